@@ -0,0 +1,87 @@
+"""
+Pipeline checkpoints
+Each stage of a run is saved under the run's key as soon as it finishes:
+
+    transcript      Whisper + diarization output (a CompactTranscript, to_json())
+    llm             pre-filter decision, action items, summary
+    issue:<n>       each created Jira issue, right after Jira returns it
+    transcript_ref  where the full transcript was published
+
+A run started again under the same key loads what exists and continues
+after the last completed step. That covers a /jobs job reclaimed after its
+owner crashed, an /upload retried with the same Idempotency-Key after a
+failure, and a CLI run resumed after Ctrl-C. Every key belongs to one run
+at a time (lease, idempotency claim, manifest entry). Whisper and the LLM are not paid for twice, and
+issues that already exist are not created again. Checkpoints are deleted
+once the run succeeds; those of runs that never come back are purged after
+CHECKPOINT_TTL_SECONDS.
+
+They live in the job store (app.jobs): a local SQLite file by default, or
+Postgres shared by every instance.
+"""
+import hashlib
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.jobs import get_job_store
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class Checkpoint:
+    """
+    Checkpoints of one run. Loaded once when the run starts; save() writes
+    through (blocking, so call it from a worker thread in async code).
+    A Checkpoint without a store (checkpoints disabled) saves nothing.
+    """
+
+    def __init__(self, store, run_key: str, values: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.run_key = run_key
+        self._values = dict(values or {})
+        self.resumed: List[str] = []
+
+    def get(self, step: str) -> Any:
+        """A checkpointed value, recorded in `resumed` when found"""
+        value = self._values.get(step)
+        if value is not None and step not in self.resumed:
+            self.resumed.append(step)
+        return value
+
+    def save(self, step: str, value: Any):
+        self._values[step] = value
+        if self.store is None:
+            return
+        try:
+            self.store.save_checkpoint(self.run_key, step, value)
+        except Exception as e:
+            # Losing a checkpoint only costs redoing the step after a crash
+            logger.warning("Checkpoint %s of %s not saved: %s", step, self.run_key, e, extra={"stage": "checkpoint"})
+
+    def clear(self):
+        """Drop the run's checkpoints once it has succeeded"""
+        if self.store is None:
+            return
+        try:
+            self.store.clear_checkpoints(self.run_key)
+        except Exception as e:
+            logger.warning("Checkpoints of %s not cleared: %s", self.run_key, e, extra={"stage": "checkpoint"})
+
+
+def run_key(kind: str, *parts: Any) -> str:
+    """Stable key of a run from what identifies it (tenant, endpoint, Idempotency-Key...)"""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+    return f"{kind}:{digest}"
+
+
+def open_checkpoint(key: str) -> Checkpoint:
+    """Load the checkpoints of run `key` (blocking); a no-op Checkpoint when CHECKPOINTS_ENABLED is off"""
+    if not getattr(settings, "CHECKPOINTS_ENABLED", True):
+        return Checkpoint(None, key)
+    store = get_job_store()
+    try:
+        values = store.load_checkpoints(key)
+    except Exception as e:
+        logger.warning("Checkpoints of %s not loaded: %s", key, e, extra={"stage": "checkpoint"})
+        values = {}
+    return Checkpoint(store, key, values)
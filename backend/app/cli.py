@@ -0,0 +1,367 @@
+"""
+Headless batch processing
+Runs the upload pipeline over a directory of recordings in-process, without
+the HTTP server. It handles transcription or caption/text parsing, LLM
+extraction and summary, and Jira:
+
+    python -m app.cli process /archive/2025 --project ENG --out results.jsonl
+
+Each of `--processes` worker processes keeps `--concurrency` files in
+flight. Inside a process, stage concurrency is capped by the same scheduler
+limits as the server (WHISPER_CONCURRENCY, LLM_CONCURRENCY,
+JIRA_CONCURRENCY). One JSON line per file is appended to `--out`. The
+manifest (`<out>.manifest` by default) records each finished file by path,
+size and mtime, so re-running the same command resumes where it stopped.
+A file interrupted mid-run resumes from its pipeline checkpoints
+(app.checkpoints) instead of starting over.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.checkpoints import open_checkpoint, run_key
+from app.config import settings
+from app.logs import configure_logging, get_logger, new_request_id
+from app.pipeline import elapsed_ms, process_transcript_and_create_issues, transcribe_audio
+from app.scheduler import set_current_tenant, tenant_key
+from app.services.captions import CAPTION_FORMATS, parse_captions
+from app.tracing import tracer
+
+logger = get_logger(__name__)
+
+# Attempts per file when a stage answers 429 (scheduler queue full)
+_MAX_ATTEMPTS = 5
+
+# (path, size, mtime_ns)
+FileRef = Tuple[str, int, int]
+
+
+def supported_extensions():
+    return {ext.lower() for ext in settings.ALLOWED_AUDIO_FORMATS} | {".txt"} | set(CAPTION_FORMATS)
+
+
+def discover(root: str, skip=()) -> Iterator[str]:
+    """Supported files under `root` in a stable order (hidden files and directories skipped)"""
+    extensions = supported_extensions()
+    skip = {os.path.abspath(p) for p in skip}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.startswith(".") or os.path.splitext(name)[1].lower() not in extensions:
+                continue
+            path = os.path.abspath(os.path.join(dirpath, name))
+            if path not in skip:
+                yield path
+
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """Latest manifest entry per file path (a torn last line from a crash is ignored)"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["path"]] = entry
+    return entries
+
+
+def pending_files(paths: Iterator[str], manifest: Dict[str, Dict[str, Any]], retry_failed: bool) -> Iterator[FileRef]:
+    """Files not yet finished in the manifest (or changed since they were)"""
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entry = manifest.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            if entry["status"] == "ok" or not retry_failed:
+                continue
+        yield path, stat.st_size, stat.st_mtime_ns
+
+
+def _read_text(path: str) -> str:
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ValueError("Unable to decode text file. Please use UTF-8 encoded .txt files.")
+
+
+def _read_caption_file(path: str, file_ext: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return parse_captions(f, file_ext)
+
+
+async def process_file(ref: FileRef, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one file through the pipeline; returns its output record (status ok/error)"""
+    path, size, mtime_ns = ref
+    file_ext = os.path.splitext(path)[1].lower()
+    filename = os.path.basename(path)
+    record = {"path": path, "size": size, "mtime_ns": mtime_ns}
+    started = time.perf_counter()
+
+    key = run_key("cli", path, size, mtime_ns, options["project"], options["issue_type"], options["priority"])
+    checkpoint = await asyncio.to_thread(open_checkpoint, key)
+    new_request_id()
+    with tracer.start_span("cli.process", {"file.name": filename, "file.size_bytes": size, "jira.project": options["project"]}):
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            timings: Dict[str, float] = {}
+            try:
+                segments = None
+                if file_ext == ".txt":
+                    transcript_text = await asyncio.to_thread(_read_text, path)
+                elif file_ext in CAPTION_FORMATS:
+                    captions = await asyncio.to_thread(_read_caption_file, path, file_ext)
+                    transcript_text, segments = captions["text"], captions["segments"]
+                else:
+                    transcript_text, segments = await transcribe_audio(path, options["project"], timings, checkpoint)
+                if not transcript_text.strip():
+                    raise ValueError("Empty transcript")
+
+                result = await process_transcript_and_create_issues(
+                    transcript_text=transcript_text,
+                    filename=filename,
+                    jira_project_key=options["project"],
+                    jira_issue_type=options["issue_type"],
+                    jira_priority=options["priority"],
+                    timings=timings,
+                    segments=segments,
+                    create_issues=not options["skip_jira"],
+                    checkpoint=checkpoint
+                )
+                await asyncio.to_thread(checkpoint.clear)
+                record.update(status="ok", result=result)
+                break
+            except HTTPException as e:
+                if e.status_code == 429 and attempt < _MAX_ATTEMPTS:
+                    await asyncio.sleep(float((e.headers or {}).get("Retry-After", 1)))
+                    continue
+                record.update(status="error", error=str(e.detail))
+                break
+            except Exception as e:
+                record.update(status="error", error=str(e) or type(e).__name__)
+                break
+
+    record["duration_ms"] = elapsed_ms(started)
+    if record["status"] == "error":
+        logger.warning("Failed to process %s: %s", path, record["error"], extra={"stage": "cli"})
+    return record
+
+
+async def run_worker(next_file: Callable[[], Optional[FileRef]], emit: Callable[[Dict[str, Any]], None], options: Dict[str, Any]):
+    """
+    Process files from the blocking `next_file()` (None when exhausted)
+    with `concurrency` in flight, passing each record to `emit`.
+    """
+    concurrency = options["concurrency"]
+    set_current_tenant(tenant_key(None, options["project"]), True)
+    refs: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    async def feed():
+        # One thread blocks on the source so the default executor stays free for stage work
+        while True:
+            ref = await asyncio.to_thread(next_file)
+            if ref is None:
+                break
+            await refs.put(ref)
+        for _ in range(concurrency):
+            await refs.put(None)
+
+    async def work():
+        while True:
+            ref = await refs.get()
+            if ref is None:
+                return
+            emit(await process_file(ref, options))
+
+    await asyncio.gather(feed(), *(work() for _ in range(concurrency)))
+
+
+def _worker_process(tasks, results, options: Dict[str, Any]):
+    """Entry point of a --processes worker: records go back to the parent, then None"""
+    configure_logging()
+    try:
+        asyncio.run(run_worker(tasks.get, results.put, options))
+    finally:
+        results.put(None)
+
+
+class ResultWriter:
+    """Appends output records and manifest entries (the parent process is the only writer)"""
+
+    def __init__(self, out_path: str, manifest_path: str, progress_seconds: float = 10.0):
+        self._out = open(out_path, "a", encoding="utf-8")
+        self._manifest = open(manifest_path, "a", encoding="utf-8")
+        self._progress_seconds = progress_seconds
+        self._started = time.monotonic()
+        self._last_progress = self._started
+        self.ok = 0
+        self.failed = 0
+
+    def write(self, record: Dict[str, Any]):
+        # Output first: a file is only marked finished once its result is on disk
+        self._out.write(json.dumps(record, default=str) + "\n")
+        self._out.flush()
+        self._manifest.write(json.dumps({
+            "path": record["path"],
+            "size": record["size"],
+            "mtime_ns": record["mtime_ns"],
+            "status": record["status"],
+            "finished_at": time.time(),
+        }) + "\n")
+        self._manifest.flush()
+        if record["status"] == "ok":
+            self.ok += 1
+        else:
+            self.failed += 1
+        now = time.monotonic()
+        if now - self._last_progress >= self._progress_seconds:
+            self._last_progress = now
+            self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self._started
+        done = self.ok + self.failed
+        rate = done / elapsed if elapsed else 0.0
+        print(f"{done} files ({self.failed} failed) in {elapsed:.0f}s, {rate:.2f} files/s", file=sys.stderr, flush=True)
+
+    def close(self):
+        self._out.close()
+        self._manifest.close()
+
+
+def _feed(files: Iterator[FileRef], tasks, stop: int):
+    """Push files onto the task queue, then one None per worker process"""
+    for ref in files:
+        tasks.put(ref)
+    for _ in range(stop):
+        tasks.put(None)
+
+
+def _run_in_process(files: Iterator[FileRef], writer: ResultWriter, options: Dict[str, Any]):
+    lock = threading.Lock()
+
+    def next_file():
+        with lock:
+            return next(files, None)
+
+    asyncio.run(run_worker(next_file, writer.write, options))
+    return 0
+
+
+def _run_processes(files: Iterator[FileRef], writer: ResultWriter, options: Dict[str, Any]):
+    # spawn: workers build their own service clients instead of inheriting the parent's threads
+    context = multiprocessing.get_context("spawn")
+    processes = options["processes"]
+    tasks = context.Queue(maxsize=processes * options["concurrency"] * 2)
+    results = context.Queue()
+    workers = [context.Process(target=_worker_process, args=(tasks, results, options), daemon=True) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    # Each worker process stops at its first None
+    threading.Thread(target=_feed, args=(files, tasks, processes), daemon=True).start()
+
+    finished = 0
+    try:
+        while finished < processes:
+            try:
+                record = results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    break
+                continue
+            if record is None:
+                finished += 1
+            else:
+                writer.write(record)
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+    crashed = [worker.exitcode for worker in workers if worker.exitcode]
+    if crashed:
+        print(f"{len(crashed)} worker process(es) exited abnormally (exit codes {crashed}); re-run to resume", file=sys.stderr)
+        return 1
+    return 0
+
+
+def process_command(args) -> int:
+    if not os.path.isdir(args.directory):
+        print(f"Not a directory: {args.directory}", file=sys.stderr)
+        return 2
+    out_path = os.path.abspath(args.out)
+    manifest_path = os.path.abspath(args.manifest or f"{args.out}.manifest")
+    options = {
+        "project": args.project,
+        "issue_type": args.issue_type,
+        "priority": args.priority,
+        "skip_jira": args.skip_jira,
+        "concurrency": max(1, args.concurrency),
+        "processes": max(1, args.processes),
+    }
+
+    manifest = load_manifest(manifest_path)
+    files = pending_files(discover(args.directory, skip=(out_path, manifest_path)), manifest, args.retry_failed)
+    if args.limit:
+        files = (ref for _, ref in zip(range(args.limit), files))
+
+    writer = ResultWriter(out_path, manifest_path)
+    try:
+        if options["processes"] == 1:
+            status = _run_in_process(files, writer, options)
+        else:
+            status = _run_processes(files, writer, options)
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume", file=sys.stderr)
+        status = 130
+    finally:
+        writer.report()
+        writer.close()
+    if status == 0 and writer.failed:
+        status = 1
+    return status
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Audio to Jira batch processing")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    process = commands.add_parser("process", help="Process every recording, transcript and caption export under a directory")
+    process.add_argument("directory", help="Directory to scan (recursively)")
+    process.add_argument("--project", required=True, help="Jira project key (also the speaker-enrollment scope)")
+    process.add_argument("--issue-type", default="Task", help="Jira issue type (default: Task)")
+    process.add_argument("--priority", default="Medium", help="Jira priority (default: Medium)")
+    process.add_argument("--out", default="results.jsonl", help="JSONL output, appended to (default: results.jsonl)")
+    process.add_argument("--manifest", help="Resume manifest (default: <out>.manifest)")
+    process.add_argument("--concurrency", type=int, default=8, help="Files in flight per process (default: 8)")
+    process.add_argument("--processes", type=int, default=1, help="Worker processes, for CPU-bound local Whisper/diarization (default: 1)")
+    process.add_argument("--skip-jira", action="store_true", help="Extract and summarize only; do not create issues")
+    process.add_argument("--retry-failed", action="store_true", help="Reprocess files that failed on a previous run")
+    process.add_argument("--limit", type=int, help="Stop after this many files (for trial runs)")
+    process.set_defaults(handler=process_command)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
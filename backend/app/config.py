@@ -4,6 +4,7 @@ Application configuration
 from pydantic_settings import BaseSettings
 from typing import List, Optional
 import os
+import threading
 
 
 class Settings(BaseSettings):
@@ -22,9 +23,42 @@ class Settings(BaseSettings):
     # Groq API (for LLM extraction)
     GROQ_API_KEY: Optional[str] = None
     LLM_MODEL: str = "llama-3.1-70b-versatile"
+    GROQ_BASE_URL: Optional[str] = None
     
     # OpenAI (for Whisper transcription)
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: Optional[str] = None
+
+    # Local transcription via faster-whisper (used for live meetings when enabled)
+    USE_LOCAL_WHISPER: bool = False
+    WHISPER_MODEL: str = "base"
+
+    # Live meetings (WebSocket): seconds of audio per transcription window
+    LIVE_WINDOW_SECONDS: float = 30.0
+    # Windows a session may have waiting for transcription; newer ones are dropped
+    LIVE_MAX_PENDING_WINDOWS: int = 4
+
+    # Speaker diarization and per-team speaker/owner directory
+    ENABLE_DIARIZATION: bool = True
+    DIARIZATION_THRESHOLD: float = 0.75
+    DIARIZATION_MAX_SPEAKERS: int = 8
+    SPEAKER_DIR: str = "./data/speakers"
+
+    # Local mirror of assignable Jira users (owner -> assignee resolution)
+    ENABLE_USER_DIRECTORY: bool = True
+    USER_DIRECTORY_DIR: str = "./data/jira_users"
+    USER_DIRECTORY_TTL_SECONDS: float = 900.0
+    USER_MATCH_MIN_SCORE: float = 0.6
+
+    # Issue descriptions: full transcript is attached once ("attachment") or
+    # kept under TRANSCRIPT_DIR ("local"); issues carry an excerpt + link
+    TRANSCRIPT_STORAGE: str = "attachment"
+    TRANSCRIPT_DIR: str = "./data/transcripts"
+    PUBLIC_BASE_URL: str = ""
+    ISSUE_EXCERPT_CHARS: int = 800
+
+    # Local models via Ollama when no API key is set
+    ENABLE_LOCAL_MODE: bool = False
     
     # Jira Integration
     JIRA_BASE_URL: Optional[str] = None
@@ -34,28 +68,252 @@ class Settings(BaseSettings):
     # File upload
     MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB
     ALLOWED_AUDIO_FORMATS: List[str] = [".mp3", ".wav", ".m4a", ".ogg", ".flac"]
+    # Recordings longer than this (read from the file headers) are refused
+    # at upload; 0 disables the check
+    MAX_AUDIO_DURATION_SECONDS: float = 4 * 3600
     
     # Storage
     UPLOAD_DIR: str = "./uploads"
+    # Total bytes UPLOAD_DIR may hold; uploads beyond it wait, then get 503
+    UPLOAD_DISK_BUDGET: int = 2 * 1024 * 1024 * 1024  # 2GB
+    UPLOAD_QUEUE_TIMEOUT: float = 30.0
+    # Janitor: delete files nobody owns after this age, every interval seconds
+    UPLOAD_ORPHAN_AGE_SECONDS: float = 6 * 3600
+    UPLOAD_JANITOR_INTERVAL: float = 300.0
+    # Bytes each queued-audio directory (JOB_AUDIO_DIR, DEFERRED_AUDIO_DIR) may
+    # hold; queued uploads beyond it get 503
+    QUEUED_AUDIO_BUDGET: int = 20 * 1024 * 1024 * 1024  # 20GB
+
+    # Admission control: concurrent calls per stage, queue bounds (429 beyond),
+    # tenant weights and the share given to batch requests. Weights name project
+    # keys or API key tenants, "key:" + first 12 hex of the key's SHA-256:
+    # "PROJ=4,key:3f9a0c1d2e4b=2".
+    # Per worker process: the server-wide limit is WEB_CONCURRENCY times these
+    WHISPER_CONCURRENCY: int = 4
+    DIARIZATION_CONCURRENCY: int = 2
+    LLM_CONCURRENCY: int = 8
+    JIRA_CONCURRENCY: int = 8
+    STAGE_QUEUE_LIMIT: int = 100
+    TENANT_QUEUE_LIMIT: int = 20
+    TENANT_WEIGHTS: str = ""
+    BATCH_WEIGHT: float = 0.25
+
+    # Idempotency-Key: results kept for TTL; a running request whose worker
+    # stopped heartbeating for STALE seconds may be taken over; retries on
+    # another worker wait up to WAIT seconds for the result (then 409)
+    IDEMPOTENCY_DB: str = "./data/idempotency.sqlite3"
+    IDEMPOTENCY_TTL_SECONDS: float = 24 * 3600
+    IDEMPOTENCY_STALE_SECONDS: float = 900.0
+    IDEMPOTENCY_WAIT_SECONDS: float = 120.0
+
+    # Server lifecycle
+    WARMUP_SERVICES: bool = True
+    SHUTDOWN_DRAIN_TIMEOUT: int = 120
+
+    # Tracing: "none", "console" (stderr) or "file" (OTLP/JSON lines)
+    TRACE_EXPORTER: str = "none"
+    TRACE_FILE: str = "./traces.jsonl"
+    TRACE_SERVICE_NAME: str = "meeto-backend"
+
+    # Logging: JSON lines ("json") or "text" on stderr via a background
+    # writer; records sharing a rate_limit key are capped per minute
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_RATE_LIMIT_PER_MINUTE: int = 10
+    LOG_QUEUE_SIZE: int = 10000
+
+    # Similar past action items (local vector index)
+    ENABLE_SIMILAR_ITEMS: bool = True
+    VECTOR_INDEX_DIR: str = "./data/action_index"
+    SIMILAR_ITEMS_TOP_K: int = 3
+    SIMILAR_ITEMS_MIN_SCORE: float = 0.35
+
+    # Lexical pre-filter before LLM extraction: transcripts scoring below the
+    # threshold get PREFILTER_LOW_ROUTE ("summary": summary call only, "regex":
+    # no LLM call); under PREFILTER_MIN_WORDS words always "regex"
+    ENABLE_ACTION_PREFILTER: bool = True
+    PREFILTER_THRESHOLD: float = 0.3
+    PREFILTER_LOW_ROUTE: str = "summary"
+    PREFILTER_MIN_WORDS: int = 5
+
+    # Extraction cascade: LLM_SMALL_MODEL answers first (Groq default:
+    # llama-3.1-8b-instant) and escalates to LLM_MODEL when its JSON is
+    # invalid, any kept task is below CASCADE_MIN_CONFIDENCE, or the
+    # transcript's complexity (1.0 ~ 2000 words, 2 speakers) is above the max
+    ENABLE_MODEL_CASCADE: bool = True
+    LLM_SMALL_MODEL: Optional[str] = None
+    CASCADE_MIN_CONFIDENCE: float = 0.7
+    CASCADE_MAX_COMPLEXITY: float = 1.0
+
+    # Prompt layout (app/services/prompts.py): 2 = static system prompt shared
+    # by extraction and summary, then the transcript, then the task, so both
+    # calls hit provider prompt caches; 1 = previous layout
+    PROMPT_VERSION: str = "2"
+
+    # How long Ollama keeps the local model loaded after a request ("30m",
+    # "-1" = forever); the model is also loaded at startup
+    OLLAMA_KEEP_ALIVE: str = "30m"
+
+    # Deferred mode (/deferred/upload): jobs queue in DEFERRED_DB and their
+    # LLM calls go out as one provider batch job once BATCH_MIN_JOBS are ready
+    # or the oldest has waited BATCH_MAX_WAIT_SECONDS (at most BATCH_MAX_JOBS
+    # per batch); batch status is polled every BATCH_POLL_SECONDS
+    DEFERRED_DB: str = "./data/deferred.sqlite3"
+    DEFERRED_AUDIO_DIR: str = "./data/deferred_audio"
+    DEFERRED_STALE_SECONDS: float = 900.0
+    DEFERRED_TTL_SECONDS: float = 604800.0
+    BATCH_MIN_JOBS: int = 20
+    BATCH_MAX_JOBS: int = 1000
+    BATCH_MAX_WAIT_SECONDS: float = 600.0
+    BATCH_POLL_SECONDS: float = 30.0
+    BATCH_MAX_ATTEMPTS: int = 3
+    BATCH_COMPLETION_WINDOW: str = "24h"
+
+    # Leased job queue (/jobs/upload): jobs live in JOB_STORE_URL (sqlite:///path
+    # for one host, postgresql://... shared by all instances) and every instance
+    # leases JOB_WORKER_CONCURRENCY at a time. A lease is a visibility timeout of
+    # JOB_LEASE_SECONDS, renewed by heartbeats; a job whose owner stops
+    # heartbeating is picked up by another instance. JOB_AUDIO_DIR must be
+    # storage every instance can read (a shared mount across hosts).
+    JOB_STORE_URL: str = "sqlite:///./data/jobs.sqlite3"
+    JOB_AUDIO_DIR: str = "./data/job_audio"
+    JOB_WORKER_ENABLED: bool = True
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_LEASE_SECONDS: float = 60.0
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_TTL_SECONDS: float = 604800.0
+
+    # Pipeline checkpoints (app.checkpoints): finished stages of a run are
+    # saved in the job store so a crashed run resumes where it stopped; those of
+    # runs never retried are purged after CHECKPOINT_TTL_SECONDS
+    CHECKPOINTS_ENABLED: bool = True
+    CHECKPOINT_TTL_SECONDS: float = 86400.0
+
+
+def _load_settings():
+    """Build the settings object - catch any errors"""
+    try:
+        settings = Settings()
+    except Exception as e:
+        print(f"Warning: Error loading settings: {e}")
+        print("Using default settings...")
+        # Create minimal settings if pydantic fails
+        class SimpleSettings:
+            SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+            CORS_ORIGINS = ["*"]
+            GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+            LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-70b-versatile")
+            GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+            OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+            OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+            USE_LOCAL_WHISPER = os.getenv("USE_LOCAL_WHISPER", "false").lower() == "true"
+            WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+            LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", "30"))
+            LIVE_MAX_PENDING_WINDOWS = int(os.getenv("LIVE_MAX_PENDING_WINDOWS", "4"))
+            ENABLE_DIARIZATION = os.getenv("ENABLE_DIARIZATION", "true").lower() == "true"
+            DIARIZATION_THRESHOLD = float(os.getenv("DIARIZATION_THRESHOLD", "0.75"))
+            DIARIZATION_MAX_SPEAKERS = int(os.getenv("DIARIZATION_MAX_SPEAKERS", "8"))
+            SPEAKER_DIR = os.getenv("SPEAKER_DIR", "./data/speakers")
+            ENABLE_USER_DIRECTORY = os.getenv("ENABLE_USER_DIRECTORY", "true").lower() == "true"
+            USER_DIRECTORY_DIR = os.getenv("USER_DIRECTORY_DIR", "./data/jira_users")
+            USER_DIRECTORY_TTL_SECONDS = float(os.getenv("USER_DIRECTORY_TTL_SECONDS", "900"))
+            USER_MATCH_MIN_SCORE = float(os.getenv("USER_MATCH_MIN_SCORE", "0.6"))
+            TRANSCRIPT_STORAGE = os.getenv("TRANSCRIPT_STORAGE", "attachment")
+            TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "./data/transcripts")
+            PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "")
+            ISSUE_EXCERPT_CHARS = int(os.getenv("ISSUE_EXCERPT_CHARS", "800"))
+            ENABLE_LOCAL_MODE = os.getenv("ENABLE_LOCAL_MODE", "false").lower() == "true"
+            JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")
+            JIRA_EMAIL = os.getenv("JIRA_EMAIL")
+            JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
+            MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "104857600"))
+            ALLOWED_AUDIO_FORMATS = [".mp3", ".wav", ".m4a", ".ogg", ".flac"]
+            MAX_AUDIO_DURATION_SECONDS = float(os.getenv("MAX_AUDIO_DURATION_SECONDS", str(4 * 3600)))
+            UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+            UPLOAD_DISK_BUDGET = int(os.getenv("UPLOAD_DISK_BUDGET", str(2 * 1024 * 1024 * 1024)))
+            UPLOAD_QUEUE_TIMEOUT = float(os.getenv("UPLOAD_QUEUE_TIMEOUT", "30"))
+            UPLOAD_ORPHAN_AGE_SECONDS = float(os.getenv("UPLOAD_ORPHAN_AGE_SECONDS", str(6 * 3600)))
+            UPLOAD_JANITOR_INTERVAL = float(os.getenv("UPLOAD_JANITOR_INTERVAL", "300"))
+            QUEUED_AUDIO_BUDGET = int(os.getenv("QUEUED_AUDIO_BUDGET", str(20 * 1024 * 1024 * 1024)))
+            WHISPER_CONCURRENCY = int(os.getenv("WHISPER_CONCURRENCY", "4"))
+            DIARIZATION_CONCURRENCY = int(os.getenv("DIARIZATION_CONCURRENCY", "2"))
+            LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+            JIRA_CONCURRENCY = int(os.getenv("JIRA_CONCURRENCY", "8"))
+            STAGE_QUEUE_LIMIT = int(os.getenv("STAGE_QUEUE_LIMIT", "100"))
+            TENANT_QUEUE_LIMIT = int(os.getenv("TENANT_QUEUE_LIMIT", "20"))
+            TENANT_WEIGHTS = os.getenv("TENANT_WEIGHTS", "")
+            BATCH_WEIGHT = float(os.getenv("BATCH_WEIGHT", "0.25"))
+            IDEMPOTENCY_DB = os.getenv("IDEMPOTENCY_DB", "./data/idempotency.sqlite3")
+            IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+            IDEMPOTENCY_STALE_SECONDS = float(os.getenv("IDEMPOTENCY_STALE_SECONDS", "900"))
+            IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "120"))
+            WARMUP_SERVICES = os.getenv("WARMUP_SERVICES", "true").lower() == "true"
+            SHUTDOWN_DRAIN_TIMEOUT = int(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "120"))
+            TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+            TRACE_FILE = os.getenv("TRACE_FILE", "./traces.jsonl")
+            TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "meeto-backend")
+            LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+            LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+            LOG_RATE_LIMIT_PER_MINUTE = int(os.getenv("LOG_RATE_LIMIT_PER_MINUTE", "10"))
+            LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+            ENABLE_SIMILAR_ITEMS = os.getenv("ENABLE_SIMILAR_ITEMS", "true").lower() == "true"
+            VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "./data/action_index")
+            SIMILAR_ITEMS_TOP_K = int(os.getenv("SIMILAR_ITEMS_TOP_K", "3"))
+            SIMILAR_ITEMS_MIN_SCORE = float(os.getenv("SIMILAR_ITEMS_MIN_SCORE", "0.35"))
+            ENABLE_ACTION_PREFILTER = os.getenv("ENABLE_ACTION_PREFILTER", "true").lower() == "true"
+            PREFILTER_THRESHOLD = float(os.getenv("PREFILTER_THRESHOLD", "0.3"))
+            PREFILTER_LOW_ROUTE = os.getenv("PREFILTER_LOW_ROUTE", "summary")
+            PREFILTER_MIN_WORDS = int(os.getenv("PREFILTER_MIN_WORDS", "5"))
+            ENABLE_MODEL_CASCADE = os.getenv("ENABLE_MODEL_CASCADE", "true").lower() == "true"
+            LLM_SMALL_MODEL = os.getenv("LLM_SMALL_MODEL")
+            CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+            CASCADE_MAX_COMPLEXITY = float(os.getenv("CASCADE_MAX_COMPLEXITY", "1.0"))
+            PROMPT_VERSION = os.getenv("PROMPT_VERSION", "2")
+            OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+            DEFERRED_DB = os.getenv("DEFERRED_DB", "./data/deferred.sqlite3")
+            DEFERRED_AUDIO_DIR = os.getenv("DEFERRED_AUDIO_DIR", "./data/deferred_audio")
+            DEFERRED_STALE_SECONDS = float(os.getenv("DEFERRED_STALE_SECONDS", "900"))
+            DEFERRED_TTL_SECONDS = float(os.getenv("DEFERRED_TTL_SECONDS", "604800"))
+            BATCH_MIN_JOBS = int(os.getenv("BATCH_MIN_JOBS", "20"))
+            BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "1000"))
+            BATCH_MAX_WAIT_SECONDS = float(os.getenv("BATCH_MAX_WAIT_SECONDS", "600"))
+            BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "30"))
+            BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+            BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+            JOB_STORE_URL = os.getenv("JOB_STORE_URL", "sqlite:///./data/jobs.sqlite3")
+            JOB_AUDIO_DIR = os.getenv("JOB_AUDIO_DIR", "./data/job_audio")
+            JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+            JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+            JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+            JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+            JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+            JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "604800"))
+            CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() == "true"
+            CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", "86400"))
+        settings = SimpleSettings()
+    return settings
+
+
+class _LazySettings:
+    """
+    Proxy that loads settings (and reads .env) on first attribute access
+    rather than at import time. Thread-safe.
+    """
+
+    def __init__(self):
+        self._settings = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._settings is None:
+            with self._lock:
+                if self._settings is None:
+                    self._settings = _load_settings()
+        return self._settings
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
 
 
-# Initialize settings - catch any errors
-try:
-    settings = Settings()
-except Exception as e:
-    print(f"Warning: Error loading settings: {e}")
-    print("Using default settings...")
-    # Create minimal settings if pydantic fails
-    class SimpleSettings:
-        SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-        CORS_ORIGINS = ["*"]
-        GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-        LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-70b-versatile")
-        OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-        JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")
-        JIRA_EMAIL = os.getenv("JIRA_EMAIL")
-        JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
-        MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "104857600"))
-        ALLOWED_AUDIO_FORMATS = [".mp3", ".wav", ".m4a", ".ogg", ".flac"]
-        UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
-    settings = SimpleSettings()
+settings = _LazySettings()
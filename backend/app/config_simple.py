@@ -18,11 +18,40 @@ class Settings:
         # Groq API (for LLM extraction)
         self.GROQ_API_KEY = os.getenv("GROQ_API_KEY")
         self.LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-70b-versatile")
+        self.ENABLE_LOCAL_MODE = os.getenv("ENABLE_LOCAL_MODE", "false").lower() == "true"
+        self.GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+
+        # OpenAI (Whisper API, optional LLM provider)
+        self.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+        self.OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
         
         # Whisper
         self.WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
         use_local = os.getenv("USE_LOCAL_WHISPER", "true").lower()
         self.USE_LOCAL_WHISPER = use_local == "true"
+
+        # Live meetings (WebSocket): seconds of audio per transcription window
+        self.LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", "30"))
+        self.LIVE_MAX_PENDING_WINDOWS = int(os.getenv("LIVE_MAX_PENDING_WINDOWS", "4"))
+
+        # Speaker diarization and per-team speaker/owner directory
+        self.ENABLE_DIARIZATION = os.getenv("ENABLE_DIARIZATION", "true").lower() == "true"
+        self.DIARIZATION_THRESHOLD = float(os.getenv("DIARIZATION_THRESHOLD", "0.75"))
+        self.DIARIZATION_MAX_SPEAKERS = int(os.getenv("DIARIZATION_MAX_SPEAKERS", "8"))
+        self.SPEAKER_DIR = os.getenv("SPEAKER_DIR", "./data/speakers")
+
+        # Local mirror of assignable Jira users (owner -> assignee resolution)
+        self.ENABLE_USER_DIRECTORY = os.getenv("ENABLE_USER_DIRECTORY", "true").lower() == "true"
+        self.USER_DIRECTORY_DIR = os.getenv("USER_DIRECTORY_DIR", "./data/jira_users")
+        self.USER_DIRECTORY_TTL_SECONDS = float(os.getenv("USER_DIRECTORY_TTL_SECONDS", "900"))
+        self.USER_MATCH_MIN_SCORE = float(os.getenv("USER_MATCH_MIN_SCORE", "0.6"))
+
+        # Issue descriptions: full transcript is attached once ("attachment") or
+        # kept under TRANSCRIPT_DIR ("local"); issues carry an excerpt + link
+        self.TRANSCRIPT_STORAGE = os.getenv("TRANSCRIPT_STORAGE", "attachment")
+        self.TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "./data/transcripts")
+        self.PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "")
+        self.ISSUE_EXCERPT_CHARS = int(os.getenv("ISSUE_EXCERPT_CHARS", "800"))
         
         # Jira Integration
         self.JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")
@@ -33,15 +62,132 @@ class Settings:
         self.MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "104857600"))  # 100MB
         # Allow .txt transcripts in addition to audio formats
         self.ALLOWED_AUDIO_FORMATS = [".mp3", ".wav", ".m4a", ".ogg", ".flac", ".txt"]
+        # Longest recording accepted (from the file headers); 0 disables
+        self.MAX_AUDIO_DURATION_SECONDS = float(os.getenv("MAX_AUDIO_DURATION_SECONDS", str(4 * 3600)))
         
         # Storage
         self.UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+        # Total bytes UPLOAD_DIR may hold; uploads beyond it wait, then get 503
+        self.UPLOAD_DISK_BUDGET = int(os.getenv("UPLOAD_DISK_BUDGET", str(2 * 1024 * 1024 * 1024)))  # 2GB
+        self.UPLOAD_QUEUE_TIMEOUT = float(os.getenv("UPLOAD_QUEUE_TIMEOUT", "30"))
+        # Janitor: delete files nobody owns after this age, every interval seconds
+        self.UPLOAD_ORPHAN_AGE_SECONDS = float(os.getenv("UPLOAD_ORPHAN_AGE_SECONDS", str(6 * 3600)))
+        self.UPLOAD_JANITOR_INTERVAL = float(os.getenv("UPLOAD_JANITOR_INTERVAL", "300"))
+        # Bytes each queued-audio directory (JOB_AUDIO_DIR, DEFERRED_AUDIO_DIR) may
+        # hold; queued uploads beyond it get 503
+        self.QUEUED_AUDIO_BUDGET = int(os.getenv("QUEUED_AUDIO_BUDGET", str(20 * 1024 * 1024 * 1024)))  # 20GB
+
+        # Admission control: concurrent calls per stage, queue bounds (429 beyond),
+        # tenant weights and the share given to batch requests. Weights name project
+        # keys or API key tenants, "key:" + first 12 hex of the key's SHA-256:
+        # "PROJ=4,key:3f9a0c1d2e4b=2".
+        # Per worker process: the server-wide limit is WEB_CONCURRENCY times these
+        self.WHISPER_CONCURRENCY = int(os.getenv("WHISPER_CONCURRENCY", "4"))
+        self.DIARIZATION_CONCURRENCY = int(os.getenv("DIARIZATION_CONCURRENCY", "2"))
+        self.LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+        self.JIRA_CONCURRENCY = int(os.getenv("JIRA_CONCURRENCY", "8"))
+        self.STAGE_QUEUE_LIMIT = int(os.getenv("STAGE_QUEUE_LIMIT", "100"))
+        self.TENANT_QUEUE_LIMIT = int(os.getenv("TENANT_QUEUE_LIMIT", "20"))
+        self.TENANT_WEIGHTS = os.getenv("TENANT_WEIGHTS", "")
+        self.BATCH_WEIGHT = float(os.getenv("BATCH_WEIGHT", "0.25"))
+
+        # Idempotency-Key: results kept for TTL; a running request whose worker
+        # stopped heartbeating for STALE seconds may be taken over; retries on
+        # another worker wait up to WAIT seconds for the result (then 409)
+        self.IDEMPOTENCY_DB = os.getenv("IDEMPOTENCY_DB", "./data/idempotency.sqlite3")
+        self.IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+        self.IDEMPOTENCY_STALE_SECONDS = float(os.getenv("IDEMPOTENCY_STALE_SECONDS", "900"))
+        self.IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "120"))
+
+        # Server lifecycle
+        self.WARMUP_SERVICES = os.getenv("WARMUP_SERVICES", "true").lower() == "true"
+        self.SHUTDOWN_DRAIN_TIMEOUT = int(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "120"))
+
+        # Tracing: "none", "console" (stderr) or "file" (OTLP/JSON lines)
+        self.TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+        self.TRACE_FILE = os.getenv("TRACE_FILE", "./traces.jsonl")
+        self.TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "meeto-backend")
+
+        # Logging: JSON lines ("json") or "text" on stderr via a background
+        # writer; records sharing a rate_limit key are capped per minute
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+        self.LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+        self.LOG_RATE_LIMIT_PER_MINUTE = int(os.getenv("LOG_RATE_LIMIT_PER_MINUTE", "10"))
+        self.LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
         # Task extraction tuning
         # Tasks with confidence below this threshold will be filtered out
         self.TASK_CONFIDENCE_THRESHOLD = float(os.getenv("TASK_CONFIDENCE_THRESHOLD", "0.4"))
         # Whether to apply deterministic normalization heuristics to task descriptions
         self.NORMALIZE_TASKS = os.getenv("NORMALIZE_TASKS", "true").lower() == "true"
 
+        # Similar past action items (local vector index)
+        self.ENABLE_SIMILAR_ITEMS = os.getenv("ENABLE_SIMILAR_ITEMS", "true").lower() == "true"
+        self.VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "./data/action_index")
+        self.SIMILAR_ITEMS_TOP_K = int(os.getenv("SIMILAR_ITEMS_TOP_K", "3"))
+        self.SIMILAR_ITEMS_MIN_SCORE = float(os.getenv("SIMILAR_ITEMS_MIN_SCORE", "0.35"))
+
+        # Lexical pre-filter before LLM extraction: transcripts scoring below the
+        # threshold get PREFILTER_LOW_ROUTE ("summary": summary call only, "regex":
+        # no LLM call); under PREFILTER_MIN_WORDS words always "regex"
+        self.ENABLE_ACTION_PREFILTER = os.getenv("ENABLE_ACTION_PREFILTER", "true").lower() == "true"
+        self.PREFILTER_THRESHOLD = float(os.getenv("PREFILTER_THRESHOLD", "0.3"))
+        self.PREFILTER_LOW_ROUTE = os.getenv("PREFILTER_LOW_ROUTE", "summary")
+        self.PREFILTER_MIN_WORDS = int(os.getenv("PREFILTER_MIN_WORDS", "5"))
+
+        # Extraction cascade: LLM_SMALL_MODEL answers first (Groq default:
+        # llama-3.1-8b-instant) and escalates to LLM_MODEL when its JSON is
+        # invalid, any kept task is below CASCADE_MIN_CONFIDENCE, or the
+        # transcript's complexity (1.0 ~ 2000 words, 2 speakers) is above the max
+        self.ENABLE_MODEL_CASCADE = os.getenv("ENABLE_MODEL_CASCADE", "true").lower() == "true"
+        self.LLM_SMALL_MODEL = os.getenv("LLM_SMALL_MODEL")
+        self.CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+        self.CASCADE_MAX_COMPLEXITY = float(os.getenv("CASCADE_MAX_COMPLEXITY", "1.0"))
+
+        # Prompt layout (app/services/prompts.py): 2 = static system prompt shared
+        # by extraction and summary, then the transcript, then the task, so both
+        # calls hit provider prompt caches; 1 = previous layout
+        self.PROMPT_VERSION = os.getenv("PROMPT_VERSION", "2")
+
+        # How long Ollama keeps the local model loaded after a request ("30m",
+        # "-1" = forever); the model is also loaded at startup
+        self.OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+        # Deferred mode (/deferred/upload): jobs queue in DEFERRED_DB and their
+        # LLM calls go out as one provider batch job once BATCH_MIN_JOBS are ready
+        # or the oldest has waited BATCH_MAX_WAIT_SECONDS (at most BATCH_MAX_JOBS
+        # per batch); batch status is polled every BATCH_POLL_SECONDS
+        self.DEFERRED_DB = os.getenv("DEFERRED_DB", "./data/deferred.sqlite3")
+        self.DEFERRED_AUDIO_DIR = os.getenv("DEFERRED_AUDIO_DIR", "./data/deferred_audio")
+        self.DEFERRED_STALE_SECONDS = float(os.getenv("DEFERRED_STALE_SECONDS", "900"))
+        self.DEFERRED_TTL_SECONDS = float(os.getenv("DEFERRED_TTL_SECONDS", "604800"))
+        self.BATCH_MIN_JOBS = int(os.getenv("BATCH_MIN_JOBS", "20"))
+        self.BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "1000"))
+        self.BATCH_MAX_WAIT_SECONDS = float(os.getenv("BATCH_MAX_WAIT_SECONDS", "600"))
+        self.BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "30"))
+        self.BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+        self.BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+
+        # Leased job queue (/jobs/upload): jobs live in JOB_STORE_URL (sqlite:///path
+        # for one host, postgresql://... shared by all instances) and every instance
+        # leases JOB_WORKER_CONCURRENCY at a time. A lease is a visibility timeout of
+        # JOB_LEASE_SECONDS, renewed by heartbeats; a job whose owner stops
+        # heartbeating is picked up by another instance. JOB_AUDIO_DIR must be
+        # storage every instance can read (a shared mount across hosts).
+        self.JOB_STORE_URL = os.getenv("JOB_STORE_URL", "sqlite:///./data/jobs.sqlite3")
+        self.JOB_AUDIO_DIR = os.getenv("JOB_AUDIO_DIR", "./data/job_audio")
+        self.JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+        self.JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+        self.JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+        self.JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+        self.JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "604800"))
+
+        # Pipeline checkpoints (app.checkpoints): finished stages of a run are
+        # saved in the job store so a crashed run resumes where it stopped; those of
+        # runs never retried are purged after CHECKPOINT_TTL_SECONDS
+        self.CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() == "true"
+        self.CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", "86400"))
+
 
 # Try to use pydantic settings, fallback to simple version
 try:
@@ -0,0 +1,474 @@
+"""
+Deferred processing through provider batch APIs
+Uploads sent to /deferred/upload are queued in SQLite and answered with a
+job id. A background loop in each worker moves jobs through:
+
+    queued -> ready          audio transcribed (Whisper, batch priority)
+    ready -> submitted       transcripts bundled into one JSONL batch job
+    submitted -> results     batch finished; extraction + summary parsed
+    results -> done          Jira issues created
+
+Batch jobs (OpenAI / Groq) cost half as much as synchronous calls and
+don't count against the synchronous rate limits; they finish within
+BATCH_COMPLETION_WINDOW. Every transition is a claim on the SQLite store,
+so several workers can share one queue. A worker heartbeats its claims
+while a step runs; claims left by a killed worker are released after
+DEFERRED_STALE_SECONDS.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
+from app.config import settings
+from app.logs import get_logger
+from app.scheduler import set_current_tenant
+from app.storage import QueuedAudio
+
+logger = get_logger(__name__)
+
+# Transient states (held while one worker processes a job) and the state
+# they fall back to when that worker disappears
+_CLAIMED = {
+    "transcribing": "queued",
+    "submitting": "ready",
+    "collecting": "submitted",
+    "creating": "results",
+}
+_JSON_FIELDS = ("segments", "prefilter", "extraction", "result")
+_FAILED_BATCH_STATES = ("failed", "expired", "cancelled", "cancelling")
+
+# Summary stored for jobs that get none from their batch (regex route, or a
+# failed summary request). NULL means "not summarized yet": the Jira step
+# would then make the synchronous summary call the batch was meant to replace.
+NO_SUMMARY = ""
+
+
+class DeferredRetry(Exception):
+    """The step can't run right now (e.g. the stage queue is full); retry on a later tick"""
+
+
+class DeferredJobStore:
+    """SQLite table of deferred jobs, their state and intermediate results"""
+
+    def __init__(self, path: str, stale_seconds: float = 900, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.stale_seconds = stale_seconds
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS deferred_jobs (
+                id TEXT PRIMARY KEY,
+                tenant TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                project_key TEXT NOT NULL,
+                issue_type TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                state TEXT NOT NULL,
+                audio_path TEXT,
+                transcript TEXT,
+                segments TEXT,
+                prefilter TEXT,
+                batch_id TEXT,
+                extraction TEXT,
+                summary TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS deferred_jobs_state ON deferred_jobs (state, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS deferred_jobs_batch ON deferred_jobs (batch_id)")
+        self._purged_at = 0.0
+
+    def _row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for field in _JSON_FIELDS:
+            if job.get(field) is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def enqueue(
+        self,
+        tenant: str,
+        filename: str,
+        project_key: str,
+        issue_type: str,
+        priority: str,
+        transcript: Optional[str] = None,
+        audio_path: Optional[str] = None,
+        segments: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO deferred_jobs (id, tenant, filename, project_key, issue_type, priority, state, "
+                "audio_path, transcript, segments, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, tenant, filename, project_key, issue_type, priority,
+                 "ready" if transcript is not None else "queued", audio_path, transcript,
+                 json.dumps(segments) if segments is not None else None, now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM deferred_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row is not None else None
+
+    def update(self, job_id: str, **fields):
+        """Set `fields` (dicts/lists stored as JSON) and bump updated_at"""
+        values = [json.dumps(v, default=str) if k in _JSON_FIELDS and v is not None else v for k, v in fields.items()]
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE deferred_jobs SET {assignments}, updated_at = ? WHERE id = ?",
+                values + [time.time(), job_id]
+            )
+
+    def claim(self, state: str, claimed_state: str, limit: int, batch_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Move up to `limit` of the oldest jobs in `state` to `claimed_state` and return them"""
+        query = "SELECT * FROM deferred_jobs WHERE state = ?"
+        params: List[Any] = [state]
+        if batch_id is not None:
+            query += " AND batch_id = ?"
+            params.append(batch_id)
+        query += " ORDER BY created_at LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(query, params).fetchall()
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE deferred_jobs SET state = ?, updated_at = ? WHERE id = ?",
+                    [(claimed_state, now, row["id"]) for row in rows]
+                )
+            finally:
+                self._conn.execute("COMMIT")
+        return [self._row(row) for row in rows]
+
+    def touch(self, job_id: str, state: str) -> bool:
+        """Heartbeat a claim (bump updated_at); False when the job is no longer in `state`"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE deferred_jobs SET updated_at = ? WHERE id = ? AND state = ?", (time.time(), job_id, state)
+            ).rowcount == 1
+
+    def audio_paths(self) -> List[str]:
+        """Audio files of jobs that are still to be transcribed"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT audio_path FROM deferred_jobs WHERE audio_path IS NOT NULL AND state IN ('queued', 'transcribing')"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def ready_backlog(self) -> Tuple[int, Optional[float]]:
+        """(jobs waiting for a batch, created_at of the oldest)"""
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*), MIN(created_at) FROM deferred_jobs WHERE state = 'ready'").fetchone()
+        return row[0], row[1]
+
+    def submitted_batches(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT batch_id FROM deferred_jobs WHERE state = 'submitted' AND batch_id IS NOT NULL"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def retry_or_fail(self, job_id: str, state: str, error: str, max_attempts: int):
+        """Count a failed attempt; back to `state` or "failed" after max_attempts"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE deferred_jobs SET attempts = attempts + 1, error = ?, updated_at = ?, "
+                "state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE ? END WHERE id = ?",
+                (error, time.time(), max_attempts, state, job_id)
+            )
+
+    def recover_stale(self):
+        """Release claims older than stale_seconds and purge finished jobs past the TTL"""
+        now = time.time()
+        with self._lock:
+            for claimed, state in _CLAIMED.items():
+                self._conn.execute(
+                    "UPDATE deferred_jobs SET state = ?, updated_at = ? WHERE state = ? AND updated_at < ?",
+                    (state, now, claimed, now - self.stale_seconds)
+                )
+            if now - self._purged_at >= 60:
+                self._purged_at = now
+                self._conn.execute(
+                    "DELETE FROM deferred_jobs WHERE state IN ('done', 'failed') AND updated_at < ?",
+                    (now - self.ttl_seconds,)
+                )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM deferred_jobs GROUP BY state").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+
+class DeferredProcessor:
+    """
+    Drives deferred jobs on a background task. The pipeline steps that
+    live in app.main are passed to start():
+
+        transcribe(job) -> (transcript, segments)   for audio jobs
+        create_issues(job) -> response payload       once LLM results are in
+
+    Either may raise DeferredRetry to leave the job for a later tick.
+    LLM providers without a Batch API (Ollama) skip the batch step and get
+    the synchronous calls from create_issues instead.
+    """
+
+    def __init__(
+        self,
+        store: DeferredJobStore,
+        audio_dir: str,
+        min_jobs: int = 20,
+        max_jobs: int = 1000,
+        max_wait_seconds: float = 600.0,
+        poll_seconds: float = 30.0,
+        max_attempts: int = 3,
+        step_concurrency: int = 8,
+        audio_budget_bytes: int = 20 * 1024 ** 3,
+        audio_orphan_age: float = 6 * 3600
+    ):
+        self.store = store
+        self.audio_dir = audio_dir
+        self.audio = QueuedAudio(audio_dir, audio_budget_bytes, audio_orphan_age)
+        self.min_jobs = max(1, min_jobs)
+        self.max_jobs = max(self.min_jobs, max_jobs)
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.step_concurrency = step_concurrency
+        self._task: Optional[asyncio.Task] = None
+        self._transcribe: Optional[Callable[[Dict[str, Any]], Awaitable[Tuple[str, Any]]]] = None
+        self._create_issues: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None
+
+    def start(self, transcribe, create_issues):
+        self._transcribe = transcribe
+        self._create_issues = create_issues
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.warning("Deferred processing tick failed: %s", e, extra={"stage": "deferred"}, exc_info=True)
+            await asyncio.sleep(self.poll_seconds)
+
+    async def tick(self):
+        """One pass over every step"""
+        await asyncio.to_thread(self.store.recover_stale)
+        if self.audio.sweep_due():
+            await asyncio.to_thread(self._sweep_audio)
+        await self._transcribe_queued()
+        await self._submit_ready()
+        await self._collect_batches()
+        await self._create_pending_issues()
+
+    def _sweep_audio(self):
+        self.audio.sweep(self.store.audio_paths())
+
+    async def _heartbeat(self, job_id: str, claimed_state: str):
+        """Keep a claim fresh while its step runs, so recover_stale doesn't hand it to another worker"""
+        interval = max(1.0, self.store.stale_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await asyncio.to_thread(self.store.touch, job_id, claimed_state):
+                    return
+            except Exception as e:
+                logger.warning("Deferred job heartbeat failed: %s", e, extra={"stage": "deferred", "job_id": job_id})
+
+    async def _run_claimed(self, jobs: List[Dict[str, Any]], step, retry_state: str):
+        claimed_state = next(claimed for claimed, state in _CLAIMED.items() if state == retry_state)
+
+        async def run(job):
+            # Batch-class requests of the job's tenant in the stage queues
+            set_current_tenant(job["tenant"], True)
+            heartbeat = asyncio.create_task(self._heartbeat(job["id"], claimed_state))
+            try:
+                await step(job)
+            except DeferredRetry:
+                await asyncio.to_thread(self.store.update, job["id"], state=retry_state)
+            except Exception as e:
+                logger.warning("Deferred job %s failed in %s: %s", job["id"], retry_state, e,
+                               extra={"stage": "deferred", "job_id": job["id"]})
+                await asyncio.to_thread(
+                    self.store.retry_or_fail, job["id"], retry_state, f"{type(e).__name__}: {e}", self.max_attempts
+                )
+            finally:
+                heartbeat.cancel()
+
+        await asyncio.gather(*(run(job) for job in jobs))
+
+    async def _transcribe_queued(self):
+        jobs = await asyncio.to_thread(self.store.claim, "queued", "transcribing", self.step_concurrency)
+
+        async def step(job):
+            transcript, segments = await self._transcribe(job)
+            await asyncio.to_thread(
+                self.store.update, job["id"], state="ready", transcript=transcript, segments=segments, error=None
+            )
+            try:
+                os.remove(job["audio_path"])
+            except OSError:
+                pass
+
+        await self._run_claimed(jobs, step, "queued")
+
+    async def _submit_ready(self):
+        count, oldest = await asyncio.to_thread(self.store.ready_backlog)
+        if not count or (count < self.min_jobs and time.time() - oldest < self.max_wait_seconds):
+            return
+        jobs = await asyncio.to_thread(self.store.claim, "ready", "submitting", self.max_jobs)
+        if jobs:
+            await asyncio.to_thread(self._submit, jobs)
+
+    def _submit(self, jobs: List[Dict[str, Any]]):
+        """Prefilter each job, then send the LLM requests of all of them as one batch"""
+        # Local imports: the services pull in provider SDKs
+        from app.services.action_prefilter import get_action_prefilter
+        from app.services.llm_service import get_llm_service
+
+        llm_service = get_llm_service()
+        if not llm_service or not llm_service.supports_batch:
+            for job in jobs:
+                self.store.update(job["id"], state="results")
+            return
+
+        prefilter = get_action_prefilter()
+        lines, batched = [], []
+        for job in jobs:
+            decision = prefilter.evaluate(job["transcript"]) if prefilter else None
+            route = decision["route"] if decision else "llm"
+            if route == "regex":
+                extraction = llm_service.extract_action_items_simple(job["transcript"])
+                self.store.update(
+                    job["id"], state="results", prefilter=decision, extraction=extraction, summary=NO_SUMMARY
+                )
+                continue
+            lines.extend(llm_service.batch_requests(job["id"], job["transcript"], extract=route == "llm"))
+            batched.append((job, decision))
+        if not batched:
+            return
+
+        try:
+            batch_id = llm_service.submit_batch(lines)
+        except Exception as e:
+            logger.warning("Batch submission failed: %s", e, extra={"stage": "deferred", "provider": llm_service.provider})
+            for job, _ in batched:
+                self.store.retry_or_fail(job["id"], "ready", f"{type(e).__name__}: {e}", self.max_attempts)
+            return
+        for job, decision in batched:
+            self.store.update(job["id"], state="submitted", batch_id=batch_id, prefilter=decision, error=None)
+        logger.info("Submitted batch %s", batch_id, extra={
+            "stage": "deferred",
+            "provider": llm_service.provider,
+            "jobs": len(batched),
+            "requests": len(lines),
+        })
+
+    async def _collect_batches(self):
+        for batch_id in await asyncio.to_thread(self.store.submitted_batches):
+            await asyncio.to_thread(self._collect, batch_id)
+
+    def _collect(self, batch_id: str):
+        from app.services.llm_service import get_llm_service
+
+        llm_service = get_llm_service()
+        status = llm_service.batch_status(batch_id)
+        if status["status"] in _FAILED_BATCH_STATES:
+            jobs = self.store.claim("submitted", "collecting", self.max_jobs, batch_id=batch_id)
+            logger.warning("Batch %s ended as %s; requeueing %d job(s)", batch_id, status["status"], len(jobs),
+                           extra={"stage": "deferred", "provider": llm_service.provider})
+            for job in jobs:
+                self.store.retry_or_fail(job["id"], "ready", f"batch {status['status']}", self.max_attempts)
+            return
+        if status["status"] != "completed":
+            return
+
+        jobs = self.store.claim("submitted", "collecting", self.max_jobs, batch_id=batch_id)
+        if not jobs:
+            return   # another worker collected it
+        outputs = llm_service.batch_output(status["output_file_id"]) if status["output_file_id"] else {}
+        for job in jobs:
+            extraction = None
+            if (job.get("prefilter") or {}).get("route", "llm") == "llm":
+                extraction = llm_service.batch_extraction_result(outputs.get(f"{job['id']}:extract"), job["transcript"])
+            else:
+                extraction = {"tasks": [], "tier": None}
+            summary = outputs.get(f"{job['id']}:summary")
+            self.store.update(
+                job["id"], state="results", extraction=extraction,
+                summary=summary.strip() if summary else NO_SUMMARY
+            )
+        logger.info("Collected batch %s", batch_id, extra={
+            "stage": "deferred",
+            "provider": llm_service.provider,
+            "jobs": len(jobs),
+            "answers": sum(1 for content in outputs.values() if content is not None),
+        })
+
+    async def _create_pending_issues(self):
+        jobs = await asyncio.to_thread(self.store.claim, "results", "creating", self.step_concurrency)
+
+        async def step(job):
+            result = await self._create_issues(job)
+            await asyncio.to_thread(self.store.update, job["id"], state="done", result=result, error=None, transcript=None)
+
+        await self._run_claimed(jobs, step, "results")
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.counts()
+
+
+# Lazily constructed singleton
+_processor: Optional[DeferredProcessor] = None
+_processor_lock = threading.Lock()
+
+
+def get_deferred_processor() -> DeferredProcessor:
+    global _processor
+    if _processor is None:
+        with _processor_lock:
+            if _processor is None:
+                store = DeferredJobStore(
+                    getattr(settings, "DEFERRED_DB", "./data/deferred.sqlite3"),
+                    stale_seconds=float(getattr(settings, "DEFERRED_STALE_SECONDS", 900)),
+                    ttl_seconds=float(getattr(settings, "DEFERRED_TTL_SECONDS", 7 * 24 * 3600))
+                )
+                _processor = DeferredProcessor(
+                    store,
+                    audio_dir=getattr(settings, "DEFERRED_AUDIO_DIR", "./data/deferred_audio"),
+                    min_jobs=int(getattr(settings, "BATCH_MIN_JOBS", 20)),
+                    max_jobs=int(getattr(settings, "BATCH_MAX_JOBS", 1000)),
+                    max_wait_seconds=float(getattr(settings, "BATCH_MAX_WAIT_SECONDS", 600)),
+                    poll_seconds=float(getattr(settings, "BATCH_POLL_SECONDS", 30)),
+                    max_attempts=int(getattr(settings, "BATCH_MAX_ATTEMPTS", 3)),
+                    audio_budget_bytes=int(getattr(settings, "QUEUED_AUDIO_BUDGET", 20 * 1024 ** 3)),
+                    audio_orphan_age=float(getattr(settings, "UPLOAD_ORPHAN_AGE_SECONDS", 6 * 3600))
+                )
+    return _processor
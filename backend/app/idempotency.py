@@ -0,0 +1,241 @@
+"""
+Idempotency-Key support for the processing endpoints
+The first request with a key runs; retries with the same key attach to the
+run in progress or get its stored response, instead of transcribing again
+and creating duplicate Jira issues.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
+from app.config import settings
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with different parameters"""
+
+
+class IdempotencyInProgress(Exception):
+    """Another worker is still processing the key; retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def request_fingerprint(parts: List[Any]) -> str:
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    SQLite table of keys -> state ("in_progress" | "done") and the stored
+    response. An in-progress row records its owner and heartbeat time so
+    a row left behind by a killed worker can be taken over once stale.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 24 * 3600, stale_seconds: float = 900):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                state TEXT NOT NULL,
+                owner TEXT,
+                response TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._purged_at = 0.0
+
+    def begin(self, key: str, fingerprint: str, owner: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Claim a key. Returns one of:
+            ("started", None)       caller owns the key and must complete/abandon it
+            ("done", response)      stored response of an earlier run
+            ("in_progress", None)   another run holds the key
+            ("mismatch", None)      key reused with different request parameters
+        """
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT fingerprint, state, response, created_at, updated_at FROM idempotency_keys WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None and now - row[3] < self.ttl_seconds:
+                    if row[0] != fingerprint:
+                        return "mismatch", None
+                    if row[1] == "done":
+                        return "done", json.loads(row[2])
+                    if now - row[4] < self.stale_seconds:
+                        return "in_progress", None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency_keys "
+                    "(key, fingerprint, state, owner, response, created_at, updated_at) VALUES (?, ?, 'in_progress', ?, NULL, ?, ?)",
+                    (key, fingerprint, owner, now, now)
+                )
+                return "started", None
+            finally:
+                self._conn.execute("COMMIT")
+
+    def heartbeat(self, key: str, owner: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency_keys SET updated_at = ? WHERE key = ? AND owner = ? AND state = 'in_progress'",
+                (time.time(), key, owner)
+            )
+
+    def complete(self, key: str, owner: str, response: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency_keys SET state = 'done', response = ?, updated_at = ? WHERE key = ? AND owner = ?",
+                (json.dumps(response, default=str), time.time(), key, owner)
+            )
+
+    def abandon(self, key: str, owner: str):
+        """Forget a failed run so a retry processes the request again"""
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND owner = ?", (key, owner))
+
+    def lookup(self, key: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        with self._lock:
+            row = self._conn.execute("SELECT state, response FROM idempotency_keys WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, None
+        return row[0], (json.loads(row[1]) if row[1] else None)
+
+    def _purge(self, now: float):
+        # Caller holds the lock; expired keys are dropped at most once a minute
+        if now - self._purged_at < 60:
+            return
+        self._purged_at = now
+        self._conn.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (now - self.ttl_seconds,))
+
+
+class IdempotencyManager:
+    """
+    Runs a request once per key. Retries in the same worker await the
+    original run directly; retries in another worker poll the store until
+    the response is there (or give up with IdempotencyInProgress).
+    """
+
+    def __init__(self, store: IdempotencyStore, wait_seconds: float = 120.0, poll_interval: float = 0.5):
+        self.store = store
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self._running: Dict[str, asyncio.Future] = {}
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Returns:
+            (response, replayed) - replayed is True when the response comes
+            from an earlier or concurrent run with the same key
+        """
+        owner = uuid.uuid4().hex
+        state, response = await asyncio.to_thread(self.store.begin, key, fingerprint, owner)
+
+        if state == "done":
+            return response, True
+        if state == "mismatch":
+            raise IdempotencyKeyReused("Idempotency-Key was already used with different request parameters")
+        if state == "in_progress":
+            running = self._running.get(key)
+            if running is not None:
+                return await asyncio.shield(running), True
+            return await self._wait_for_other_worker(key), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._running[key] = future
+        heartbeat = asyncio.create_task(self._heartbeat(key, owner))
+        try:
+            response = await func()
+        except BaseException as e:
+            # Waiters in this worker are released before the store is touched
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody attached
+            try:
+                await asyncio.to_thread(self.store.abandon, key, owner)
+            except Exception as store_error:
+                # The row goes stale and is taken over after stale_seconds
+                logger.warning("Could not release Idempotency-Key %s: %s", key, store_error, extra={"stage": "idempotency"})
+            raise
+        else:
+            future.set_result(response)
+        finally:
+            heartbeat.cancel()
+            self._running.pop(key, None)
+
+        try:
+            await asyncio.to_thread(self.store.complete, key, owner, response)
+        except Exception as e:
+            # The work is done (issues exist), so the response still goes out.
+            # Without a stored copy, retries in other workers wait until the
+            # row goes stale.
+            logger.error("Could not store the response for Idempotency-Key %s: %s", key, e, extra={"stage": "idempotency"})
+        return response, False
+
+    async def _heartbeat(self, key: str, owner: str):
+        interval = max(1.0, self.store.stale_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.store.heartbeat, key, owner)
+
+    async def _wait_for_other_worker(self, key: str) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            state, response = await asyncio.to_thread(self.store.lookup, key)
+            if state == "done":
+                return response
+            if state is None:
+                break  # the other run failed; the client should retry
+        raise IdempotencyInProgress(
+            "A request with this Idempotency-Key is still being processed",
+            retry_after=max(1, int(self.poll_interval * 10))
+        )
+
+
+# Lazily constructed singleton
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_idempotency_manager() -> IdempotencyManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                store = IdempotencyStore(
+                    getattr(settings, "IDEMPOTENCY_DB", "./data/idempotency.sqlite3"),
+                    ttl_seconds=float(getattr(settings, "IDEMPOTENCY_TTL_SECONDS", 24 * 3600)),
+                    stale_seconds=float(getattr(settings, "IDEMPOTENCY_STALE_SECONDS", 900))
+                )
+                _manager = IdempotencyManager(store, wait_seconds=float(getattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 120)))
+    return _manager
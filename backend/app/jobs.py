@@ -0,0 +1,530 @@
+"""
+Leased job queue shared by every app instance
+Uploads sent to /jobs/upload go into one job table instead of being
+processed by whichever instance received them. Every instance runs a
+JobWorker that leases the oldest visible job, so a long recording occupies
+one worker slot somewhere in the fleet, and capacity grows with instances.
+
+A lease is a visibility timeout: a leased job is hidden until visible_at
+(now + JOB_LEASE_SECONDS), and the owner's heartbeats keep pushing that
+forward. If an owner crashes or hangs, its heartbeats stop, the job becomes
+visible again and the next lease() anywhere picks it up. A job that keeps
+losing its owner fails after JOB_MAX_ATTEMPTS leases.
+
+Backends (JOB_STORE_URL):
+- sqlite:///path/jobs.sqlite3: WAL mode. Leases are taken under BEGIN
+  IMMEDIATE, which makes them safe across the workers of one host.
+- postgresql://...: leases use SELECT ... FOR UPDATE SKIP LOCKED, so
+  instances on any number of hosts share one queue. Requires psycopg (v3).
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+from app.config import settings
+from app.logs import get_logger
+from app.scheduler import set_current_tenant
+from app.storage import QueuedAudio
+
+logger = get_logger(__name__)
+
+# psycopg is imported on first use of a Postgres store; only check it is installed here
+PSYCOPG_AVAILABLE = importlib.util.find_spec("psycopg") is not None
+
+_JSON_FIELDS = ("payload", "result")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    owner TEXT,
+    visible_at {real} NOT NULL,
+    heartbeat_at {real},
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at {real} NOT NULL,
+    updated_at {real} NOT NULL
+)
+"""
+
+# Pipeline checkpoints (see app.checkpoints), kept next to the jobs so a
+# job reclaimed by another instance finds them
+_CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_key TEXT NOT NULL,
+    step TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at {real} NOT NULL,
+    PRIMARY KEY (run_key, step)
+)
+"""
+
+
+class JobRetry(Exception):
+    """The job can't run right now (e.g. a stage queue is full); release it without counting an attempt"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobStore:
+    """
+    Job table with leases. Subclasses supply the connection and lease();
+    every other statement is shared SQL with "?" placeholders.
+    """
+
+    placeholder = "?"
+
+    def __init__(self, ttl_seconds: float = 7 * 24 * 3600, checkpoint_ttl_seconds: float = 24 * 3600):
+        self.ttl_seconds = ttl_seconds
+        self.checkpoint_ttl_seconds = checkpoint_ttl_seconds
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def _execute(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _modify(self, sql: str, params=()) -> int:
+        """Run an UPDATE/DELETE; returns the number of rows changed"""
+        raise NotImplementedError
+
+    def lease(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """Lease the oldest visible job (queued, or leased by an owner that stopped heartbeating)"""
+        raise NotImplementedError
+
+    def _sql(self, sql: str) -> str:
+        return sql if self.placeholder == "?" else sql.replace("?", self.placeholder)
+
+    def _row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        job = dict(row)
+        for field in _JSON_FIELDS:
+            if job.get(field) is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def enqueue(self, tenant: str, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._modify(
+            "INSERT INTO jobs (id, tenant, payload, state, visible_at, attempts, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'queued', ?, 0, ?, ?)",
+            (job_id, tenant, json.dumps(payload), now, now, now)
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._row(rows[0]) if rows else None
+
+    def heartbeat(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease; False when the job is no longer ours (it expired and was re-leased)"""
+        now = time.time()
+        return self._modify(
+            "UPDATE jobs SET visible_at = ?, heartbeat_at = ?, updated_at = ? "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (now + lease_seconds, now, now, job_id, owner)
+        ) == 1
+
+    def complete(self, job_id: str, owner: str, result: Dict[str, Any]) -> bool:
+        """Store the result; False (and nothing stored) when the lease was lost"""
+        return self._modify(
+            "UPDATE jobs SET state = 'done', result = ?, error = NULL, owner = NULL, updated_at = ? "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (json.dumps(result, default=str), time.time(), job_id, owner)
+        ) == 1
+
+    def release(self, job_id: str, owner: str, delay: float = 0.0) -> bool:
+        """Give the job back without counting the attempt (retry later, or shutdown)"""
+        now = time.time()
+        return self._modify(
+            "UPDATE jobs SET state = 'queued', owner = NULL, visible_at = ?, attempts = attempts - 1, updated_at = ? "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (now + delay, now, job_id, owner)
+        ) == 1
+
+    def fail(self, job_id: str, owner: str, error: str, max_attempts: int, backoff: float) -> Optional[str]:
+        """Record a failed attempt: back to "queued" after `backoff`, or "failed" after max_attempts"""
+        now = time.time()
+        changed = self._modify(
+            "UPDATE jobs SET owner = NULL, error = ?, visible_at = ?, updated_at = ?, "
+            "state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (error, now + backoff, now, max_attempts, job_id, owner)
+        )
+        if not changed:
+            return None
+        job = self.get(job_id)
+        return job["state"] if job else None
+
+    def sweep(self, max_attempts: int) -> List[Dict[str, Any]]:
+        """
+        Fail expired leases that used their last attempt (the owner died
+        every time) and purge finished jobs past the TTL. Returns the jobs
+        that were failed.
+        """
+        now = time.time()
+        exhausted = self._execute(
+            "SELECT * FROM jobs WHERE state = 'leased' AND visible_at <= ? AND attempts >= ?",
+            (now, max_attempts)
+        )
+        failed = []
+        for row in exhausted:
+            if self._modify(
+                "UPDATE jobs SET state = 'failed', owner = NULL, updated_at = ?, error = ? "
+                "WHERE id = ? AND state = 'leased' AND visible_at <= ?",
+                (now, f"Lease expired {row['attempts']} times (owner stopped heartbeating)", row["id"], now)
+            ):
+                failed.append(self._row(row))
+        if now - self._purged_at >= 60:
+            self._purged_at = now
+            self._modify(
+                "DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated_at < ?",
+                (now - self.ttl_seconds,)
+            )
+            # Runs that crashed and were never retried
+            self._modify("DELETE FROM checkpoints WHERE created_at < ?", (now - self.checkpoint_ttl_seconds,))
+        return failed
+
+    def load_checkpoints(self, run_key: str) -> Dict[str, Any]:
+        rows = self._execute("SELECT step, value FROM checkpoints WHERE run_key = ?", (run_key,))
+        return {row["step"]: json.loads(row["value"]) for row in rows}
+
+    def save_checkpoint(self, run_key: str, step: str, value: Any):
+        self._modify(
+            "INSERT INTO checkpoints (run_key, step, value, created_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (run_key, step) DO UPDATE SET value = excluded.value, created_at = excluded.created_at",
+            (run_key, step, json.dumps(value, default=str), time.time())
+        )
+
+    def clear_checkpoints(self, run_key: str):
+        self._modify("DELETE FROM checkpoints WHERE run_key = ?", (run_key,))
+
+    def audio_paths(self) -> List[str]:
+        """Audio files of jobs that are still to be transcribed"""
+        rows = self._execute("SELECT payload FROM jobs WHERE state IN ('queued', 'leased')")
+        return [path for path in (json.loads(row["payload"]).get("audio_path") for row in rows) if path]
+
+    def counts(self) -> Dict[str, int]:
+        now = time.time()
+        rows = self._execute(
+            "SELECT CASE WHEN state = 'leased' AND visible_at <= ? THEN 'expired' ELSE state END AS state, "
+            "COUNT(*) AS n FROM jobs GROUP BY 1",
+            (now,)
+        )
+        return {row["state"]: row["n"] for row in rows}
+
+
+class SQLiteJobStore(JobStore):
+    """Job table in a SQLite file (WAL), shared by the workers of one host"""
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, checkpoint_ttl_seconds: float = 24 * 3600):
+        super().__init__(ttl_seconds, checkpoint_ttl_seconds)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA.format(real="REAL"))
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_visible ON jobs (state, visible_at)")
+        self._conn.execute(_CHECKPOINT_SCHEMA.format(real="REAL"))
+
+    def _execute(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def _modify(self, sql: str, params=()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def lease(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE state IN ('queued', 'leased') AND visible_at <= ? AND attempts < ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (now, max_attempts)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = 'leased', owner = ?, visible_at = ?, heartbeat_at = ?, "
+                        "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (owner, now + lease_seconds, now, now, row["id"])
+                    )
+                    row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            finally:
+                self._conn.execute("COMMIT")
+        return self._row(dict(row)) if row is not None else None
+
+
+class PostgresJobStore(JobStore):
+    """Job table in Postgres, shared by instances on any number of hosts"""
+
+    placeholder = "%s"
+
+    def __init__(self, url: str, ttl_seconds: float = 7 * 24 * 3600, checkpoint_ttl_seconds: float = 24 * 3600):
+        super().__init__(ttl_seconds, checkpoint_ttl_seconds)
+        if not PSYCOPG_AVAILABLE:
+            raise RuntimeError("JOB_STORE_URL points at Postgres but psycopg is not installed (pip install 'psycopg[binary]')")
+        self.url = url
+        self._conn = None
+        with self._lock:
+            conn = self._connection()
+            conn.execute(_SCHEMA.format(real="DOUBLE PRECISION"))
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_visible ON jobs (state, visible_at)")
+            conn.execute(_CHECKPOINT_SCHEMA.format(real="DOUBLE PRECISION"))
+
+    def _connection(self):
+        # Reconnect after the server dropped us (failover, idle timeout)
+        if self._conn is None or self._conn.closed:
+            import psycopg
+            from psycopg.rows import dict_row
+
+            self._conn = psycopg.connect(self.url, autocommit=True, row_factory=dict_row)
+        return self._conn
+
+    def _execute(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._connection().execute(self._sql(sql), params).fetchall()
+
+    def _modify(self, sql: str, params=()) -> int:
+        with self._lock:
+            return self._connection().execute(self._sql(sql), params).rowcount
+
+    def lease(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        # SKIP LOCKED: concurrent leasers take different rows instead of queueing on the same one
+        rows = self._execute(
+            "UPDATE jobs SET state = 'leased', owner = ?, visible_at = ?, heartbeat_at = ?, "
+            "attempts = attempts + 1, updated_at = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE state IN ('queued', 'leased') AND visible_at <= ? AND attempts < ? "
+            "ORDER BY created_at LIMIT 1 FOR UPDATE SKIP LOCKED) RETURNING *",
+            (owner, now + lease_seconds, now, now, now, max_attempts)
+        )
+        return self._row(rows[0]) if rows else None
+
+
+def open_job_store(url: str, ttl_seconds: float = 7 * 24 * 3600, checkpoint_ttl_seconds: float = 24 * 3600) -> JobStore:
+    """JobStore for a sqlite:///path or postgresql:// URL"""
+    if url.startswith(("postgresql://", "postgres://")):
+        return PostgresJobStore(url, ttl_seconds=ttl_seconds, checkpoint_ttl_seconds=checkpoint_ttl_seconds)
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):], ttl_seconds=ttl_seconds, checkpoint_ttl_seconds=checkpoint_ttl_seconds)
+    raise ValueError(f"Unsupported JOB_STORE_URL '{url}' (expected sqlite:///path or postgresql://...)")
+
+
+def job_run_key(job_id: str) -> str:
+    """Checkpoint key of a job; the same on every attempt, so a reclaimed job resumes"""
+    return f"job:{job_id}"
+
+
+class JobWorker:
+    """
+    Leases up to `concurrency` jobs at a time on this instance and runs the
+    handler passed to start() on each: handler(job) -> result payload.
+    The handler may raise JobRetry to hand the job back for later.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        audio_dir: str,
+        concurrency: int = 2,
+        lease_seconds: float = 60.0,
+        poll_seconds: float = 1.0,
+        max_attempts: int = 3,
+        audio_budget_bytes: int = 20 * 1024 ** 3,
+        audio_orphan_age: float = 6 * 3600
+    ):
+        self.store = store
+        self.audio_dir = audio_dir
+        self.audio = QueuedAudio(audio_dir, audio_budget_bytes, audio_orphan_age)
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handler: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._active: Dict[str, asyncio.Task] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._metrics = {"leased": 0, "completed": 0, "failed": 0, "released": 0, "lost": 0}
+
+    def start(self, handler):
+        self._handler = handler
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self, timeout: float = 0.0):
+        """
+        Stop leasing, give running jobs up to `timeout` seconds, then hand
+        the rest back so another instance picks them up immediately.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        running = list(self._active.values())
+        if running and timeout > 0:
+            await asyncio.wait(running, timeout=timeout)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    async def _loop(self):
+        swept_at = 0.0
+        while True:
+            try:
+                if time.monotonic() - swept_at >= self.lease_seconds:
+                    swept_at = time.monotonic()
+                    for job in await asyncio.to_thread(self.store.sweep, self.max_attempts):
+                        logger.warning("Job %s failed: %s", job["id"], "lease expired too many times",
+                                       extra={"stage": "jobs", "job_id": job["id"]})
+                        self._discard_audio(job)
+                if self.audio.sweep_due():
+                    await asyncio.to_thread(self._sweep_audio)
+                while len(self._active) < self.concurrency:
+                    job = await asyncio.to_thread(self.store.lease, self.owner, self.lease_seconds, self.max_attempts)
+                    if job is None:
+                        break
+                    self._metrics["leased"] += 1
+                    self._active[job["id"]] = asyncio.get_running_loop().create_task(self._run(job))
+            except Exception as e:
+                logger.warning("Job lease failed: %s", e, extra={"stage": "jobs"}, exc_info=True)
+            # Woken early when a slot frees up
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job: Dict[str, Any]):
+        set_current_tenant(job["tenant"])
+        work = asyncio.get_running_loop().create_task(self._handler(job))
+        lost = asyncio.Event()
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job, work, lost))
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if lost.is_set():
+                self._metrics["lost"] += 1
+                logger.warning("Lost the lease on job %s; another instance owns it now", job["id"],
+                               extra={"stage": "jobs", "job_id": job["id"]})
+            else:
+                # Shutdown: no attempt counted, visible again immediately
+                await asyncio.to_thread(self.store.release, job["id"], self.owner)
+                self._metrics["released"] += 1
+                raise
+        except JobRetry as e:
+            await asyncio.to_thread(self.store.release, job["id"], self.owner, e.retry_after)
+            self._metrics["released"] += 1
+        except Exception as e:
+            state = await asyncio.to_thread(
+                self.store.fail, job["id"], self.owner, f"{type(e).__name__}: {e}",
+                self.max_attempts, self.poll_seconds * 2 ** job["attempts"]
+            )
+            logger.warning("Job %s attempt %d failed: %s", job["id"], job["attempts"], e,
+                           extra={"stage": "jobs", "job_id": job["id"], "state": state})
+            if state == "failed":
+                self._metrics["failed"] += 1
+                self._discard_audio(job)
+        else:
+            if await asyncio.to_thread(self.store.complete, job["id"], self.owner, result):
+                self._metrics["completed"] += 1
+                self._discard_audio(job)
+                await asyncio.to_thread(self.store.clear_checkpoints, job_run_key(job["id"]))
+            else:
+                self._metrics["lost"] += 1
+                logger.warning("Lost the lease on job %s before completing it; result discarded", job["id"],
+                               extra={"stage": "jobs", "job_id": job["id"]})
+        finally:
+            heartbeat.cancel()
+            self._active.pop(job["id"], None)
+            if self._wake is not None:
+                self._wake.set()
+
+    async def _heartbeat(self, job: Dict[str, Any], work: asyncio.Task, lost: asyncio.Event):
+        """Renew the lease every third of its length; cancel the work if it was taken over"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await asyncio.to_thread(self.store.heartbeat, job["id"], self.owner, self.lease_seconds)
+            except Exception as e:
+                # Store unreachable: keep working, the lease may still be renewed in time
+                logger.warning("Job heartbeat failed: %s", e, extra={"stage": "jobs", "job_id": job["id"]})
+                continue
+            if not renewed:
+                lost.set()
+                work.cancel()
+                return
+
+    def _sweep_audio(self):
+        self.audio.sweep(self.store.audio_paths())
+
+    def _discard_audio(self, job: Dict[str, Any]):
+        audio_path = (job.get("payload") or {}).get("audio_path")
+        if audio_path:
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "active": len(self._active),
+            "concurrency": self.concurrency,
+            **self._metrics,
+            "queue": self.store.counts(),
+        }
+
+
+# Lazily constructed singletons
+_store: Optional[JobStore] = None
+_worker: Optional[JobWorker] = None
+_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = open_job_store(
+                    getattr(settings, "JOB_STORE_URL", "sqlite:///./data/jobs.sqlite3"),
+                    ttl_seconds=float(getattr(settings, "JOB_TTL_SECONDS", 7 * 24 * 3600)),
+                    checkpoint_ttl_seconds=float(getattr(settings, "CHECKPOINT_TTL_SECONDS", 24 * 3600))
+                )
+    return _store
+
+
+def get_job_worker() -> JobWorker:
+    global _worker
+    if _worker is None:
+        store = get_job_store()
+        with _lock:
+            if _worker is None:
+                _worker = JobWorker(
+                    store,
+                    audio_dir=getattr(settings, "JOB_AUDIO_DIR", "./data/job_audio"),
+                    concurrency=int(getattr(settings, "JOB_WORKER_CONCURRENCY", 2)),
+                    lease_seconds=float(getattr(settings, "JOB_LEASE_SECONDS", 60)),
+                    poll_seconds=float(getattr(settings, "JOB_POLL_SECONDS", 1)),
+                    max_attempts=int(getattr(settings, "JOB_MAX_ATTEMPTS", 3)),
+                    audio_budget_bytes=int(getattr(settings, "QUEUED_AUDIO_BUDGET", 20 * 1024 ** 3)),
+                    audio_orphan_age=float(getattr(settings, "UPLOAD_ORPHAN_AGE_SECONDS", 6 * 3600))
+                )
+    return _worker
@@ -0,0 +1,71 @@
+"""
+Process lifecycle helpers: in-flight work tracking for graceful drain
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class InflightTracker:
+    """
+    Counts in-flight pipeline runs (transcription + extraction + Jira) so a
+    worker that received SIGTERM can wait for them before exiting.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._started = 0
+        self._idle = None
+
+    def _idle_event(self) -> asyncio.Event:
+        # Created lazily so it binds to the worker's running event loop
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            if self._count == 0:
+                self._idle.set()
+        return self._idle
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @asynccontextmanager
+    async def track(self):
+        idle = self._idle_event()
+        self._count += 1
+        self._started += 1
+        idle.clear()
+        try:
+            yield
+        finally:
+            self._count -= 1
+            if self._count == 0:
+                idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Wait until nothing is in flight
+
+        Returns:
+            True if drained, False if the timeout elapsed first
+        """
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._idle_event().wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if self._count:
+                logger.warning("Shutdown: %d request(s) still in flight after %.1fs", self._count, time.monotonic() - started,
+                               extra={"stage": "shutdown"})
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self._count, "started": self._started}
+
+
+inflight = InflightTracker()
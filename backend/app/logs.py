@@ -0,0 +1,201 @@
+"""
+Structured logging
+Records go through a bounded queue to a background listener thread that
+writes them as JSON lines, so logging from request handlers costs one
+put_nowait instead of a synchronous write on the event loop.
+
+Usage:
+    from app.logs import get_logger
+
+    logger = get_logger(__name__)
+    logger.warning("LLM extraction failed: %s", e, extra={"stage": "llm.extract", "provider": "openai"})
+
+    # Noisy paths: at most LOG_RATE_LIMIT_PER_MINUTE records per key
+    logger.info("Jira user lookup failed", extra={"rate_limit": "find_user"})
+
+    # Or keep a fraction of them
+    logger.debug("Window transcribed", extra={"sample": 0.01})
+
+Each line carries time, level, logger and message, the request id and
+trace id of the request being handled, and any `extra` fields (stage,
+duration_ms, provider, ...).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
+from app.config import settings
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "rate_limit", "sample"}
+
+
+def new_request_id(request_id: Optional[str] = None):
+    """Set the id logged with every record of the current request; returns a ContextVar token"""
+    return _request_id.set(request_id or uuid.uuid4().hex[:16])
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class _TextFormatter(logging.Formatter):
+    """Human-readable lines for local development (LOG_FORMAT=text)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {k: v for k, v in vars(record).items() if k not in _RESERVED and not k.startswith("_")}
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _RateLimitFilter(logging.Filter):
+    """
+    Drops records beyond `per_minute` per `rate_limit` key (token bucket)
+    and records outside their `sample` fraction. The next record let
+    through for a key reports how many were suppressed in between.
+    """
+
+    def __init__(self, per_minute: int):
+        super().__init__()
+        self.per_minute = max(1, per_minute)
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}   # key -> (tokens, updated, suppressed)
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample = getattr(record, "sample", None)
+        if sample is not None and random.random() >= sample:
+            return False
+
+        key = getattr(record, "rate_limit", None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (float(self.per_minute), now, 0))
+            tokens = min(self.per_minute, tokens + (now - updated) * self.per_minute / 60.0)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1.0, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Stamps request context in the calling thread and hands the record to
+    the listener; formatting and I/O happen on the listener thread. When
+    the queue is full the record is dropped and counted rather than
+    blocking the caller.
+
+    The LOG_* settings are read and the listener thread started on the
+    first record, so importing a module that logs stays cheap.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self.dropped = 0
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._listener is not None:
+                return
+            output = logging.StreamHandler(sys.stderr)
+            if str(getattr(settings, "LOG_FORMAT", "json")).lower() == "text":
+                output.setFormatter(_TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+            else:
+                output.setFormatter(JsonFormatter())
+            self.addFilter(_RateLimitFilter(int(getattr(settings, "LOG_RATE_LIMIT_PER_MINUTE", 10))))
+            self.queue = queue.Queue(maxsize=int(getattr(settings, "LOG_QUEUE_SIZE", 10000)))
+            self._listener = logging.handlers.QueueListener(self.queue, output, respect_handler_level=True)
+            self._listener.start()
+            atexit.register(self._listener.stop)   # flush what is still queued
+
+    def handle(self, record: logging.LogRecord):
+        if self._listener is None:
+            self._start()
+        return super().handle(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Local import: app.tracing logs through this module
+        from app.tracing import current_span
+
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        request_id = _request_id.get()
+        if request_id:
+            record.request_id = request_id
+        trace_id = getattr(current_span(), "trace_id", None)
+        if trace_id:
+            record.trace_id = trace_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = _NonBlockingQueueHandler()
+_app_logger = logging.getLogger("app")
+_app_logger.addHandler(_handler)
+_app_logger.setLevel(logging.INFO)
+_app_logger.propagate = False
+
+
+def configure_logging():
+    """Apply LOG_LEVEL and start the listener now rather than on the first record"""
+    _app_logger.setLevel(str(getattr(settings, "LOG_LEVEL", "INFO")).upper())
+    if _handler._listener is None:
+        _handler._start()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """A logger under "app", which writes through the structured queue handler"""
+    return logging.getLogger(name if name.startswith("app") else f"app.{name}")
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "queued": _handler.queue.qsize() if _handler.queue is not None else 0,
+        "dropped": _handler.dropped,
+    }
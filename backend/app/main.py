@@ -2,26 +2,36 @@
 Simple Audio to Jira System
 Extracts text from audio and creates Jira issues
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from app.checkpoints import Checkpoint, open_checkpoint, run_key
 from app.config import settings
+from app.deferred import DeferredRetry, get_deferred_processor
+from app.idempotency import IdempotencyInProgress, IdempotencyKeyReused, get_idempotency_manager, request_fingerprint
+from app.jobs import JobRetry, get_job_worker, job_run_key
+from app.lifecycle import inflight
+from app.logs import configure_logging, get_logger, current_request_id, new_request_id, stats as log_stats
+from app.pipeline import audio_cost, probe_recording, process_transcript_and_create_issues, transcribe_audio
+from app.scheduler import AdmissionRejected, get_scheduler, set_current_tenant, tenant_key
+from app.storage import QueuedAudio, UploadStorageFull, get_upload_storage
+from app.tracing import tracer, current_span
+from app.services.captions import CAPTION_FORMATS, parse_captions
+from app.services.compact_transcript import load_segments
+from app.services.issue_content import local_transcript_path
 from app.services.jira_service import JiraService
-import os
+from app.services.llm_service import get_llm_service
+from app.services.whisper_service import get_whisper_service
+import asyncio
+import json
 from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
-# Initialize services
-try:
-    from app.services.whisper_service import whisper_service
-except Exception as e:
-    print(f"Warning: Whisper service not available: {e}")
-    whisper_service = None
+logger = get_logger(__name__)
 
-try:
-    from app.services.llm_service import llm_service
-except Exception as e:
-    print(f"Warning: LLM service not available: {e}")
-    llm_service = None
+# Services (and their provider SDKs) are built lazily on first use via
+# get_llm_service() / get_whisper_service(), so importing this module stays cheap.
+# Modules that import numpy (diarization, live sessions) are imported where used.
 
 app = FastAPI(
     title="Audio to Jira",
@@ -37,8 +47,92 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ensure upload directory exists
-Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    One root span and request id per processing request (uploads); static
+    pages are skipped. The id (X-Request-ID, or a new one) is on every log
+    line of the request and echoed in the response.
+    """
+    if request.method == "GET":
+        return await call_next(request)
+
+    new_request_id(request.headers.get("X-Request-ID"))
+
+    attributes = {
+        "http.method": request.method,
+        "http.route": request.url.path,
+        "http.request_content_length": request.headers.get("content-length"),
+    }
+    with tracer.start_span(f"{request.method} {request.url.path}", attributes) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        response.headers["X-Request-ID"] = current_request_id()
+        return response
+
+
+@app.on_event("startup")
+async def ensure_upload_dir():
+    """Ensure upload directory exists"""
+    Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
+
+
+@app.on_event("startup")
+async def start_logging():
+    """Apply LOG_LEVEL and start the log writer thread"""
+    configure_logging()
+
+
+@app.on_event("startup")
+async def warm_up_services():
+    """
+    Build the shared service clients before the worker takes traffic, so
+    the first request on each worker doesn't pay for SDK import + setup.
+    """
+    if not getattr(settings, "WARMUP_SERVICES", True):
+        return
+    loop = asyncio.get_running_loop()
+    llm_service = await loop.run_in_executor(None, get_llm_service)
+    if llm_service:
+        await loop.run_in_executor(None, llm_service.warm_up)
+    await loop.run_in_executor(None, get_whisper_service)
+
+
+@app.on_event("startup")
+async def start_upload_janitor():
+    """Sweep uploads orphaned by killed workers and refresh disk usage"""
+    get_upload_storage().start_janitor()
+
+
+@app.on_event("startup")
+async def start_deferred_processor():
+    """Drive queued deferred jobs (transcription, batch submit/poll, Jira)"""
+    get_deferred_processor().start(_deferred_transcribe, _deferred_create_issues)
+
+
+@app.on_event("startup")
+async def start_job_worker():
+    """Lease jobs from the shared job table (JOB_STORE_URL)"""
+    if getattr(settings, "JOB_WORKER_ENABLED", True):
+        get_job_worker().start(_run_job)
+
+
+@app.on_event("shutdown")
+async def stop_deferred_processor():
+    await get_deferred_processor().stop()
+
+
+@app.on_event("shutdown")
+async def stop_job_worker():
+    """Let running jobs finish, then hand the rest back so another instance takes them over"""
+    await get_job_worker().stop(timeout=getattr(settings, "SHUTDOWN_DRAIN_TIMEOUT", 120))
+
+
+@app.on_event("shutdown")
+async def drain_inflight_requests():
+    """Give in-flight transcriptions a chance to finish on SIGTERM"""
+    await inflight.drain(timeout=getattr(settings, "SHUTDOWN_DRAIN_TIMEOUT", 120))
+    await get_upload_storage().stop_janitor()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -164,8 +258,8 @@ async def root():
             
             <form id="uploadForm">
                 <div class="form-group">
-                    <label for="audioFile">File (audio or transcript *.txt) *</label>
-                    <input type="file" id="audioFile" name="file" accept=".mp3,.wav,.m4a,.ogg,.flac,.txt" required>
+                    <label for="audioFile">File (audio, transcript *.txt or captions *.vtt/*.srt/*.json) *</label>
+                    <input type="file" id="audioFile" name="file" accept=".mp3,.wav,.m4a,.ogg,.flac,.txt,.vtt,.srt,.json" required>
                 </div>
                 
                 <div class="form-group">
@@ -228,7 +322,7 @@ async def root():
 
                 // Choose endpoint depending on file type
                 let endpoint = '/upload';
-                if (ext === 'txt') endpoint = '/upload-transcript';
+                if (['txt', 'vtt', 'srt', 'json'].includes(ext)) endpoint = '/upload-transcript';
 
                 // Build FormData manually to support both endpoints
                 const formData = new FormData();
@@ -322,6 +416,7 @@ async def root():
 
 @app.post("/upload")
 async def upload_audio(
+    request: Request,
     file: UploadFile = File(...),
     jira_project_key: str = Form(...),
     jira_issue_type: str = Form("Task"),
@@ -335,7 +430,24 @@ async def upload_audio(
     - jira_project_key: Jira project key (required)
     - jira_issue_type: Issue type (optional, default: Task)
     - jira_priority: Priority (optional, default: Medium)
+
+    Send an Idempotency-Key header to make retries safe: a retry with the
+    same key attaches to the running request or returns its stored result.
     """
+    return await _idempotent(
+        request, "upload", jira_project_key,
+        [file.filename, file.size, jira_project_key, jira_issue_type, jira_priority],
+        lambda: _upload_audio(request, file, jira_project_key, jira_issue_type, jira_priority)
+    )
+
+
+async def _upload_audio(
+    request: Request,
+    file: UploadFile,
+    jira_project_key: str,
+    jira_issue_type: str,
+    jira_priority: str
+) -> Dict[str, Any]:
     if not jira_project_key:
         raise HTTPException(
             status_code=400,
@@ -344,111 +456,193 @@ async def upload_audio(
     
     # Validate file type
     file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in settings.ALLOWED_AUDIO_FORMATS:
+    if file_ext not in settings.ALLOWED_AUDIO_FORMATS and file_ext not in CAPTION_FORMATS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(settings.ALLOWED_AUDIO_FORMATS)}"
+            detail=f"Invalid file type. Allowed: {', '.join(list(settings.ALLOWED_AUDIO_FORMATS) + list(CAPTION_FORMATS))}"
         )
 
-    # Check file size
-    file_content = await file.read()
-    if len(file_content) > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB"
-        )
+    # Turn the request away before storing anything if its first stage is full
+    _admit(request, jira_project_key, "llm" if file_ext == ".txt" or file_ext in CAPTION_FORMATS else "whisper")
 
-    # Handle text transcripts directly; for audio, save then transcribe
+    # Handle text transcripts and caption exports directly; for audio, stream to disk then transcribe
+    stored = None
     file_path = None
     transcript_text = None
+    segments = None
+    current_span().set_attributes({
+        "file.name": file.filename,
+        "file.ext": file_ext,
+        "jira.project": jira_project_key,
+    })
 
     if file_ext == ".txt":
+        file_content = await file.read()
+        current_span().set_attribute("file.size_bytes", len(file_content))
+        if len(file_content) > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB"
+            )
         try:
             transcript_text = file_content.decode("utf-8")
         except Exception:
             raise HTTPException(status_code=400, detail="Unable to decode text file. Please use UTF-8 encoded .txt files.")
+    elif file_ext in CAPTION_FORMATS:
+        # Platform captions already carry speakers and timestamps: no Whisper call
+        captions = await _read_captions(file, file_ext)
+        transcript_text, segments = captions["text"], captions["segments"]
     else:
-        # Save file
-        import uuid
-        filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(settings.UPLOAD_DIR, filename)
-
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        upload_storage = get_upload_storage()
+        try:
+            stored = await upload_storage.save(file, file_ext, max_bytes=settings.MAX_UPLOAD_SIZE)
+        except UploadStorageFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        file_path = stored.path
+        current_span().set_attribute("file.size_bytes", stored.size)
 
-    # At this point either `transcript_text` is set (for .txt uploads) or
-    # an audio file was saved to `file_path` and needs transcription.
+    # At this point either `transcript_text` is set (for .txt uploads and
+    # captions) or an audio file was saved to `file_path` and needs transcription.
+    timings = {}
     try:
-        if not transcript_text:
-            if not whisper_service:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Whisper service not available. Set OPENAI_API_KEY in .env file"
+        async with inflight.track():
+            # Duration from the headers: over-long recordings stop here
+            audio = await probe_recording(file_path) if file_path else None
+            checkpoint = await _upload_checkpoint(request, "upload", jira_project_key)
+            if not transcript_text:
+                transcript_text, segments = await transcribe_audio(
+                    file_path, jira_project_key, timings, checkpoint, audio
                 )
 
-            transcript_result = whisper_service.transcribe(file_path)
-            transcript_text = transcript_result["text"]
-
-        # Delegate the rest of processing to helper
-        result = await process_transcript_and_create_issues(
-            transcript_text=transcript_text,
-            filename=file.filename,
-            jira_project_key=jira_project_key,
-            jira_issue_type=jira_issue_type,
-            jira_priority=jira_priority
-        )
-
-        # Clean up audio file if it was saved
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+            # Delegate the rest of processing to helper
+            result = await process_transcript_and_create_issues(
+                transcript_text=transcript_text,
+                filename=file.filename,
+                jira_project_key=jira_project_key,
+                jira_issue_type=jira_issue_type,
+                jira_priority=jira_priority,
+                timings=timings,
+                segments=segments,
+                checkpoint=checkpoint
+            )
+            if audio:
+                result["audio"] = audio
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.clear)
 
-        return result
+            return result
     except HTTPException:
-        # Re-raise HTTP exceptions, cleaning up saved file if any
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
         raise
     except Exception as e:
-        # Clean up on error
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+    finally:
+        # Delete the saved audio and return its disk budget
+        await get_upload_storage().release(stored)
+
+
+async def _upload_checkpoint(request: Request, endpoint: str, jira_project_key: str) -> Optional[Checkpoint]:
+    """
+    Checkpoints of a synchronous upload sent with an Idempotency-Key: a
+    retry with the key after a failed or interrupted run resumes it. The
+    idempotency layer already lets only one run per key proceed at a time,
+    so no other request can be using these checkpoints.
+    """
+    key = request.headers.get("Idempotency-Key")
+    if not key or not getattr(settings, "CHECKPOINTS_ENABLED", True):
+        return None
+    tenant = tenant_key(request.headers.get("X-API-Key"), jira_project_key)
+    return await asyncio.to_thread(open_checkpoint, run_key("upload", tenant, endpoint, key))
+
+
+async def _read_captions(file: UploadFile, file_ext: str) -> Dict[str, Any]:
+    """Parse an uploaded VTT/SRT/Zoom/Teams JSON caption export (read in a worker thread)"""
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB")
+    await file.seek(0)
+    try:
+        captions = await asyncio.to_thread(parse_captions, file.file, file_ext)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    current_span().set_attributes({
+        "file.size_bytes": file.size,
+        "captions.format": file_ext,
+        "captions.segments": len(captions["segments"]),
+        "captions.speakers": len(captions["speakers"]),
+    })
+    return captions
 
 
 @app.post("/upload-transcript")
 async def upload_transcript(
+    request: Request,
     file: UploadFile = File(...),
     jira_project_key: str = Form(...),
     jira_issue_type: str = Form("Task"),
     jira_priority: str = Form("Medium")
 ):
     """
-    Upload a plain text transcript (.txt) and create Jira issues.
+    Upload a plain text transcript (.txt) or a caption export (.vtt, .srt,
+    Zoom/Teams .json) and create Jira issues. Captions keep their speakers
+    and timestamps. Honours Idempotency-Key like /upload.
     """
+    return await _idempotent(
+        request, "upload-transcript", jira_project_key,
+        [file.filename, file.size, jira_project_key, jira_issue_type, jira_priority],
+        lambda: _upload_transcript(request, file, jira_project_key, jira_issue_type, jira_priority)
+    )
+
+
+async def _upload_transcript(
+    request: Request,
+    file: UploadFile,
+    jira_project_key: str,
+    jira_issue_type: str,
+    jira_priority: str
+) -> Dict[str, Any]:
     if not jira_project_key:
         raise HTTPException(status_code=400, detail="jira_project_key is required")
 
     file_ext = Path(file.filename).suffix.lower()
-    if file_ext != ".txt":
-        raise HTTPException(status_code=400, detail="Only .txt transcript files are accepted by this endpoint")
+    if file_ext != ".txt" and file_ext not in CAPTION_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Only .txt transcripts and caption exports ({', '.join(CAPTION_FORMATS)}) are accepted by this endpoint"
+        )
 
-    file_content = await file.read()
-    if len(file_content) > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB")
+    _admit(request, jira_project_key, "llm")
 
-    try:
-        transcript_text = file_content.decode("utf-8")
-    except Exception:
-        raise HTTPException(status_code=400, detail="Unable to decode text file. Please use UTF-8 encoded .txt files.")
+    current_span().set_attributes({"file.name": file.filename, "jira.project": jira_project_key})
+    segments = None
+    if file_ext in CAPTION_FORMATS:
+        captions = await _read_captions(file, file_ext)
+        transcript_text, segments = captions["text"], captions["segments"]
+    else:
+        file_content = await file.read()
+        current_span().set_attribute("file.size_bytes", len(file_content))
+        if len(file_content) > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB")
+
+        try:
+            transcript_text = file_content.decode("utf-8")
+        except Exception:
+            raise HTTPException(status_code=400, detail="Unable to decode text file. Please use UTF-8 encoded .txt files.")
 
     try:
-        result = await process_transcript_and_create_issues(
-            transcript_text=transcript_text,
-            filename=file.filename,
-            jira_project_key=jira_project_key,
-            jira_issue_type=jira_issue_type,
-            jira_priority=jira_priority
-        )
+        async with inflight.track():
+            checkpoint = await _upload_checkpoint(request, "upload-transcript", jira_project_key)
+            result = await process_transcript_and_create_issues(
+                transcript_text=transcript_text,
+                filename=file.filename,
+                jira_project_key=jira_project_key,
+                jira_issue_type=jira_issue_type,
+                jira_priority=jira_priority,
+                segments=segments,
+                checkpoint=checkpoint
+            )
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.clear)
 
         return result
     except HTTPException:
@@ -457,119 +651,482 @@ async def upload_transcript(
         raise HTTPException(status_code=500, detail=f"Error processing transcript: {e}")
 
 
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+@app.post("/deferred/upload", status_code=202)
+async def deferred_upload(
+    request: Request,
+    file: UploadFile = File(...),
+    jira_project_key: str = Form(...),
+    jira_issue_type: str = Form("Task"),
+    jira_priority: str = Form("Medium")
+):
+    """
+    Queue an audio file, .txt transcript or caption export for deferred processing.
 
+    The LLM calls go out in provider batch jobs (half price, separate rate
+    limits) and the Jira issues are created when the batch finishes, up to
+    BATCH_COMPLETION_WINDOW later. Returns the job id; poll
+    GET /deferred/jobs/{job_id} for the result. Honours Idempotency-Key.
+    """
+    return await _idempotent(
+        request, "deferred-upload", jira_project_key,
+        [file.filename, file.size, jira_project_key, jira_issue_type, jira_priority],
+        lambda: _deferred_upload(request, file, jira_project_key, jira_issue_type, jira_priority)
+    )
 
-async def process_transcript_and_create_issues(
-    transcript_text: str,
-    filename: str,
+
+async def _deferred_upload(
+    request: Request,
+    file: UploadFile,
     jira_project_key: str,
     jira_issue_type: str,
     jira_priority: str
-) -> dict:
+) -> Dict[str, Any]:
+    if not jira_project_key:
+        raise HTTPException(status_code=400, detail="jira_project_key is required")
+
+    file_ext = Path(file.filename).suffix.lower()
+    allowed = [".txt"] + list(CAPTION_FORMATS) + list(settings.ALLOWED_AUDIO_FORMATS)
+    if file_ext not in allowed:
+        raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {', '.join(allowed)}")
+
+    tenant = tenant_key(request.headers.get("X-API-Key"), jira_project_key)
+    processor = get_deferred_processor()
+    transcript_text, segments, audio_path, audio = await _read_job_input(file, file_ext, processor.audio)
+    job_id = await asyncio.to_thread(
+        processor.store.enqueue, tenant, file.filename, jira_project_key, jira_issue_type, jira_priority,
+        transcript_text, audio_path, segments
+    )
+    current_span().set_attributes({"deferred.job_id": job_id, "jira.project": jira_project_key})
+    response = {"job_id": job_id, "status": "queued", "status_url": f"/deferred/jobs/{job_id}"}
+    if audio:
+        response["audio"] = audio
+    return response
+
+
+async def _read_job_input(file: UploadFile, file_ext: str, queued_audio: QueuedAudio):
     """
-    Helper to extract action items, summarize, and create Jira issues from a transcript.
-    Returns the same response payload used by the endpoints.
+    Input of a queued job: the parsed transcript of a .txt or caption
+    upload, or the audio moved into the queue's audio directory (its own
+    disk budget, see QueuedAudio) until a worker transcribes it. Audio is
+    probed first, so over-long recordings are refused at upload.
+
+    Returns:
+        (transcript text or None, segments or None, audio path or None,
+         audio probe or None)
     """
-    # Extract action items and generate summary
-    action_items = []
-    summary = None
+    if file_ext in CAPTION_FORMATS:
+        captions = await _read_captions(file, file_ext)
+        return captions["text"], captions["segments"], None, None
+    if file_ext == ".txt":
+        file_content = await file.read()
+        if len(file_content) > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB")
+        try:
+            return file_content.decode("utf-8"), None, None, None
+        except Exception:
+            raise HTTPException(status_code=400, detail="Unable to decode text file. Please use UTF-8 encoded .txt files.")
 
-    if llm_service:
+    upload_storage = get_upload_storage()
+    try:
+        stored = await upload_storage.save(file, file_ext, max_bytes=settings.MAX_UPLOAD_SIZE)
+    except UploadStorageFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        audio = await probe_recording(stored.path)
+        audio_path = await asyncio.to_thread(queued_audio.add, stored.path)
+    except UploadStorageFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    finally:
+        await upload_storage.release(stored)
+    return None, None, audio_path, audio
+
+
+@app.get("/deferred/jobs/{job_id}")
+async def deferred_job(job_id: str):
+    """State of a deferred job; `result` is the /upload response once done"""
+    job = await asyncio.to_thread(get_deferred_processor().store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "status": job["state"],
+        "filename": job["filename"],
+        "batch_id": job["batch_id"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "result": job["result"],
+    }
+
+
+async def _deferred_transcribe(job: Dict[str, Any]):
+    """Transcription step of a deferred audio job (see app.deferred)"""
+    try:
+        transcript_text, segments = await transcribe_audio(job["audio_path"], job["project_key"], {})
+    except HTTPException as e:
+        if e.status_code == 429:
+            raise DeferredRetry(e.detail)
+        raise RuntimeError(e.detail)
+    # Stored as the job's JSON segments column
+    return transcript_text, segments.to_json()
+
+
+async def _deferred_create_issues(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Jira step of a deferred job, with the LLM results of its batch"""
+    extraction = job.get("extraction")
+    # Issues created before a crash are not created again on the next tick
+    checkpoint = await asyncio.to_thread(open_checkpoint, f"deferred:{job['id']}")
+    try:
+        async with inflight.track():
+            result = await process_transcript_and_create_issues(
+                transcript_text=job["transcript"],
+                filename=job["filename"],
+                jira_project_key=job["project_key"],
+                jira_issue_type=job["issue_type"],
+                jira_priority=job["priority"],
+                action_items=extraction["tasks"] if extraction else None,
+                segments=load_segments(job.get("segments")),
+                summary=job.get("summary"),
+                checkpoint=checkpoint
+            )
+    except HTTPException as e:
+        if e.status_code == 429:
+            raise DeferredRetry(e.detail)
+        raise RuntimeError(e.detail)
+    await asyncio.to_thread(checkpoint.clear)
+    # The store keeps NO_SUMMARY ("") for jobs without one; report it as usual
+    result["summary"] = result["summary"] or None
+    if extraction:
+        result["prefilter"] = job.get("prefilter")
+        result["extraction"] = {k: extraction.get(k) for k in ("tier", "model", "escalation")}
+    return result
+
+
+@app.post("/jobs/upload", status_code=202)
+async def jobs_upload(
+    request: Request,
+    file: UploadFile = File(...),
+    jira_project_key: str = Form(...),
+    jira_issue_type: str = Form("Task"),
+    jira_priority: str = Form("Medium")
+):
+    """
+    Queue an audio file, .txt transcript or caption export on the shared job
+    table. The next free worker on any instance processes it (same pipeline
+    as /upload). Returns the job id; poll GET /jobs/{job_id} for the result.
+    Honours Idempotency-Key.
+    """
+    return await _idempotent(
+        request, "jobs-upload", jira_project_key,
+        [file.filename, file.size, jira_project_key, jira_issue_type, jira_priority],
+        lambda: _jobs_upload(request, file, jira_project_key, jira_issue_type, jira_priority)
+    )
+
+
+async def _jobs_upload(
+    request: Request,
+    file: UploadFile,
+    jira_project_key: str,
+    jira_issue_type: str,
+    jira_priority: str
+) -> Dict[str, Any]:
+    if not jira_project_key:
+        raise HTTPException(status_code=400, detail="jira_project_key is required")
+
+    file_ext = Path(file.filename).suffix.lower()
+    allowed = [".txt"] + list(CAPTION_FORMATS) + list(settings.ALLOWED_AUDIO_FORMATS)
+    if file_ext not in allowed:
+        raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {', '.join(allowed)}")
+
+    worker = get_job_worker()
+    transcript_text, segments, audio_path, audio = await _read_job_input(file, file_ext, worker.audio)
+    job_id = await asyncio.to_thread(worker.store.enqueue, tenant_key(request.headers.get("X-API-Key"), jira_project_key), {
+        "filename": file.filename,
+        "project_key": jira_project_key,
+        "issue_type": jira_issue_type,
+        "priority": jira_priority,
+        "transcript": transcript_text,
+        "segments": segments,
+        "audio_path": audio_path,
+        "audio": audio,
+    })
+    current_span().set_attributes({"jobs.job_id": job_id, "jira.project": jira_project_key})
+    response = {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+    if audio:
+        # This instance's Whisper backlog plus the recording itself
+        response["audio"] = audio
+        response["eta_seconds"] = round(get_scheduler().estimate("whisper", audio_cost(audio)), 1)
+    return response
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """State of a queued job; `result` is the /upload response once done"""
+    job = await asyncio.to_thread(get_job_worker().store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "status": job["state"],
+        "filename": job["payload"]["filename"],
+        "owner": job["owner"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "result": job["result"],
+    }
+
+
+async def _run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Process a leased job (see app.jobs); a full stage queue hands it back
+    for later. Stages finished by an earlier attempt (possibly on another
+    instance) are resumed from the job's checkpoints.
+    """
+    payload = job["payload"]
+    timings: Dict[str, float] = {}
+    checkpoint = await asyncio.to_thread(open_checkpoint, job_run_key(job["id"]))
+    new_request_id()
+    with tracer.start_span("jobs.run", {"jobs.job_id": job["id"], "jobs.attempt": job["attempts"], "file.name": payload["filename"]}):
         try:
-            llm_result = llm_service.extract_action_items(transcript_text)
-            action_items = llm_result.get("tasks", [])
-        except Exception as e:
-            print(f"LLM extraction failed: {e}")
+            async with inflight.track():
+                transcript_text, segments = payload["transcript"], payload["segments"]
+                if payload["audio_path"]:
+                    transcript_text, segments = await transcribe_audio(
+                        payload["audio_path"], payload["project_key"], timings, checkpoint, payload.get("audio")
+                    )
+                return await process_transcript_and_create_issues(
+                    transcript_text=transcript_text,
+                    filename=payload["filename"],
+                    jira_project_key=payload["project_key"],
+                    jira_issue_type=payload["issue_type"],
+                    jira_priority=payload["priority"],
+                    timings=timings,
+                    segments=segments,
+                    checkpoint=checkpoint
+                )
+        except HTTPException as e:
+            if e.status_code == 429:
+                raise JobRetry(e.detail, float((e.headers or {}).get("Retry-After", 1)))
+            raise RuntimeError(e.detail)
+
+
+@app.websocket("/ws/meeting")
+async def live_meeting(websocket: WebSocket):
+    """
+    Stream a meeting while it happens.
 
+    Protocol:
+    1. Client sends a JSON text frame:
+       {"type": "start", "jira_project_key": "PROJ", "jira_issue_type": "Task",
+        "jira_priority": "Medium", "sample_rate": 16000, "channels": 1}
+    2. Client streams binary frames of raw 16-bit little-endian PCM audio.
+       The server replies with {"type": "transcript", ...} after each window
+       and {"type": "action_items", "tasks": [...]} when new items appear.
+    3. Client sends {"type": "stop"}; the server flushes the last window,
+       creates Jira issues and replies with {"type": "result", ...} (the same
+       payload as /upload).
+    """
+    from app.services.live_session import LiveMeetingSession
+
+    await websocket.accept()
+    session = None
+    try:
+        start = await websocket.receive_json()
+        if start.get("type") != "start" or not start.get("jira_project_key"):
+            await websocket.send_json({"type": "error", "detail": "First message must be {\"type\": \"start\", \"jira_project_key\": ...}"})
+            await websocket.close(code=1008)
+            return
+
+        # Before the session starts its worker task, which inherits the tenant
+        set_current_tenant(tenant_key(websocket.headers.get("X-API-Key"), start["jira_project_key"]))
         try:
-            summary = llm_service.summarize_transcript(transcript_text)
-        except Exception as e:
-            print(f"LLM summarization failed: {e}")
-            summary = None
+            session = LiveMeetingSession(
+                sample_rate=int(start.get("sample_rate", 16000)),
+                channels=int(start.get("channels", 1)),
+                on_event=websocket.send_json
+            )
+        except ValueError as e:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=1011)
+            return
 
-    # Create Jira service and validate project key early
-    if not all([settings.JIRA_BASE_URL, settings.JIRA_EMAIL, settings.JIRA_API_TOKEN]):
-        raise HTTPException(
-            status_code=500,
-            detail="Jira credentials not configured. Check JIRA_BASE_URL, JIRA_EMAIL, and JIRA_API_TOKEN in .env"
-        )
+        await websocket.send_json({"type": "started", "session_id": session.session_id})
 
-    jira_service = JiraService(
-        base_url=settings.JIRA_BASE_URL,
-        email=settings.JIRA_EMAIL,
-        api_token=settings.JIRA_API_TOKEN
-    )
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                session.add_audio(message["bytes"])
+            elif message.get("text"):
+                if json.loads(message["text"]).get("type") == "stop":
+                    break
+
+        async with inflight.track():
+            live_result = await session.finish()
+            result = await process_transcript_and_create_issues(
+                transcript_text=live_result["transcript"],
+                filename=f"live-meeting-{session.session_id}",
+                jira_project_key=start["jira_project_key"],
+                jira_issue_type=start.get("jira_issue_type", "Task"),
+                jira_priority=start.get("jira_priority", "Medium"),
+                action_items=live_result["action_items"],
+                segments=live_result["segments"]
+            )
+        result["duration_seconds"] = live_result["duration_seconds"]
+        result["windows_dropped"] = live_result["windows_dropped"]
+        await websocket.send_json({"type": "result", **result})
+        await websocket.close()
+    except WebSocketDisconnect:
+        if session:
+            await session.abort()
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1011)
+    except Exception as e:
+        if session:
+            await session.abort()
+        await websocket.send_json({"type": "error", "detail": f"Error processing live meeting: {e}"})
+        await websocket.close(code=1011)
+
+
+# Audio beyond this much of an enrollment sample is not decoded
+ENROLL_MAX_SECONDS = 120
 
-    # Validate project key exists and is accessible
+
+@app.post("/speakers/{project_key}/enroll")
+async def enroll_speaker(
+    project_key: str,
+    file: UploadFile = File(...),
+    name: str = Form(...),
+    account_id: Optional[str] = Form(None)
+):
+    """
+    Enroll a team member's voice so diarized meetings label them by name.
+
+    Form Parameters:
+    - file: Audio sample of the person speaking alone (10-60s, WAV or any format ffmpeg reads)
+    - name: Display name used in transcripts and as the action item owner
+    - account_id: Jira accountId (optional; looked up by name when omitted)
+    """
+    from app.services.diarization_service import get_diarization_service, get_speaker_directory
+
+    service = get_diarization_service()
+    if not service:
+        raise HTTPException(status_code=500, detail="Diarization not available. Install numpy and set ENABLE_DIARIZATION=true")
+
+    upload_storage = get_upload_storage()
     try:
-        jira_service.get_project(jira_project_key)
-    except RuntimeError as e:
-        # Jira returned a helpful body; surface it to client
+        stored = await upload_storage.save(file, Path(file.filename).suffix.lower(), max_bytes=settings.MAX_UPLOAD_SIZE)
+    except UploadStorageFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid or inaccessible project key: {e}")
-
-    # Create Jira issue(s)
-    created_issues = []
-
-    if action_items:
-        # Create one issue per action item
-        for item in action_items:
-            priority_map = {
-                "low": "Lowest",
-                "medium": "Medium",
-                "high": "High",
-                "critical": "Highest"
-            }
 
-            assignee_id = None
-            owner_val = item.get("owner")
-            if owner_val:
-                try:
-                    assignee_id = jira_service.find_user(owner_val, project_key=jira_project_key)
-                except Exception as e:
-                    # If lookup fails, log and continue without assignee
-                    print(f"Jira user lookup failed for '{owner_val}': {e}")
-
-            issue = jira_service.create_issue(
-                summary=item.get("description", "No description")[:255],
-                description=f"**Extracted from transcript**\n\n{item.get('description')}\n\n**Full Transcript:**\n{transcript_text[:5000]}",
-                project_key=jira_project_key,
-                issue_type=jira_issue_type,
-                priority=priority_map.get(item.get("priority", "medium"), "Medium"),
-                due_date=item.get("deadline"),
-                assignee=assignee_id
-            )
-            created_issues.append(issue)
-    else:
-        # Create single issue with summary + full transcript
-        desc = ""
-        if summary:
-            desc += f"**Meeting Summary:**\n\n{summary}\n\n"
-        desc += f"**Full Transcript**\n\n{transcript_text}"
-
-        issue = jira_service.create_issue(
-            summary=f"Transcript: {filename}",
-            description=desc,
-            project_key=jira_project_key,
-            issue_type=jira_issue_type,
-            priority=jira_priority
-        )
-        created_issues.append(issue)
+    def extract_embedding():
+        samples = service.load_audio(stored.path, max_seconds=ENROLL_MAX_SECONDS)
+        return service.embed(samples) if samples is not None else None
+
+    try:
+        embedding = await asyncio.to_thread(extract_embedding)
+    finally:
+        await upload_storage.release(stored)
+    if embedding is None:
+        raise HTTPException(status_code=400, detail="Could not extract a voice sample. Upload at least a few seconds of clear speech.")
+
+    if not account_id and all([settings.JIRA_BASE_URL, settings.JIRA_EMAIL, settings.JIRA_API_TOKEN]):
+        account_id = await asyncio.to_thread(JiraService().find_user, name, project_key=project_key)
+
+    await asyncio.to_thread(get_speaker_directory().enroll, project_key, name, account_id, embedding)
+    return {"success": True, "project_key": project_key, "name": name, "account_id": account_id}
 
+
+@app.get("/speakers/{project_key}")
+async def list_speakers(project_key: str):
+    """List enrolled speakers for a team"""
+    from app.services.diarization_service import get_speaker_directory
+
+    speakers = await asyncio.to_thread(get_speaker_directory().speakers, project_key)
+    return {"project_key": project_key, "speakers": speakers}
+
+
+@app.get("/transcripts/{transcript_id}", response_class=PlainTextResponse)
+async def get_transcript(transcript_id: str):
+    """Full transcript stored locally (TRANSCRIPT_STORAGE=local or attachment fallback)"""
+    path = local_transcript_path(transcript_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@app.get("/health")
+async def health_check():
+    llm_service = get_llm_service()
     return {
-        "success": True,
-        "transcript": transcript_text,
-        "summary": summary,
-        "action_items": action_items,
-        "jira_issues": [
-            {
-                "key": issue["key"],
-                "url": f"{settings.JIRA_BASE_URL}/browse/{issue['key']}"
-            }
-            for issue in created_issues
-        ]
+        "status": "healthy",
+        "requests": inflight.stats(),
+        "uploads": get_upload_storage().stats(),
+        "stages": get_scheduler().stats(),
+        "logging": log_stats(),
+        "deferred": get_deferred_processor().stats(),
+        "jobs": get_job_worker().stats(),
+        "llm": llm_service.usage_stats() if llm_service else None,
     }
+
+
+def _admit(request: Request, jira_project_key: str, stage: str):
+    """
+    Tag the request with its tenant (X-API-Key or Jira project) and class
+    (X-Request-Class: batch) and reject it up front if `stage` is full.
+    """
+    tenant = tenant_key(request.headers.get("X-API-Key"), jira_project_key)
+    batch = request.headers.get("X-Request-Class", "").lower() == "batch"
+    current_span().set_attributes({"tenant": tenant, "request.class": "batch" if batch else "interactive"})
+    try:
+        get_scheduler().check_for(tenant, batch, stage)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    set_current_tenant(tenant, batch)
+
+
+async def _idempotent(
+    request: Request,
+    endpoint: str,
+    jira_project_key: str,
+    fingerprint_parts: List[Any],
+    run: Callable[[], Awaitable[Dict[str, Any]]]
+):
+    """
+    Run `run()` once per Idempotency-Key (scoped to the tenant and
+    endpoint); retries get the same result with Idempotent-Replayed: true.
+    Failed runs are not stored, so a retry after an error reprocesses.
+    """
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        return await run()
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+
+    tenant = tenant_key(request.headers.get("X-API-Key"), jira_project_key)
+    current_span().set_attribute("idempotency.key", key)
+    try:
+        result, replayed = await get_idempotency_manager().run(
+            f"{tenant}:{endpoint}:{key}",
+            request_fingerprint([endpoint] + fingerprint_parts),
+            run
+        )
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    current_span().set_attribute("idempotency.replayed", replayed)
+    if replayed:
+        return JSONResponse(content=result, headers={"Idempotent-Replayed": "true"})
+    return result
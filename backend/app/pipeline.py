@@ -0,0 +1,470 @@
+"""
+Upload pipeline shared by the HTTP endpoints (app.main), the job worker and
+deferred processor steps defined there, and the headless CLI (app.cli):
+header probe, Whisper and speaker tagging, LLM extraction and summary, and
+Jira issue creation. Stage concurrency goes through the scheduler; failures
+surface as HTTPException so the endpoints can return them as they are.
+"""
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.checkpoints import Checkpoint
+from app.config import settings
+from app.logs import get_logger
+from app.scheduler import AdmissionRejected, get_scheduler
+from app.tracing import current_span
+from app.services.action_prefilter import get_action_prefilter
+from app.services.audio_probe import duration_seconds, probe_audio
+from app.services.compact_transcript import CompactTranscript
+from app.services.issue_content import (
+    build_action_item_description,
+    build_meeting_description,
+    excerpt_source_label,
+    store_transcript_locally,
+    transcript_filename,
+)
+from app.services.jira_service import JiraService
+from app.services.llm_service import get_llm_service
+from app.services.transcript_index import TranscriptIndex, format_timestamp
+from app.services.whisper_service import get_whisper_service
+
+logger = get_logger(__name__)
+
+
+async def transcribe_audio(
+    file_path: str,
+    jira_project_key: str,
+    timings: Dict[str, float],
+    checkpoint: Optional[Checkpoint] = None,
+    audio: Optional[Dict[str, Any]] = None
+):
+    """
+    Whisper + speaker tagging for a stored audio file. With a `checkpoint`,
+    a transcript saved by an earlier attempt is reused and a new one is saved.
+    `audio` is the file's header probe (probed here when not given); its
+    duration weighs the request in the Whisper queue.
+
+    Returns:
+        (transcript text, segments as a CompactTranscript)
+    """
+    saved = checkpoint.get("transcript") if checkpoint is not None else None
+    if saved:
+        segments = CompactTranscript.from_json(saved)
+        return segments.text, segments
+
+    whisper_service = get_whisper_service()
+    if not whisper_service:
+        raise HTTPException(
+            status_code=500,
+            detail="Whisper service not available. Set OPENAI_API_KEY in .env file"
+        )
+    if audio is None:
+        audio = await probe_recording(file_path)
+
+    async with stage_slot("whisper", audio_cost(audio)):
+        started = time.perf_counter()
+        transcript_result = await asyncio.to_thread(whisper_service.transcribe, file_path)
+        timings["transcription_ms"] = elapsed_ms(started)
+    transcript_text = transcript_result["text"]
+    segments = transcript_result["segments"]
+
+    # Speaker-tag the transcript so the LLM can attribute owners
+    from app.services.diarization_service import diarize_transcript
+
+    started = time.perf_counter()
+    try:
+        # Best effort: a full diarization queue (429) skips speaker tagging
+        async with stage_slot("diarization", audio_cost(audio)):
+            diarized = await asyncio.to_thread(diarize_transcript, file_path, segments, jira_project_key)
+    except Exception as e:
+        logger.warning("Diarization failed: %s", e, extra={"stage": "diarization"})
+        diarized = None
+    if diarized:
+        transcript_text = diarized["text"]
+        segments = CompactTranscript.from_segments(
+            transcript_text, diarized["segments"], segments.language, segments.duration
+        )
+        current_span().set_attribute("diarization.speakers", len(diarized["speakers"]))
+    timings["diarization_ms"] = elapsed_ms(started)
+    if checkpoint is not None:
+        await asyncio.to_thread(checkpoint.save, "transcript", segments.to_json())
+    return transcript_text, segments
+
+
+async def probe_recording(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Header probe of a stored recording (see app.services.audio_probe);
+    400 when it is longer than MAX_AUDIO_DURATION_SECONDS.
+    """
+    audio = await asyncio.to_thread(probe_audio, file_path)
+    seconds = duration_seconds(audio)
+    if seconds is None:
+        return audio
+    current_span().set_attributes({
+        "audio.duration_s": round(seconds, 3),
+        "audio.sample_rate": audio["sample_rate"],
+        "audio.channels": audio["channels"],
+    })
+    limit = getattr(settings, "MAX_AUDIO_DURATION_SECONDS", 0)
+    if limit and seconds > limit:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Recording too long ({format_timestamp(seconds)}). Max duration: {format_timestamp(limit)}"
+        )
+    return audio
+
+
+def audio_cost(audio: Optional[Dict[str, Any]]) -> float:
+    """Whisper queue cost of a recording: its minutes of audio (1 when unknown)"""
+    seconds = duration_seconds(audio)
+    return max(seconds / 60, 0.1) if seconds else 1.0
+
+
+# Diarization labels that were not matched to an enrolled voice
+UNNAMED_SPEAKER_RE = re.compile(r"^SPEAKER_\d+$")
+
+
+@asynccontextmanager
+async def stage_slot(stage: str, cost: float = 1.0):
+    """
+    Hold one of the stage's concurrency slots (fair-queued per tenant,
+    weighted by `cost`); 429 with Retry-After when the tenant's or the
+    stage's queue is full.
+    """
+    scheduler = get_scheduler()
+    try:
+        ticket = await scheduler.acquire(stage, cost)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    try:
+        yield
+    finally:
+        scheduler.release(ticket)
+
+
+def elapsed_ms(started: float) -> float:
+    """Milliseconds since a time.perf_counter() reading"""
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _publish_transcript(jira_service: JiraService, issue_key: str, transcript_text: str, filename: str) -> Dict[str, Any]:
+    """
+    Attach the full transcript to `issue_key` once and return a reference
+    for the other issues to link; falls back to local storage on failure.
+    """
+    name = transcript_filename(filename)
+    try:
+        attachment = jira_service.add_attachment(issue_key, name, transcript_text.encode("utf-8"))
+        return {
+            "issue_key": issue_key,
+            "label": f"{name} (attached to {issue_key})",
+            "url": attachment.get("content") or f"{settings.JIRA_BASE_URL}/browse/{issue_key}",
+        }
+    except Exception as e:
+        logger.warning("Transcript attachment to %s failed, storing locally: %s", issue_key, e, extra={"stage": "jira.attach"})
+        return store_transcript_locally(transcript_text)
+
+
+def _create_jira_issues(
+    transcript_text: str,
+    filename: str,
+    jira_project_key: str,
+    jira_issue_type: str,
+    jira_priority: str,
+    summary: Optional[str],
+    action_items: List[Dict[str, Any]],
+    segments: Optional[List[Any]],
+    checkpoint: Optional[Checkpoint] = None
+):
+    """
+    Blocking Jira half of the pipeline (run in a worker thread): validate
+    the project, create the issues and publish the transcript. Each issue
+    is checkpointed as soon as Jira returns it, so a resumed run creates
+    only the ones still missing.
+
+    Returns:
+        (created issues, transcript reference)
+    """
+    jira_service = JiraService(
+        base_url=settings.JIRA_BASE_URL,
+        email=settings.JIRA_EMAIL,
+        api_token=settings.JIRA_API_TOKEN
+    )
+
+    # Validate project key exists and is accessible
+    try:
+        jira_service.get_project(jira_project_key)
+    except RuntimeError as e:
+        # Jira returned a helpful body; surface it to client
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid or inaccessible project key: {e}")
+
+    # Create Jira issue(s)
+    created_issues = []
+    # Action items whose issues were created by this run, for the similar-items index
+    remembered = []
+    excerpt_chars = int(getattr(settings, "ISSUE_EXCERPT_CHARS", 800))
+    transcript_index = TranscriptIndex(transcript_text, segments)
+    transcript_ref = checkpoint.get("transcript_ref") if checkpoint is not None else None
+    if transcript_ref is None and getattr(settings, "TRANSCRIPT_STORAGE", "attachment") == "local":
+        transcript_ref = store_transcript_locally(transcript_text)
+        if checkpoint is not None:
+            checkpoint.save("transcript_ref", transcript_ref)
+
+    def publish(issue):
+        # The first issue carries the full transcript; the rest link to it
+        ref = _publish_transcript(jira_service, issue["key"], transcript_text, filename)
+        if checkpoint is not None:
+            checkpoint.save("transcript_ref", ref)
+        return ref
+
+    if action_items:
+        from app.services.diarization_service import get_speaker_directory
+
+        speaker_directory = get_speaker_directory()
+        # Create one issue per action item
+        for index, item in enumerate(action_items):
+            item["source_span"] = transcript_index.locate(item.get("source"), item.get("description"))
+            issue = checkpoint.get(f"issue:{index}") if checkpoint is not None else None
+            if issue:
+                created_issues.append(issue)
+                if transcript_ref is None:
+                    transcript_ref = publish(issue)
+                continue
+
+            priority_map = {
+                "low": "Lowest",
+                "medium": "Medium",
+                "high": "High",
+                "critical": "Highest"
+            }
+
+            assignee_id = None
+            owner_val = item.get("owner")
+            if owner_val and not UNNAMED_SPEAKER_RE.match(owner_val):
+                # Local speaker/owner cache first, Jira search only on a miss
+                assignee_id = speaker_directory.resolve_owner(jira_project_key, owner_val)
+                if not assignee_id:
+                    try:
+                        assignee_id = jira_service.find_user(owner_val, project_key=jira_project_key)
+                    except Exception as e:
+                        # If lookup fails, log (rate limited: one per item) and continue without assignee
+                        logger.warning("Jira user lookup failed for '%s': %s", owner_val, e,
+                                       extra={"stage": "jira.find_user", "rate_limit": "find_user"})
+                    if assignee_id:
+                        speaker_directory.remember_owner(jira_project_key, owner_val, assignee_id)
+
+            excerpt = transcript_index.excerpt(item["source_span"], max_chars=excerpt_chars)
+            issue = jira_service.create_issue(
+                summary=item.get("description", "No description")[:255],
+                description=build_action_item_description(
+                    item, excerpt["text"], transcript_ref, source=excerpt_source_label(excerpt)
+                ),
+                project_key=jira_project_key,
+                issue_type=jira_issue_type,
+                priority=priority_map.get(item.get("priority", "medium"), "Medium"),
+                due_date=item.get("deadline"),
+                assignee=assignee_id
+            )
+            created_issues.append(issue)
+            remembered.append({**item, "issue_key": issue.get("key")})
+            if checkpoint is not None:
+                checkpoint.save(f"issue:{index}", issue)
+
+            if transcript_ref is None:
+                transcript_ref = publish(issue)
+    else:
+        # Create single issue with summary + transcript excerpt; full transcript attached
+        issue = checkpoint.get("issue:0") if checkpoint is not None else None
+        if not issue:
+            issue = jira_service.create_issue(
+                summary=f"Transcript: {filename}",
+                description=build_meeting_description(
+                    summary, transcript_index.excerpt(None, max_chars=excerpt_chars)["text"], transcript_ref
+                ),
+                project_key=jira_project_key,
+                issue_type=jira_issue_type,
+                priority=jira_priority
+            )
+            if checkpoint is not None:
+                checkpoint.save("issue:0", issue)
+        created_issues.append(issue)
+        if transcript_ref is None:
+            transcript_ref = publish(issue)
+
+    if remembered:
+        # numpy-backed; imported here so importing app.main stays cheap
+        from app.services.vector_index import remember_action_items
+
+        remember_action_items(remembered)
+    return created_issues, transcript_ref
+
+
+async def process_transcript_and_create_issues(
+    transcript_text: str,
+    filename: str,
+    jira_project_key: str,
+    jira_issue_type: str,
+    jira_priority: str,
+    timings: Optional[Dict[str, float]] = None,
+    action_items: Optional[List[Dict[str, Any]]] = None,
+    segments: Optional[List[Any]] = None,
+    summary: Optional[str] = None,
+    create_issues: bool = True,
+    checkpoint: Optional[Checkpoint] = None
+) -> dict:
+    """
+    Helper to extract action items, summarize, and create Jira issues from a transcript.
+    Returns the same response payload used by the endpoints.
+
+    Per-stage durations are recorded into `timings` (milliseconds) and
+    returned in the payload so clients and benchmarks can attribute latency.
+    Pass `action_items` when they were already extracted (e.g. incrementally
+    during a live meeting) to skip the extraction call, and `summary` as
+    well (deferred batch results; "" when there is none) to skip both LLM
+    calls. Pass the Whisper `segments` so each item's source span and
+    excerpt carry timestamps.
+
+    Otherwise the lexical pre-filter scores the transcript first; low
+    scores get the summary call only (or regex extraction and no LLM call),
+    and its decision is returned as `prefilter`.
+
+    With `create_issues=False` (CLI dry runs) the Jira stage is skipped and
+    the payload carries the extracted items only.
+
+    With a `checkpoint` (app.checkpoints), LLM results and created issues
+    saved by an earlier attempt of the same run are reused, and new ones
+    are saved; the steps that were reused are returned as `resumed`.
+    """
+    timings = timings if timings is not None else {}
+    request_span = current_span()
+    request_span.set_attribute("transcript.chars", len(transcript_text))
+
+    # Extract action items and generate summary
+    saved = checkpoint.get("llm") if checkpoint is not None else None
+    if saved:
+        action_items, summary = saved["action_items"], saved["summary"]
+    precomputed_items = action_items is not None
+    action_items = list(action_items or [])
+
+    # Create Jira service and validate project key early
+    if create_issues and not all([settings.JIRA_BASE_URL, settings.JIRA_EMAIL, settings.JIRA_API_TOKEN]):
+        raise HTTPException(
+            status_code=500,
+            detail="Jira credentials not configured. Check JIRA_BASE_URL, JIRA_EMAIL, and JIRA_API_TOKEN in .env"
+        )
+
+    llm_service = get_llm_service()
+    prefilter = get_action_prefilter()
+    # A resumed run keeps the decision it checkpointed with its LLM output
+    decision = saved["prefilter"] if saved else None
+    route = decision["route"] if decision else "llm"
+    if llm_service and prefilter and decision is None and not precomputed_items:
+        # Skip the extraction call (or both calls) for transcripts with no actionable content
+        started = time.perf_counter()
+        decision = await asyncio.to_thread(prefilter.evaluate, transcript_text)
+        route = decision["route"]
+        timings["prefilter_ms"] = elapsed_ms(started)
+        request_span.set_attributes({"prefilter.score": decision["score"], "prefilter.route": route})
+        logger.info("Prefilter routed %s to %s", filename, route, extra={
+            "stage": "prefilter",
+            "score": decision["score"],
+            "threshold": prefilter.threshold,
+            "route": route,
+            "words": decision["words"],
+            "actionable": decision["actionable"],
+            "negative": decision["negative"],
+            "cues": decision["cues"],
+        })
+
+    extraction = saved["extraction"] if saved else None
+    if llm_service and route == "regex" and not saved:
+        simple = await asyncio.to_thread(llm_service.extract_action_items_simple, transcript_text)
+        action_items = simple.get("tasks", [])
+        extraction = {"tier": "regex"}
+    elif llm_service and not saved and not (precomputed_items and summary is not None):
+        async with stage_slot("llm"):
+            if not precomputed_items and route == "llm":
+                started = time.perf_counter()
+                try:
+                    llm_result = await asyncio.to_thread(llm_service.extract_action_items, transcript_text)
+                    action_items = llm_result.get("tasks", [])
+                    # Which model tier answered (small / large after escalation / regex fallback)
+                    extraction = {k: llm_result.get(k) for k in ("tier", "model", "escalation")}
+                except Exception as e:
+                    logger.warning("LLM extraction failed: %s", e, extra={"stage": "llm.extract"})
+                timings["extraction_ms"] = elapsed_ms(started)
+
+            started = time.perf_counter()
+            try:
+                summary = await asyncio.to_thread(llm_service.summarize_transcript, transcript_text)
+            except Exception as e:
+                logger.warning("LLM summarization failed: %s", e, extra={"stage": "llm.summarize"})
+                summary = None
+            timings["summary_ms"] = elapsed_ms(started)
+    if checkpoint is not None and not saved:
+        await asyncio.to_thread(checkpoint.save, "llm", {
+            "action_items": action_items,
+            "summary": summary,
+            "prefilter": decision,
+            "extraction": extraction,
+        })
+
+    created_issues, transcript_ref = [], None
+    if create_issues:
+        jira_started = time.perf_counter()
+        async with stage_slot("jira"):
+            created_issues, transcript_ref = await asyncio.to_thread(
+                _create_jira_issues,
+                transcript_text,
+                filename,
+                jira_project_key,
+                jira_issue_type,
+                jira_priority,
+                summary,
+                action_items,
+                segments,
+                checkpoint
+            )
+        timings["jira_ms"] = elapsed_ms(jira_started)
+    resumed = checkpoint.resumed if checkpoint is not None else []
+    request_span.set_attributes({
+        "tasks.count": len(action_items),
+        "jira.issues_created": len(created_issues),
+        "checkpoint.resumed": len(resumed),
+    })
+    logger.info("Processed %s", filename, extra={
+        "stage": "pipeline",
+        "project": jira_project_key,
+        "provider": getattr(llm_service, "provider", None),
+        "tier": (extraction or {}).get("tier"),
+        "tasks": len(action_items),
+        "issues": len(created_issues),
+        "resumed": resumed,
+        "durations_ms": timings,
+    })
+
+    return {
+        "success": True,
+        "transcript": transcript_text,
+        "transcript_ref": transcript_ref,
+        "summary": summary,
+        "action_items": action_items,
+        "jira_issues": [
+            {
+                "key": issue["key"],
+                "url": f"{settings.JIRA_BASE_URL}/browse/{issue['key']}"
+            }
+            for issue in created_issues
+        ],
+        "timings": timings,
+        "prefilter": decision,
+        "extraction": extraction,
+        "resumed": resumed
+    }
@@ -0,0 +1,307 @@
+"""
+Admission control for the expensive pipeline stages (Whisper, diarization, LLM, Jira)
+Each stage has a concurrency cap; requests beyond it wait in per-tenant
+weighted fair queues, and are turned away (429 + Retry-After) when their
+tenant's queue or the stage's queue is full.
+
+Caps and queues are per process: with gunicorn, each of the WEB_CONCURRENCY
+workers admits up to the configured cap, so size the caps for one worker.
+"""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import math
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
+from app.config import settings
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+# (tenant, is_batch) of the request being processed
+_current_tenant: ContextVar[Tuple[str, bool]] = ContextVar("current_tenant", default=("anonymous", False))
+
+
+class AdmissionRejected(Exception):
+    """A stage queue is full; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def normalize_tenant(name: str) -> str:
+    """
+    Canonical spelling of a tenant name: project keys are upper case, API
+    key tenants ("key:" + hex digest) lower case
+    """
+    name = name.strip()
+    if name[:4].lower() == "key:":
+        return "key:" + name[4:].lower()
+    return name.upper()
+
+
+def tenant_key(api_key: Optional[str] = None, project_key: Optional[str] = None) -> str:
+    """
+    Tenant of a request: its API key when sent, as "key:" plus the first 12
+    hex digits of the key's SHA-256, else the Jira project key
+    """
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    return normalize_tenant(project_key or "anonymous")
+
+
+def set_current_tenant(tenant: str, batch: bool = False):
+    """
+    Attribute stage slots acquired from here on in the current task (one
+    per request) to `tenant`. Returns a token for ContextVar.reset.
+    """
+    return _current_tenant.set((tenant, batch))
+
+
+class _Waiter:
+    __slots__ = ("queue", "start_tag", "cost", "future")
+
+    def __init__(self, queue: str, start_tag: float, cost: float, future: asyncio.Future):
+        self.queue = queue
+        self.start_tag = start_tag
+        self.cost = cost
+        self.future = future
+
+
+class StageScheduler:
+    """
+    Concurrency cap plus start-time fair queueing for one stage.
+
+    Every queue (a tenant, or a tenant's batch traffic) has a weight. Each
+    admitted request is tagged with a virtual start time
+    max(stage clock, queue's previous finish) and advances its queue's
+    finish by 1/weight, so when a slot frees up the request with the lowest
+    tag runs. A tenant bulk-uploading a quarter of recordings builds up a
+    long run of tags and interleaves with other tenants instead of
+    blocking them; batch traffic gets BATCH_WEIGHT of its tenant's share.
+
+    Requests may carry a cost (Whisper: minutes of audio, from the upload's
+    header probe) that advances the finish by cost/weight, so one 3-hour
+    recording counts like 180 one-minute clips. Service time is tracked
+    per unit of cost, which lets retry_after() and estimate() scale with
+    the audio actually queued instead of the number of requests.
+
+    Runs on the worker's event loop only (no locking needed).
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_limit: int = 100, tenant_queue_limit: int = 20):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_limit = queue_limit
+        self.tenant_queue_limit = tenant_queue_limit
+
+        self._active = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._clock = 0.0
+        self._finish: Dict[str, float] = {}
+        self._waiting: Dict[str, int] = {}
+        self._queued_cost = 0.0
+        self._active_cost = 0.0
+        self._service_seconds = 1.0   # EWMA of time a slot is held, per unit of cost
+        self._metrics = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    @property
+    def waiting(self) -> int:
+        return sum(self._waiting.values())
+
+    def _backlog_seconds(self) -> float:
+        return self._service_seconds * (self._queued_cost + self._active_cost) / self.concurrency
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        return max(1, min(300, math.ceil(self._backlog_seconds())))
+
+    def estimate(self, cost: float = 1.0) -> float:
+        """Seconds until a request of `cost` submitted now would finish"""
+        wait = self._backlog_seconds() if self._active >= self.concurrency or self._heap else 0.0
+        return wait + self._service_seconds * cost
+
+    def _tag(self, queue: str, weight: float, cost: float) -> float:
+        start = max(self._clock, self._finish.get(queue, 0.0))
+        self._finish[queue] = start + cost / weight
+        return start
+
+    def check(self, queue: str):
+        """Raise AdmissionRejected now if a request for `queue` could not be queued"""
+        if self._active < self.concurrency and not self._heap:
+            return
+        if self.waiting >= self.queue_limit:
+            self._metrics["rejected"] += 1
+            raise AdmissionRejected(f"The {self.name} stage is at capacity, please retry later", self.retry_after())
+        if self._waiting.get(queue, 0) >= self.tenant_queue_limit:
+            self._metrics["rejected"] += 1
+            raise AdmissionRejected(
+                f"Too many queued {self.name} requests for this tenant, please retry later", self.retry_after()
+            )
+
+    async def acquire(self, queue: str, weight: float = 1.0, cost: float = 1.0) -> Tuple[float, float]:
+        """Wait for a slot; returns a ticket to pass to release()"""
+        self.check(queue)
+        cost = max(cost, 0.01)
+        start_tag = self._tag(queue, weight, cost)
+        if self._active < self.concurrency and not self._heap:
+            self._active += 1
+            self._active_cost += cost
+            self._clock = start_tag
+            self._metrics["admitted"] += 1
+            return time.monotonic(), cost
+
+        waiter = _Waiter(queue, start_tag, cost, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, (start_tag, next(self._seq), waiter))
+        self._waiting[queue] = self._waiting.get(queue, 0) + 1
+        self._queued_cost += cost
+        self._metrics["queued"] += 1
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the client went away: hand the slot on
+                self.release(waiter.future.result())
+            else:
+                waiter.future.cancel()
+                self._dequeued(waiter)
+            raise
+
+    def release(self, ticket: Tuple[float, float]):
+        started, cost = ticket
+        held = time.monotonic() - started
+        self._service_seconds = 0.8 * self._service_seconds + 0.2 * held / cost
+        self._active -= 1
+        self._active_cost = max(0.0, self._active_cost - cost)
+        self._dispatch()
+        self._evict_idle()
+
+    def _evict_idle(self):
+        """
+        Forget queues with nothing waiting whose finish tag the clock has
+        passed: their next tag would be the clock either way, and keeping
+        them grows the map with every tenant ever seen. Once the stage is
+        idle no earlier tag matters any more, so all of them are dropped.
+        """
+        if len(self._finish) <= len(self._waiting):
+            return
+        if not self._active and not self._heap:
+            self._finish.clear()
+            return
+        idle = [queue for queue, finish in self._finish.items()
+                if finish <= self._clock and queue not in self._waiting]
+        for queue in idle:
+            del self._finish[queue]
+
+    def _dequeued(self, waiter: _Waiter):
+        self._waiting[waiter.queue] -= 1
+        if not self._waiting[waiter.queue]:
+            del self._waiting[waiter.queue]
+        self._queued_cost = max(0.0, self._queued_cost - waiter.cost)
+
+    def _dispatch(self):
+        while self._active < self.concurrency and self._heap:
+            start_tag, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue  # cancelled while queued (already uncounted)
+            self._dequeued(waiter)
+            self._active += 1
+            self._active_cost += waiter.cost
+            self._clock = start_tag
+            self._metrics["admitted"] += 1
+            waiter.future.set_result((time.monotonic(), waiter.cost))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "waiting": self.waiting,
+            "waiting_by_queue": dict(self._waiting),
+            "queued_cost": round(self._queued_cost, 2),
+            "avg_service_seconds": round(self._service_seconds, 3),
+            **self._metrics,
+        }
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    """"PROJ=4,key:3f9a0c1d2e4b=2" -> {"PROJ": 4.0, "key:3f9a0c1d2e4b": 2.0}"""
+    weights = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            try:
+                weights[normalize_tenant(name)] = max(0.01, float(value))
+            except ValueError:
+                logger.warning("Ignoring invalid tenant weight '%s'", part)
+    return weights
+
+
+class PipelineScheduler:
+    """The per-stage schedulers plus tenant weights"""
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        queue_limit: int = 100,
+        tenant_queue_limit: int = 20,
+        weights: Optional[Dict[str, float]] = None,
+        batch_weight: float = 0.25
+    ):
+        self.stages = {
+            name: StageScheduler(name, concurrency, queue_limit, tenant_queue_limit)
+            for name, concurrency in limits.items()
+        }
+        self.weights = weights or {}
+        self.batch_weight = batch_weight
+
+    def _queue(self, tenant: str, batch: bool) -> Tuple[str, float]:
+        weight = self.weights.get(tenant, 1.0)
+        if batch:
+            return f"{tenant}:batch", weight * self.batch_weight
+        return tenant, weight
+
+    def check_for(self, tenant: str, batch: bool, stage: str):
+        """Reject early (before any work) when `stage` couldn't queue this tenant"""
+        self.stages[stage].check(self._queue(tenant, batch)[0])
+
+    async def acquire(self, stage: str, cost: float = 1.0) -> Tuple[str, Tuple[float, float]]:
+        """Slot in `stage` for the tenant of the current context (see tenant_context)"""
+        queue, weight = self._queue(*_current_tenant.get())
+        return stage, await self.stages[stage].acquire(queue, weight, cost)
+
+    def release(self, ticket: Tuple[str, Tuple[float, float]]):
+        stage, stage_ticket = ticket
+        self.stages[stage].release(stage_ticket)
+
+    def estimate(self, stage: str, cost: float = 1.0) -> float:
+        """Seconds until a `stage` request of `cost` submitted now would finish"""
+        return self.stages[stage].estimate(cost)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: stage.stats() for name, stage in self.stages.items()}
+
+
+# Lazily constructed singleton
+_scheduler = None
+
+
+def get_scheduler() -> PipelineScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PipelineScheduler(
+            limits={
+                "whisper": int(getattr(settings, "WHISPER_CONCURRENCY", 4)),
+                "diarization": int(getattr(settings, "DIARIZATION_CONCURRENCY", 2)),
+                "llm": int(getattr(settings, "LLM_CONCURRENCY", 8)),
+                "jira": int(getattr(settings, "JIRA_CONCURRENCY", 8)),
+            },
+            queue_limit=int(getattr(settings, "STAGE_QUEUE_LIMIT", 100)),
+            tenant_queue_limit=int(getattr(settings, "TENANT_QUEUE_LIMIT", 20)),
+            weights=_parse_weights(getattr(settings, "TENANT_WEIGHTS", "")),
+            batch_weight=float(getattr(settings, "BATCH_WEIGHT", 0.25))
+        )
+    return _scheduler
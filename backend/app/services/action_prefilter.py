@@ -0,0 +1,122 @@
+"""
+Lexical pre-filter for action item extraction
+Scores a transcript for actionable content with precompiled cue patterns
+before any LLM call, so stand-ups with "nothing new" and near-silent
+recordings skip the extraction call (or both LLM calls).
+"""
+import math
+import re
+import threading
+from bisect import bisect_right
+from typing import Dict, Any, Optional
+from app.config import settings
+
+# (name, weight, pattern). A sentence's score is the sum of the weights of
+# the distinct cue kinds it contains; patterns run over lowercased text.
+CUES = [
+    ("marker", 2.0, r"\baction items?\b|\bto-?dos?\b|\bfollow[- ]?ups?\b|\bnext steps?\b|\bassign(?:ed)? to\b|\bowner\b"),
+    ("commitment", 1.0, r"\b(?:i|we)(?:'ll| will| can take| am going to|'m going to| are going to|'re going to)\b|\blet(?:'s| me)\b"),
+    ("request", 1.0, r"\b(?:can|could|would) you\b|\bplease\b|\bmake sure\b|\bneeds? to\b|\b(?:have|has|got) to\b|\bshould\b|\bmust\b"),
+    ("future", 0.5, r"\bwill\b|\bgoing to\b|'ll\b"),
+    ("task_verb", 0.5, r"\b(?:send|schedule|review|fix|update|deploy|prepare|draft|write|create|share|set up|reach out"
+                      r"|look into|investigate|check|book|file|merge|ship|email|call)\b"),
+    ("deadline", 1.0, r"\b(?:by|before|until|due)\s+(?:the\s+)?(?:today|tomorrow|tonight|eod|eow|end of|next|this"
+                      r"|mon|tue|wed|thu|fri|sat|sun|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|\d)"),
+]
+_CUE_PATTERNS = [(name, weight, re.compile(pattern)) for name, weight, pattern in CUES]
+
+# Phrases that say there is nothing to do; each cancels part of one actionable sentence
+_NEGATIVE_RE = re.compile(
+    r"\bnothing (?:new|to report|else|from me|much)\b|\bno (?:updates?|blockers?|action items?)\b"
+    r"|\bsame as (?:yesterday|last (?:week|time))\b|\ball good\b"
+)
+_SENTENCE_END_RE = re.compile(r"[.!?\n]+")
+
+# Sentence score at which a sentence counts as one action item candidate;
+# sentences with a single weak cue count for PARTIAL_CREDIT
+ACTIONABLE_SCORE = 1.5
+PARTIAL_CREDIT = 0.25
+NEGATIVE_CREDIT = 0.5
+
+
+class ActionPrefilter:
+    """
+    Estimates whether a transcript contains action items.
+
+    The score is 1 - exp(-n / 2) where n is the number of actionable
+    sentences (minus NEGATIVE_CREDIT per "nothing new"-style phrase), so
+    one clear commitment scores ~0.39, two ~0.63, none 0.
+
+    Runs the cue patterns once over the whole text (a few ms for a one
+    hour meeting); callers on the event loop should use a worker thread.
+
+    Routes:
+        "llm"      score >= threshold: full extraction + summary
+        low_route  "summary" (summary call only) or "regex" (no LLM call)
+        "regex"    fewer than min_words words: nothing worth sending
+    """
+
+    def __init__(self, threshold: float = 0.3, low_route: str = "summary", min_words: int = 5):
+        if low_route not in ("summary", "regex"):
+            raise ValueError(f"PREFILTER_LOW_ROUTE must be 'summary' or 'regex', got '{low_route}'")
+        self.threshold = threshold
+        self.low_route = low_route
+        self.min_words = min_words
+
+    def evaluate(self, transcript: str) -> Dict[str, Any]:
+        text = (transcript or "").lower()
+        words = len(text.split())
+        if words < self.min_words:
+            return {"score": 0.0, "route": "regex", "words": words, "actionable": 0.0, "negative": 0, "cues": {}}
+
+        # Sentence i spans [ends[i-1], ends[i]); cue hits are bucketed by bisect
+        ends = [m.end() for m in _SENTENCE_END_RE.finditer(text)]
+        sentence_scores: Dict[int, float] = {}
+        cue_counts: Dict[str, int] = {}
+        for name, weight, pattern in _CUE_PATTERNS:
+            seen = set()
+            for m in pattern.finditer(text):
+                sentence = bisect_right(ends, m.start())
+                if sentence not in seen:
+                    seen.add(sentence)
+                    sentence_scores[sentence] = sentence_scores.get(sentence, 0.0) + weight
+            if seen:
+                cue_counts[name] = len(seen)
+
+        actionable = sum(
+            1.0 if score >= ACTIONABLE_SCORE else PARTIAL_CREDIT
+            for score in sentence_scores.values() if score >= 1.0
+        )
+        negative = len(_NEGATIVE_RE.findall(text))
+        net = max(0.0, actionable - NEGATIVE_CREDIT * negative)
+        score = round(1.0 - math.exp(-net / 2.0), 3)
+        return {
+            "score": score,
+            "route": "llm" if score >= self.threshold else self.low_route,
+            "words": words,
+            "actionable": actionable,
+            "negative": negative,
+            "cues": cue_counts,
+        }
+
+
+# Lazily constructed singleton (None when disabled)
+_UNSET = object()
+_prefilter = _UNSET
+_prefilter_lock = threading.Lock()
+
+
+def get_action_prefilter() -> Optional[ActionPrefilter]:
+    global _prefilter
+    if _prefilter is _UNSET:
+        with _prefilter_lock:
+            if _prefilter is _UNSET:
+                prefilter = None
+                if getattr(settings, "ENABLE_ACTION_PREFILTER", True):
+                    prefilter = ActionPrefilter(
+                        threshold=float(getattr(settings, "PREFILTER_THRESHOLD", 0.3)),
+                        low_route=str(getattr(settings, "PREFILTER_LOW_ROUTE", "summary")).lower(),
+                        min_words=int(getattr(settings, "PREFILTER_MIN_WORDS", 5))
+                    )
+                _prefilter = prefilter
+    return _prefilter
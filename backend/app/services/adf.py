@@ -0,0 +1,106 @@
+"""
+Atlassian Document Format (ADF) builders for Jira issue descriptions
+Jira Cloud's REST v3 stores descriptions as ADF JSON; these helpers build
+small structured documents (headings, bullet lists, links) instead of one
+giant text node.
+"""
+import re
+from typing import List, Dict, Any, Optional
+
+# Jira rejects description fields above 32767 characters; keep every text
+# node comfortably below that
+MAX_TEXT_CHARS = 4000
+
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.*)$")
+_HEADING_RE = re.compile(r"^\s*(#{1,6})\s+(.*)$")
+_BOLD_LINE_RE = re.compile(r"^\s*\*\*(.+?)\*\*:?\s*$")
+
+
+def text(value: str, marks: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    value = value if len(value) <= MAX_TEXT_CHARS else value[:MAX_TEXT_CHARS - 3] + "..."
+    node = {"type": "text", "text": value}
+    if marks:
+        node["marks"] = marks
+    return node
+
+
+def strong(value: str) -> Dict[str, Any]:
+    return text(value, [{"type": "strong"}])
+
+
+def link(label: str, href: str) -> Dict[str, Any]:
+    return text(label, [{"type": "link", "attrs": {"href": href}}])
+
+
+def paragraph(*content) -> Dict[str, Any]:
+    """Paragraph from text nodes or plain strings (empty strings are dropped)"""
+    nodes = [text(c) if isinstance(c, str) else c for c in content if c]
+    return {"type": "paragraph", "content": nodes}
+
+
+def heading(value: str, level: int = 3) -> Dict[str, Any]:
+    return {"type": "heading", "attrs": {"level": level}, "content": [text(value)]}
+
+
+def bullet_list(items: List[Any]) -> Dict[str, Any]:
+    """Bullet list; each item is a string or a list of inline nodes"""
+    return {
+        "type": "bulletList",
+        "content": [
+            {"type": "listItem", "content": [paragraph(*(item if isinstance(item, list) else [item]))]}
+            for item in items
+        ],
+    }
+
+
+def quote(value: str) -> Dict[str, Any]:
+    return {"type": "blockquote", "content": [paragraph(p) for p in value.split("\n\n") if p.strip()]}
+
+
+def document(*blocks) -> Dict[str, Any]:
+    """Top-level ADF document; None blocks are skipped"""
+    return {"type": "doc", "version": 1, "content": [b for b in blocks if b]}
+
+
+def markdown_blocks(markdown: str) -> List[Dict[str, Any]]:
+    """
+    Convert the light markdown the LLM writes (``#`` headings, ``**Title**``
+    lines, ``-``/``*``/numbered bullets, blank-line separated paragraphs)
+    into ADF blocks.
+    """
+    blocks: List[Dict[str, Any]] = []
+    bullets: List[str] = []
+    para: List[str] = []
+
+    def flush():
+        if bullets:
+            blocks.append(bullet_list(list(bullets)))
+            bullets.clear()
+        if para:
+            blocks.append(paragraph(" ".join(para)))
+            para.clear()
+
+    for line in (markdown or "").splitlines():
+        if not line.strip():
+            flush()
+            continue
+        bullet = _BULLET_RE.match(line)
+        if bullet:
+            if para:
+                flush()
+            bullets.append(_strip_inline(bullet.group(1)))
+            continue
+        title = _HEADING_RE.match(line) or _BOLD_LINE_RE.match(line)
+        if title:
+            flush()
+            blocks.append(heading(_strip_inline(title.groups()[-1]), level=4))
+            continue
+        if bullets:
+            flush()
+        para.append(_strip_inline(line.strip()))
+    flush()
+    return blocks
+
+
+def _strip_inline(value: str) -> str:
+    return re.sub(r"\*\*(.+?)\*\*", r"\1", value).strip()
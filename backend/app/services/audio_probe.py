@@ -0,0 +1,323 @@
+"""
+Header-only audio metadata probe
+Reads just enough of an uploaded recording to know its duration, sample
+rate and channel count before it is sent to Whisper, so uploads can be
+rejected when too long, weighted in the Whisper queue and given an ETA.
+Nothing is decoded; at most a few hundred KB are read from any file.
+
+Supported (ALLOWED_AUDIO_FORMATS):
+- WAV (.wav): fmt chunk + data chunk size
+- FLAC (.flac): STREAMINFO total samples
+- MP3 (.mp3): first frame header, then the Xing/Info or VBRI frame count;
+  without one the stream is taken as CBR and sized from the file length
+- M4A (.m4a): moov/mvhd duration, sample rate and channels from the audio
+  track's sample description (moov may sit after mdat; mdat is skipped)
+- Ogg (.ogg, .opus): identification header (Vorbis or Opus), granule
+  position of the last page
+
+probe_audio() returns {"format", "duration_us", "sample_rate", "channels",
+"exact"} or None when the file isn't recognized. "exact" is False when the
+duration is an estimate (MP3 without a frame count).
+"""
+import os
+import struct
+from typing import Any, BinaryIO, Dict, Optional
+
+# How far into a file the probes look for a first MP3 frame / Ogg page
+_SCAN_BYTES = 256 * 1024
+# moov atoms larger than this are not read
+_MAX_MOOV_BYTES = 16 * 1024 * 1024
+
+_MP3_BITRATES = {
+    # (MPEG-1?, layer) -> kbit/s by index
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _info(fmt: str, seconds: float, sample_rate: int, channels: int, exact: bool = True) -> Dict[str, Any]:
+    return {
+        "format": fmt,
+        "duration_us": int(round(seconds * 1_000_000)),
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "exact": exact,
+    }
+
+
+def _skip_id3(f: BinaryIO) -> int:
+    """Offset just past a leading ID3v2 tag (0 without one)"""
+    f.seek(0)
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b"ID3":
+        size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        return 10 + size + (10 if header[5] & 0x10 else 0)
+    return 0
+
+
+def probe_wav(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    f.seek(0)
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    channels = sample_rate = byte_rate = None
+    pos = 12
+    while pos + 8 <= size:
+        f.seek(pos)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"fmt ":
+            _, channels, sample_rate, byte_rate = struct.unpack("<HHII", f.read(12))
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streamed writers leave the size at 0 or 0xFFFFFFFF: use what's there
+            available = size - pos - 8
+            if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+                chunk_size = available
+            return _info("wav", chunk_size / byte_rate, sample_rate, channels)
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def probe_flac(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    f.seek(_skip_id3(f))
+    if f.read(4) != b"fLaC":
+        return None
+    block = f.read(4 + 18)
+    if len(block) < 22 or block[0] & 0x7F != 0:
+        return None  # STREAMINFO must come first
+    # 20 bits sample rate, 3 bits channels-1, 5 bits bps-1, 36 bits total samples
+    packed = int.from_bytes(block[14:22], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate:
+        return None
+    return _info("flac", total_samples / sample_rate, sample_rate, channels, exact=total_samples > 0)
+
+
+def _mp3_frame(header: bytes) -> Optional[Dict[str, Any]]:
+    """Fields of a 4-byte MPEG audio frame header, None when it isn't one"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x3   # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = 4 - ((header[1] >> 1) & 0x3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {
+        "mpeg1": mpeg1,
+        "sample_rate": sample_rate,
+        "channels": 1 if header[3] >> 6 == 3 else 2,
+        "bitrate": bitrate,
+        "samples": samples,
+        "length": length,
+    }
+
+
+def probe_mp3(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    start = _skip_id3(f)
+    f.seek(start)
+    data = f.read(_SCAN_BYTES)
+    pos = data.find(b"\xff")
+    while 0 <= pos < len(data) - 4:
+        frame = _mp3_frame(data[pos:pos + 4])
+        # A real frame is followed by another one (or the end of the scan window)
+        if frame and frame["length"] > 4:
+            following = data[pos + frame["length"]:pos + frame["length"] + 4]
+            if len(following) < 4 or _mp3_frame(following):
+                break
+        pos = data.find(b"\xff", pos + 1)
+    else:
+        return None
+
+    sample_rate, channels = frame["sample_rate"], frame["channels"]
+    # Xing/Info sits after the side information; VBRI at a fixed offset
+    side_info = (32 if channels == 2 else 17) if frame["mpeg1"] else (17 if channels == 2 else 9)
+    xing = data[pos + 4 + side_info:pos + 4 + side_info + 12]
+    if xing[:4] in (b"Xing", b"Info") and len(xing) == 12 and xing[7] & 0x1:
+        frames = struct.unpack(">I", xing[8:12])[0]
+        return _info("mp3", frames * frame["samples"] / sample_rate, sample_rate, channels)
+    vbri = data[pos + 36:pos + 36 + 18]
+    if vbri[:4] == b"VBRI" and len(vbri) == 18:
+        frames = struct.unpack(">I", vbri[14:18])[0]
+        return _info("mp3", frames * frame["samples"] / sample_rate, sample_rate, channels)
+
+    # No frame count: assume constant bitrate over the rest of the file
+    audio_bytes = size - start - pos
+    if size >= 128:
+        f.seek(size - 128)
+        if f.read(3) == b"TAG":
+            audio_bytes -= 128
+    return _info("mp3", audio_bytes * 8 / frame["bitrate"], sample_rate, channels, exact=False)
+
+
+def _atoms(data: bytes, start: int = 0, end: Optional[int] = None):
+    """(type, payload start, payload end) of the MP4 boxes in data[start:end]"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        box_size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif box_size == 0:
+            box_size = end - pos
+        if box_size < header:
+            return
+        yield box_type, pos + header, min(pos + box_size, end)
+        pos += box_size
+
+
+def _child(data: bytes, start: int, end: int, *path: bytes) -> Optional[tuple]:
+    for name in path:
+        for box_type, payload_start, payload_end in _atoms(data, start, end):
+            if box_type == name:
+                start, end = payload_start, payload_end
+                break
+        else:
+            return None
+    return start, end
+
+
+def probe_m4a(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    # Walk top-level boxes by seeking, so a leading mdat is never read
+    moov = None
+    pos = 0
+    while pos + 8 <= size:
+        f.seek(pos)
+        header = f.read(16)
+        box_size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = size - pos
+        if box_size < header_size:
+            return None
+        if pos == 0 and box_type != b"ftyp":
+            return None
+        if box_type == b"moov":
+            if box_size > _MAX_MOOV_BYTES:
+                return None
+            f.seek(pos + header_size)
+            moov = f.read(box_size - header_size)
+            break
+        pos += box_size
+    if moov is None:
+        return None
+
+    mvhd = _child(moov, 0, len(moov), b"mvhd")
+    if mvhd is None:
+        return None
+    start = mvhd[0]
+    if moov[start] == 1:
+        timescale, duration = struct.unpack(">IQ", moov[start + 20:start + 32])
+    else:
+        timescale, duration = struct.unpack(">II", moov[start + 12:start + 20])
+    if not timescale:
+        return None
+
+    sample_rate = channels = None
+    for box_type, trak_start, trak_end in _atoms(moov):
+        if box_type != b"trak":
+            continue
+        hdlr = _child(moov, trak_start, trak_end, b"mdia", b"hdlr")
+        if hdlr is None or moov[hdlr[0] + 8:hdlr[0] + 12] != b"soun":
+            continue
+        stsd = _child(moov, trak_start, trak_end, b"mdia", b"minf", b"stbl", b"stsd")
+        if stsd is None:
+            continue
+        # Full box header (4) + entry count (4), then the first sample entry:
+        # size/type (8), reserved (6), data ref (2), reserved (8),
+        # channels (2), sample size (2), reserved (4), rate 16.16 (4)
+        entry = stsd[0] + 8
+        channels = struct.unpack(">H", moov[entry + 24:entry + 26])[0]
+        sample_rate = struct.unpack(">I", moov[entry + 32:entry + 36])[0] >> 16
+        break
+    return _info("m4a", duration / timescale, sample_rate, channels)
+
+
+def probe_ogg(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    f.seek(0)
+    first = f.read(_SCAN_BYTES)
+    if first[:4] != b"OggS" or len(first) < 27:
+        return None
+    serial = first[14:18]
+    segments = first[26]
+    packet = first[27 + segments:27 + segments + 64]
+    if packet[:7] == b"\x01vorbis":
+        channels, sample_rate = packet[11], struct.unpack("<I", packet[12:16])[0]
+        granule_rate, pre_skip, fmt = sample_rate, 0, "ogg"
+    elif packet[:8] == b"OpusHead":
+        channels = packet[9]
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+        sample_rate = struct.unpack("<I", packet[12:16])[0] or 48000
+        granule_rate, fmt = 48000, "opus"   # Opus granules always count 48kHz samples
+    else:
+        return None
+    if not granule_rate:
+        return None
+
+    # The last page of the stream carries the final granule position
+    tail_start = max(0, size - _SCAN_BYTES)
+    f.seek(tail_start)
+    tail = first if tail_start == 0 else f.read(_SCAN_BYTES)
+    pos = tail.rfind(b"OggS")
+    while pos >= 0:
+        page = tail[pos:pos + 27]
+        if len(page) == 27 and page[14:18] == serial:
+            granule = struct.unpack("<q", page[6:14])[0]
+            if granule >= 0:
+                return _info(fmt, max(0, granule - pre_skip) / granule_rate, sample_rate, channels)
+        pos = tail.rfind(b"OggS", 0, pos)
+    return None
+
+
+# Formats with a signature first; MP3 (a frame sync search) last, so a WAV or
+# M4A whose payload happens to contain frame-like bytes isn't read as MP3
+_PROBES = (probe_wav, probe_flac, probe_m4a, probe_ogg, probe_mp3)
+
+
+def probe_audio(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Duration (microseconds), sample rate and channels of an audio file from
+    its headers. Formats are recognized by content, not extension, so
+    misnamed uploads are probed too. None when nothing matches or the file
+    can't be read.
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            for probe in _PROBES:
+                try:
+                    info = probe(f, size)
+                except (struct.error, IndexError, ValueError, ZeroDivisionError):
+                    info = None
+                if info is not None:
+                    return info
+    except OSError:
+        return None
+    return None
+
+
+def duration_seconds(info: Optional[Dict[str, Any]]) -> Optional[float]:
+    return info["duration_us"] / 1_000_000 if info else None
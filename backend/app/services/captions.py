@@ -0,0 +1,227 @@
+"""
+Caption / transcript export parsers
+Turns platform-generated captions into the transcript text and timed,
+speaker-tagged segments the pipeline otherwise gets from Whisper +
+diarization, so uploads that already have captions skip transcription.
+
+Supported:
+- WebVTT (.vtt): Teams (<v Speaker> voice tags) and Zoom ("Speaker: text") exports.
+  "Speaker: text" prefixes are only taken as speakers when most cues have
+  one, so "Action item: ..." in an ordinary caption file stays text
+- SubRip (.srt)
+- JSON (.json): Teams/Stream "entries" exports and Zoom-style lists of
+  {speaker, text, start, end} records
+
+VTT and SRT are read one line at a time from the upload's file object.
+"""
+import html
+import io
+import json
+import re
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+CAPTION_FORMATS = (".vtt", ".srt", ".json")
+
+_TIMING_RE = re.compile(r"^\s*(\S+)\s+-->\s+(\S+)")
+_TIMESTAMP_RE = re.compile(r"^(?:(\d+):)?(\d{1,2}):(\d{1,2})(?:[.,](\d+))?$")
+_VOICE_RE = re.compile(r"<v(?:\.[^\s>]*)?\s+([^>]+)>")
+_TAG_RE = re.compile(r"<[^>]*>")
+# "Alice Smith: text" (Zoom); the name may not start with a digit so "10:30" stays text
+_SPEAKER_PREFIX_RE = re.compile(r"^\s*(?:-\s*)?([^\s:<>\d][^:<>]{0,39}):\s+(.*)$")
+# Words in a display name
+_MAX_NAME_WORDS = 4
+# Labels that read like "Speaker: text" but introduce content
+_NOT_SPEAKERS = {
+    "action", "action item", "action items", "agenda", "answer", "blocker", "blockers", "decision",
+    "decisions", "deadline", "due", "example", "follow up", "follow-up", "fyi", "goal", "important",
+    "issue", "next step", "next steps", "note", "notes", "outcome", "owner", "problem", "ps",
+    "q", "a", "question", "re", "reminder", "result", "risk", "status", "summary", "tip",
+    "to do", "todo", "topic", "update", "warning",
+}
+
+# JSON record keys, in order of preference
+_TEXT_KEYS = ("text", "content", "caption", "transcript")
+_SPEAKER_KEYS = ("speakerDisplayName", "speaker_name", "speakerName", "speaker", "username", "user_name", "displayName", "name")
+_START_KEYS = ("startOffset", "start", "start_time", "startTime", "ts", "offset")
+_END_KEYS = ("endOffset", "end", "end_time", "endTime", "end_ts")
+_RECORD_LIST_KEYS = ("entries", "segments", "transcript", "results", "timeline", "recording_transcript")
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Seconds from "HH:MM:SS.mmm", "MM:SS,mmm" (SRT), "00:00:05.4560000" (Teams) or a number"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _TIMESTAMP_RE.match(str(value or "").strip())
+    if not m:
+        return None
+    hours, minutes, seconds, fraction = m.groups()
+    total = int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+    return round(total + (float(f"0.{fraction}") if fraction else 0.0), 3)
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", html.unescape(_TAG_RE.sub("", text))).strip()
+
+
+def _cue_segment(start: float, end: float, payload: List[str]) -> Optional[Dict[str, Any]]:
+    raw = " ".join(payload)
+    speaker = None
+    voice = _VOICE_RE.search(raw)
+    if voice:
+        speaker = voice.group(1).strip()
+    text = _clean(raw)
+    if not text:
+        return None
+    return {"start": start, "end": end, "text": text, "speaker": speaker}
+
+
+def _speaker_prefix(text: str) -> Optional[Tuple[str, str]]:
+    """(name, rest) when the cue starts with something shaped like a display name and a colon"""
+    m = _SPEAKER_PREFIX_RE.match(text)
+    if not m:
+        return None
+    name, rest = m.group(1).strip(), m.group(2).strip()
+    if not rest or len(name.split()) > _MAX_NAME_WORDS or name.lower() in _NOT_SPEAKERS:
+        return None
+    return name, rest
+
+
+def _apply_speaker_prefixes(segments: List[Dict[str, Any]]):
+    """
+    Zoom puts the speaker in front of every cue ("Alice: text"). Split those
+    off only when most cues without a voice tag have such a prefix; in other
+    files a "Note: ..." or "Action item: ..." cue is just text.
+    """
+    untagged = [seg for seg in segments if seg["speaker"] is None]
+    prefixes = [_speaker_prefix(seg["text"]) for seg in untagged]
+    if sum(1 for prefix in prefixes if prefix) * 2 <= len(untagged):
+        return
+    for seg, prefix in zip(untagged, prefixes):
+        if prefix:
+            seg["speaker"], seg["text"] = prefix
+
+
+def parse_cues(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Segments from WebVTT or SRT lines. Both are blank-line separated blocks
+    where a cue has an optional identifier, a "start --> end" timing line
+    and payload lines; header, NOTE, STYLE and REGION blocks have no
+    timing line and are skipped.
+    """
+    segments = []
+    timing = None
+    payload: List[str] = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            if timing is not None:
+                segment = _cue_segment(timing[0], timing[1], payload)
+                if segment:
+                    segments.append(segment)
+            timing, payload = None, []
+            continue
+        if timing is None:
+            m = _TIMING_RE.match(line)
+            if m:
+                start, end = parse_timestamp(m.group(1)), parse_timestamp(m.group(2))
+                if start is not None and end is not None:
+                    timing = (start, end)
+            continue
+        payload.append(line)
+    if timing is not None:
+        segment = _cue_segment(timing[0], timing[1], payload)
+        if segment:
+            segments.append(segment)
+    _apply_speaker_prefixes(segments)
+    return segments
+
+
+def _first(record: Dict[str, Any], keys) -> Any:
+    for key in keys:
+        if record.get(key) not in (None, ""):
+            return record[key]
+    return None
+
+
+def parse_json_records(data: Any) -> List[Dict[str, Any]]:
+    """Segments from a Teams/Stream or Zoom-style JSON transcript export"""
+    records = data
+    if isinstance(data, dict):
+        records = next((data[key] for key in _RECORD_LIST_KEYS if isinstance(data.get(key), list)), None)
+    if not isinstance(records, list):
+        raise ValueError("Unrecognized JSON transcript: expected a list of caption records")
+
+    segments = []
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        text = _first(record, _TEXT_KEYS)
+        if not isinstance(text, str) or not _clean(text):
+            continue
+        speaker = _first(record, _SPEAKER_KEYS)
+        if isinstance(speaker, dict):
+            speaker = _first(speaker, ("displayName", "name", "username"))
+        start = parse_timestamp(_first(record, _START_KEYS))
+        end = parse_timestamp(_first(record, _END_KEYS))
+        segments.append({
+            "start": start if start is not None else 0.0,
+            "end": end if end is not None else (start or 0.0),
+            "text": _clean(text),
+            "speaker": str(speaker).strip() if speaker else None,
+        })
+    return segments
+
+
+def format_caption_transcript(segments: List[Dict[str, Any]]) -> str:
+    """"Speaker: text" lines with consecutive cues of a speaker merged (untagged cues without a prefix)"""
+    lines = []
+    current, buffer = None, []
+    for seg in segments:
+        speaker = seg.get("speaker")
+        if speaker != current and buffer:
+            lines.append(f"{current}: {' '.join(buffer)}" if current else " ".join(buffer))
+            buffer = []
+        current = speaker
+        buffer.append(seg["text"])
+    if buffer:
+        lines.append(f"{current}: {' '.join(buffer)}" if current else " ".join(buffer))
+    return "\n".join(lines)
+
+
+def parse_captions(fileobj, file_ext: str) -> Dict[str, Any]:
+    """
+    Parse a binary caption file object (read from its current position).
+
+    Returns:
+        {"text": transcript, "segments": [{start, end, text, speaker}], "speakers": [names], "format": ext}
+
+    Raises:
+        ValueError: unsupported format, undecodable or empty file
+    """
+    file_ext = file_ext.lower()
+    if file_ext not in CAPTION_FORMATS:
+        raise ValueError(f"Unsupported caption format '{file_ext}'. Supported: {', '.join(CAPTION_FORMATS)}")
+
+    text_stream = io.TextIOWrapper(fileobj, encoding="utf-8-sig")
+    try:
+        if file_ext == ".json":
+            try:
+                segments = parse_json_records(json.load(text_stream))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON transcript: {e}")
+        else:
+            segments = parse_cues(text_stream)
+    except UnicodeDecodeError:
+        raise ValueError("Unable to decode caption file. Please use UTF-8.")
+    finally:
+        # Leave the caller's file object open
+        text_stream.detach()
+
+    if not segments:
+        raise ValueError("No captions found in file")
+    return {
+        "text": format_caption_transcript(segments),
+        "segments": segments,
+        "speakers": sorted({seg["speaker"] for seg in segments if seg["speaker"]}),
+        "format": file_ext,
+    }
@@ -0,0 +1,242 @@
+"""
+Compact transcript segments
+Whisper's verbose_json response carries every segment as an object with its
+text, timings, token ids and decoder statistics. For a two-hour meeting that
+is a few thousand dicts and tens of thousands of boxed ints and floats, and
+the service used to keep a model_dump() copy of all of it next to the SDK
+object. CompactTranscript keeps the same data column-wise:
+
+    start, end, decoder stats   array('f'), 4 bytes per segment each
+    seek                        array('i')
+    segment text                (offset, length) into the transcript text;
+                                text not found there goes to the string table
+    speaker                     index into the string table
+    token ids                   one flat array('I') plus per-segment end offsets
+
+Iterating yields {start, end, text, speaker} dicts built on the fly, which is
+all TranscriptIndex, diarization and the pipeline read. verbose() rebuilds
+the Whisper-style result only when something asks for it. to_json() is a
+self-contained form (columns as lists, absent columns omitted) used for
+checkpoints and the deferred job store.
+"""
+import math
+from array import array
+from typing import Any, Dict, Iterator, List, Optional
+
+FORMAT = "compact-transcript/1"
+
+# Times first; the rest are Whisper's per-segment decoder statistics
+_FLOAT_FIELDS = ("start", "end", "temperature", "avg_logprob", "compression_ratio", "no_speech_prob")
+_TIME_FIELDS = ("start", "end")
+
+# How far past the previous segment a segment's text is looked for
+_SEARCH_SLACK = 2000
+
+
+def _field(segment: Any, name: str, default=None):
+    """Segments are dicts (local, diarized, SDK extras) or pydantic objects"""
+    if isinstance(segment, dict):
+        return segment.get(name, default)
+    return getattr(segment, name, default)
+
+
+class CompactTranscript:
+    """
+    Transcript text plus its segments in array-backed columns. Behaves as a
+    read-only sequence of segment dicts.
+    """
+
+    __slots__ = (
+        "text", "language", "duration", "_floats", "_seek", "_text_offsets", "_text_lengths",
+        "_speakers", "_strings", "_string_ids", "_tokens", "_token_ends", "_cursor",
+    )
+
+    def __init__(self, text: Optional[str] = None, language: Optional[str] = None, duration: Optional[float] = None):
+        self.text = text or ""
+        self.language = language
+        self.duration = duration
+        self._floats = {name: array("f") for name in _FLOAT_FIELDS}
+        self._seek = array("i")
+        # >= 0: offset into text; < 0: -(string id + 1)
+        self._text_offsets = array("i")
+        self._text_lengths = array("I")
+        # string id, -1 when unlabeled
+        self._speakers = array("i")
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._tokens = array("I")
+        self._token_ends = array("I")
+        self._cursor = 0
+
+    @classmethod
+    def from_segments(
+        cls,
+        text: Optional[str],
+        segments: Optional[List[Any]],
+        language: Optional[str] = None,
+        duration: Optional[float] = None
+    ) -> "CompactTranscript":
+        """Compact Whisper (API or local) or diarized segments of `text`"""
+        compact = cls(text, language, duration)
+        for segment in segments or ():
+            compact.append(segment)
+        return compact
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def append(self, segment: Any):
+        """Add one segment; segments must be appended in transcript order"""
+        for name in _FLOAT_FIELDS:
+            value = _field(segment, name)
+            if value is None:
+                value = 0.0 if name in _TIME_FIELDS else math.nan
+            self._floats[name].append(float(value))
+        self._seek.append(int(_field(segment, "seek") or 0))
+
+        seg_text = (_field(segment, "text") or "").strip()
+        # Whisper's text is its segments joined (diarized text adds speaker
+        # prefixes), so each segment is found just past the previous one
+        pos = self.text.find(seg_text, self._cursor, self._cursor + len(seg_text) + _SEARCH_SLACK)
+        if pos >= 0:
+            self._text_offsets.append(pos)
+            self._text_lengths.append(len(seg_text))
+            self._cursor = pos + len(seg_text)
+        else:
+            self._text_offsets.append(-(self._intern(seg_text) + 1))
+            self._text_lengths.append(0)
+
+        speaker = _field(segment, "speaker")
+        self._speakers.append(self._intern(speaker) if speaker else -1)
+
+        tokens = _field(segment, "tokens")
+        if tokens:
+            self._tokens.extend(tokens)
+        self._token_ends.append(len(self._tokens))
+
+    def __len__(self) -> int:
+        return len(self._text_offsets)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def segment_text(self, index: int) -> str:
+        offset = self._text_offsets[index]
+        if offset < 0:
+            return self._strings[-offset - 1]
+        return self.text[offset:offset + self._text_lengths[index]]
+
+    def speaker(self, index: int) -> Optional[str]:
+        string_id = self._speakers[index]
+        return self._strings[string_id] if string_id >= 0 else None
+
+    def tokens(self, index: int) -> List[int]:
+        start = self._token_ends[index - 1] if index > 0 else 0
+        return self._tokens[start:self._token_ends[index]].tolist()
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return {
+            # float32 storage; rounded so 12.34 does not read back as 12.340000152
+            "start": round(self._floats["start"][index], 3),
+            "end": round(self._floats["end"][index], 3),
+            "text": self.segment_text(index),
+            "speaker": self.speaker(index),
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def speakers(self) -> List[str]:
+        return sorted({self._strings[i] for i in set(self._speakers) if i >= 0})
+
+    def verbose(self) -> Dict[str, Any]:
+        """
+        The Whisper verbose_json-shaped result (text, language, duration and
+        full segments with tokens and decoder statistics), built on request.
+        Segment text is stripped of Whisper's leading space.
+        """
+        segments = []
+        for index in range(len(self)):
+            segment = {"id": index, "seek": self._seek[index]}
+            for name in _FLOAT_FIELDS:
+                value = self._floats[name][index]
+                if not math.isnan(value):
+                    segment[name] = round(value, 3) if name in _TIME_FIELDS else round(value, 6)
+            segment["text"] = self.segment_text(index)
+            segment["tokens"] = self.tokens(index)
+            speaker = self.speaker(index)
+            if speaker:
+                segment["speaker"] = speaker
+            segments.append(segment)
+        return {"text": self.text, "language": self.language, "duration": self.duration, "segments": segments}
+
+    def to_json(self) -> Dict[str, Any]:
+        """JSON-serializable form; columns without any values are left out"""
+        data: Dict[str, Any] = {
+            "format": FORMAT,
+            "text": self.text,
+            "language": self.language,
+            "duration": self.duration,
+            "text_offsets": self._text_offsets.tolist(),
+            "text_lengths": self._text_lengths.tolist(),
+            "strings": self._strings,
+        }
+        for name in _FLOAT_FIELDS:
+            column = self._floats[name]
+            if name in _TIME_FIELDS:
+                data[name] = [round(v, 3) for v in column]
+            elif any(not math.isnan(v) for v in column):
+                data[name] = [None if math.isnan(v) else round(v, 6) for v in column]
+        if any(self._seek):
+            data["seek"] = self._seek.tolist()
+        if any(i >= 0 for i in self._speakers):
+            data["speakers"] = self._speakers.tolist()
+        if self._tokens:
+            data["tokens"] = self._tokens.tolist()
+            data["token_ends"] = self._token_ends.tolist()
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "CompactTranscript":
+        if data.get("format") != FORMAT:
+            raise ValueError(f"Not a compact transcript: {data.get('format')!r}")
+        compact = cls(data.get("text"), data.get("language"), data.get("duration"))
+        count = len(data["text_offsets"])
+        for name in _FLOAT_FIELDS:
+            column = data.get(name)
+            if column is None:
+                column = [0.0 if name in _TIME_FIELDS else math.nan] * count
+            compact._floats[name] = array("f", (math.nan if v is None else v for v in column))
+        compact._seek = array("i", data.get("seek") or [0] * count)
+        compact._text_offsets = array("i", data["text_offsets"])
+        compact._text_lengths = array("I", data["text_lengths"])
+        compact._speakers = array("i", data.get("speakers") or [-1] * count)
+        compact._strings = list(data.get("strings") or [])
+        compact._string_ids = {value: i for i, value in enumerate(compact._strings)}
+        compact._tokens = array("I", data.get("tokens") or [])
+        compact._token_ends = array("I", data.get("token_ends") or [0] * count)
+        compact._cursor = max(
+            (offset + length for offset, length in zip(compact._text_offsets, compact._text_lengths) if offset >= 0),
+            default=0
+        )
+        return compact
+
+
+def load_segments(value: Any) -> Any:
+    """
+    Segments as stored by a job or checkpoint: compact JSON becomes a
+    CompactTranscript, lists (captions, rows written before compaction) and
+    None pass through.
+    """
+    if isinstance(value, dict) and value.get("format") == FORMAT:
+        return CompactTranscript.from_json(value)
+    return value
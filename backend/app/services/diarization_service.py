@@ -0,0 +1,535 @@
+"""
+Speaker diarization service (CPU, NumPy only)
+Labels the Whisper segments of a recording with speakers and keeps a per-team
+speaker directory (keyed on Jira project) so that owners named in the
+transcript resolve to Jira accounts with a local lookup.
+"""
+import glob
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import threading
+import wave
+from array import array
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from app.config import settings
+
+# NumPy is optional - without it diarization is skipped
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+
+SAMPLE_RATE = 16000
+FRAME = 400      # 25 ms
+HOP = 160        # 10 ms
+N_FFT = 512
+N_MELS = 32
+# Audio is decoded and embedded this many seconds at a time, so a long
+# recording is never held in memory as one float32 array
+CHUNK_SECONDS = 60
+
+
+def _segment_field(segment: Any, name: str, default=None):
+    """Whisper segments are dicts (local) or pydantic objects (API)"""
+    if isinstance(segment, dict):
+        return segment.get(name, default)
+    return getattr(segment, name, default)
+
+
+def _mel_filterbank() -> "np.ndarray":
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mels = np.linspace(hz_to_mel(60.0), hz_to_mel(SAMPLE_RATE / 2 - 200), N_MELS + 2)
+    bins = np.floor((N_FFT + 1) * mel_to_hz(mels) / SAMPLE_RATE).astype(int)
+    bank = np.zeros((N_MELS, N_FFT // 2 + 1), dtype=np.float32)
+    for m in range(1, N_MELS + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            bank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+
+class DiarizationService:
+    """
+    Lightweight speaker diarization.
+
+    Each Whisper segment gets a voice embedding: the mean and standard
+    deviation of log-mel energies over its voiced frames, centered per
+    vector so loudness differences don't dominate. Segments are clustered
+    with greedy cosine clustering followed by a few k-means refinement
+    passes. Whisper already splits at pauses, so one segment rarely
+    contains two speakers.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, max_speakers: Optional[int] = None):
+        if not NUMPY_AVAILABLE:
+            raise ValueError("NumPy package not installed. Install with: pip install numpy")
+        self.threshold = threshold or getattr(settings, "DIARIZATION_THRESHOLD", 0.75)
+        self.max_speakers = max_speakers or getattr(settings, "DIARIZATION_MAX_SPEAKERS", 8)
+        self._mel = _mel_filterbank()
+        self._window = np.hanning(FRAME).astype(np.float32)
+
+    # ------------------------------------------------------------------
+    # Audio decoding
+    # ------------------------------------------------------------------
+    def load_audio(self, audio_file_path: str, max_seconds: Optional[float] = None) -> Optional["np.ndarray"]:
+        """
+        Decode a (short) recording to mono float32 at 16 kHz, e.g. an
+        enrollment sample, keeping at most `max_seconds`. Returns None when
+        the file can't be decoded.
+        """
+        limit = int(max_seconds * SAMPLE_RATE) if max_seconds else None
+        chunks = []
+        for position, chunk in self.iter_audio(audio_file_path):
+            if limit is not None and position + len(chunk) >= limit:
+                chunks.append(chunk[:max(limit - position, 0)])
+                break
+            chunks.append(chunk)
+        if not chunks:
+            return None
+        return np.concatenate(chunks)
+
+    def iter_audio(self, audio_file_path: str, chunk_seconds: float = CHUNK_SECONDS) -> Iterator[Tuple[int, "np.ndarray"]]:
+        """
+        Decode to mono float32 at 16 kHz, yielding (first sample index,
+        samples) about `chunk_seconds` at a time. 16-bit PCM WAV is read
+        directly; other formats need ffmpeg on PATH. Yields nothing when the
+        file can't be decoded.
+        """
+        if audio_file_path.lower().endswith(".wav"):
+            try:
+                with wave.open(audio_file_path, "rb") as w:
+                    if w.getsampwidth() == 2:
+                        yield from self._iter_wav(w, chunk_seconds)
+                        return
+            except (wave.Error, EOFError):
+                pass  # e.g. float WAV - let ffmpeg handle it
+
+        if not shutil.which("ffmpeg"):
+            return
+        proc = subprocess.Popen(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", audio_file_path,
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        chunk_bytes = int(chunk_seconds * SAMPLE_RATE) * 2
+        position = 0
+        try:
+            while True:
+                data = proc.stdout.read(chunk_bytes)
+                if len(data) < 2:
+                    break
+                samples = np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+                yield position, samples
+                position += len(samples)
+        finally:
+            proc.stdout.close()
+            proc.kill()
+            proc.wait()
+
+    def _iter_wav(self, w: "wave.Wave_read", chunk_seconds: float) -> Iterator[Tuple[int, "np.ndarray"]]:
+        channels, rate = w.getnchannels(), w.getframerate()
+        ratio = rate / SAMPLE_RATE
+        frames_per_chunk = max(1, int(chunk_seconds * rate))
+        in_position = out_position = 0
+        # Last input sample of the previous chunk: output samples between
+        # chunks interpolate across the boundary
+        carry = None
+        while True:
+            data = w.readframes(frames_per_chunk)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+            if channels > 1:
+                samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+            n = len(samples)
+            if rate != SAMPLE_RATE:
+                # Linear resampling is plenty for spectral-envelope features.
+                # Output positions are global, so chunks join without drift;
+                # positions past this chunk's last sample wait for the next one.
+                base = in_position
+                if carry is not None:
+                    samples, base = np.concatenate(([carry], samples)), in_position - 1
+                carry = samples[-1]
+                out_end = int((in_position + n - 1) // ratio) + 1
+                positions = np.arange(out_position, out_end) * ratio - base
+                samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+            in_position += n
+            if len(samples):
+                yield out_position, samples
+                out_position += len(samples)
+        if carry is not None:
+            # The tail past the last input sample holds its value
+            tail = int(-(-in_position // ratio)) - out_position
+            if tail > 0:
+                yield out_position, np.full(tail, carry, dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # Embeddings
+    # ------------------------------------------------------------------
+    def embed(self, samples: "np.ndarray") -> Optional["np.ndarray"]:
+        """Voice embedding for a stretch of audio (None if it is too short/silent)"""
+        if len(samples) < FRAME * 10:
+            return None
+        n_frames = 1 + (len(samples) - FRAME) // HOP
+        idx = np.arange(FRAME)[None, :] + HOP * np.arange(n_frames)[:, None]
+        frames = samples[idx] * self._window
+        power = np.abs(np.fft.rfft(frames, n=N_FFT)) ** 2
+        logmel = np.log(power @ self._mel.T + 1e-8)
+
+        # Keep voiced frames only (energy within 30 dB of the loudest)
+        energy = logmel.mean(axis=1)
+        voiced = logmel[energy > energy.max() - 6.9]
+        if len(voiced) < 10:
+            return None
+
+        mean = voiced.mean(axis=0)
+        mean -= mean.mean()
+        vec = np.concatenate([mean, voiced.std(axis=0)])
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else None
+
+    # ------------------------------------------------------------------
+    # Clustering
+    # ------------------------------------------------------------------
+    def _cluster(self, embeddings: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        centroids: List["np.ndarray"] = []
+        labels = np.zeros(len(embeddings), dtype=int)
+        for i, vec in enumerate(embeddings):
+            if centroids:
+                sims = np.array([c @ vec for c in centroids])
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold or len(centroids) >= self.max_speakers:
+                    labels[i] = best
+                    updated = centroids[best] + vec
+                    centroids[best] = updated / np.linalg.norm(updated)
+                    continue
+            labels[i] = len(centroids)
+            centroids.append(vec.copy())
+
+        centroid_arr = np.array(centroids)
+        for _ in range(3):
+            labels = np.argmax(embeddings @ centroid_arr.T, axis=1)
+            for c in range(len(centroid_arr)):
+                members = embeddings[labels == c]
+                if len(members):
+                    total = members.sum(axis=0)
+                    centroid_arr[c] = total / np.linalg.norm(total)
+        return labels, centroid_arr
+
+    def _embed_segments(self, audio_file_path: str, segments: List[Dict[str, Any]]) -> Optional[Dict[int, "np.ndarray"]]:
+        """
+        Embeddings of the segments (row -> vector) while streaming the audio
+        once. Only the audio from the earliest pending segment onward is kept
+        buffered. None when the file can't be decoded.
+        """
+        spans = sorted(
+            (int(seg["start"] * SAMPLE_RATE), int(seg["end"] * SAMPLE_RATE), row)
+            for row, seg in enumerate(segments)
+        )
+        embedded: Dict[int, "np.ndarray"] = {}
+        buffer, buffer_start = np.zeros(0, dtype=np.float32), 0
+        pending = 0
+        decoded = False
+
+        def embed_ready(buffer_end: int):
+            nonlocal pending
+            while pending < len(spans) and spans[pending][1] <= buffer_end:
+                start, end, row = spans[pending]
+                vec = self.embed(buffer[max(start - buffer_start, 0):max(end - buffer_start, 0)])
+                if vec is not None:
+                    embedded[row] = vec
+                pending += 1
+
+        for position, chunk in self.iter_audio(audio_file_path):
+            decoded = True
+            if position != buffer_start + len(buffer):
+                buffer, buffer_start = np.zeros(0, dtype=np.float32), position
+            buffer = np.concatenate([buffer, chunk])
+            embed_ready(buffer_start + len(buffer))
+            if pending == len(spans):
+                break
+            # Drop audio before the next segment (segments are sorted by start)
+            keep_from = max(spans[pending][0] - buffer_start, 0)
+            if keep_from:
+                buffer, buffer_start = buffer[keep_from:], buffer_start + keep_from
+
+        if not decoded:
+            return None
+        # Segments running past the end of the audio get what there is
+        embed_ready(float("inf"))
+        return embedded
+
+    def diarize(self, audio_file_path: str, segments: List[Any]) -> Optional[Dict[str, Any]]:
+        """
+        Assign a speaker to each Whisper segment
+
+        Returns:
+            {"segments": [{"start", "end", "text", "speaker"}...],
+             "speakers": {"SPEAKER_1": centroid embedding (np.ndarray), ...}}
+            or None when the audio can't be decoded or has no usable segments
+        """
+        if not segments:
+            return None
+
+        out = []
+        for seg in segments:
+            start = float(_segment_field(seg, "start", 0.0))
+            end = float(_segment_field(seg, "end", 0.0))
+            out.append({"start": start, "end": end, "text": (_segment_field(seg, "text", "") or "").strip(), "speaker": None})
+
+        embedded = self._embed_segments(audio_file_path, out)
+        if embedded is None:
+            return None
+        vector_rows = sorted(embedded)
+        vectors = [embedded[row] for row in vector_rows]
+        if not vectors:
+            return None
+
+        labels, centroids = self._cluster(np.array(vectors))
+        # Number speakers in order of first appearance
+        order = {}
+        for row, label in zip(vector_rows, labels):
+            name = order.setdefault(int(label), f"SPEAKER_{len(order) + 1}")
+            out[row]["speaker"] = name
+
+        # Segments too short to embed inherit the previous speaker
+        previous = None
+        for seg in out:
+            seg["speaker"] = seg["speaker"] or previous
+            previous = seg["speaker"]
+
+        return {
+            "segments": out,
+            "speakers": {name: centroids[label] for label, name in order.items()},
+        }
+
+
+def format_speaker_transcript(segments: List[Dict[str, Any]]) -> str:
+    """Render diarized segments as "Speaker: text" lines, merging consecutive turns"""
+    lines = []
+    current, buffer = None, []
+    for seg in segments:
+        speaker = seg.get("speaker") or "UNKNOWN"
+        if speaker != current and buffer:
+            lines.append(f"{current}: {' '.join(buffer)}")
+            buffer = []
+        current = speaker
+        if seg.get("text"):
+            buffer.append(seg["text"])
+    if buffer:
+        lines.append(f"{current}: {' '.join(buffer)}")
+    return "\n".join(lines)
+
+
+def _to_blob(embedding: Any) -> bytes:
+    """Embeddings are stored as float32 (array, so owner lookups work without NumPy)"""
+    return array("f", (float(v) for v in embedding)).tobytes()
+
+
+def _normalize_name(name: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s@.]", "", (name or "").lower())).strip()
+
+
+class SpeakerDirectory:
+    """
+    Per-team (Jira project) speaker and owner cache, in SQLite so every
+    worker process reads and updates the same rows
+
+    - voices: enrolled voice embeddings with display name and Jira accountId,
+      used to name diarized speakers
+    - owners: normalized owner name -> accountId, filled from enrollments and
+      from successful Jira lookups, so repeated owners never hit Jira again
+
+    Per-team JSON files written by earlier versions are imported on first use.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "speakers.db"), check_same_thread=False, isolation_level=None, timeout=10
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS speaker_voices (
+                project_key TEXT NOT NULL,
+                name TEXT NOT NULL,
+                account_id TEXT,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (project_key, name)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS speaker_owners (
+                project_key TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                account_id TEXT NOT NULL,
+                PRIMARY KEY (project_key, owner)
+            )
+            """
+        )
+        self._import_json()
+
+    def _import_json(self):
+        """Move <KEY>.json team files into the database (once; INSERT OR IGNORE)"""
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            key = os.path.splitext(os.path.basename(path))[0].upper()
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for voice in data.get("voices", []):
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO speaker_voices VALUES (?, ?, ?, ?)",
+                            (key, voice["name"], voice.get("account_id"), _to_blob(voice["embedding"]))
+                        )
+                    for owner, account_id in data.get("owners", {}).items():
+                        self._conn.execute("INSERT OR IGNORE INTO speaker_owners VALUES (?, ?, ?)", (key, owner, account_id))
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            try:
+                os.replace(path, path + ".imported")
+            except OSError:
+                pass  # another worker imported it first
+
+    def enroll(self, project_key: str, name: str, account_id: Optional[str], embedding: "np.ndarray"):
+        """Store a voice sample so future meetings label this speaker by name"""
+        key = project_key.upper()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO speaker_voices VALUES (?, ?, ?, ?)",
+                    (key, name, account_id, _to_blob(embedding))
+                )
+                if account_id:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO speaker_owners VALUES (?, ?, ?)", (key, _normalize_name(name), account_id)
+                    )
+                    first = _normalize_name(name).split(" ")[0]
+                    self._conn.execute("INSERT OR IGNORE INTO speaker_owners VALUES (?, ?, ?)", (key, first, account_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _voices(self, project_key: str) -> List[Tuple[str, Optional[str], bytes]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT name, account_id, embedding FROM speaker_voices WHERE project_key = ? ORDER BY rowid",
+                (project_key.upper(),)
+            ).fetchall()
+
+    def speakers(self, project_key: str) -> List[Dict[str, Any]]:
+        return [{"name": name, "account_id": account_id} for name, account_id, _ in self._voices(project_key)]
+
+    def label_speakers(self, project_key: str, centroids: Dict[str, "np.ndarray"], threshold: float = 0.85) -> Dict[str, str]:
+        """Map diarization labels (SPEAKER_n) to enrolled names where voices match"""
+        voices = self._voices(project_key)
+        if not voices or not NUMPY_AVAILABLE:
+            return {}
+        enrolled = np.stack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in voices])
+        mapping, taken = {}, set()
+        for label, centroid in centroids.items():
+            sims = enrolled @ centroid
+            best = int(np.argmax(sims))
+            if sims[best] >= threshold and best not in taken:
+                mapping[label] = voices[best][0]
+                taken.add(best)
+        return mapping
+
+    def resolve_owner(self, project_key: str, owner: str) -> Optional[str]:
+        """Local owner -> accountId lookup (None if unknown)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT account_id FROM speaker_owners WHERE project_key = ? AND owner = ?",
+                (project_key.upper(), _normalize_name(owner))
+            ).fetchone()
+        return row[0] if row else None
+
+    def remember_owner(self, project_key: str, owner: str, account_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO speaker_owners VALUES (?, ?, ?)",
+                (project_key.upper(), _normalize_name(owner), account_id)
+            )
+
+
+def diarize_transcript(audio_file_path: str, segments: List[Any], project_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Run diarization and name speakers from the team's speaker directory
+
+    Returns:
+        {"segments": [...], "text": speaker-tagged transcript, "speakers": [names]}
+        or None when diarization is disabled or not possible
+    """
+    service = get_diarization_service()
+    if not service:
+        return None
+    result = service.diarize(audio_file_path, segments)
+    if not result:
+        return None
+
+    names = get_speaker_directory().label_speakers(project_key, result["speakers"])
+    for seg in result["segments"]:
+        seg["speaker"] = names.get(seg["speaker"], seg["speaker"])
+
+    return {
+        "segments": result["segments"],
+        "text": format_speaker_transcript(result["segments"]),
+        "speakers": sorted({seg["speaker"] for seg in result["segments"] if seg["speaker"]}),
+    }
+
+
+# Lazily constructed singletons
+_UNSET = object()
+_diarization_service = _UNSET
+_speaker_directory = None
+_lock = threading.Lock()
+
+
+def get_diarization_service() -> Optional[DiarizationService]:
+    """Shared DiarizationService, or None when disabled or NumPy is missing"""
+    global _diarization_service
+    if _diarization_service is _UNSET:
+        with _lock:
+            if _diarization_service is _UNSET:
+                service = None
+                if NUMPY_AVAILABLE and getattr(settings, "ENABLE_DIARIZATION", True):
+                    service = DiarizationService()
+                _diarization_service = service
+    return _diarization_service
+
+
+def get_speaker_directory() -> SpeakerDirectory:
+    global _speaker_directory
+    if _speaker_directory is None:
+        with _lock:
+            if _speaker_directory is None:
+                _speaker_directory = SpeakerDirectory(getattr(settings, "SPEAKER_DIR", "./data/speakers"))
+    return _speaker_directory
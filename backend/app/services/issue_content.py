@@ -0,0 +1,103 @@
+"""
+Issue descriptions for meeting-derived Jira issues
+Each issue carries a structured ADF description with the relevant part of
+the transcript only; the full transcript is stored once (Jira attachment or
+local file) and linked from every issue.
+"""
+import os
+import re
+import uuid
+from typing import List, Dict, Any, Optional
+from app.config import settings
+from app.services import adf
+from app.services.transcript_index import format_timestamp
+
+
+def excerpt_source_label(excerpt: Dict[str, Any]) -> Optional[str]:
+    """e.g. "Discussed at 12:03 - 12:41" for excerpts with segment timestamps"""
+    if excerpt.get("start") is None:
+        return None
+    return f"Discussed at {format_timestamp(excerpt['start'])} - {format_timestamp(excerpt.get('end'))}"
+
+
+def transcript_reference_blocks(transcript_ref: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not transcript_ref:
+        return []
+    if transcript_ref.get("url"):
+        target = adf.link(transcript_ref["label"], transcript_ref["url"])
+    else:
+        target = adf.text(transcript_ref["label"])
+    return [adf.paragraph(adf.strong("Full transcript: "), target)]
+
+
+def build_action_item_description(
+    item: Dict[str, Any],
+    excerpt: str,
+    transcript_ref: Optional[Dict[str, Any]] = None,
+    source: Optional[str] = None
+) -> Dict[str, Any]:
+    """ADF description for one action item issue"""
+    details = []
+    if item.get("owner"):
+        details.append([adf.strong("Owner: "), adf.text(str(item["owner"]))])
+    if item.get("deadline"):
+        details.append([adf.strong("Due: "), adf.text(str(item["deadline"]))])
+    if item.get("priority"):
+        details.append([adf.strong("Priority: "), adf.text(str(item["priority"]))])
+
+    return adf.document(
+        adf.heading("Action item"),
+        adf.paragraph(item.get("description") or "No description"),
+        adf.bullet_list(details) if details else None,
+        adf.heading("From the meeting") if excerpt else None,
+        adf.paragraph(adf.text(source, [{"type": "em"}])) if source and excerpt else None,
+        adf.quote(excerpt) if excerpt else None,
+        *transcript_reference_blocks(transcript_ref)
+    )
+
+
+def build_meeting_description(
+    summary: Optional[str],
+    excerpt: str,
+    transcript_ref: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """ADF description for the single meeting issue created when no action items were found"""
+    summary_blocks = adf.markdown_blocks(summary) if summary else []
+    return adf.document(
+        adf.heading("Meeting summary") if summary_blocks else None,
+        *summary_blocks,
+        adf.heading("Transcript excerpt") if excerpt else None,
+        adf.quote(excerpt) if excerpt else None,
+        *transcript_reference_blocks(transcript_ref)
+    )
+
+
+def transcript_filename(filename: str) -> str:
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.splitext(os.path.basename(filename or "meeting"))[0]) or "meeting"
+    return f"transcript-{stem}.txt"
+
+
+def store_transcript_locally(transcript_text: str) -> Dict[str, Any]:
+    """
+    Save the transcript under TRANSCRIPT_DIR and return a reference to it,
+    served by GET /transcripts/{id} (linked when PUBLIC_BASE_URL is set)
+    """
+    directory = getattr(settings, "TRANSCRIPT_DIR", "./data/transcripts")
+    os.makedirs(directory, exist_ok=True)
+    transcript_id = uuid.uuid4().hex
+    with open(os.path.join(directory, f"{transcript_id}.txt"), "w", encoding="utf-8") as f:
+        f.write(transcript_text)
+
+    base_url = (getattr(settings, "PUBLIC_BASE_URL", "") or "").rstrip("/")
+    return {
+        "id": transcript_id,
+        "label": f"transcript {transcript_id}",
+        "url": f"{base_url}/transcripts/{transcript_id}" if base_url else None,
+    }
+
+
+def local_transcript_path(transcript_id: str) -> Optional[str]:
+    if not re.fullmatch(r"[0-9a-f]{32}", transcript_id or ""):
+        return None
+    path = os.path.join(getattr(settings, "TRANSCRIPT_DIR", "./data/transcripts"), f"{transcript_id}.txt")
+    return path if os.path.exists(path) else None
@@ -1,9 +1,12 @@
 """
 Jira API integration service
 """
+import json
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
+from urllib.parse import urlsplit
 from app.config import settings
+from app.tracing import tracer
 from requests.auth import HTTPBasicAuth
 
 
@@ -17,11 +20,28 @@ class JiraService:
         
         if not all([self.base_url, self.email, self.api_token]):
             raise ValueError("Jira credentials not configured")
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Perform an authenticated HTTP call inside a `jira.http` span that
+        records the endpoint, status code and response size.
+        """
+        attributes = {"http.method": method, "http.route": urlsplit(url).path}
+        with tracer.start_span("jira.http", attributes) as span:
+            response = requests.request(
+                method,
+                url,
+                auth=HTTPBasicAuth(self.email, self.api_token),
+                **kwargs
+            )
+            span.set_attribute("http.status_code", response.status_code)
+            span.set_attribute("http.response_bytes", len(response.content or b""))
+            return response
     
     def create_issue(
         self,
         summary: str,
-        description: str,
+        description: Union[str, Dict[str, Any]],
         issue_type: str = "Task",
         project_key: str = None,
         priority: str = "Medium",
@@ -33,7 +53,7 @@ class JiraService:
         
         Args:
             summary: Issue summary/title
-            description: Issue description
+            description: Issue description (plain text, or an ADF document from app.services.adf)
             issue_type: Type of issue (Task, Bug, Story, etc.)
             project_key: Jira project key
             priority: Issue priority
@@ -52,7 +72,7 @@ class JiraService:
             "fields": {
                 "project": {"key": project_key},
                 "summary": summary,
-                "description": {
+                "description": description if isinstance(description, dict) else {
                     "type": "doc",
                     "version": 1,
                     "content": [
@@ -73,12 +93,15 @@ class JiraService:
         if due_date:
             payload["fields"]["duedate"] = due_date
         
-        response = requests.post(
-            url,
-            json=payload,
-            auth=HTTPBasicAuth(self.email, self.api_token),
-            headers={"Accept": "application/json", "Content-Type": "application/json"}
-        )
+        with tracer.start_span("jira.create_issue", {"jira.project": project_key, "jira.issue_type": issue_type}) as span:
+            span.set_attribute("jira.description_chars", len(json.dumps(description) if isinstance(description, dict) else description or ""))
+            response = self._request(
+                "POST",
+                url,
+                json=payload,
+                headers={"Accept": "application/json", "Content-Type": "application/json"}
+            )
+            span.set_attribute("http.status_code", response.status_code)
 
         try:
             response.raise_for_status()
@@ -93,15 +116,35 @@ class JiraService:
 
         return response.json()
     
+    def add_attachment(self, issue_key: str, filename: str, content: bytes, content_type: str = "text/plain") -> Dict[str, Any]:
+        """
+        Attach a file to an issue. Returns the attachment record, whose
+        `content` field is the download URL.
+        """
+        url = f"{self.base_url.rstrip('/')}/rest/api/3/issue/{issue_key}/attachments"
+
+        with tracer.start_span("jira.add_attachment", {"jira.issue_key": issue_key, "attachment.bytes": len(content)}):
+            response = self._request(
+                "POST",
+                url,
+                files={"file": (filename, content, content_type)},
+                headers={"Accept": "application/json", "X-Atlassian-Token": "no-check"}
+            )
+
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            raise RuntimeError(f"Jira attachment error {response.status_code}: {response.text}") from e
+
+        attachments = response.json()
+        return attachments[0] if attachments else {}
+
     def get_issue(self, issue_key: str) -> Dict[str, Any]:
         """Get issue details"""
         url = f"{self.base_url.rstrip('/')}/rest/api/3/issue/{issue_key}"
         
-        response = requests.get(
-            url,
-            auth=HTTPBasicAuth(self.email, self.api_token),
-            headers={"Accept": "application/json"}
-        )
+        with tracer.start_span("jira.get_issue", {"jira.issue_key": issue_key}):
+            response = self._request("GET", url, headers={"Accept": "application/json"})
         
         response.raise_for_status()
         return response.json()
@@ -112,11 +155,8 @@ class JiraService:
         """
         url = f"{self.base_url.rstrip('/')}/rest/api/3/project/{project_key}"
 
-        response = requests.get(
-            url,
-            auth=HTTPBasicAuth(self.email, self.api_token),
-            headers={"Accept": "application/json"}
-        )
+        with tracer.start_span("jira.get_project", {"jira.project": project_key}):
+            response = self._request("GET", url, headers={"Accept": "application/json"})
 
         try:
             response.raise_for_status()
@@ -138,22 +178,53 @@ class JiraService:
         - If project_key provided, try assignable search first (ensures user can be assigned in project).
         - Fall back to global user search endpoint.
 
+        When the local user directory is enabled, projects are answered from
+        its mirror of assignable users (fuzzy, no Jira round trip). The live
+        search is used until the project's first sync has completed, and for
+        owners the mirror doesn't know (e.g. added since the last sync).
+        Ambiguous owners are not searched: the search would just take the
+        first hit.
+
         Returns accountId string if found, otherwise None.
         """
         if not query:
             return None
 
+        with tracer.start_span("jira.find_user", {"jira.project": project_key, "jira.user_query": query}) as span:
+            if project_key:
+                from app.services.user_directory import get_user_directory
+                directory = get_user_directory()
+                if directory:
+                    loaded, account_id, score = directory.lookup(self, project_key, query)
+                    if loaded and (account_id or score >= directory.min_score):
+                        span.set_attributes({"jira.user_source": "directory", "jira.user_match_score": round(score, 3)})
+                        span.set_attribute("jira.user_found", account_id is not None)
+                        return account_id
+
+            span.set_attribute("jira.user_source", "search")
+            account_id = self._find_user(query, project_key)
+            span.set_attribute("jira.user_found", account_id is not None)
+            return account_id
+
+    def list_assignable_users(self, project_key: str, start_at: int = 0, max_results: int = 1000) -> List[Dict[str, Any]]:
+        """One page of users assignable to issues in a project"""
+        url = f"{self.base_url.rstrip('/')}/rest/api/3/user/assignable/search"
+        params = {"project": project_key, "startAt": start_at, "maxResults": max_results}
+
+        with tracer.start_span("jira.list_assignable_users", {"jira.project": project_key, "jira.start_at": start_at}) as span:
+            response = self._request("GET", url, params=params, headers={"Accept": "application/json"})
+            response.raise_for_status()
+            users = response.json()
+            span.set_attribute("jira.users", len(users))
+            return users
+
+    def _find_user(self, query: str, project_key: Optional[str]) -> Optional[str]:
         # Try assignable search if project provided
         try:
             if project_key:
                 url = f"{self.base_url.rstrip('/')}/rest/api/3/user/assignable/search"
                 params = {"project": project_key, "query": query}
-                response = requests.get(
-                    url,
-                    params=params,
-                    auth=HTTPBasicAuth(self.email, self.api_token),
-                    headers={"Accept": "application/json"}
-                )
+                response = self._request("GET", url, params=params, headers={"Accept": "application/json"})
 
                 if response.status_code == 200:
                     try:
@@ -166,12 +237,7 @@ class JiraService:
             # Fallback to global user search
             url = f"{self.base_url.rstrip('/')}/rest/api/3/user/search"
             params = {"query": query}
-            response = requests.get(
-                url,
-                params=params,
-                auth=HTTPBasicAuth(self.email, self.api_token),
-                headers={"Accept": "application/json"}
-            )
+            response = self._request("GET", url, params=params, headers={"Accept": "application/json"})
 
             if response.status_code == 200:
                 try:
@@ -193,12 +259,13 @@ class JiraService:
         
         payload = {"fields": updates}
         
-        response = requests.put(
-            url,
-            json=payload,
-            auth=HTTPBasicAuth(self.email, self.api_token),
-            headers={"Accept": "application/json", "Content-Type": "application/json"}
-        )
+        with tracer.start_span("jira.update_issue", {"jira.issue_key": issue_key}):
+            response = self._request(
+                "PUT",
+                url,
+                json=payload,
+                headers={"Accept": "application/json", "Content-Type": "application/json"}
+            )
         
         response.raise_for_status()
         return response.json()
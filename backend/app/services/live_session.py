@@ -0,0 +1,265 @@
+"""
+Live meeting ingestion
+Buffers streamed PCM audio into rolling windows, transcribes each window as
+soon as it is complete and extracts action items incrementally, so that
+issues can be created seconds after the meeting ends.
+
+Whisper and LLM calls take slots from the same stage scheduler as uploads.
+A session cannot slow the meeting down, so when its windows back up beyond
+LIVE_MAX_PENDING_WINDOWS the newest window is dropped (logged, and reported
+to the client) instead of being buffered without limit.
+"""
+import asyncio
+import os
+import re
+import uuid
+import wave
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
+from app.config import settings
+from app.logs import get_logger
+from app.scheduler import AdmissionRejected, get_scheduler
+from app.services.llm_service import get_llm_service
+from app.services.whisper_service import get_whisper_service, get_local_whisper_service
+
+logger = get_logger(__name__)
+
+# Characters of already-processed transcript given to the LLM alongside each
+# new window, so items that span a window boundary are still recognized
+EXTRACTION_CONTEXT_CHARS = 1500
+
+
+def _task_key(description: str) -> str:
+    return re.sub(r"\W+", " ", (description or "").lower()).strip()
+
+
+@asynccontextmanager
+async def _stage_slot(stage: str, cost: float = 1.0):
+    """
+    Hold a slot of a pipeline stage for the current tenant. A live window
+    has nowhere to be retried from, so a full queue is waited out rather
+    than rejected.
+    """
+    scheduler = get_scheduler()
+    while True:
+        try:
+            ticket = await scheduler.acquire(stage, cost)
+            break
+        except AdmissionRejected as e:
+            await asyncio.sleep(e.retry_after)
+    try:
+        yield
+    finally:
+        scheduler.release(ticket)
+
+
+class LiveMeetingSession:
+    """
+    State for one streamed meeting.
+
+    Audio arrives as raw little-endian PCM (``pcm_s16le``). Every
+    ``window_seconds`` of audio becomes one window that is written to a WAV
+    file, transcribed (local faster-whisper when USE_LOCAL_WHISPER is set,
+    otherwise the Whisper API) and appended to the running transcript. New
+    text is then passed to the LLM for action items, which are merged into
+    the session's task list (deduplicated by normalized description).
+
+    Windows are processed strictly in order by a single background task so
+    the receive loop never blocks on transcription. At most
+    ``max_pending`` windows wait for it; further windows are dropped.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        sample_width: int = 2,
+        window_seconds: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.window_seconds = window_seconds or getattr(settings, "LIVE_WINDOW_SECONDS", 30)
+        self.window_bytes = int(self.window_seconds * sample_rate) * channels * sample_width
+        self.on_event = on_event
+
+        self.session_id = str(uuid.uuid4())
+        self.transcript_parts: List[str] = []
+        self.segments: List[Dict[str, Any]] = []
+        self.tasks: List[Dict[str, Any]] = []
+        self._task_keys = set()
+        self._buffer = bytearray()
+        self._windows_queued = 0
+        self._windows_dropped = 0
+        self._seconds_received = 0.0
+        self._seconds_processed = 0.0
+        self._extracted_upto = 0
+
+        self.transcriber = get_local_whisper_service() or get_whisper_service()
+        if not self.transcriber:
+            raise ValueError(
+                "No transcription backend available. Set OPENAI_API_KEY, or USE_LOCAL_WHISPER=true with faster-whisper installed"
+            )
+
+        max_pending = max_pending or int(getattr(settings, "LIVE_MAX_PENDING_WINDOWS", 4))
+        # (window start in seconds, index, PCM); None ends the stream
+        self._queue: "asyncio.Queue[Optional[Tuple[float, int, bytes]]]" = asyncio.Queue(max_pending)
+        self._worker = asyncio.create_task(self._process_windows())
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(p for p in self.transcript_parts if p).strip()
+
+    def add_audio(self, chunk: bytes):
+        """Buffer an audio frame; queue a window whenever one is complete"""
+        self._buffer.extend(chunk)
+        while len(self._buffer) >= self.window_bytes:
+            with memoryview(self._buffer) as view:
+                window = view[:self.window_bytes].tobytes()
+            del self._buffer[:self.window_bytes]
+            self._enqueue(window)
+
+    def _enqueue(self, window: bytes):
+        start = self._seconds_received
+        self._seconds_received += len(window) / (self.sample_rate * self.channels * self.sample_width)
+        index = self._windows_queued
+        self._windows_queued += 1
+        try:
+            self._queue.put_nowait((start, index, window))
+        except asyncio.QueueFull:
+            self._windows_dropped += 1
+            logger.warning(
+                "Live window %d dropped: %d windows already waiting for transcription", index, self._queue.qsize(),
+                extra={"stage": "live.window", "session_id": self.session_id}
+            )
+            self._notify({
+                "type": "dropped",
+                "window": index,
+                "start": round(start, 2),
+                "end": round(self._seconds_received, 2),
+            })
+
+    async def finish(self) -> Dict[str, Any]:
+        """
+        Flush the partial last window, wait for all windows to be processed
+        and run a final extraction pass over any remaining text.
+        """
+        # Ignore a trailing fragment shorter than half a second
+        min_bytes = int(0.5 * self.sample_rate) * self.channels * self.sample_width
+        if len(self._buffer) >= min_bytes:
+            self._enqueue(bytes(self._buffer))
+        self._buffer.clear()
+
+        await self._queue.put(None)
+        await self._worker
+        await self._extract_new_text()
+
+        return {
+            "session_id": self.session_id,
+            "transcript": self.transcript,
+            "segments": self.segments,
+            "action_items": self.tasks,
+            "duration_seconds": round(self._seconds_received, 2),
+            "windows_dropped": self._windows_dropped,
+        }
+
+    async def abort(self):
+        self._worker.cancel()
+
+    def _notify(self, event: Dict[str, Any]):
+        """_emit from synchronous code (add_audio), without waiting for the send"""
+        if self.on_event:
+            asyncio.get_running_loop().create_task(self._emit(event))
+
+    async def _emit(self, event: Dict[str, Any]):
+        if self.on_event:
+            try:
+                await self.on_event(event)
+            except Exception as e:
+                logger.warning("Failed to send live event: %s", e, extra={"stage": "live", "session_id": self.session_id})
+
+    async def _process_windows(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            window_start, index, window = item
+            try:
+                await self._process_window(index, window_start, window)
+            except Exception as e:
+                logger.warning("Live window %d failed: %s", index, e, extra={"stage": "live.window", "session_id": self.session_id})
+                await self._emit({"type": "error", "window": index, "detail": str(e)})
+
+    async def _process_window(self, index: int, window_start: float, pcm: bytes):
+        duration = len(pcm) / (self.sample_rate * self.channels * self.sample_width)
+        self._seconds_processed = window_start + duration
+
+        path = self._write_wav(index, pcm)
+        try:
+            # Same cost unit as uploads: minutes of audio
+            async with _stage_slot("whisper", max(duration / 60, 0.1)):
+                result = await asyncio.to_thread(self.transcriber.transcribe, path, self.transcript or None)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+        text = (result.get("text") or "").strip()
+        self.transcript_parts.append(text)
+        for seg in result.get("segments") or []:
+            seg = seg if isinstance(seg, dict) else seg.model_dump()
+            self.segments.append({
+                "start": round(window_start + float(seg.get("start", 0.0)), 2),
+                "end": round(window_start + float(seg.get("end", 0.0)), 2),
+                "text": (seg.get("text") or "").strip(),
+            })
+
+        await self._emit({
+            "type": "transcript",
+            "window": index,
+            "start": round(window_start, 2),
+            "end": round(self._seconds_processed, 2),
+            "text": text,
+        })
+
+        new_tasks = await self._extract_new_text()
+        if new_tasks:
+            await self._emit({"type": "action_items", "window": index, "tasks": new_tasks})
+
+    async def _extract_new_text(self) -> List[Dict[str, Any]]:
+        """Run extraction on transcript text not yet seen by the LLM"""
+        llm_service = get_llm_service()
+        transcript = self.transcript
+        if not llm_service or len(transcript) <= self._extracted_upto:
+            return []
+
+        context_start = max(0, self._extracted_upto - EXTRACTION_CONTEXT_CHARS)
+        chunk = transcript[context_start:]
+        self._extracted_upto = len(transcript)
+
+        try:
+            async with _stage_slot("llm"):
+                result = await asyncio.to_thread(llm_service.extract_action_items, chunk)
+        except Exception as e:
+            logger.warning("Live extraction failed: %s", e, extra={"stage": "live.extract", "session_id": self.session_id})
+            return []
+
+        new_tasks = []
+        for task in result.get("tasks", []):
+            key = _task_key(task.get("description"))
+            if key and key not in self._task_keys:
+                self._task_keys.add(key)
+                self.tasks.append(task)
+                new_tasks.append(task)
+        return new_tasks
+
+    def _write_wav(self, index: int, pcm: bytes) -> str:
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(settings.UPLOAD_DIR, f"live-{self.session_id}-{index}.wav")
+        with wave.open(path, "wb") as w:
+            w.setnchannels(self.channels)
+            w.setsampwidth(self.sample_width)
+            w.setframerate(self.sample_rate)
+            w.writeframes(pcm)
+        return path
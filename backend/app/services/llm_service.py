@@ -2,26 +2,60 @@
 LLM service for extracting action items from transcripts
 Supports Groq API, OpenAI API (optional), and local models via Ollama
 """
+import importlib.util
 import json
 import re
+import threading
 from typing import List, Dict, Any, Optional
 from app.config import settings
+from app.logs import get_logger
+from app.services import prompts
+from app.tracing import tracer, current_span
 import os
 
-# Try to import Groq
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
-    Groq = None
+logger = get_logger(__name__)
+
+# Provider SDKs are heavy to import (openai alone pulls in hundreds of
+# modules), so only check that they are installed here and import them
+# when the service is first constructed.
+GROQ_AVAILABLE = importlib.util.find_spec("groq") is not None
 
 # Optional OpenAI support for backward compatibility
-try:
-    from openai import OpenAI as OpenAIClient
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+
+
+# Seconds per Files / Batch API call (uploads of large batch files included)
+BATCH_API_TIMEOUT = 120
+
+_SPEAKER_RE = re.compile(r"^([^:\n]{1,40}):", re.MULTILINE)
+
+
+def _usage_field(usage: Any, name: str) -> Any:
+    """
+    A field of an API usage object, dict or nested dict. Fields the pinned
+    SDK's model doesn't declare (openai 1.3.0 has no prompt_tokens_details)
+    are kept as raw JSON in the model's extras.
+    """
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get(name)
+    value = getattr(usage, name, None)
+    if value is None:
+        extra = getattr(usage, "model_extra", None) or getattr(usage, "__pydantic_extra__", None) or {}
+        value = extra.get(name)
+    return value
+
+
+def transcript_complexity(transcript: str) -> float:
+    """
+    Rough difficulty of a transcript for extraction: 1.0 is about 2000
+    words with two speakers; each speaker beyond two adds 1/8. Above
+    CASCADE_MAX_COMPLEXITY extraction goes straight to the large model.
+    """
+    words = len(transcript.split())
+    speakers = len(set(_SPEAKER_RE.findall(transcript[:200000])))
+    return words / 2000.0 + max(0, speakers - 2) / 8.0
 
 
 class LLMService:
@@ -34,19 +68,28 @@ class LLMService:
         
         if settings.GROQ_API_KEY and GROQ_AVAILABLE:
             # Use Groq API (recommended)
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
+            from groq import Groq
+            self.client = Groq(
+                api_key=settings.GROQ_API_KEY,
+                base_url=getattr(settings, "GROQ_BASE_URL", None)
+            )
             self.provider = "groq"
             # Default Groq models if not specified
             if not settings.LLM_MODEL or settings.LLM_MODEL.startswith("gpt-"):
                 self.model = "llama-3.1-70b-versatile"
         elif settings.OPENAI_API_KEY and OPENAI_AVAILABLE:
             # Fallback to OpenAI API
-            self.client = OpenAIClient(api_key=settings.OPENAI_API_KEY)
+            from openai import OpenAI as OpenAIClient
+            self.client = OpenAIClient(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=getattr(settings, "OPENAI_BASE_URL", None)
+            )
             self.provider = "openai"
             self.model = settings.LLM_MODEL or "gpt-4o-mini"
-        elif settings.ENABLE_LOCAL_MODE:
+        elif getattr(settings, "ENABLE_LOCAL_MODE", False):
             # Try to use local Ollama if available
             if OPENAI_AVAILABLE:
+                from openai import OpenAI as OpenAIClient
                 self.client = OpenAIClient(
                     base_url="http://localhost:11434/v1",
                     api_key="ollama"  # Not used but required
@@ -64,6 +107,20 @@ class LLMService:
             error_msg += "\n- OPENAI_API_KEY"
             error_msg += "\n- ENABLE_LOCAL_MODE (with Ollama)"
             raise ValueError(error_msg)
+
+        # Extraction cascade: try the small model first (Groq defaults to the
+        # 8B model; other providers only cascade when LLM_SMALL_MODEL is set)
+        self.small_model = None
+        if getattr(settings, "ENABLE_MODEL_CASCADE", True):
+            small_model = getattr(settings, "LLM_SMALL_MODEL", None)
+            if not small_model and self.provider == "groq":
+                small_model = "llama-3.1-8b-instant"
+            if small_model and small_model != self.model:
+                self.small_model = small_model
+
+        # Prompt / cached token totals reported by the API (see usage_stats)
+        self._usage = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        self._usage_lock = threading.Lock()
     
     def extract_action_items(self, transcript: str) -> Dict[str, Any]:
         """
@@ -75,164 +132,324 @@ class LLMService:
         Returns:
             Dictionary with extracted tasks in the required format
         """
-        prompt = self._build_extraction_prompt(transcript)
-        
+        with tracer.start_span("llm.extract_action_items", {"transcript.chars": len(transcript)}) as span:
+            result = self._extract_action_items(transcript)
+            span.set_attribute("tasks.count", len(result.get("tasks", [])))
+            return result
+
+    def extract_action_items_simple(self, transcript: str) -> Dict[str, Any]:
+        """Regex-only extraction without an LLM call (same output format)"""
+        with tracer.start_span("llm.extract_action_items_simple", {"transcript.chars": len(transcript)}) as span:
+            result = self._extract_simple(transcript)
+            span.set_attribute("tasks.count", len(result.get("tasks", [])))
+            return result
+
+    def _extract_action_items(self, transcript: str) -> Dict[str, Any]:
         try:
-            if self.client:
-                # Prepare request parameters with a strict system prompt
-                request_params = {
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are an expert at analyzing meeting transcripts and extracting clear, actionable tasks.\n\n"
-                                "Requirements:\n"
-                                "- Extract only explicit action items or tasks mentioned in the transcript. Do NOT hallucinate.\n"
-                                "- Each task must be a single concise one-line description (preferably under 140 characters).\n"
-                                "- Identify responsible person if mentioned (owner). If not clearly stated, set owner to null.\n"
-                                "- Identify a deadline if mentioned and normalize to YYYY-MM-DD; otherwise null.\n"
-                                "- Assign priority: one of \"low\"|\"medium\"|\"high\"|\"critical\". Default to \"medium\" when unclear.\n"
-                                "- Provide a confidence score between 0.0 and 1.0.\n\n"
-                                "Return ONLY valid JSON in this exact format (no extra text):\n"
-                                "{\n  \"tasks\": [\n    {\n      \"description\": \"...\",\n      \"owner\": \"...\" or null,\n      \"deadline\": \"YYYY-MM-DD\" or null,\n      \"priority\": \"low|medium|high|critical\",\n      \"confidence\": 0.0-1.0\n    }\n  ]\n}\n\n"
-                                "If there are no action items, return {\"tasks\": []}. Be conservative and prefer omitting unclear items."
-                            )
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.1,
-                }
-
-                # Request structured response where supported
-                if self.provider in ("groq", "openai"):
-                    request_params["response_format"] = {"type": "json_object"}
-
-                response = self.client.chat.completions.create(**request_params)
-                content = response.choices[0].message.content
+            if not self.client:
+                # Fallback: Simple regex-based extraction
+                return self._extract_simple(transcript)
+
+            escalation = None
+            if self.small_model:
+                # Cascade: the small model answers unless the transcript is too
+                # complex or its answer is unparseable / not confident enough
+                complexity = transcript_complexity(transcript)
+                if complexity > getattr(settings, "CASCADE_MAX_COMPLEXITY", 1.0):
+                    escalation = "complexity"
+                else:
+                    try:
+                        raw, filtered = self._run_extraction(self.small_model, transcript)
+                        escalation = self._escalation_reason(raw, filtered)
+                    except Exception as e:
+                        logger.warning("Small model extraction failed, escalating: %s", e,
+                                       extra={"stage": "llm.extract", "provider": self.provider, "model": self.small_model})
+                        escalation = "error"
+                    if escalation is None:
+                        return self._extraction_result(filtered, "small", self.small_model)
+                logger.info("Escalating extraction to %s (%s)", self.model, escalation, extra={
+                    "stage": "llm.extract",
+                    "provider": self.provider,
+                    "escalation": escalation,
+                    "complexity": round(complexity, 2),
+                })
+
+            raw, filtered = self._run_extraction(self.model, transcript)
+            return self._extraction_result(filtered, "large", self.model, escalation)
+
+        except Exception as e:
+            logger.warning("Action item extraction failed, using regex fallback: %s", e,
+                           extra={"stage": "llm.extract", "provider": self.provider})
+            current_span().set_attribute("llm.error", f"{type(e).__name__}: {e}")
+            # Fallback to simple extraction
+            return self._extract_simple(transcript)
 
-                # Try strict JSON parse first
-                tasks_out = []
-                try:
-                    parsed = json.loads(content)
-                except Exception:
-                    # Try to extract JSON substring if model added surrounding text
-                    m = re.search(r"\{\s*\"tasks\"[\s\S]*\}\s*$", content)
-                    if not m:
-                        m = re.search(r"\{\s*\"tasks\"[\s\S]*\}", content)
-                    if m:
-                        try:
-                            parsed = json.loads(m.group(0))
-                        except Exception:
-                            parsed = {"tasks": []}
-                    else:
-                        parsed = {"tasks": []}
-
-                for t in parsed.get("tasks", []):
-                    # Normalize and enforce one-line concise descriptions
-                    desc = t.get("description") if isinstance(t.get("description"), str) else ""
-                    desc = re.sub(r"\s+", ' ', desc).strip()
-                    # If long, take the first sentence or truncate
-                    if len(desc) > 140:
-                        first_sent = re.split(r"[\.\!\?]\s", desc)[0]
-                        if len(first_sent) >= 10:
-                            desc = first_sent.strip()
-                        desc = (desc[:137].rstrip() + '...') if len(desc) > 140 else desc
-
-                    owner = t.get("owner") if t.get("owner") else None
-
-                    # Normalize deadline
-                    deadline = None
-                    if t.get("deadline"):
-                        dl = str(t.get("deadline"))
-                        from datetime import datetime
-                        for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%m/%d/%Y"):
-                            try:
-                                dt = datetime.strptime(dl, fmt)
-                                deadline = dt.strftime("%Y-%m-%d")
-                                break
-                            except Exception:
-                                continue
-
-                    priority = (t.get("priority") or "medium").lower()
-                    if priority not in ("low", "medium", "high", "critical"):
-                        priority = "medium"
+    def _extraction_result(self, tasks: List[Dict[str, Any]], tier: str, model: str, escalation: Optional[str] = None) -> Dict[str, Any]:
+        span = current_span()
+        span.set_attributes({"llm.tier": tier, "llm.escalation": escalation})
+        return {
+            "tasks": self._attach_similar_items(tasks),
+            "tier": tier,
+            "model": model,
+            "escalation": escalation,
+        }
+
+    def _escalation_reason(self, raw: Optional[List[Dict[str, Any]]], filtered: List[Dict[str, Any]]) -> Optional[str]:
+        """Why the small model's answer isn't good enough, or None to accept it"""
+        if raw is None:
+            return "invalid_json"
+        if raw and not filtered:
+            return "low_confidence"   # every task fell below TASK_CONFIDENCE_THRESHOLD
+        min_confidence = getattr(settings, "CASCADE_MIN_CONFIDENCE", 0.7)
+        if any((t.get("confidence") or 0.0) < min_confidence for t in filtered):
+            return "low_confidence"
+        return None
+
+    def _run_extraction(self, model: str, transcript: str):
+        """
+        One extraction call on `model`.
 
+        Returns:
+            (parsed tasks, or None when the response was not valid JSON;
+             the tasks that pass TASK_CONFIDENCE_THRESHOLD, normalized)
+        """
+        response = self._chat_completion(self._extraction_params(model, transcript), "extract")
+        raw = self._parse_tasks(response.choices[0].message.content or "")
+        return raw, self._filter_tasks(raw or [])
+
+    def _extraction_params(self, model: str, transcript: str) -> Dict[str, Any]:
+        request_params = {
+            "model": model,
+            "messages": prompts.extraction_messages(transcript),
+            "temperature": 0.1,
+        }
+
+        # Request structured response where supported
+        if self.provider in ("groq", "openai"):
+            request_params["response_format"] = {"type": "json_object"}
+        return request_params
+
+    def _summary_params(self, transcript: str) -> Dict[str, Any]:
+        request_params = {
+            "model": self.model,
+            "messages": prompts.summary_messages(transcript),
+            "temperature": 0.2,
+        }
+        if self.provider in ("groq", "openai"):
+            request_params["response_format"] = {"type": "text"}
+        return request_params
+
+    def _parse_tasks(self, content: str) -> Optional[List[Dict[str, Any]]]:
+        """Tasks from the model's JSON answer, normalized; None if it isn't valid JSON"""
+        # Try strict JSON parse first
+        tasks_out = []
+        try:
+            parsed = json.loads(content)
+        except Exception:
+            # Try to extract JSON substring if model added surrounding text
+            m = re.search(r"\{\s*\"tasks\"[\s\S]*\}\s*$", content)
+            if not m:
+                m = re.search(r"\{\s*\"tasks\"[\s\S]*\}", content)
+            if not m:
+                return None
+            try:
+                parsed = json.loads(m.group(0))
+            except Exception:
+                return None
+        if not isinstance(parsed, dict) or not isinstance(parsed.get("tasks", []), list):
+            return None
+
+        for t in parsed.get("tasks", []):
+            # Normalize and enforce one-line concise descriptions
+            desc = t.get("description") if isinstance(t.get("description"), str) else ""
+            desc = re.sub(r"\s+", ' ', desc).strip()
+            # If long, take the first sentence or truncate
+            if len(desc) > 140:
+                first_sent = re.split(r"[\.\!\?]\s", desc)[0]
+                if len(first_sent) >= 10:
+                    desc = first_sent.strip()
+                desc = (desc[:137].rstrip() + '...') if len(desc) > 140 else desc
+
+            owner = t.get("owner") if t.get("owner") else None
+
+            # Normalize deadline
+            deadline = None
+            if t.get("deadline"):
+                dl = str(t.get("deadline"))
+                from datetime import datetime
+                for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%m/%d/%Y"):
                     try:
-                        confidence = float(t.get("confidence", 0.5))
+                        dt = datetime.strptime(dl, fmt)
+                        deadline = dt.strftime("%Y-%m-%d")
+                        break
                     except Exception:
-                        confidence = 0.5
-
-                    tasks_out.append({
-                        "description": desc,
-                        "owner": owner,
-                        "deadline": deadline,
-                        "priority": priority,
-                        "confidence": round(confidence, 2)
-                    })
-
-                # Confidence filtering and deterministic normalization
-                filtered = []
-                threshold = getattr(settings, "TASK_CONFIDENCE_THRESHOLD", 0.4)
-                normalize_enabled = getattr(settings, "NORMALIZE_TASKS", True)
-
-                def normalize_description(d, owner_val=None):
-                    d = d or ""
-                    d = d.strip()
-                    # Remove polite prefixes
-                    d = re.sub(r'^(please|pls|kindly|could you|can you|would you|let\'s|let us|we should|we need to)\b[:,]?\s*', '', d, flags=re.I)
-                    # If starts with "we" remove leading "we (should|will|need to)" to make imperative
-                    d = re.sub(r'^(we\s+(should|will|need to)\s+)', '', d, flags=re.I)
-                    # If starts with "NAME will ..." or "NAME to ..." try to extract owner and make rest imperative
-                    m = re.match(r'^([A-Z][a-zA-Z]+)\s+(will|shall|should|to)\s+(.*)$', d)
-                    if m:
-                        possible_owner = m.group(1)
-                        rest = m.group(3).strip()
-                        if not owner_val:
-                            owner_val = possible_owner
-                        d = rest
-                    # Ensure starts with a verb: if starts with gerund or noun phrases, try to prefix with verb 'Do' (fallback)
-                    if d and not re.match(r'^[A-Za-z]+\s', d):
-                        d = d
-                    # Capitalize first letter
-                    if d:
-                        d = d[0].upper() + d[1:]
-                    # Collapse whitespace and keep one-line
-                    d = re.sub(r"\s+", ' ', d).strip()
-                    if len(d) > 140:
-                        d = d[:137].rstrip() + '...'
-                    return d, owner_val
-
-                for t in tasks_out:
-                    conf = t.get("confidence", 0.5) or 0.5
-                    if conf < threshold:
-                        # Skip low confidence items
                         continue
 
-                    desc = t.get("description", "")
-                    owner = t.get("owner")
-                    if normalize_enabled:
-                        desc, owner = normalize_description(desc, owner)
-
-                    filtered.append({
-                        "description": desc,
-                        "owner": owner,
-                        "deadline": t.get("deadline"),
-                        "priority": t.get("priority", "medium"),
-                        "confidence": t.get("confidence", 0.5)
-                    })
+            priority = (t.get("priority") or "medium").lower()
+            if priority not in ("low", "medium", "high", "critical"):
+                priority = "medium"
+
+            try:
+                confidence = float(t.get("confidence", 0.5))
+            except Exception:
+                confidence = 0.5
+
+            source = t.get("source") if isinstance(t.get("source"), str) else None
+
+            tasks_out.append({
+                "description": desc,
+                "owner": owner,
+                "deadline": deadline,
+                "priority": priority,
+                "confidence": round(confidence, 2),
+                "source": source.strip() if source else None
+            })
+
+        return tasks_out
+
+    def _filter_tasks(self, tasks_out: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Confidence filtering and deterministic normalization"""
+        filtered = []
+        threshold = getattr(settings, "TASK_CONFIDENCE_THRESHOLD", 0.4)
+        normalize_enabled = getattr(settings, "NORMALIZE_TASKS", True)
+
+        def normalize_description(d, owner_val=None):
+            d = d or ""
+            d = d.strip()
+            # Remove polite prefixes
+            d = re.sub(r'^(please|pls|kindly|could you|can you|would you|let\'s|let us|we should|we need to)\b[:,]?\s*', '', d, flags=re.I)
+            # If starts with "we" remove leading "we (should|will|need to)" to make imperative
+            d = re.sub(r'^(we\s+(should|will|need to)\s+)', '', d, flags=re.I)
+            # If starts with "NAME will ..." or "NAME to ..." try to extract owner and make rest imperative
+            m = re.match(r'^([A-Z][a-zA-Z]+)\s+(will|shall|should|to)\s+(.*)$', d)
+            if m:
+                possible_owner = m.group(1)
+                rest = m.group(3).strip()
+                if not owner_val:
+                    owner_val = possible_owner
+                d = rest
+            # Ensure starts with a verb: if starts with gerund or noun phrases, try to prefix with verb 'Do' (fallback)
+            if d and not re.match(r'^[A-Za-z]+\s', d):
+                d = d
+            # Capitalize first letter
+            if d:
+                d = d[0].upper() + d[1:]
+            # Collapse whitespace and keep one-line
+            d = re.sub(r"\s+", ' ', d).strip()
+            if len(d) > 140:
+                d = d[:137].rstrip() + '...'
+            return d, owner_val
+
+        for t in tasks_out:
+            conf = t.get("confidence", 0.5) or 0.5
+            if conf < threshold:
+                # Skip low confidence items
+                continue
+
+            desc = t.get("description", "")
+            owner = t.get("owner")
+            if normalize_enabled:
+                desc, owner = normalize_description(desc, owner)
+
+            filtered.append({
+                "description": desc,
+                "owner": owner,
+                "deadline": t.get("deadline"),
+                "priority": t.get("priority", "medium"),
+                "confidence": t.get("confidence", 0.5),
+                "source": t.get("source")
+            })
+        return filtered
+
+    def _attach_similar_items(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Annotate tasks with similar past action items from the local vector
+        index. Tasks are added to the index once their Jira issue exists
+        (see remember_action_items), not here.
+        """
+        from app.services.vector_index import get_action_item_index
 
-                return {"tasks": filtered}
+        action_item_index = get_action_item_index()
+        if not action_item_index or not tasks:
+            return tasks
 
-                return {"tasks": tasks_out}
-            else:
-                # Fallback: Simple regex-based extraction
-                return self._extract_simple(transcript)
+        try:
+            action_item_index.annotate(
+                tasks,
+                k=getattr(settings, "SIMILAR_ITEMS_TOP_K", 3),
+                min_score=getattr(settings, "SIMILAR_ITEMS_MIN_SCORE", 0.35)
+            )
+        except Exception as e:
+            logger.warning("Similar action item lookup failed: %s", e, extra={"stage": "similar_items"})
+        return tasks
 
+    def _chat_completion(self, request_params: Dict[str, Any], operation: str):
+        """
+        Call chat.completions.create inside an `llm.chat` span recording the
+        model, provider, prompt version and token usage reported by the API,
+        including prompt tokens served from the provider's prompt cache.
+        """
+        if self.provider == "ollama":
+            # Keep the model (and its KV cache of the shared prompt prefix)
+            # loaded between meetings instead of the 5 minute default
+            request_params.setdefault("extra_body", {})["keep_alive"] = getattr(settings, "OLLAMA_KEEP_ALIVE", "30m")
+        attributes = {
+            "llm.operation": operation,
+            "llm.provider": self.provider,
+            "llm.model": request_params.get("model"),
+            "llm.prompt_version": prompts.prompt_version(),
+            "llm.prompt_chars": sum(len(m.get("content") or "") for m in request_params.get("messages", [])),
+        }
+        with tracer.start_span("llm.chat", attributes) as span:
+            response = self.client.chat.completions.create(**request_params)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                prompt_tokens = getattr(usage, "prompt_tokens", None)
+                cached_tokens = _usage_field(_usage_field(usage, "prompt_tokens_details"), "cached_tokens")
+                span.set_attributes({
+                    "llm.prompt_tokens": prompt_tokens,
+                    "llm.cached_tokens": cached_tokens,
+                    "llm.completion_tokens": getattr(usage, "completion_tokens", None),
+                    "llm.total_tokens": getattr(usage, "total_tokens", None),
+                })
+                with self._usage_lock:
+                    self._usage["calls"] += 1
+                    self._usage["prompt_tokens"] += prompt_tokens or 0
+                    self._usage["cached_tokens"] += cached_tokens or 0
+            if response.choices:
+                span.set_attribute("llm.finish_reason", response.choices[0].finish_reason)
+                span.set_attribute("llm.response_chars", len(response.choices[0].message.content or ""))
+            return response
+
+    def usage_stats(self) -> Dict[str, Any]:
+        """Prompt tokens sent and served from the provider's prompt cache since startup"""
+        with self._usage_lock:
+            usage = dict(self._usage)
+        usage["cache_hit_ratio"] = round(usage["cached_tokens"] / usage["prompt_tokens"], 3) if usage["prompt_tokens"] else None
+        usage["prompt_version"] = prompts.prompt_version()
+        return usage
+
+    def warm_up(self):
+        """
+        Load the Ollama model into memory with OLLAMA_KEEP_ALIVE so the
+        first meeting doesn't pay for the model load (no-op for hosted APIs).
+        """
+        if self.provider != "ollama":
+            return
+        import urllib.request
+
+        base_url = str(self.client.base_url).rstrip("/")
+        if base_url.endswith("/v1"):
+            base_url = base_url[:-3]
+        body = json.dumps({"model": self.model, "keep_alive": getattr(settings, "OLLAMA_KEEP_ALIVE", "30m")}).encode()
+        request = urllib.request.Request(
+            f"{base_url}/api/generate", data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read()
         except Exception as e:
-            print(f"Error extracting action items with {self.provider}: {e}")
-            # Fallback to simple extraction
-            return self._extract_simple(transcript)
+            logger.warning("Ollama warm-up failed: %s", e, extra={"stage": "startup", "provider": self.provider})
 
     def summarize_transcript(self, transcript: str) -> str:
         """
@@ -240,31 +457,15 @@ class LLMService:
 
         Returns a plain text summary.
         """
-        # Keep the prompt focused and ask for short bullet points with clear one-line action summaries
-        sample = transcript if len(transcript) < 12000 else transcript[:12000]
-        prompt = (
-            "Produce concise meeting minutes from the transcript below. Respond with short bullet points under these headings (if present): Attendees, Decisions, Action Items (one-line per item), Key Takeaways. "
-            "Action items must be one-line, start with a verb, and be under 140 characters. Do not add any tasks not present in the transcript. "
-            f"Transcript:\n{sample}"
-        )
+        with tracer.start_span("llm.summarize_transcript", {"transcript.chars": len(transcript)}) as span:
+            summary = self._summarize_transcript(transcript)
+            span.set_attribute("summary.chars", len(summary or ""))
+            return summary
 
+    def _summarize_transcript(self, transcript: str) -> str:
         try:
             if self.client:
-                request_params = {
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": "You are an assistant that summarizes meeting transcripts into concise minutes with bullets."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.2,
-                }
-
-                if self.provider == "groq":
-                    request_params["response_format"] = {"type": "text"}
-                elif self.provider == "openai":
-                    request_params["response_format"] = {"type": "text"}
-
-                response = self.client.chat.completions.create(**request_params)
+                response = self._chat_completion(self._summary_params(transcript), "summarize")
                 content = response.choices[0].message.content
                 return content.strip()
             else:
@@ -272,17 +473,124 @@ class LLMService:
                 return transcript.strip()[:400] + ("..." if len(transcript) > 400 else "")
 
         except Exception as e:
-            print(f"Error summarizing transcript with {self.provider}: {e}")
+            logger.warning("Summarization failed, using transcript prefix: %s", e,
+                           extra={"stage": "llm.summarize", "provider": self.provider})
+            current_span().set_attribute("llm.error", f"{type(e).__name__}: {e}")
             return transcript.strip()[:400] + ("..." if len(transcript) > 400 else "")
     
-    def _build_extraction_prompt(self, transcript: str) -> str:
-        """Build the prompt for action item extraction"""
-        # Truncate very long transcripts to keep prompts within model context windows
-        sample = transcript if len(transcript) < 20000 else transcript[:20000]
-        return f"Analyze the following meeting transcript and extract all explicit action items. Return only JSON as instructed in the system prompt.\n\nTranscript:\n{sample}"
-    
+    @property
+    def supports_batch(self) -> bool:
+        """Whether the provider has an OpenAI-style Batch API (Ollama doesn't)"""
+        return self.provider in ("openai", "groq")
+
+    def batch_requests(self, job_id: str, transcript: str, extract: bool = True) -> List[Dict[str, Any]]:
+        """
+        Batch input lines for one transcript: the same extraction (on
+        LLM_MODEL; the cascade doesn't apply) and summary requests the
+        synchronous path sends, with custom_ids "<job_id>:extract" and
+        "<job_id>:summary".
+        """
+        lines = []
+        if extract:
+            lines.append({
+                "custom_id": f"{job_id}:extract",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._extraction_params(self.model, transcript),
+            })
+        lines.append({
+            "custom_id": f"{job_id}:summary",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": self._summary_params(transcript),
+        })
+        return lines
+
+    def _batch_api(self, method: str, path: str, **kwargs):
+        """
+        Call the provider's Files / Batch REST API directly. The pinned SDKs
+        (openai 1.3.0, groq 0.4) predate client.batches, so these endpoints
+        are reached with requests, under the same base URL and API key the
+        SDK client uses for chat completions.
+        """
+        import requests
+
+        root = str(self.client.base_url).rstrip("/")
+        if self.provider == "groq":
+            # Groq's SDK adds the OpenAI-compatible prefix per route
+            root += "/openai/v1"
+        response = requests.request(
+            method,
+            f"{root}/{path}",
+            headers={"Authorization": f"Bearer {self.client.api_key}"},
+            timeout=BATCH_API_TIMEOUT,
+            **kwargs
+        )
+        response.raise_for_status()
+        return response
+
+    def submit_batch(self, lines: List[Dict[str, Any]]) -> str:
+        """Upload `lines` as a JSONL batch file and start a batch job; returns the batch id"""
+        data = "".join(json.dumps(line, separators=(",", ":")) + "\n" for line in lines).encode("utf-8")
+        with tracer.start_span("llm.batch.submit", {
+            "llm.provider": self.provider,
+            "llm.model": self.model,
+            "batch.requests": len(lines),
+            "batch.bytes": len(data),
+        }) as span:
+            input_file = self._batch_api(
+                "POST", "files", data={"purpose": "batch"}, files={"file": ("batch.jsonl", data, "application/jsonl")}
+            ).json()
+            batch = self._batch_api("POST", "batches", json={
+                "input_file_id": input_file["id"],
+                "endpoint": "/v1/chat/completions",
+                "completion_window": getattr(settings, "BATCH_COMPLETION_WINDOW", "24h"),
+            }).json()
+            span.set_attribute("batch.id", batch["id"])
+            return batch["id"]
+
+    def batch_status(self, batch_id: str) -> Dict[str, Any]:
+        """Status of a batch job ("validating", "in_progress", "completed", "failed", "expired", ...)"""
+        batch = self._batch_api("GET", f"batches/{batch_id}").json()
+        return {
+            "status": batch.get("status"),
+            "output_file_id": batch.get("output_file_id"),
+            "error_file_id": batch.get("error_file_id"),
+        }
+
+    def batch_output(self, file_id: str) -> Dict[str, Optional[str]]:
+        """custom_id -> message content of a finished batch's output (None for failed requests)"""
+        with tracer.start_span("llm.batch.output", {"llm.provider": self.provider, "batch.file_id": file_id}) as span:
+            data = self._batch_api("GET", f"files/{file_id}/content").content
+            results = {}
+            for line in data.decode("utf-8").splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                content = None
+                if response.get("status_code") == 200:
+                    choices = (response.get("body") or {}).get("choices") or []
+                    if choices:
+                        content = (choices[0].get("message") or {}).get("content")
+                results[entry.get("custom_id")] = content
+            span.set_attribute("batch.results", len(results))
+            return results
+
+    def batch_extraction_result(self, content: Optional[str], transcript: str) -> Dict[str, Any]:
+        """
+        Extraction result from a batch answer, in the same format as
+        extract_action_items (tier "batch"); regex fallback when the request
+        failed or its JSON doesn't parse.
+        """
+        raw = self._parse_tasks(content) if content else None
+        if raw is None:
+            return self._extract_simple(transcript)
+        return self._extraction_result(self._filter_tasks(raw), "batch", self.model)
+
     def _extract_simple(self, transcript: str) -> Dict[str, Any]:
         """Fallback simple extraction using regex patterns"""
+        current_span().set_attribute("llm.fallback", "regex")
         tasks = []
         
         # Look for common patterns
@@ -313,12 +621,35 @@ class LLMService:
                     "owner": None,
                     "deadline": None,
                     "priority": "medium",
-                    "confidence": 0.5
+                    "confidence": 0.5,
+                    "source": match.group(0).strip()
                 })
         
-        return {"tasks": tasks[:10]}  # Limit to 10 tasks
+        return {"tasks": tasks[:10], "tier": "regex"}  # Limit to 10 tasks
 
 
-# Singleton instance
-llm_service = LLMService() if (settings.GROQ_API_KEY or settings.OPENAI_API_KEY or settings.ENABLE_LOCAL_MODE) else None
+# Lazily constructed singleton (see get_llm_service)
+_UNSET = object()
+_llm_service = _UNSET
+_llm_service_lock = threading.Lock()
 
+
+def get_llm_service() -> Optional[LLMService]:
+    """
+    Return the shared LLMService, constructing it on first use.
+
+    Returns None when no provider is configured. Construction happens at most
+    once per process, even when several threads ask for it concurrently.
+    """
+    global _llm_service
+    if _llm_service is _UNSET:
+        with _llm_service_lock:
+            if _llm_service is _UNSET:
+                service = None
+                if settings.GROQ_API_KEY or settings.OPENAI_API_KEY or getattr(settings, "ENABLE_LOCAL_MODE", False):
+                    try:
+                        service = LLMService()
+                    except Exception as e:
+                        logger.error("LLM service not available: %s", e, extra={"stage": "startup"})
+                _llm_service = service
+    return _llm_service
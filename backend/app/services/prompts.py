@@ -0,0 +1,118 @@
+"""
+Versioned prompt templates for the LLM calls
+Builds the chat messages for extraction and summarization. Version 2 lays
+the messages out so that provider prompt caches (OpenAI, Groq) and the
+Ollama KV cache can reuse as much of each request as possible:
+
+    system   SYSTEM_PROMPT              static, byte-identical on every call
+    user     "Transcript:\\n..."         identical for both calls on a meeting
+    user     task instructions          the only part that differs
+
+Caches match on an exact token prefix, so nothing request-specific may
+appear before the transcript, and the transcript is truncated the same
+way for both calls. Version 1 is the previous layout (a different system
+prompt per call, instructions before the transcript), kept for comparison.
+"""
+from typing import Dict, List
+from app.config import settings
+
+LATEST_VERSION = "2"
+
+# Characters of transcript sent to the model (same for both calls so the
+# transcript message is a shared cache prefix)
+TRANSCRIPT_CHARS = 20000
+
+_TASK_FORMAT = (
+    "{\n  \"tasks\": [\n    {\n      \"description\": \"...\",\n      \"owner\": \"...\" or null,\n"
+    "      \"deadline\": \"YYYY-MM-DD\" or null,\n      \"priority\": \"low|medium|high|critical\",\n"
+    "      \"confidence\": 0.0-1.0,\n      \"source\": \"...\"\n    }\n  ]\n}"
+)
+
+SYSTEM_PROMPT = (
+    "You are an expert at analyzing meeting transcripts. You are given one transcript and one task: "
+    "either extracting action items as JSON or writing meeting minutes.\n\n"
+    "General rules:\n"
+    "- Only use information present in the transcript. Do NOT hallucinate.\n"
+    "- Lines may be prefixed with the speaker (\"Name: ...\"). When a speaker commits to a task themselves (\"I'll send it\"), the owner is that speaker.\n\n"
+    "Action item extraction:\n"
+    "- Extract only explicit action items or tasks mentioned in the transcript.\n"
+    "- Each task must be a single concise one-line description (preferably under 140 characters).\n"
+    "- Identify responsible person if mentioned (owner). If not clearly stated, set owner to null.\n"
+    "- Identify a deadline if mentioned and normalize to YYYY-MM-DD; otherwise null.\n"
+    "- Assign priority: one of \"low\"|\"medium\"|\"high\"|\"critical\". Default to \"medium\" when unclear.\n"
+    "- Provide a confidence score between 0.0 and 1.0.\n"
+    "- In source, copy the transcript words where the task is discussed verbatim (at most 25 words).\n"
+    "- Return ONLY valid JSON in this exact format (no extra text):\n"
+    f"{_TASK_FORMAT}\n"
+    "- If there are no action items, return {\"tasks\": []}. Be conservative and prefer omitting unclear items.\n\n"
+    "Meeting minutes:\n"
+    "- Respond with short bullet points under these headings (if present): Attendees, Decisions, Action Items (one-line per item), Key Takeaways.\n"
+    "- Action items must be one-line, start with a verb, and be under 140 characters. Do not add any tasks not present in the transcript."
+)
+
+EXTRACTION_TASK = "Task: extract all explicit action items from the transcript above. Return only JSON as instructed."
+SUMMARY_TASK = "Task: produce concise meeting minutes from the transcript above."
+
+# Version 1 (previous layout)
+_V1_EXTRACTION_SYSTEM = (
+    "You are an expert at analyzing meeting transcripts and extracting clear, actionable tasks.\n\n"
+    "Requirements:\n"
+    "- Extract only explicit action items or tasks mentioned in the transcript. Do NOT hallucinate.\n"
+    "- Each task must be a single concise one-line description (preferably under 140 characters).\n"
+    "- Identify responsible person if mentioned (owner). If not clearly stated, set owner to null.\n"
+    "- Lines may be prefixed with the speaker (\"Name: ...\"). When a speaker commits to a task themselves (\"I'll send it\"), the owner is that speaker.\n"
+    "- Identify a deadline if mentioned and normalize to YYYY-MM-DD; otherwise null.\n"
+    "- Assign priority: one of \"low\"|\"medium\"|\"high\"|\"critical\". Default to \"medium\" when unclear.\n"
+    "- Provide a confidence score between 0.0 and 1.0.\n"
+    "- In source, copy the transcript words where the task is discussed verbatim (at most 25 words).\n\n"
+    "Return ONLY valid JSON in this exact format (no extra text):\n"
+    f"{_TASK_FORMAT}\n\n"
+    "If there are no action items, return {\"tasks\": []}. Be conservative and prefer omitting unclear items."
+)
+_V1_SUMMARY_SYSTEM = "You are an assistant that summarizes meeting transcripts into concise minutes with bullets."
+
+
+def prompt_version() -> str:
+    version = str(getattr(settings, "PROMPT_VERSION", LATEST_VERSION) or LATEST_VERSION)
+    if version not in ("1", "2"):
+        raise ValueError(f"Unknown PROMPT_VERSION '{version}' (expected 1 or 2)")
+    return version
+
+
+def transcript_message(transcript: str) -> Dict[str, str]:
+    return {"role": "user", "content": f"Transcript:\n{transcript[:TRANSCRIPT_CHARS]}"}
+
+
+def extraction_messages(transcript: str) -> List[Dict[str, str]]:
+    if prompt_version() == "1":
+        sample = transcript if len(transcript) < 20000 else transcript[:20000]
+        return [
+            {"role": "system", "content": _V1_EXTRACTION_SYSTEM},
+            {"role": "user", "content": (
+                "Analyze the following meeting transcript and extract all explicit action items. "
+                f"Return only JSON as instructed in the system prompt.\n\nTranscript:\n{sample}"
+            )},
+        ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        transcript_message(transcript),
+        {"role": "user", "content": EXTRACTION_TASK},
+    ]
+
+
+def summary_messages(transcript: str) -> List[Dict[str, str]]:
+    if prompt_version() == "1":
+        sample = transcript if len(transcript) < 12000 else transcript[:12000]
+        return [
+            {"role": "system", "content": _V1_SUMMARY_SYSTEM},
+            {"role": "user", "content": (
+                "Produce concise meeting minutes from the transcript below. Respond with short bullet points under these headings (if present): Attendees, Decisions, Action Items (one-line per item), Key Takeaways. "
+                "Action items must be one-line, start with a verb, and be under 140 characters. Do not add any tasks not present in the transcript. "
+                f"Transcript:\n{sample}"
+            )},
+        ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        transcript_message(transcript),
+        {"role": "user", "content": SUMMARY_TASK},
+    ]
@@ -0,0 +1,175 @@
+"""
+Segment offset index over a transcript
+Built once per transcript so every action item can be mapped back to where
+it was discussed (character span + timestamps) and its surrounding segment
+window sliced without rescanning the text.
+"""
+import re
+from bisect import bisect_right
+from typing import List, Dict, Any, Optional
+
+_SENTENCE_RE = re.compile(r"[^.!?\n]+[.!?]*")
+_WORD_RE = re.compile(r"[a-z0-9']{3,}")
+_SPEAKER_PREFIX_RE = re.compile(r"[^:\n]{1,40}: ")
+
+
+def format_timestamp(seconds: Optional[float]) -> Optional[str]:
+    if seconds is None:
+        return None
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:d}:{secs:02d}"
+
+
+def _segment_dict(seg: Any) -> Dict[str, Any]:
+    """Whisper API segments are pydantic models, local/diarized ones dicts"""
+    if not isinstance(seg, dict):
+        seg = seg.model_dump() if hasattr(seg, "model_dump") else vars(seg)
+    return seg
+
+
+class TranscriptIndex:
+    """
+    Units (Whisper segments when available, otherwise sentences) with their
+    character offsets in the transcript text and, for segments, start/end
+    times in seconds.
+
+    Lookups are a bisect over unit start offsets; excerpts are plain slices
+    of the original text between precomputed unit boundaries.
+    """
+
+    def __init__(self, text: str, segments: Optional[List[Any]] = None):
+        self.text = text or ""
+        self.char_starts: List[int] = []
+        self.char_ends: List[int] = []
+        self.times: List[Optional[tuple]] = []
+        self._words: List[set] = []
+        self._lowered = self.text.lower()
+
+        if segments:
+            self._index_segments([_segment_dict(s) for s in segments])
+        if not self.char_starts:
+            self._index_sentences()
+
+    def __len__(self) -> int:
+        return len(self.char_starts)
+
+    def _add(self, start: int, end: int, times: Optional[tuple]):
+        self.char_starts.append(start)
+        self.char_ends.append(end)
+        self.times.append(times)
+        self._words.append(set(_WORD_RE.findall(self.text[start:end].lower())))
+
+    def _index_segments(self, segments: List[Dict[str, Any]]):
+        """
+        Locate each segment's text in the transcript, scanning forward from
+        the previous match (segments are in order; speaker prefixes and
+        joining whitespace sit between them).
+        """
+        cursor = 0
+        for seg in segments:
+            seg_text = (seg.get("text") or "").strip()
+            if not seg_text:
+                continue
+            pos = self.text.find(seg_text, cursor)
+            if pos < 0:
+                # Transcript was edited or normalized; sentence units instead
+                self.char_starts, self.char_ends, self.times, self._words = [], [], [], []
+                return
+            times = (float(seg.get("start", 0.0)), float(seg.get("end", 0.0)))
+            self._add(pos, pos + len(seg_text), times)
+            cursor = pos + len(seg_text)
+
+    def _index_sentences(self):
+        for m in _SENTENCE_RE.finditer(self.text):
+            if m.group().strip():
+                start = m.start() + (len(m.group()) - len(m.group().lstrip()))
+                self._add(start, m.end(), None)
+
+    def unit_at(self, offset: int) -> int:
+        """Index of the unit containing (or preceding) a character offset"""
+        return max(0, bisect_right(self.char_starts, offset) - 1)
+
+    def locate(self, quote: Optional[str], fallback: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Source span for an action item: the exact position of `quote` (the
+        verbatim words the LLM cited) when it occurs in the text, otherwise
+        the unit sharing the most words with `quote` or `fallback`.
+        """
+        if not self.char_starts:
+            return None
+
+        for probe in (quote, fallback):
+            probe = (probe or "").strip()
+            if len(probe) < 8:
+                continue
+            pos = self.text.find(probe)
+            if pos < 0:
+                pos = self._lowered.find(probe.lower())
+            if pos >= 0:
+                return self.span(pos, pos + len(probe))
+
+        wanted = set(_WORD_RE.findall(f"{quote or ''} {fallback or ''}".lower()))
+        if not wanted:
+            return None
+        scores = [len(wanted & words) for words in self._words]
+        best = max(range(len(scores)), key=scores.__getitem__)
+        if scores[best] == 0:
+            return None
+        return self.span(self.char_starts[best], self.char_ends[best])
+
+    def span(self, char_start: int, char_end: int) -> Dict[str, Any]:
+        """Character span widened to whole units, with timestamps when known"""
+        first = self.unit_at(char_start)
+        last = max(first, self.unit_at(max(char_start, char_end - 1)))
+        span = {
+            "char_start": self.char_starts[first],
+            "char_end": self.char_ends[last],
+            "unit_start": first,
+            "unit_end": last,
+        }
+        if self.times[first] is not None and self.times[last] is not None:
+            span["start"] = round(self.times[first][0], 2)
+            span["end"] = round(self.times[last][1], 2)
+        return span
+
+    def _line_start(self, offset: int) -> int:
+        """Include a "Speaker: " prefix when the unit starts a speaker-tagged line"""
+        line_start = self.text.rfind("\n", 0, offset) + 1
+        if _SPEAKER_PREFIX_RE.fullmatch(self.text, line_start, offset):
+            return line_start
+        return offset
+
+    def excerpt(self, span: Optional[Dict[str, Any]], max_chars: int = 800) -> Dict[str, Any]:
+        """
+        The span plus neighbouring units on both sides while they fit in
+        `max_chars`. Without a span, the start of the transcript.
+        """
+        if not self.char_starts:
+            return {"text": self.text[:max_chars]}
+
+        lo = span["unit_start"] if span else 0
+        hi = span["unit_end"] if span else 0
+        while True:
+            grown = False
+            if lo > 0 and self.char_ends[hi] - self.char_starts[lo - 1] <= max_chars:
+                lo, grown = lo - 1, True
+            if hi < len(self.char_starts) - 1 and self.char_ends[hi + 1] - self.char_starts[lo] <= max_chars:
+                hi, grown = hi + 1, True
+            if not grown:
+                break
+
+        char_start = self._line_start(self.char_starts[lo])
+        text = self.text[char_start:self.char_ends[hi]].strip()
+        if len(text) > max_chars:
+            text = text[:max_chars - 3].rstrip() + "..."
+        excerpt = {
+            "text": f"{'...' if lo > 0 else ''}{text}{'...' if hi < len(self.char_starts) - 1 else ''}",
+            "char_start": char_start,
+            "char_end": self.char_ends[hi],
+        }
+        if self.times[lo] is not None and self.times[hi] is not None:
+            excerpt["start"] = round(self.times[lo][0], 2)
+            excerpt["end"] = round(self.times[hi][1], 2)
+        return excerpt
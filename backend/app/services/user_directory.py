@@ -0,0 +1,308 @@
+"""
+Local mirror of assignable Jira users per project
+Owner strings from action items ("alice", "Bob S.", "carol@acme.io") are
+resolved against an in-memory index instead of Jira's user search, which
+costs up to two round trips per task and simply takes the first hit.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+from app.config import settings
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+# A fuzzy match must beat the runner-up by this much, otherwise the owner is
+# ambiguous ("Alex" with two Alexes on the team) and is left unassigned
+AMBIGUITY_MARGIN = 0.1
+
+# Keys scored per fuzzy query (ranked by shared trigram count first)
+CANDIDATES = 32
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s@.+-]", "", text.lower())).strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class UserIndex:
+    """
+    Immutable lookup structure over one project's users.
+
+    Every user contributes a few keys: full display name, email, email local
+    part, first and last name. Exact key hits win outright; otherwise keys
+    are scored by trigram Dice similarity using an inverted index, so a
+    query only touches keys that share at least one trigram with it.
+    """
+
+    def __init__(self, users: List[Dict[str, Any]]):
+        self.users = users
+        self._exact: Dict[str, int] = {}
+        self._key_user: List[int] = []
+        self._key_size: List[int] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+        for user_idx, user in enumerate(users):
+            for key in self._keys(user):
+                # A key shared by two people (e.g. a first name) is ambiguous
+                owner = self._exact.get(key, user_idx)
+                self._exact[key] = user_idx if owner == user_idx else -1
+
+                key_idx = len(self._key_user)
+                grams = _trigrams(key)
+                self._key_user.append(user_idx)
+                self._key_size.append(len(grams))
+                for gram in grams:
+                    self._postings[gram].append(key_idx)
+        self._postings = dict(self._postings)
+
+    @staticmethod
+    def _keys(user: Dict[str, Any]) -> set:
+        keys = set()
+        name = _normalize(user.get("displayName"))
+        if name:
+            keys.add(name)
+            parts = name.split(" ")
+            if len(parts) > 1:
+                keys.update((parts[0], parts[-1]))
+        email = _normalize(user.get("emailAddress"))
+        if email:
+            keys.add(email)
+            keys.add(email.split("@")[0])
+        keys.discard("")
+        return keys
+
+    def match(self, query: str, min_score: float = 0.6) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Best matching user and its score, or (None, score) if below threshold or ambiguous"""
+        query = _normalize(query)
+        if not query:
+            return None, 0.0
+
+        exact = self._exact.get(query)
+        if exact is not None:
+            return (self.users[exact], 1.0) if exact >= 0 else (None, 1.0)
+        if "@" in query:
+            # Emails must match exactly; a near miss is somebody else
+            return None, 0.0
+
+        grams = _trigrams(query)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self._postings.get(gram, ()))
+
+        # Only the keys sharing the most trigrams can have the best Dice score
+        best: Dict[int, float] = {}
+        for key_idx, shared in overlap.most_common(CANDIDATES):
+            score = 2.0 * shared / (len(grams) + self._key_size[key_idx])
+            user_idx = self._key_user[key_idx]
+            if score > best.get(user_idx, 0.0):
+                best[user_idx] = score
+        if not best:
+            return None, 0.0
+
+        ranked = sorted(best.items(), key=lambda kv: kv[1], reverse=True)
+        top_idx, top_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if top_score < min_score or top_score - runner_up < AMBIGUITY_MARGIN:
+            return None, top_score
+        return self.users[top_idx], top_score
+
+
+class _ProjectMirror:
+    __slots__ = ("index", "fingerprint", "synced_at", "refreshing", "jira_service")
+
+    def __init__(self):
+        self.index: Optional[UserIndex] = None
+        self.fingerprint = ""
+        self.synced_at = 0.0
+        self.refreshing = False
+        self.jira_service = None
+
+
+class UserDirectory:
+    """
+    Per-project mirrors of Jira's assignable users.
+
+    - lookup() never calls Jira: it answers from the index, or reports
+      "not loaded" so the caller can fall back to a live search while the
+      first sync runs in the background. A miss (as opposed to an ambiguous
+      match) is reported with a score below ``min_score``, so the caller can
+      also search live for users added since the last sync
+    - mirrors older than ``ttl_seconds`` are re-synced by a background
+      thread; the old index keeps serving until the new one is swapped in,
+      and the index is only rebuilt (and the snapshot rewritten) when the
+      user list actually changed
+    - snapshots are kept under ``directory`` so restarts start warm
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = 900.0, min_score: float = 0.6, page_size: int = 1000):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.min_score = min_score
+        self.page_size = page_size
+        self._mirrors: Dict[str, _ProjectMirror] = {}
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _mirror_key(base_url: str, project_key: str) -> str:
+        return f"{(base_url or '').rstrip('/')}|{project_key.upper()}"
+
+    def _path(self, mirror_key: str) -> str:
+        digest = hashlib.sha1(mirror_key.encode("utf-8")).hexdigest()[:16]
+        project = re.sub(r"[^A-Za-z0-9_-]", "_", mirror_key.rsplit("|", 1)[-1])
+        return os.path.join(self.directory, f"{project}-{digest}.json")
+
+    def _mirror(self, mirror_key: str) -> _ProjectMirror:
+        """Mirror for a project, loaded from its snapshot on first use (caller holds the lock)"""
+        mirror = self._mirrors.get(mirror_key)
+        if mirror is None:
+            mirror = _ProjectMirror()
+            path = self._path(mirror_key)
+            if os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        snapshot = json.load(f)
+                    mirror.index = UserIndex(snapshot["users"])
+                    mirror.fingerprint = snapshot.get("fingerprint", "")
+                    mirror.synced_at = float(snapshot.get("synced_at", 0.0))
+                except Exception as e:
+                    logger.warning("Ignoring unreadable user directory snapshot %s: %s", path, e, extra={"stage": "user_directory"})
+            self._mirrors[mirror_key] = mirror
+        return mirror
+
+    def lookup(self, jira_service, project_key: str, query: str) -> Tuple[bool, Optional[str], float]:
+        """
+        Resolve an owner string to an accountId from the local mirror.
+
+        Returns:
+            (loaded, account_id, score). ``loaded`` is False while the project
+            has never been synced; a sync is then started in the background.
+        """
+        mirror_key = self._mirror_key(jira_service.base_url, project_key)
+        with self._lock:
+            mirror = self._mirror(mirror_key)
+            mirror.jira_service = jira_service
+            index = mirror.index
+            stale = time.time() - mirror.synced_at > self.ttl_seconds
+        if stale:
+            self._schedule_refresh(mirror_key)
+        if index is None:
+            return False, None, 0.0
+
+        user, score = index.match(query, self.min_score)
+        return True, (user.get("accountId") if user else None), score
+
+    def _schedule_refresh(self, mirror_key: str):
+        with self._lock:
+            mirror = self._mirrors[mirror_key]
+            if mirror.refreshing:
+                return
+            mirror.refreshing = True
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="jira-user-directory", daemon=True)
+                self._refresher.start()
+        threading.Thread(target=self._refresh_safely, args=(mirror_key,), daemon=True).start()
+
+    def _refresh_loop(self):
+        """Keep every project that has been looked up fresh, even when idle"""
+        while True:
+            time.sleep(max(self.ttl_seconds / 4, 5.0))
+            with self._lock:
+                due = [key for key, mirror in self._mirrors.items()
+                       if mirror.jira_service is not None
+                       and time.time() - mirror.synced_at > self.ttl_seconds]
+            for mirror_key in due:
+                self._schedule_refresh(mirror_key)
+
+    def _refresh_safely(self, mirror_key: str):
+        try:
+            self.refresh(mirror_key)
+        except Exception as e:
+            logger.warning("User directory sync failed for %s: %s", mirror_key, e,
+                           extra={"stage": "user_directory", "rate_limit": "user_directory.sync"})
+        finally:
+            with self._lock:
+                self._mirrors[mirror_key].refreshing = False
+
+    def refresh(self, mirror_key: str) -> int:
+        """Fetch all assignable users for a project and swap in a new index; returns the user count"""
+        with self._lock:
+            mirror = self._mirrors[mirror_key]
+            jira_service = mirror.jira_service
+        project_key = mirror_key.rsplit("|", 1)[-1]
+
+        users, start_at = [], 0
+        while True:
+            page = jira_service.list_assignable_users(project_key, start_at=start_at, max_results=self.page_size)
+            users.extend(
+                {
+                    "accountId": u.get("accountId"),
+                    "displayName": u.get("displayName"),
+                    "emailAddress": u.get("emailAddress"),
+                }
+                for u in page
+                if u.get("accountId") and u.get("active", True) and u.get("accountType", "atlassian") == "atlassian"
+            )
+            # Jira may return fewer than maxResults before the end (it caps
+            # page sizes and filters after paging), so only an empty page ends it
+            if not page:
+                break
+            start_at += len(page)
+
+        users.sort(key=lambda u: u["accountId"])
+        fingerprint = hashlib.sha1(json.dumps(users, sort_keys=True).encode("utf-8")).hexdigest()
+        synced_at = time.time()
+
+        with self._lock:
+            if fingerprint == mirror.fingerprint and mirror.index is not None:
+                mirror.synced_at = synced_at
+                return len(users)
+
+        index = UserIndex(users)
+        with self._lock:
+            mirror.index = index
+            mirror.fingerprint = fingerprint
+            mirror.synced_at = synced_at
+
+        path = self._path(mirror_key)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"synced_at": synced_at, "fingerprint": fingerprint, "users": users}, f)
+        os.replace(tmp, path)
+        return len(users)
+
+
+# Lazily constructed singleton
+_UNSET = object()
+_user_directory = _UNSET
+_user_directory_lock = threading.Lock()
+
+
+def get_user_directory() -> Optional[UserDirectory]:
+    """Shared UserDirectory, or None when ENABLE_USER_DIRECTORY is off"""
+    global _user_directory
+    if _user_directory is _UNSET:
+        with _user_directory_lock:
+            if _user_directory is _UNSET:
+                directory = None
+                if getattr(settings, "ENABLE_USER_DIRECTORY", True):
+                    directory = UserDirectory(
+                        getattr(settings, "USER_DIRECTORY_DIR", "./data/jira_users"),
+                        ttl_seconds=float(getattr(settings, "USER_DIRECTORY_TTL_SECONDS", 900)),
+                        min_score=float(getattr(settings, "USER_MATCH_MIN_SCORE", 0.6))
+                    )
+                _user_directory = directory
+    return _user_directory
@@ -0,0 +1,537 @@
+"""
+Local vector index for "similar past action items" lookups
+Uses hashed TF-IDF embeddings (no model download) and a memory-mapped,
+IVF-partitioned NumPy store for approximate nearest-neighbour search.
+Rows keep term frequencies only; IDF weights are applied at query time, so
+scores don't depend on when an item was added.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from app.config import settings
+from app.logs import get_logger
+
+# fcntl is POSIX-only; without it the index is safe within one process only
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# NumPy is optional - without it the similarity lookup is simply disabled
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+logger = get_logger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """
+    Hashed TF-IDF embedder.
+
+    Word unigrams, word bigrams and character trigrams are hashed (crc32,
+    stable across processes) into a fixed number of signed buckets. Character
+    n-grams make the vectors tolerant to inflections and small paraphrases
+    ("update the docs" vs "updating documentation").
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def features(self, text: str) -> List[str]:
+        words = _TOKEN_RE.findall((text or "").lower())
+        feats = [f"w:{w}" for w in words]
+        feats += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"#{w}#"
+            feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return feats
+
+    def term_frequencies(self, text: str) -> "np.ndarray":
+        """Signed, sublinear term-frequency vector (before IDF weighting)"""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in self.features(text):
+            h = zlib.crc32(feat.encode("utf-8"))
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            vec[h % self.dim] += sign
+        np.copysign(np.log1p(np.abs(vec)), vec, out=vec)
+        return vec
+
+
+class ActionItemIndex:
+    """
+    Append-only, memory-mapped vector index over past action items.
+
+    Layout of the index directory:
+    - vectors.i8    (capacity x dim) int8 memmap of term-frequency rows,
+                    each scaled to a max of 127 (IDF and length
+                    normalization are applied when searching)
+    - lists.i32     IVF list id per row (-1 until the quantizer is trained)
+    - centroids.npy IVF coarse quantizer
+    - df.npy        per-bucket document frequencies for IDF weighting
+    - meta.jsonl    one JSON record per row; byte offsets kept in meta.u64
+    - state.json    row count, capacity, dimension and the row count the
+                    quantizer was last trained at
+    - index.lock    flock()ed by every reader (shared) and writer (exclusive)
+
+    Every gunicorn worker opens the same directory. Writers hold the
+    exclusive lock and reload state.json first, so each append starts from
+    the rows other workers wrote; readers pick those rows up the same way.
+
+    Until TRAIN_SIZE rows exist, search is exact (brute force). After that a
+    k-means coarse quantizer partitions the rows into up to ``n_lists``
+    inverted lists (4 per square root of the row count) and only the
+    ``n_probe`` closest lists are scanned, which keeps top-k lookups in the
+    low milliseconds at a million rows (benchmarks/vector_index_benchmark.py).
+    The quantizer is retrained each time the row count doubles, so lists
+    don't grow lopsided as the corpus drifts away from the first sample.
+    """
+
+    TRAIN_SIZE = 20000
+    INITIAL_CAPACITY = 4096
+
+    def __init__(
+        self,
+        directory: str,
+        dim: int = 256,
+        n_lists: int = 1024,
+        n_probe: int = 8
+    ):
+        if not NUMPY_AVAILABLE:
+            raise ValueError("NumPy package not installed. Install with: pip install numpy")
+
+        self.directory = directory
+        self.dim = dim
+        self.max_lists = n_lists
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.embedder = HashingEmbedder(dim)
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._state_path = os.path.join(directory, "state.json")
+        self._meta_path = os.path.join(directory, "meta.jsonl")
+        self._lock_path = os.path.join(directory, "index.lock")
+        self._state_stamp = None
+        with self._lock, self._process_lock(exclusive=False):
+            self._load()
+        if self._legacy:
+            with self._lock, self._process_lock(exclusive=True):
+                self._load()
+                if self._legacy:
+                    self._migrate()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _process_lock(self, exclusive: bool):
+        """flock() on index.lock, shared between the workers using this directory"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stamp(self):
+        """Identity of the current state.json (replaced atomically on every write)"""
+        try:
+            st = os.stat(self._state_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self):
+        self._state_stamp = self._stamp()
+        state = {"count": 0, "capacity": self.INITIAL_CAPACITY, "dim": self.dim, "n_docs": 0}
+        if self._state_stamp is not None:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                state.update(json.load(f))
+            if state["dim"] != self.dim:
+                raise ValueError(
+                    f"Index at {self.directory} has dim={state['dim']}, expected {self.dim}"
+                )
+
+        self.count = state["count"]
+        self.capacity = state["capacity"]
+        self.n_docs = state["n_docs"]
+        self.trained = state.get("trained", 0)
+        # Indexes written before rows kept plain term frequencies (vectors.f16)
+        self._legacy = self.count > 0 and state.get("rows") != "tf"
+        self._open_arrays()
+
+        df_path = self._path("df.npy")
+        self.df = np.load(df_path) if os.path.exists(df_path) else np.zeros(self.dim, dtype=np.float64)
+
+        centroids_path = self._path("centroids.npy")
+        self.centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        if self.centroids is not None:
+            self.n_lists = len(self.centroids)
+        self._rebuild_lists()
+
+    def _refresh(self):
+        """
+        Pick up rows appended by other processes (call under the process
+        lock): re-read state.json when it changed and index the new rows.
+        """
+        stamp = self._stamp()
+        if stamp == self._state_stamp:
+            return
+        previous_count = self.count
+        with open(self._state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self._state_stamp = stamp
+        self.count = state["count"]
+        self.n_docs = state["n_docs"]
+        if state["capacity"] != self.capacity:
+            self.capacity = state["capacity"]
+            self._open_arrays()
+        df_path = self._path("df.npy")
+        if os.path.exists(df_path):
+            self.df = np.load(df_path)
+        if state.get("trained", 0) != self.trained:
+            # Another process (re)trained the quantizer and re-assigned every row
+            self.trained = state["trained"]
+            self.centroids = np.load(self._path("centroids.npy"))
+            self.n_lists = len(self.centroids)
+            self._rebuild_lists()
+        elif self.count > previous_count:
+            self._index_rows(previous_count, self.count)
+
+    def _open_arrays(self):
+        self.vectors = self._open_memmap("vectors.i8", np.int8, (self.capacity, self.dim))
+        self.list_ids = self._open_memmap("lists.i32", np.int32, (self.capacity,), fill=-1)
+        self.meta_offsets = self._open_memmap("meta.u64", np.uint64, (self.capacity,))
+
+    def _open_memmap(self, name: str, dtype, shape, fill=0):
+        path = self._path(name)
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        existing = os.path.getsize(path) if os.path.exists(path) else 0
+        if existing < nbytes:
+            with open(path, "ab") as f:
+                if fill:
+                    pad = np.full((nbytes - existing) // np.dtype(dtype).itemsize, fill, dtype=dtype)
+                    f.write(pad.tobytes())
+                else:
+                    f.truncate(nbytes)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _grow(self, needed: int):
+        if needed <= self.capacity:
+            return
+        new_capacity = self.capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+        for arr in (self.vectors, self.list_ids, self.meta_offsets):
+            arr.flush()
+        self.capacity = new_capacity
+        self._open_arrays()
+
+    def _save_state(self):
+        self.vectors.flush()
+        self.list_ids.flush()
+        self.meta_offsets.flush()
+        # Written under the exclusive process lock; the pid keeps a writer
+        # that lost its lock (no fcntl) from clobbering another's temp file
+        df_tmp = self._path(f"df.{os.getpid()}.tmp.npy")
+        np.save(df_tmp, self.df)
+        os.replace(df_tmp, self._path("df.npy"))
+        tmp = f"{self._state_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "count": self.count,
+                "capacity": self.capacity,
+                "dim": self.dim,
+                "n_docs": self.n_docs,
+                "trained": self.trained,
+                "rows": "tf",
+            }, f)
+        os.replace(tmp, self._state_path)
+        self._state_stamp = self._stamp()
+
+    def _rebuild_lists(self):
+        """Group row ids by IVF list (once at load and after training)"""
+        self._lists = None
+        if self.centroids is None:
+            return
+        self._lists = [array("q") for _ in range(self.n_lists)]
+        self._index_rows(0, self.count)
+
+    def _index_rows(self, start: int, stop: int):
+        """Append rows [start, stop) to their IVF lists"""
+        if self._lists is None or stop <= start:
+            return
+        ids = np.asarray(self.list_ids[start:stop])
+        for offset, list_id in enumerate(ids.tolist()):
+            if list_id >= 0:
+                self._lists[list_id].append(start + offset)
+
+    # ------------------------------------------------------------------
+    # Embedding
+    # ------------------------------------------------------------------
+    def _idf(self) -> "np.ndarray":
+        return np.log((1.0 + self.n_docs) / (1.0 + self.df)).astype(np.float32) + 1.0
+
+    def _weigh(self, tf: "np.ndarray") -> "np.ndarray":
+        """Term-frequency row(s) -> L2-normalized TF-IDF with the current document frequencies"""
+        vec = np.asarray(tf, dtype=np.float32) * self._idf()
+        norm = np.linalg.norm(vec, axis=-1, keepdims=True)
+        return vec / np.maximum(norm, 1e-12)
+
+    def _scores(self, stored: "np.ndarray", query: "np.ndarray") -> "np.ndarray":
+        """
+        Cosine similarity between stored rows, weighted with the current
+        IDF, and an embedded query. Same as ``_weigh(stored) @ query``
+        without materializing the weighted rows: tf.(idf*q) / |tf*idf|.
+        """
+        idf = self._idf()
+        rows = stored.astype(np.float32)
+        dots = rows @ (idf * query)
+        norms = np.sqrt(np.square(rows, out=rows) @ (idf * idf))
+        return dots / np.maximum(norms, 1e-12)
+
+    def embed(self, text: str) -> "np.ndarray":
+        """L2-normalized TF-IDF vector using the current document frequencies"""
+        return self._weigh(self.embedder.term_frequencies(text))
+
+    def _stored_row(self, text: str) -> "np.ndarray":
+        """
+        What vectors.i8 keeps for `text`: its term frequencies scaled to a
+        max of 127. Scores are scale-invariant, so no per-row scale is kept.
+        """
+        tf = self.embedder.term_frequencies(text)
+        peak = np.max(np.abs(tf))
+        return np.rint(tf * (127.0 / peak) if peak > 0 else tf).astype(np.int8)
+
+    # ------------------------------------------------------------------
+    # Write path
+    # ------------------------------------------------------------------
+    def add(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Store action items so later meetings can find them
+
+        Args:
+            items: Task dicts (at least ``description``; ``owner`` and any
+                   other JSON-serializable fields are kept as metadata)
+        """
+        items = [i for i in items if (i.get("description") or "").strip()]
+        if not items:
+            return
+
+        with self._lock, self._process_lock(exclusive=True):
+            self._refresh()
+            first_row = self.count
+            self._grow(self.count + len(items))
+            for item in items:
+                tf = self.embedder.term_frequencies(item["description"])
+                self.df += (tf != 0)
+                self.n_docs += 1
+
+            with open(self._meta_path, "ab") as meta_file:
+                for item in items:
+                    row = self.count
+                    record = {
+                        "description": item.get("description"),
+                        "owner": item.get("owner"),
+                        "deadline": item.get("deadline"),
+                        "priority": item.get("priority"),
+                        "issue_key": item.get("issue_key"),
+                        "created_at": time.time(),
+                    }
+                    self.meta_offsets[row] = meta_file.tell()
+                    meta_file.write(json.dumps(record).encode("utf-8") + b"\n")
+
+                    self.vectors[row] = self._stored_row(item["description"])
+                    if self.centroids is not None:
+                        self.list_ids[row] = int(np.argmax(self.centroids @ self.embed(item["description"])))
+                    self.count += 1
+
+            if self.count >= self.TRAIN_SIZE and (self.centroids is None or self.count >= 2 * self.trained):
+                self._train()
+            else:
+                self._index_rows(first_row, self.count)
+            self._save_state()
+
+    def _train(self, iterations: int = 10):
+        """
+        Fit the IVF coarse quantizer with a few rounds of spherical k-means
+        on TF-IDF rows weighted with the current document frequencies, and
+        re-assign every row
+        """
+        rng = np.random.default_rng(0)
+        n_lists = max(1, min(self.max_lists, int(4 * math.sqrt(self.count))))
+        sample_size = min(self.count, max(n_lists * 40, self.TRAIN_SIZE))
+        sample_rows = np.sort(rng.choice(self.count, size=sample_size, replace=False))
+        sample = self._weigh(self.vectors[sample_rows])
+
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.maximum(norms, 1e-12)
+
+        self.n_lists = n_lists
+        self.centroids = centroids
+        self.trained = self.count
+        tmp = self._path(f"centroids.{os.getpid()}.tmp.npy")
+        np.save(tmp, centroids)
+        os.replace(tmp, self._path("centroids.npy"))
+
+        block = 65536
+        for start in range(0, self.count, block):
+            stop = min(start + block, self.count)
+            chunk = self._weigh(self.vectors[start:stop])
+            self.list_ids[start:stop] = np.argmax(chunk @ centroids.T, axis=1)
+        self._rebuild_lists()
+        logger.info("Trained the action item index quantizer", extra={
+            "stage": "similar_items", "rows": self.count, "lists": n_lists
+        })
+
+    def _migrate(self):
+        """
+        Rewrite rows stored as IDF-weighted float16 vectors (indexes from
+        before query-time IDF) as term frequencies re-embedded from meta.jsonl
+        """
+        with open(self._meta_path, "rb") as f:
+            for row in range(self.count):
+                f.seek(int(self.meta_offsets[row]))
+                self.vectors[row] = self._stored_row(json.loads(f.readline()).get("description") or "")
+        if self.count >= self.TRAIN_SIZE:
+            self._train()
+        self._legacy = False
+        self._save_state()
+        legacy_vectors = self._path("vectors.f16")
+        if os.path.exists(legacy_vectors):
+            os.remove(legacy_vectors)
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+    def _candidate_rows(self, query: "np.ndarray") -> "np.ndarray":
+        if self._lists is None:
+            return np.arange(self.count)
+        probe = min(self.n_probe, self.n_lists)
+        closest = np.argpartition(-(self.centroids @ query), probe - 1)[:probe]
+        parts = [np.array(self._lists[c], dtype=np.int64) for c in closest]
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        rows.sort()  # sequential access pattern over the memmap
+        return rows
+
+    def _read_meta(self, rows) -> List[Dict[str, Any]]:
+        out = []
+        with open(self._meta_path, "rb") as f:
+            for row in rows:
+                f.seek(int(self.meta_offsets[row]))
+                out.append(json.loads(f.readline()))
+        return out
+
+    def search(self, text: str, k: int = 5, min_score: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Return the ``k`` most similar stored action items
+
+        Returns:
+            List of metadata dicts with an added ``score`` (cosine similarity)
+        """
+        with self._lock, self._process_lock(exclusive=False):
+            self._refresh()
+            if self.count == 0 or not (text or "").strip():
+                return []
+            query = self.embed(text)
+            rows = self._candidate_rows(query)
+            if len(rows) == 0:
+                return []
+            # Cosine similarity of TF-IDF rows, weighted with today's IDF
+            scores = self._scores(self.vectors[rows], query)
+
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            top = [i for i in top if scores[i] >= min_score]
+
+            results = self._read_meta(rows[top])
+            for result, i in zip(results, top):
+                result["score"] = round(float(scores[i]), 3)
+            return results
+
+    def annotate(
+        self,
+        tasks: List[Dict[str, Any]],
+        k: int = 3,
+        min_score: float = 0.35,
+        assigned_score: float = 0.8
+    ) -> List[Dict[str, Any]]:
+        """
+        Attach ``similar_items`` and ``previously_assigned_to`` to each task
+
+        ``previously_assigned_to`` is the owner of the closest past item when
+        it is near-identical (score >= ``assigned_score``), answering "has this
+        been assigned before?".
+        """
+        for task in tasks:
+            similar = self.search(task.get("description", ""), k=k, min_score=min_score)
+            task["similar_items"] = similar
+            task["previously_assigned_to"] = next(
+                (s["owner"] for s in similar if s.get("owner") and s["score"] >= assigned_score),
+                None
+            )
+        return tasks
+
+
+# Lazily constructed singleton (see get_action_item_index)
+_UNSET = object()
+_action_item_index = _UNSET
+_action_item_index_lock = threading.Lock()
+
+
+def get_action_item_index() -> Optional[ActionItemIndex]:
+    """Return the shared index, opening it on first use (None if disabled)"""
+    global _action_item_index
+    if _action_item_index is _UNSET:
+        with _action_item_index_lock:
+            if _action_item_index is _UNSET:
+                index = None
+                if NUMPY_AVAILABLE and getattr(settings, "ENABLE_SIMILAR_ITEMS", True):
+                    try:
+                        index = ActionItemIndex(getattr(settings, "VECTOR_INDEX_DIR", "./data/action_index"))
+                    except Exception as e:
+                        logger.error("Could not initialize action item index: %s", e, extra={"stage": "startup"})
+                _action_item_index = index
+    return _action_item_index
+
+
+def remember_action_items(items: List[Dict[str, Any]]) -> None:
+    """
+    Add action items that became Jira issues (with their ``issue_key``) to
+    the shared index. Only created issues are remembered, so dry runs,
+    retries and resumed runs don't make items match their own copies.
+    """
+    index = get_action_item_index()
+    if not index or not items:
+        return
+    try:
+        index.add(items)
+    except Exception as e:
+        logger.warning("Could not add action items to the index: %s", e, extra={"stage": "similar_items"})
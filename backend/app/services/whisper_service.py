@@ -1,15 +1,24 @@
 """
 Whisper service for speech-to-text conversion
-Uses OpenAI Whisper API (no local installation needed)
+Uses OpenAI Whisper API (no local installation needed), with an optional
+local backend via faster-whisper
 """
+import importlib.util
+import os
+import threading
 from typing import Optional, Dict, Any
 from app.config import settings
+from app.logs import get_logger
+from app.services.compact_transcript import CompactTranscript
+from app.tracing import tracer
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+logger = get_logger(__name__)
+
+# The openai SDK is imported on first use; only check it is installed here
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+
+# Optional local transcription (pip install faster-whisper)
+FASTER_WHISPER_AVAILABLE = importlib.util.find_spec("faster_whisper") is not None
 
 
 class WhisperService:
@@ -26,24 +35,43 @@ class WhisperService:
                 "OpenAI package not installed. Install with: pip install openai"
             )
         
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        from openai import OpenAI
+        self.client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=getattr(settings, "OPENAI_BASE_URL", None)
+        )
     
-    def transcribe(self, audio_file_path: str) -> Dict[str, Any]:
+    def transcribe(self, audio_file_path: str, prompt: Optional[str] = None) -> Dict[str, Any]:
         """
         Transcribe audio file to text using OpenAI Whisper API
 
         Args:
             audio_file_path: Path to audio file
+            prompt: Optional preceding text (e.g. the previous window of a
+                    live meeting) to keep wording consistent across chunks
 
         Returns:
-            Dictionary with transcript and metadata
+            Dictionary with text, language, duration and segments (a
+            CompactTranscript; segments.verbose() rebuilds the full
+            verbose_json result)
         """
+        with tracer.start_span("whisper.transcribe", {"whisper.model": "whisper-1"}) as span:
+            return self._transcribe(audio_file_path, prompt, span)
+
+    def _transcribe(self, audio_file_path: str, prompt: Optional[str], span) -> Dict[str, Any]:
         try:
-            with open(audio_file_path, "rb") as audio_file:
+            span.set_attribute("file.size_bytes", os.path.getsize(audio_file_path))
+            request_params = {"model": "whisper-1", "response_format": "verbose_json"}
+            if prompt:
+                # Whisper only looks at the last ~224 tokens of the prompt
+                request_params["prompt"] = prompt[-800:]
+            # Pass the open file, not a Path or bytes: the SDK reads paths
+            # fully into memory, while a file object is streamed into the
+            # multipart body in 64KB chunks
+            with open(audio_file_path, "rb", buffering=0) as audio_file:
                 transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
                     file=audio_file,
-                    response_format="verbose_json"
+                    **request_params
                 )
             
             # Extract segments if available
@@ -52,21 +80,123 @@ class WhisperService:
                 segments = transcript.segments
             elif isinstance(transcript, dict) and 'segments' in transcript:
                 segments = transcript['segments']
-            
+
+            language = getattr(transcript, 'language', None)
+            duration = getattr(transcript, 'duration', None)
+            # Keep the segments column-wise and let the SDK object go
+            compact = CompactTranscript.from_segments(transcript.text, segments, language, duration)
+
+            span.set_attributes({
+                "transcript.chars": len(compact.text),
+                "transcript.segments": len(compact),
+                "audio.duration_s": duration,
+                "audio.language": language,
+            })
+
             return {
-                "text": transcript.text,
-                "language": getattr(transcript, 'language', 'unknown'),
-                "segments": segments,
-                "full_result": transcript.model_dump() if hasattr(transcript, 'model_dump') else str(transcript)
+                "text": compact.text,
+                "language": language or 'unknown',
+                "duration": duration,
+                "segments": compact,
             }
         except Exception as e:
             raise RuntimeError(f"Error transcribing audio with OpenAI Whisper: {str(e)}")
 
 
-# Initialize service if OpenAI API key is available
-whisper_service = None
-if settings.OPENAI_API_KEY and OPENAI_AVAILABLE:
-    try:
-        whisper_service = WhisperService()
-    except Exception as e:
-        print(f"Warning: Could not initialize Whisper service: {e}")
+class LocalWhisperService:
+    """Service for transcribing audio on this machine using faster-whisper (CPU)"""
+
+    def __init__(self, model_size: Optional[str] = None):
+        if not FASTER_WHISPER_AVAILABLE:
+            raise ValueError(
+                "faster-whisper package not installed. Install with: pip install faster-whisper"
+            )
+
+        from faster_whisper import WhisperModel
+        self.model_size = model_size or getattr(settings, "WHISPER_MODEL", "base")
+        self.model = WhisperModel(self.model_size, device="cpu", compute_type="int8")
+
+    def transcribe(self, audio_file_path: str, prompt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Transcribe audio file to text locally
+
+        Returns the same shape as WhisperService.transcribe.
+        """
+        with tracer.start_span("whisper.transcribe", {"whisper.model": f"local:{self.model_size}"}) as span:
+            try:
+                span.set_attribute("file.size_bytes", os.path.getsize(audio_file_path))
+                # The decoder (PyAV/ffmpeg) reads the file itself; no copy here
+                segments_iter, info = self.model.transcribe(
+                    audio_file_path,
+                    initial_prompt=prompt[-800:] if prompt else None,
+                    vad_filter=True
+                )
+                segments = list(segments_iter)
+                text = "".join(seg.text for seg in segments).strip()
+                language = getattr(info, "language", None)
+                duration = getattr(info, "duration", None)
+                compact = CompactTranscript.from_segments(text, segments, language, duration)
+                span.set_attributes({
+                    "transcript.chars": len(text),
+                    "transcript.segments": len(compact),
+                    "audio.duration_s": duration,
+                    "audio.language": language,
+                })
+                return {
+                    "text": text,
+                    "language": language or "unknown",
+                    "duration": duration,
+                    "segments": compact,
+                }
+            except Exception as e:
+                raise RuntimeError(f"Error transcribing audio with local Whisper: {str(e)}")
+
+
+# Lazily constructed singletons (see get_whisper_service / get_local_whisper_service)
+_UNSET = object()
+_whisper_service = _UNSET
+_whisper_service_lock = threading.Lock()
+
+
+def get_whisper_service() -> Optional[WhisperService]:
+    """
+    Return the shared WhisperService, constructing it on first use.
+
+    Returns None when OPENAI_API_KEY is not set or the openai package is
+    missing. Safe to call from multiple threads.
+    """
+    global _whisper_service
+    if _whisper_service is _UNSET:
+        with _whisper_service_lock:
+            if _whisper_service is _UNSET:
+                service = None
+                if settings.OPENAI_API_KEY and OPENAI_AVAILABLE:
+                    try:
+                        service = WhisperService()
+                    except Exception as e:
+                        logger.error("Could not initialize Whisper service: %s", e, extra={"stage": "startup", "provider": "openai"})
+                _whisper_service = service
+    return _whisper_service
+
+
+_local_whisper_service = _UNSET
+_local_whisper_service_lock = threading.Lock()
+
+
+def get_local_whisper_service() -> Optional[LocalWhisperService]:
+    """
+    Return the shared local (faster-whisper) service when USE_LOCAL_WHISPER
+    is enabled and the package is installed, otherwise None.
+    """
+    global _local_whisper_service
+    if _local_whisper_service is _UNSET:
+        with _local_whisper_service_lock:
+            if _local_whisper_service is _UNSET:
+                service = None
+                if getattr(settings, "USE_LOCAL_WHISPER", False) and FASTER_WHISPER_AVAILABLE:
+                    try:
+                        service = LocalWhisperService()
+                    except Exception as e:
+                        logger.error("Could not initialize local Whisper: %s", e, extra={"stage": "startup", "provider": "faster-whisper"})
+                _local_whisper_service = service
+    return _local_whisper_service
@@ -0,0 +1,410 @@
+"""
+Upload storage: disk budget for UPLOAD_DIR and a janitor for orphaned files,
+and the same for audio held by queued jobs (JOB_AUDIO_DIR, DEFERRED_AUDIO_DIR)
+"""
+import asyncio
+import io
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Any, Iterable, Optional
+from app.config import settings
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Bytes copied per read from the incoming upload to disk
+CHUNK_SIZE = 1024 * 1024
+
+
+def _spooled_fileno(fileobj) -> Optional[int]:
+    """
+    File descriptor of an upload the server already spooled to disk, or
+    None while it is still held in memory (SpooledTemporaryFile before
+    rollover) or not a real file.
+    """
+    if fileobj is None or not getattr(fileobj, "_rolled", True):
+        return None
+    try:
+        return fileobj.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def copy_file_data(src_fd: int, dst_fd: int, count: int) -> int:
+    """
+    Copy `count` bytes from the start of src_fd to dst_fd without passing
+    them through user space (copy_file_range, then sendfile), falling back
+    to buffered reads where neither is supported. Returns bytes copied.
+    """
+    copied = 0
+    for fast_copy in ("copy_file_range", "sendfile"):
+        if not hasattr(os, fast_copy):
+            continue
+        try:
+            while copied < count:
+                if fast_copy == "copy_file_range":
+                    n = os.copy_file_range(src_fd, dst_fd, count - copied, copied, copied)
+                else:
+                    n = os.sendfile(dst_fd, src_fd, copied, count - copied)
+                if n == 0:
+                    return copied
+                copied += n
+            return copied
+        except OSError:
+            # EXDEV/ENOSYS/EINVAL: filesystem or kernel doesn't support it
+            if copied:
+                raise
+    os.lseek(src_fd, 0, os.SEEK_SET)
+    while copied < count:
+        chunk = os.read(src_fd, min(CHUNK_SIZE, count - copied))
+        if not chunk:
+            break
+        os.write(dst_fd, chunk)
+        copied += len(chunk)
+    return copied
+
+
+class UploadStorageFull(RuntimeError):
+    """Raised when an upload would exceed the disk budget; retry later"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class StoredUpload:
+    """An upload saved to disk and the budget it holds until released"""
+
+    __slots__ = ("path", "size", "reserved", "released")
+
+    def __init__(self, path: str, reserved: int):
+        self.path = path
+        self.size = 0
+        self.reserved = reserved
+        self.released = False
+
+
+class UploadStorage:
+    """
+    Saves uploads into `directory` under a total disk budget.
+
+    Usage is what the last directory scan found (files of other workers,
+    live meeting windows, leftovers) plus the bytes reserved by uploads in
+    progress in this process. An upload reserves its declared size (or the
+    max upload size when unknown) before streaming to disk, shrinks the
+    reservation to the real size once written, and gives it back on
+    release(). When the budget would be exceeded the upload waits up to
+    `queue_timeout` seconds for space, then is rejected with a retry hint.
+
+    A janitor removes files older than `orphan_age` that no request owns,
+    e.g. left behind by a worker killed mid-transcription.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        budget_bytes: int,
+        queue_timeout: float = 30.0,
+        orphan_age: float = 6 * 3600,
+        sweep_interval: float = 300.0
+    ):
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self.queue_timeout = queue_timeout
+        self.orphan_age = orphan_age
+        self.sweep_interval = sweep_interval
+
+        self._active: Dict[str, StoredUpload] = {}
+        self._reserved = 0
+        self._disk_untracked = 0
+        self._lock = threading.Lock()
+        self._space_freed: Optional[asyncio.Condition] = None
+        self._janitor: Optional[asyncio.Task] = None
+        self._metrics = {
+            "uploads_stored": 0,
+            "uploads_rejected": 0,
+            "uploads_waited": 0,
+            "swept_files": 0,
+            "swept_bytes": 0,
+            "last_sweep": None,
+        }
+        os.makedirs(directory, exist_ok=True)
+        self.scan()
+
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the worker's running event loop
+        if self._space_freed is None:
+            self._space_freed = asyncio.Condition()
+        return self._space_freed
+
+    def scan(self) -> int:
+        """Measure files on disk that no active upload of this process owns"""
+        untracked = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False) and entry.path not in self._active:
+                    try:
+                        untracked += entry.stat(follow_symlinks=False).st_size
+                    except FileNotFoundError:
+                        pass
+        with self._lock:
+            self._disk_untracked = untracked
+        return untracked
+
+    @property
+    def used_bytes(self) -> int:
+        return self._disk_untracked + self._reserved
+
+    def _try_reserve(self, nbytes: int) -> bool:
+        with self._lock:
+            if self._disk_untracked + self._reserved + nbytes > self.budget_bytes:
+                return False
+            self._reserved += nbytes
+            return True
+
+    async def _reserve(self, nbytes: int):
+        if nbytes > self.budget_bytes:
+            raise ValueError(f"Upload of {nbytes} bytes exceeds the total upload budget of {self.budget_bytes} bytes")
+        if self._try_reserve(nbytes):
+            return
+        # Other workers or a sweep may have freed space since the last scan
+        await asyncio.to_thread(self.scan)
+        if self._try_reserve(nbytes):
+            return
+
+        self._metrics["uploads_waited"] += 1
+        deadline = time.monotonic() + self.queue_timeout
+        condition = self._condition()
+        async with condition:
+            while not self._try_reserve(nbytes):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics["uploads_rejected"] += 1
+                    raise UploadStorageFull(
+                        "Upload storage is full, please retry later",
+                        retry_after=max(1, int(min(self.sweep_interval, 60)))
+                    )
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=min(remaining, 5.0))
+                except asyncio.TimeoutError:
+                    await asyncio.to_thread(self.scan)
+
+    async def save(self, upload, suffix: str, max_bytes: int) -> StoredUpload:
+        """
+        Write an UploadFile to disk without holding it in memory. Uploads
+        the server already spooled to a temp file are copied kernel-side
+        (copy_file_range/sendfile); small in-memory ones in CHUNK_SIZE reads.
+
+        Raises:
+            ValueError: the upload is larger than `max_bytes`
+            UploadStorageFull: no space within the budget after waiting
+        """
+        declared = getattr(upload, "size", None)
+        if declared is not None and declared > max_bytes:
+            raise ValueError(f"File too large. Max size: {max_bytes / 1024 / 1024}MB")
+        reserved = declared if declared is not None else max_bytes
+        await self._reserve(reserved)
+
+        stored = StoredUpload(os.path.join(self.directory, f"{uuid.uuid4()}{suffix}"), reserved)
+        with self._lock:
+            self._active[stored.path] = stored
+        try:
+            source_fd = _spooled_fileno(getattr(upload, "file", None))
+            with open(stored.path, "wb") as f:
+                if source_fd is not None and declared is not None:
+                    # Already on disk in the server's spool file: copy in the kernel
+                    stored.size = await asyncio.to_thread(copy_file_data, source_fd, f.fileno(), declared)
+                else:
+                    while True:
+                        chunk = await upload.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        stored.size += len(chunk)
+                        if stored.size > max_bytes:
+                            raise ValueError(f"File too large. Max size: {max_bytes / 1024 / 1024}MB")
+                        f.write(chunk)
+        except BaseException:
+            await self.release(stored)
+            raise
+
+        # Hand back the part of the reservation the file didn't need
+        with self._lock:
+            self._reserved -= stored.reserved - stored.size
+            stored.reserved = stored.size
+        self._metrics["uploads_stored"] += 1
+        return stored
+
+    async def release(self, stored: Optional[StoredUpload]):
+        """Delete the stored file and return its budget"""
+        if stored is None or stored.released:
+            return
+        stored.released = True
+        try:
+            os.remove(stored.path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._active.pop(stored.path, None)
+            self._reserved -= stored.reserved
+        condition = self._condition()
+        async with condition:
+            condition.notify_all()
+
+    def sweep(self) -> Dict[str, int]:
+        """Remove orphaned files older than orphan_age and rescan usage"""
+        cutoff = time.time() - self.orphan_age
+        removed = removed_bytes = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False) or entry.path in self._active:
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                        removed_bytes += stat.st_size
+                except FileNotFoundError:
+                    continue
+        self.scan()
+        self._metrics["swept_files"] += removed
+        self._metrics["swept_bytes"] += removed_bytes
+        self._metrics["last_sweep"] = time.time()
+        if removed:
+            logger.info("Upload janitor removed %d orphaned file(s)", removed,
+                        extra={"stage": "janitor", "bytes": removed_bytes})
+        return {"files": removed, "bytes": removed_bytes}
+
+    async def _janitor_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+                condition = self._condition()
+                async with condition:
+                    condition.notify_all()
+            except Exception as e:
+                logger.warning("Upload janitor failed: %s", e, extra={"stage": "janitor"})
+            await asyncio.sleep(self.sweep_interval)
+
+    def start_janitor(self):
+        if self._janitor is None:
+            self._janitor = asyncio.get_running_loop().create_task(self._janitor_loop())
+
+    async def stop_janitor(self):
+        if self._janitor is not None:
+            self._janitor.cancel()
+            self._janitor = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": self.used_bytes,
+                "reserved_bytes": self._reserved,
+                "in_flight_uploads": len(self._active),
+                **self._metrics,
+            }
+
+
+class QueuedAudio:
+    """
+    Audio moved out of UPLOAD_DIR for a queued job, kept in `directory`
+    until a worker transcribes it. Queued jobs can wait longer than the
+    upload janitor's orphan age, so the directory has its own budget and
+    its own cleanup:
+
+    - add() moves a file in, or raises UploadStorageFull when that would
+      take the directory over `budget_bytes` (checked against a directory
+      scan, so it holds across the workers sharing the directory)
+    - sweep() removes files older than `orphan_age` that no queued job
+      references, e.g. the audio of jobs that failed or were purged
+    """
+
+    def __init__(self, directory: str, budget_bytes: int, orphan_age: float = 6 * 3600, sweep_interval: float = 300.0):
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self.orphan_age = orphan_age
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+        self._metrics = {"rejected": 0, "swept_files": 0, "swept_bytes": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def used_bytes(self) -> int:
+        used = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        used += entry.stat(follow_symlinks=False).st_size
+                except FileNotFoundError:
+                    pass
+        return used
+
+    def add(self, path: str) -> str:
+        """Move `path` into the directory; returns its new path"""
+        size = os.path.getsize(path)
+        target = os.path.join(self.directory, os.path.basename(path))
+        with self._lock:
+            if self.used_bytes() + size > self.budget_bytes:
+                self._metrics["rejected"] += 1
+                raise UploadStorageFull(
+                    "Too much audio is waiting to be processed, please retry later",
+                    retry_after=max(1, int(min(self.sweep_interval, 60)))
+                )
+            shutil.move(path, target)
+        return target
+
+    def sweep_due(self) -> bool:
+        return time.monotonic() - self._swept_at >= self.sweep_interval
+
+    def sweep(self, referenced: Iterable[str]) -> Dict[str, int]:
+        """Remove old files not in `referenced` (audio paths of jobs still waiting for transcription)"""
+        self._swept_at = time.monotonic()
+        keep = {os.path.abspath(path) for path in referenced if path}
+        cutoff = time.time() - self.orphan_age
+        removed = removed_bytes = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False) or os.path.abspath(entry.path) in keep:
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                        removed_bytes += stat.st_size
+                except FileNotFoundError:
+                    continue
+        self._metrics["swept_files"] += removed
+        self._metrics["swept_bytes"] += removed_bytes
+        if removed:
+            logger.info("Removed %d orphaned queued audio file(s) from %s", removed, self.directory,
+                        extra={"stage": "janitor", "bytes": removed_bytes})
+        return {"files": removed, "bytes": removed_bytes}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"budget_bytes": self.budget_bytes, "used_bytes": self.used_bytes(), **self._metrics}
+
+
+# Lazily constructed singleton
+_upload_storage = None
+_upload_storage_lock = threading.Lock()
+
+
+def get_upload_storage() -> UploadStorage:
+    global _upload_storage
+    if _upload_storage is None:
+        with _upload_storage_lock:
+            if _upload_storage is None:
+                _upload_storage = UploadStorage(
+                    settings.UPLOAD_DIR,
+                    budget_bytes=int(getattr(settings, "UPLOAD_DISK_BUDGET", 2 * 1024 ** 3)),
+                    queue_timeout=float(getattr(settings, "UPLOAD_QUEUE_TIMEOUT", 30)),
+                    orphan_age=float(getattr(settings, "UPLOAD_ORPHAN_AGE_SECONDS", 6 * 3600)),
+                    sweep_interval=float(getattr(settings, "UPLOAD_JANITOR_INTERVAL", 300))
+                )
+    return _upload_storage
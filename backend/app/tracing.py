@@ -0,0 +1,209 @@
+"""
+Lightweight OpenTelemetry-style tracing
+Spans propagate through contextvars (so they follow async handlers and
+asyncio.to_thread calls) and each finished trace is exported as one
+OTLP/JSON line (`resourceSpans`) to a file or the console.
+
+Usage:
+    from app.tracing import tracer
+
+    with tracer.start_span("whisper.transcribe", {"file.size_bytes": size}) as span:
+        ...
+        span.set_attribute("transcript.chars", len(text))
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Any, Optional, List
+from app.config import settings
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation with attributes, linked to its parent by ids"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = "UNSET"
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, exc: BaseException):
+        self.status = "ERROR"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": {"UNSET": 0, "OK": 1, "ERROR": 2}[self.status]},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"]["message"] = self.error
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled so call sites need no checks"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Creates spans and buffers them per trace; the whole trace is exported
+    in a single write when its root span ends.
+    """
+
+    def __init__(self, exporter: str = "none", path: Optional[str] = None, service_name: str = "meeto-backend"):
+        self.exporter = exporter
+        self.path = path
+        self.service_name = service_name
+        self._pending: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter in ("console", "file")
+
+    @contextmanager
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self._finish(span, is_root=parent is None)
+
+    def _finish(self, span: Span, is_root: bool):
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if not is_root:
+                return
+            del self._pending[span.trace_id]
+        self._export(spans)
+
+    def _export(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.tracing"},
+                    "spans": [s.to_otlp() for s in spans],
+                }],
+            }]
+        }
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+        try:
+            if self.exporter == "file":
+                with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            else:
+                sys.stderr.write(line)
+        except Exception as e:
+            logger.warning("Trace export failed: %s", e, extra={"rate_limit": "trace_export"})
+
+
+def current_span():
+    """The active span, or a no-op span when there is none"""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def traced(name: str):
+    """Decorator that wraps a function call in a span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _LazyTracer:
+    """Defers reading the TRACE_* settings until the first span"""
+
+    def __init__(self):
+        self._tracer = None
+
+    def __getattr__(self, name):
+        if self._tracer is None:
+            self._tracer = Tracer(
+                exporter=getattr(settings, "TRACE_EXPORTER", "none"),
+                path=getattr(settings, "TRACE_FILE", "./traces.jsonl"),
+                service_name=getattr(settings, "TRACE_SERVICE_NAME", "meeto-backend")
+            )
+        return getattr(self._tracer, name)
+
+
+tracer = _LazyTracer()
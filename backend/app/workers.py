@@ -0,0 +1,38 @@
+"""
+Gunicorn worker class for production (see gunicorn.conf.py)
+"""
+import importlib.util
+import os
+
+from uvicorn.workers import UvicornWorker
+
+
+def _event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def _http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+class TunedUvicornWorker(UvicornWorker):
+    """
+    UvicornWorker with uvloop/httptools pinned (falling back to the pure
+    Python implementations when they are not installed) and no per-request
+    access log on the hot path unless ACCESS_LOG=true.
+
+    Keep-alive and backlog come from the gunicorn config. Gunicorn's
+    graceful_timeout is also applied to uvicorn's own shutdown wait, so
+    in-flight transcriptions get the full window to finish after SIGTERM.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": _event_loop(),
+        "http": _http_protocol(),
+        "lifespan": "on",
+        "access_log": os.getenv("ACCESS_LOG", "false").lower() == "true",
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = self.cfg.graceful_timeout
@@ -0,0 +1 @@
+"""Benchmark suite with local stand-ins for Whisper, LLM and Jira"""
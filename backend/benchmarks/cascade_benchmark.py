@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the small-model-first extraction cascade
+
+Runs the transcript scenario twice against the fake OpenAI server, once
+with every extraction on the large model (ENABLE_MODEL_CASCADE=false) and
+once with the cascade. Each fake model has its own latency, and a
+fraction of the small model's answers come back with low confidence so
+some requests escalate. Reports end-to-end and extraction p50/p95, the
+tier that answered and the p50 savings.
+
+Usage (from backend/):
+    python -m benchmarks.cascade_benchmark --requests 60 --concurrency 4
+    python -m benchmarks.cascade_benchmark --large-latency-ms 1200 --small-latency-ms 250 --unsure-rate 0.3
+"""
+import argparse
+import json
+import os
+import tempfile
+from typing import Dict, Any, Optional
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakeJiraServer, FaultConfig
+from benchmarks.run_benchmark import AppServer, make_transcript, run_scenario
+
+LARGE_MODEL = "bench-large"
+SMALL_MODEL = "bench-small"
+
+
+def _savings(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return round((before - after) / before * 100, 1)
+
+
+def run_mode(cascade: bool, args, openai_server, jira_server, transcript: bytes) -> Dict[str, Any]:
+    upload_dir = tempfile.mkdtemp(prefix="bench-cascade-")
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"{openai_server.url}/v1",
+        "JIRA_BASE_URL": jira_server.url,
+        "JIRA_EMAIL": "bench@example.com",
+        "JIRA_API_TOKEN": "bench-token",
+        "UPLOAD_DIR": upload_dir,
+        "VECTOR_INDEX_DIR": os.path.join(upload_dir, "index"),
+        "IDEMPOTENCY_DB": os.path.join(upload_dir, "idempotency.sqlite3"),
+        "LLM_MODEL": LARGE_MODEL,
+        "LLM_SMALL_MODEL": SMALL_MODEL,
+        "ENABLE_MODEL_CASCADE": "true" if cascade else "false",
+        "LOG_LEVEL": "WARNING",
+    })
+    env.pop("GROQ_API_KEY", None)
+
+    app_server = AppServer(env).start()
+    try:
+        return run_scenario(
+            app_server.url, "transcript", args.requests, args.concurrency,
+            args.project_key, transcript, b""
+        )
+    finally:
+        app_server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--project-key", default="BENCH")
+    parser.add_argument("--transcript-repeat", type=int, default=20, help="Size of the synthetic transcript")
+    parser.add_argument("--large-latency-ms", type=float, default=900.0, help="Per-call latency of the large model")
+    parser.add_argument("--small-latency-ms", type=float, default=200.0, help="Per-call latency of the small model")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--unsure-rate", type=float, default=0.2, help="Fraction of small-model answers below the confidence bound")
+    parser.add_argument("--out", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    openai_server = FakeOpenAIServer(models={
+        LARGE_MODEL: FaultConfig(latency_ms=args.large_latency_ms, jitter_ms=args.jitter_ms),
+        SMALL_MODEL: FaultConfig(latency_ms=args.small_latency_ms, jitter_ms=args.jitter_ms, error_rate=args.unsure_rate),
+    }).start()
+    jira_server = FakeJiraServer().start()
+    transcript = make_transcript(args.transcript_repeat)
+
+    results = {"config": vars(args), "modes": {}}
+    try:
+        for mode, cascade in (("large_only", False), ("cascade", True)):
+            print(f"Running {mode} ({args.requests} requests, concurrency {args.concurrency})...")
+            result = run_mode(cascade, args, openai_server, jira_server, transcript)
+            results["modes"][mode] = result
+            lat = result["latency_ms"]
+            extraction = result["stages_ms"].get("extraction", {})
+            print(f"  end-to-end p50={lat['p50']}ms p95={lat['p95']}ms  "
+                  f"extraction p50={extraction.get('p50')}ms p95={extraction.get('p95')}ms  "
+                  f"tiers={result['extraction_tiers']}  errors={result['errors']}")
+        results["upstream_requests"] = dict(openai_server.request_counts)
+    finally:
+        openai_server.stop()
+        jira_server.stop()
+
+    before, after = results["modes"]["large_only"], results["modes"]["cascade"]
+    results["p50_savings_pct"] = {
+        "end_to_end": _savings(before["latency_ms"]["p50"], after["latency_ms"]["p50"]),
+        "extraction": _savings(
+            before["stages_ms"].get("extraction", {}).get("p50"), after["stages_ms"].get("extraction", {}).get("p50")
+        ),
+    }
+    print(f"p50 savings: end-to-end {results['p50_savings_pct']['end_to_end']}%, "
+          f"extraction {results['p50_savings_pct']['extraction']}%")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
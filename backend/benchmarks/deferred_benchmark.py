@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark for deferred (batch API) processing
+
+Processes the same number of transcripts twice against the fake servers:
+- interactive: POST /upload-transcript, two synchronous chat calls each
+  under LLM_CONCURRENCY (standing in for the provider rate limit)
+- deferred:    POST /deferred/upload, then poll /deferred/jobs/{id} until
+  every job is done; the LLM calls go out as one fake batch job
+
+Reports wall time, throughput, synchronous vs batched chat requests and a
+relative LLM cost (synchronous prompt tokens at 1.0, cached ones at 0.5,
+batch prompt tokens at 0.5 - the OpenAI/Groq batch discount).
+
+Usage (from backend/):
+    python -m benchmarks.deferred_benchmark --jobs 60 --concurrency 8
+    python -m benchmarks.deferred_benchmark --chat-latency-ms 1500 --llm-concurrency 2 --batch-latency-ms 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+
+import requests
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakeJiraServer, FaultConfig
+from benchmarks.run_benchmark import AppServer, latency_summary, make_transcript, run_scenario
+
+MODEL = "bench-model"
+
+
+def app_env(args, openai_server, jira_server) -> Dict[str, str]:
+    upload_dir = tempfile.mkdtemp(prefix="bench-deferred-")
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"{openai_server.url}/v1",
+        "JIRA_BASE_URL": jira_server.url,
+        "JIRA_EMAIL": "bench@example.com",
+        "JIRA_API_TOKEN": "bench-token",
+        "UPLOAD_DIR": upload_dir,
+        "VECTOR_INDEX_DIR": os.path.join(upload_dir, "index"),
+        "IDEMPOTENCY_DB": os.path.join(upload_dir, "idempotency.sqlite3"),
+        "DEFERRED_DB": os.path.join(upload_dir, "deferred.sqlite3"),
+        "DEFERRED_AUDIO_DIR": os.path.join(upload_dir, "deferred_audio"),
+        "LLM_MODEL": MODEL,
+        "LLM_CONCURRENCY": str(args.llm_concurrency),
+        "BATCH_MIN_JOBS": str(args.jobs),
+        "BATCH_MAX_WAIT_SECONDS": "5",
+        "BATCH_POLL_SECONDS": "0.2",
+        "LOG_LEVEL": "WARNING",
+    })
+    env.pop("GROQ_API_KEY", None)
+    return env
+
+
+def token_snapshot(openai_server) -> Dict[str, int]:
+    return {
+        "prompt": openai_server.prompt_tokens,
+        "cached": openai_server.cached_tokens,
+        "batch": openai_server.batch_prompt_tokens,
+    }
+
+
+def relative_cost(before: Dict[str, int], after: Dict[str, int]) -> float:
+    prompt = after["prompt"] - before["prompt"]
+    cached = after["cached"] - before["cached"]
+    batch = after["batch"] - before["batch"]
+    return (prompt - cached) + 0.5 * cached + 0.5 * batch
+
+
+def run_interactive(args, openai_server, jira_server, transcript: bytes) -> Dict[str, Any]:
+    app_server = AppServer(app_env(args, openai_server, jira_server)).start()
+    try:
+        result = run_scenario(
+            app_server.url, "transcript", args.jobs, args.concurrency, args.project_key, transcript, b"",
+            unique_transcripts=True
+        )
+    finally:
+        app_server.stop()
+    return {
+        "wall_seconds": result["wall_seconds"],
+        "throughput_jobs_per_s": result["throughput_rps"],
+        "latency_ms": result["latency_ms"],
+        "done": result["succeeded"],
+        "errors": result["errors"],
+    }
+
+
+def run_deferred(args, openai_server, jira_server, transcript: bytes) -> Dict[str, Any]:
+    app_server = AppServer(app_env(args, openai_server, jira_server)).start()
+    accept_ms: List[float] = []
+    job_ids: List[str] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def submit(i):
+        started = time.perf_counter()
+        response = requests.post(
+            f"{app_server.url}/deferred/upload",
+            files={"file": ("meeting.txt", f"Meeting {i}\n".encode("utf-8") + transcript)},
+            data={"jira_project_key": args.project_key, "jira_issue_type": "Task", "jira_priority": "Medium"},
+            timeout=60
+        )
+        with lock:
+            if response.status_code != 202:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                return
+            accept_ms.append((time.perf_counter() - started) * 1000)
+            job_ids.append(response.json()["job_id"])
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(submit, range(args.jobs)))
+        accepted = time.perf_counter() - started
+
+        pending = set(job_ids)
+        states: Dict[str, int] = {}
+        deadline = time.time() + args.timeout
+        while pending and time.time() < deadline:
+            time.sleep(0.2)
+            for job_id in list(pending):
+                status = requests.get(f"{app_server.url}/deferred/jobs/{job_id}", timeout=10).json()["status"]
+                if status in ("done", "failed"):
+                    pending.discard(job_id)
+                    states[status] = states.get(status, 0) + 1
+        wall = time.perf_counter() - started
+    finally:
+        app_server.stop()
+
+    return {
+        "wall_seconds": round(wall, 3),
+        "accept_seconds": round(accepted, 3),
+        "throughput_jobs_per_s": round(states.get("done", 0) / wall, 2) if wall > 0 else None,
+        "accept_latency_ms": latency_summary(accept_ms),
+        "done": states.get("done", 0),
+        "failed": states.get("failed", 0),
+        "timed_out": len(pending),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=60, help="Transcripts processed per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads uploading")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="LLM_CONCURRENCY of the app")
+    parser.add_argument("--project-key", default="BENCH")
+    parser.add_argument("--transcript-repeat", type=int, default=20, help="Size of the synthetic transcript")
+    parser.add_argument("--chat-latency-ms", type=float, default=800.0, help="Latency of one synchronous chat call")
+    parser.add_argument("--batch-latency-ms", type=float, default=3000.0, help="Time the fake batch job stays in progress")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Give up waiting for deferred jobs after this many seconds")
+    parser.add_argument("--out", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    openai_server = FakeOpenAIServer(
+        models={MODEL: FaultConfig(latency_ms=args.chat_latency_ms)}, batch_latency_ms=args.batch_latency_ms
+    ).start()
+    jira_server = FakeJiraServer().start()
+    transcript = make_transcript(args.transcript_repeat)
+
+    results = {"config": vars(args), "modes": {}}
+    try:
+        for mode, run in (("interactive", run_interactive), ("deferred", run_deferred)):
+            print(f"Running {mode} ({args.jobs} transcripts)...")
+            counts_before = dict(openai_server.request_counts)
+            tokens_before = token_snapshot(openai_server)
+            result = run(args, openai_server, jira_server, transcript)
+            result["sync_chat_requests"] = openai_server.request_counts.get(f"chat:{MODEL}", 0) - counts_before.get(f"chat:{MODEL}", 0)
+            result["batch_chat_requests"] = (
+                openai_server.request_counts.get(f"batch_chat:{MODEL}", 0) - counts_before.get(f"batch_chat:{MODEL}", 0)
+            )
+            result["relative_llm_cost"] = round(relative_cost(tokens_before, token_snapshot(openai_server)))
+            results["modes"][mode] = result
+            print(f"  done={result['done']} wall={result['wall_seconds']}s  throughput={result['throughput_jobs_per_s']} jobs/s  "
+                  f"sync chat={result['sync_chat_requests']} batch chat={result['batch_chat_requests']}  "
+                  f"relative cost={result['relative_llm_cost']}  errors={result['errors']}")
+    finally:
+        openai_server.stop()
+        jira_server.stop()
+
+    interactive, deferred = results["modes"]["interactive"], results["modes"]["deferred"]
+    if interactive["relative_llm_cost"]:
+        results["cost_savings_pct"] = round(
+            (1 - deferred["relative_llm_cost"] / interactive["relative_llm_cost"]) * 100, 1
+        )
+        print(f"LLM cost savings: {results['cost_savings_pct']}%")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
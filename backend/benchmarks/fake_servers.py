@@ -0,0 +1,475 @@
+"""
+Local stand-ins for the external APIs used by the backend
+- FakeOpenAIServer: OpenAI-compatible chat completions, audio transcriptions
+  and the Files/Batch APIs (also answers Groq's /openai/v1 prefix)
+- FakeJiraServer: the subset of the Jira Cloud REST API used by JiraService
+
+Both support configurable latency (mean + jitter) and error injection, and
+count requests per route. Run standalone with:
+    python -m benchmarks.fake_servers --openai-port 18001 --jira-port 18002
+"""
+import argparse
+import email.policy
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+class FaultConfig:
+    """Latency and error injection settings for a fake server"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, error_status: int = 500):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay(self):
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+class _FakeServer:
+    """Runs a ThreadingHTTPServer on a background thread"""
+
+    handler_class = None
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, faults: Optional[FaultConfig] = None):
+        self.faults = faults or FaultConfig()
+        self.request_counts: Dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+
+        server = self
+
+        class Handler(self.handler_class):
+            fake = server
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, route: str):
+        with self._counts_lock:
+            self.request_counts[route] = self.request_counts.get(route, 0) + 1
+
+    def start(self) -> "_FakeServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    """Shared helpers for the fake API handlers"""
+
+    fake: _FakeServer = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        path = self.path.split("?", 1)[0]
+        route = self.route(method, path)
+        self._read_body_cached = self._read_body()
+        if route is None:
+            self._send_json(404, {"error": {"message": f"No fake route for {method} {path}"}})
+            return
+
+        self.fake.count(route)
+        self.fake.faults.delay()
+        if self.fake.faults.should_fail():
+            self._send_json(self.fake.faults.error_status, {"error": {"message": "injected failure"}})
+            return
+
+        status, payload = getattr(self, f"handle_{route}")(path)
+        if isinstance(payload, bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self._send_json(status, payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def route(self, method: str, path: str) -> Optional[str]:
+        raise NotImplementedError
+
+
+def _multipart_fields(body: bytes, content_type: str) -> Dict[str, bytes]:
+    """name -> value of each part of a multipart/form-data body"""
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = part.get_payload(decode=True) or b""
+    return fields
+
+
+class _OpenAIHandler(_JsonHandler):
+    def route(self, method, path):
+        # Groq's SDK prefixes routes with /openai/v1
+        path = path.replace("/openai/v1/", "/v1/")
+        if method == "POST" and path.endswith("/chat/completions"):
+            return "chat"
+        if method == "POST" and path.endswith("/audio/transcriptions"):
+            return "transcription"
+        if method == "POST" and path.endswith("/v1/files"):
+            return "file_upload"
+        if method == "GET" and "/v1/files/" in path and path.endswith("/content"):
+            return "file_content"
+        if method == "POST" and path.endswith("/v1/batches"):
+            return "batch_create"
+        if method == "GET" and "/v1/batches/" in path:
+            return "batch_get"
+        return None
+
+    def handle_chat(self, path):
+        request = json.loads(self._read_body_cached or b"{}")
+        return 200, self.fake.chat_completion(request)
+
+    def handle_file_upload(self, path):
+        fields = _multipart_fields(self._read_body_cached, self.headers.get("Content-Type", ""))
+        data = fields.get("file", b"")
+        return 200, self.fake.store_file(data, fields.get("purpose", b"batch").decode())
+
+    def handle_file_content(self, path):
+        file_id = path.rstrip("/").split("/")[-2]
+        data = self.fake.files.get(file_id)
+        if data is None:
+            return 404, {"error": {"message": f"No such file: {file_id}"}}
+        return 200, data
+
+    def handle_batch_create(self, path):
+        request = json.loads(self._read_body_cached or b"{}")
+        if request.get("input_file_id") not in self.fake.files:
+            return 400, {"error": {"message": "input_file_id not found"}}
+        return 200, self.fake.create_batch(request)
+
+    def handle_batch_get(self, path):
+        batch = self.fake.batches.get(path.rstrip("/").split("/")[-1])
+        if batch is None:
+            return 404, {"error": {"message": "No such batch"}}
+        return 200, dict(batch)
+
+    def handle_transcription(self, path):
+        text = "Alice will send the quarterly report to finance by Friday. Bob needs to schedule a review."
+        return 200, {
+            "task": "transcribe",
+            "language": "english",
+            "duration": 6.0,
+            "text": text,
+            "segments": [
+                {"id": 0, "seek": 0, "start": 0.0, "end": 3.0, "text": text.split(". ")[0] + ".",
+                 "tokens": [1, 2, 3], "temperature": 0.0, "avg_logprob": -0.2,
+                 "compression_ratio": 1.1, "no_speech_prob": 0.01},
+                {"id": 1, "seek": 0, "start": 3.0, "end": 6.0, "text": text.split(". ")[1],
+                 "tokens": [4, 5, 6], "temperature": 0.0, "avg_logprob": -0.2,
+                 "compression_ratio": 1.1, "no_speech_prob": 0.01},
+            ],
+        }
+
+
+FAKE_USERS = [
+    {"accountId": f"fake-account-{i}", "displayName": name, "emailAddress": f"{name.split()[0].lower()}@example.com",
+     "accountType": "atlassian", "active": True}
+    for i, name in enumerate(["Alice Example", "Bob Builder", "Carol Danvers", "Dave Lister", "Eve Moneypenny"], 1)
+]
+
+
+class _JiraHandler(_JsonHandler):
+    _issue_ids = itertools.count(1)
+
+    def route(self, method, path):
+        if method == "GET" and path.startswith("/rest/api/3/project/"):
+            return "project"
+        if method == "POST" and path == "/rest/api/3/issue":
+            return "create_issue"
+        if method == "POST" and path.startswith("/rest/api/3/issue/") and path.endswith("/attachments"):
+            return "add_attachment"
+        if method == "GET" and path.startswith("/rest/api/3/issue/"):
+            return "get_issue"
+        if method == "GET" and path in ("/rest/api/3/user/assignable/search", "/rest/api/3/user/search"):
+            return "user_search"
+        return None
+
+    def handle_project(self, path):
+        key = path.rsplit("/", 1)[-1]
+        return 200, {"id": "10000", "key": key, "name": f"Project {key}"}
+
+    def handle_create_issue(self, path):
+        request = json.loads(self._read_body_cached or b"{}")
+        key = request.get("fields", {}).get("project", {}).get("key", "FAKE")
+        issue_id = next(self._issue_ids)
+        return 201, {"id": str(issue_id), "key": f"{key}-{issue_id}", "self": f"{self.fake.url}/rest/api/3/issue/{issue_id}"}
+
+    def handle_add_attachment(self, path):
+        attachment_id = next(self._issue_ids)
+        return 200, [{
+            "id": str(attachment_id),
+            "filename": "transcript.txt",
+            "size": len(self._read_body_cached or b""),
+            "content": f"{self.fake.url}/rest/api/3/attachment/content/{attachment_id}",
+        }]
+
+    def handle_get_issue(self, path):
+        key = path.rsplit("/", 1)[-1]
+        return 200, {"key": key, "fields": {"summary": "Fake issue"}}
+
+    def handle_user_search(self, path):
+        params = parse_qs(urlsplit(self.path).query)
+        query = (params.get("query") or [""])[0].lower()
+        start_at = int((params.get("startAt") or ["0"])[0])
+        max_results = int((params.get("maxResults") or ["50"])[0])
+        users = [u for u in FAKE_USERS if query in u["displayName"].lower() or query in u["emailAddress"]]
+        return 200, users[start_at:start_at + max_results]
+
+
+class FakeOpenAIServer(_FakeServer):
+    """
+    `models` maps a model name to its own FaultConfig: extra latency per
+    chat call and, as error_rate, the fraction of extraction answers given
+    with low confidence (to exercise the small -> large model cascade).
+
+    Chat calls go through a simulated prompt cache: the leading messages a
+    request shares with an earlier request on the same model count as
+    cached tokens (~4 chars per token), and `prefill_ms_per_1k_tokens` of
+    latency is added for each uncached prompt token.
+
+    The Files and Batch APIs are stubbed too: a batch created from an
+    uploaded JSONL file is "in_progress" for `batch_latency_ms`, then every
+    line is answered at once (no per-call latency) into an output file.
+    """
+
+    handler_class = _OpenAIHandler
+
+    def __init__(self, *args, models: Optional[Dict[str, FaultConfig]] = None,
+                 prefill_ms_per_1k_tokens: float = 0.0, batch_latency_ms: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.models = models or {}
+        self.prefill_ms_per_1k_tokens = prefill_ms_per_1k_tokens
+        self.batch_latency_ms = batch_latency_ms
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.batch_prompt_tokens = 0
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._prefixes = set()
+        self._ids = itertools.count(1)
+
+    def chat_completion(self, request: Dict[str, Any], batch: bool = False) -> Dict[str, Any]:
+        """A chat.completion answer: task JSON when JSON was requested, else minutes text"""
+        wants_json = (request.get("response_format") or {}).get("type") == "json_object"
+        profile = self.models.get(request.get("model"))
+        if batch:
+            # Batch requests run offline: no latency, no prompt cache
+            self.count(f"batch_chat:{request.get('model')}")
+            prompt_tokens = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4
+            cached_tokens = 0
+            with self._counts_lock:
+                self.batch_prompt_tokens += prompt_tokens
+        else:
+            self.count(f"chat:{request.get('model')}")
+            prompt_tokens, cached_tokens = self.prompt_cache_lookup(request.get("model"), request.get("messages", []))
+            if profile:
+                profile.delay()
+            if self.prefill_ms_per_1k_tokens:
+                time.sleep((prompt_tokens - cached_tokens) * self.prefill_ms_per_1k_tokens / 1e6)
+        if wants_json:
+            # An unsure model answers with confidences below the cascade bound
+            unsure = profile is not None and profile.should_fail()
+            content = json.dumps({"tasks": [
+                {"description": "Send the quarterly report to finance", "owner": "Alice",
+                 "deadline": "2030-01-15", "priority": "high", "confidence": 0.55 if unsure else 0.9,
+                 "source": "Alice will send the quarterly report to finance by Friday."},
+                {"description": "Schedule a follow-up review with the design team", "owner": "Bob",
+                 "deadline": None, "priority": "medium", "confidence": 0.5 if unsure else 0.8,
+                 "source": "Bob needs to schedule a review"},
+            ]})
+        else:
+            content = "- Decisions: ship the release\n- Action Items: Send the quarterly report to finance"
+
+        return {
+            "id": f"chatcmpl-fake-{random.randint(0, 1 << 30)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def store_file(self, data: bytes, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-fake-{next(self._ids)}"
+        self.files[file_id] = data
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": f"{file_id}.jsonl", "purpose": purpose}
+
+    def create_batch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        batch_id = f"batch-fake-{next(self._ids)}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": request.get("endpoint"),
+            "input_file_id": request.get("input_file_id"),
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        self.batches[batch_id] = batch
+        timer = threading.Timer(self.batch_latency_ms / 1000, self._run_batch, args=(batch_id,))
+        timer.daemon = True
+        timer.start()
+        return dict(batch)
+
+    def _run_batch(self, batch_id: str):
+        batch = self.batches[batch_id]
+        lines = []
+        for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            lines.append(json.dumps({
+                "id": f"batch_req_{next(self._ids)}",
+                "custom_id": entry.get("custom_id"),
+                "response": {"status_code": 200, "body": self.chat_completion(entry.get("body") or {}, batch=True)},
+                "error": None,
+            }))
+        output = self.store_file(("\n".join(lines) + "\n").encode("utf-8"), "batch_output")
+        batch.update({
+            "status": "completed",
+            "output_file_id": output["id"],
+            "completed_at": int(time.time()),
+            "request_counts": {"total": len(lines), "completed": len(lines), "failed": 0},
+        })
+
+    def prompt_cache_lookup(self, model: str, messages) -> Tuple[int, int]:
+        """(prompt tokens, tokens of the longest previously seen message prefix)"""
+        prompt_tokens = cached_tokens = 0
+        digest = hashlib.sha256(str(model).encode())
+        keys = []
+        for message in messages:
+            digest.update(json.dumps(message, sort_keys=True).encode())
+            keys.append((digest.hexdigest(), len(message.get("content") or "") // 4))
+        with self._counts_lock:
+            hit = True
+            for key, tokens in keys:
+                prompt_tokens += tokens
+                hit = hit and key in self._prefixes
+                if hit:
+                    cached_tokens += tokens
+                self._prefixes.add(key)
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+        return prompt_tokens, cached_tokens
+
+
+class FakeJiraServer(_FakeServer):
+    handler_class = _JiraHandler
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser, prefix: str):
+    """Add --<prefix>-latency-ms / -jitter-ms / -error-rate options"""
+    parser.add_argument(f"--{prefix}-latency-ms", type=float, default=0.0, help=f"Mean latency of the fake {prefix} API")
+    parser.add_argument(f"--{prefix}-jitter-ms", type=float, default=0.0, help="Uniform +/- jitter around the mean")
+    parser.add_argument(f"--{prefix}-error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+
+
+def fault_config_from_args(args: argparse.Namespace, prefix: str) -> FaultConfig:
+    return FaultConfig(
+        latency_ms=getattr(args, f"{prefix}_latency_ms"),
+        jitter_ms=getattr(args, f"{prefix}_jitter_ms"),
+        error_rate=getattr(args, f"{prefix}_error_rate")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake OpenAI/Groq and Jira servers")
+    parser.add_argument("--openai-port", type=int, default=18001)
+    parser.add_argument("--jira-port", type=int, default=18002)
+    parser.add_argument("--batch-latency-ms", type=float, default=0.0, help="Time a fake batch job stays in progress")
+    add_fault_arguments(parser, "openai")
+    add_fault_arguments(parser, "jira")
+    args = parser.parse_args()
+
+    openai_server = FakeOpenAIServer(
+        port=args.openai_port, faults=fault_config_from_args(args, "openai"), batch_latency_ms=args.batch_latency_ms
+    ).start()
+    jira_server = FakeJiraServer(port=args.jira_port, faults=fault_config_from_args(args, "jira")).start()
+    print(f"Fake OpenAI: {openai_server.url}/v1")
+    print(f"Fake Jira:   {jira_server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        openai_server.stop()
+        jira_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Prompt cache benchmark for the prompt layouts in app/services/prompts.py
+
+Runs the transcript scenario once per PROMPT_VERSION against the fake
+OpenAI server, whose simulated prompt cache counts the leading messages a
+request shares with an earlier one as cached and charges prefill latency
+only for the rest. Every request uploads a different transcript, so hits
+come from the static system prompt and from the summary call reusing the
+extraction call's transcript prefix. Reports cached-token share and the
+extraction / summary call p50 (the time-to-first-token proxy: the fake
+answers non-streaming, after prefill).
+
+Usage (from backend/):
+    python -m benchmarks.prompt_cache_benchmark --requests 40 --concurrency 4
+    python -m benchmarks.prompt_cache_benchmark --prefill-ms-per-1k 200 --transcript-repeat 40
+"""
+import argparse
+import json
+import os
+import tempfile
+from typing import Dict, Any
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakeJiraServer
+from benchmarks.run_benchmark import AppServer, make_transcript, run_scenario
+
+VERSIONS = ("1", "2")
+
+
+def run_version(version: str, args, openai_server, jira_server, transcript: bytes) -> Dict[str, Any]:
+    upload_dir = tempfile.mkdtemp(prefix="bench-prompts-")
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"{openai_server.url}/v1",
+        "JIRA_BASE_URL": jira_server.url,
+        "JIRA_EMAIL": "bench@example.com",
+        "JIRA_API_TOKEN": "bench-token",
+        "UPLOAD_DIR": upload_dir,
+        "VECTOR_INDEX_DIR": os.path.join(upload_dir, "index"),
+        "IDEMPOTENCY_DB": os.path.join(upload_dir, "idempotency.sqlite3"),
+        "PROMPT_VERSION": version,
+        "LOG_LEVEL": "WARNING",
+    })
+    env.pop("GROQ_API_KEY", None)
+
+    prompt_before, cached_before = openai_server.prompt_tokens, openai_server.cached_tokens
+    app_server = AppServer(env).start()
+    try:
+        result = run_scenario(
+            app_server.url, "transcript", args.requests, args.concurrency,
+            args.project_key, transcript, b"", unique_transcripts=True
+        )
+    finally:
+        app_server.stop()
+    prompt_tokens = openai_server.prompt_tokens - prompt_before
+    cached_tokens = openai_server.cached_tokens - cached_before
+    result["prompt_tokens"] = prompt_tokens
+    result["cached_tokens"] = cached_tokens
+    result["cache_hit_ratio"] = round(cached_tokens / prompt_tokens, 3) if prompt_tokens else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--project-key", default="BENCH")
+    parser.add_argument("--transcript-repeat", type=int, default=40, help="Size of the synthetic transcript")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=150.0, help="Fake prefill latency per 1k uncached prompt tokens")
+    parser.add_argument("--out", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    openai_server = FakeOpenAIServer(prefill_ms_per_1k_tokens=args.prefill_ms_per_1k).start()
+    jira_server = FakeJiraServer().start()
+    transcript = make_transcript(args.transcript_repeat)
+
+    results = {"config": vars(args), "versions": {}}
+    try:
+        for version in VERSIONS:
+            print(f"Running PROMPT_VERSION={version} ({args.requests} requests, concurrency {args.concurrency})...")
+            result = run_version(version, args, openai_server, jira_server, transcript)
+            results["versions"][version] = result
+            stages = result["stages_ms"]
+            print(f"  cached {result['cached_tokens']}/{result['prompt_tokens']} prompt tokens ({result['cache_hit_ratio']})  "
+                  f"extraction p50={stages.get('extraction', {}).get('p50')}ms  "
+                  f"summary p50={stages.get('summary', {}).get('p50')}ms  "
+                  f"end-to-end p50={result['latency_ms']['p50']}ms  errors={result['errors']}")
+    finally:
+        openai_server.stop()
+        jira_server.stop()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for the upload pipeline
+
+Starts the fake OpenAI/Groq and Jira servers, launches the app under uvicorn
+pointed at them, then drives the endpoints at a configurable concurrency:
+- transcript: POST /upload-transcript with a .txt transcript (LLM -> Jira)
+- pipeline:   POST /upload with a WAV file (Whisper -> LLM -> Jira)
+- mixed:      the two above interleaved 1:1
+
+Reports throughput, end-to-end and per-stage p50/p95/p99 latency (from the
+`timings` field of each response) and the app's peak RSS, and writes
+everything to JSON so runs can be compared across commits.
+
+Usage (from backend/):
+    python -m benchmarks.run_benchmark --requests 200 --concurrency 16 --out bench.json
+    python -m benchmarks.run_benchmark --compare bench.json --out bench-new.json
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from benchmarks.fake_servers import FakeOpenAIServer, FakeJiraServer, add_fault_arguments, fault_config_from_args
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SCENARIOS = ("transcript", "pipeline", "mixed")
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[rank], 2)
+
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 2) if values else None,
+    }
+
+
+def make_wav(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    """Silent mono 16-bit WAV used as the audio payload"""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buf.getvalue()
+
+
+def make_transcript(repeat: int) -> bytes:
+    sample = (
+        "Alice: Thanks everyone. Bob, can you send the quarterly report to finance by Friday?\n"
+        "Bob: Sure, I will send it. We also need to schedule a review with the design team.\n"
+    )
+    return (sample * repeat).encode("utf-8")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak resident set size of a process (Linux /proc), in MB"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class AppServer:
+    """The backend running under uvicorn in a subprocess"""
+
+    def __init__(self, env: Dict[str, str], workers: int = 1):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.workers = workers
+        self.env = env
+        self.proc = None
+
+    def start(self, timeout: float = 30.0) -> "AppServer":
+        cmd = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(self.port),
+            "--log-level", "warning", "--workers", str(self.workers),
+        ]
+        self.proc = subprocess.Popen(cmd, cwd=str(BACKEND_DIR), env=self.env)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if requests.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError("App server did not become healthy in time")
+
+    def peak_rss_mb(self) -> Optional[float]:
+        pids = [self.proc.pid]
+        try:
+            children = subprocess.run(["pgrep", "-P", str(self.proc.pid)], capture_output=True, text=True).stdout
+            pids += [int(p) for p in children.split()]
+        except OSError:
+            pass
+        values = [v for v in (peak_rss_mb(pid) for pid in pids) if v is not None]
+        return round(sum(values), 1) if values else None
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+def run_scenario(
+    base_url: str,
+    scenario: str,
+    total: int,
+    concurrency: int,
+    project_key: str,
+    transcript: bytes,
+    audio: bytes,
+    unique_transcripts: bool = False
+) -> Dict[str, Any]:
+    """
+    Fire `total` requests at `concurrency` and summarize the results.
+    With `unique_transcripts` each transcript upload starts with its own
+    title line, so no two meetings share a transcript (or a prompt cache hit).
+    """
+    transcript_request = ("/upload-transcript", "meeting.txt", transcript)
+    audio_request = ("/upload", "meeting.wav", audio)
+    if scenario == "transcript":
+        plan = [transcript_request]
+    elif scenario == "pipeline":
+        plan = [audio_request]
+    else:
+        plan = [transcript_request, audio_request]
+
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    tiers: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one_request(i):
+        endpoint, filename, payload = plan[i % len(plan)]
+        if unique_transcripts and endpoint == "/upload-transcript":
+            payload = f"Meeting {i}\n".encode("utf-8") + payload
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = local.session.post(
+                f"{base_url}{endpoint}",
+                files={"file": (filename, payload)},
+                data={"jira_project_key": project_key, "jira_issue_type": "Task", "jira_priority": "Medium"},
+                timeout=300
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            return
+
+        with lock:
+            if response.status_code != 200:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                return
+            latencies.append(elapsed)
+            for stage, value in (body.get("timings") or {}).items():
+                stages.setdefault(stage.replace("_ms", ""), []).append(value)
+            tier = (body.get("extraction") or {}).get("tier")
+            if tier:
+                tiers[tier] = tiers.get(tier, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(total)))
+    wall = time.perf_counter() - started
+
+    return {
+        "endpoints": sorted({endpoint for endpoint, _, _ in plan}),
+        "requests": total,
+        "succeeded": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else None,
+        "latency_ms": latency_summary(latencies),
+        "stages_ms": {stage: latency_summary(values) for stage, values in sorted(stages.items())},
+        "extraction_tiers": tiers,
+    }
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]):
+    """Print throughput and p95 deltas against a previous run"""
+    print(f"\nCompared with {previous.get('commit', 'previous run')}:")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for label, key_path in (("throughput_rps", ("throughput_rps",)), ("p95_ms", ("latency_ms", "p95"))):
+            old, new = before, result
+            for key in key_path:
+                old, new = (old or {}).get(key), (new or {}).get(key)
+            if old and new:
+                print(f"  {name:<11} {label:<15} {old:>10} -> {new:<10} ({(new - old) / old * 100:+.1f}%)")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(BACKEND_DIR), capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--project-key", default="BENCH")
+    parser.add_argument("--transcript-repeat", type=int, default=50, help="Size of the synthetic transcript")
+    parser.add_argument("--audio-seconds", type=float, default=5.0)
+    parser.add_argument("--out", help="Write results JSON to this path")
+    parser.add_argument("--compare", help="Previous results JSON to diff against")
+    add_fault_arguments(parser, "openai")
+    add_fault_arguments(parser, "jira")
+    args = parser.parse_args()
+
+    openai_server = FakeOpenAIServer(faults=fault_config_from_args(args, "openai")).start()
+    jira_server = FakeJiraServer(faults=fault_config_from_args(args, "jira")).start()
+
+    upload_dir = tempfile.mkdtemp(prefix="bench-uploads-")
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"{openai_server.url}/v1",
+        "JIRA_BASE_URL": jira_server.url,
+        "JIRA_EMAIL": "bench@example.com",
+        "JIRA_API_TOKEN": "bench-token",
+        "UPLOAD_DIR": upload_dir,
+        "VECTOR_INDEX_DIR": os.path.join(upload_dir, "index"),
+    })
+    env.pop("GROQ_API_KEY", None)
+
+    app_server = AppServer(env, workers=args.workers).start()
+    transcript = make_transcript(args.transcript_repeat)
+    audio = make_wav(args.audio_seconds)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "transcript_bytes": len(transcript),
+            "audio_bytes": len(audio),
+            "openai_latency_ms": args.openai_latency_ms,
+            "openai_error_rate": args.openai_error_rate,
+            "jira_latency_ms": args.jira_latency_ms,
+            "jira_error_rate": args.jira_error_rate,
+        },
+        "scenarios": {},
+    }
+
+    try:
+        for scenario in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if scenario not in SCENARIOS:
+                parser.error(f"Unknown scenario: {scenario}")
+            print(f"Running {scenario} ({args.requests} requests, concurrency {args.concurrency})...")
+            result = run_scenario(
+                app_server.url, scenario, args.requests, args.concurrency,
+                args.project_key, transcript, audio
+            )
+            results["scenarios"][scenario] = result
+            lat = result["latency_ms"]
+            print(f"  {result['throughput_rps']} req/s  p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms  errors={result['errors']}")
+            for stage, summary in result["stages_ms"].items():
+                print(f"    {stage:<14} p50={summary['p50']}ms p95={summary['p95']}ms p99={summary['p99']}ms")
+
+        results["peak_rss_mb"] = {
+            "app": app_server.peak_rss_mb(),
+            "benchmark": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+        results["upstream_requests"] = {
+            "openai": dict(openai_server.request_counts),
+            "jira": dict(jira_server.request_counts),
+        }
+        print(f"Peak RSS (app): {results['peak_rss_mb']['app']} MB")
+    finally:
+        app_server.stop()
+        openai_server.stop()
+        jira_server.stop()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the compact transcript representation
+
+Builds a synthetic verbose_json Whisper response for a long meeting and
+measures (tracemalloc) what one transcription result keeps alive:
+
+    verbose   the previous WhisperService result: the SDK Transcription
+              object's segments plus a model_dump() copy (full_result)
+    compact   a CompactTranscript of the same response
+
+Also reports the size of the checkpoint / job-store JSON, and times
+iteration over the compact segments and a verbose() rebuild.
+
+Usage (from backend/):
+    python -m benchmarks.transcript_memory_benchmark
+    python -m benchmarks.transcript_memory_benchmark --minutes 240 --segment-seconds 4
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Dict
+
+from app.services.compact_transcript import CompactTranscript
+
+_WORDS = (
+    "alice will update the deployment script before friday and bob reviews the api "
+    "changes we agreed to move the release because the migration is not finished "
+    "carol owns the dashboard fix and the on call rotation needs a new owner"
+).split()
+
+
+def make_response(minutes: int, segment_seconds: float, seed: int = 7) -> Dict[str, Any]:
+    """A Whisper verbose_json response body with realistic segment fields"""
+    rng = random.Random(seed)
+    segments, texts = [], []
+    t, seek = 0.0, 0
+    index = 0
+    while t < minutes * 60:
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 16))]
+        text = " " + " ".join(words).capitalize() + "."
+        end = t + segment_seconds * rng.uniform(0.6, 1.4)
+        segments.append({
+            "id": index,
+            "seek": seek,
+            "start": round(t, 2),
+            "end": round(end, 2),
+            "text": text,
+            "tokens": [rng.randint(50364, 51864) if i == 0 else rng.randint(200, 50000) for i in range(len(words) + 4)],
+            "temperature": 0.0,
+            "avg_logprob": round(rng.uniform(-0.6, -0.1), 6),
+            "compression_ratio": round(rng.uniform(1.2, 1.8), 6),
+            "no_speech_prob": round(rng.uniform(0.0, 0.05), 6),
+        })
+        texts.append(text)
+        t = end
+        seek = int(t * 100) // 3000 * 3000
+        index += 1
+    return {"task": "transcribe", "language": "english", "duration": round(t, 2),
+            "text": "".join(texts).strip(), "segments": segments}
+
+
+def _parse(body: str):
+    """What the openai SDK hands back for the body (plain dicts without it)"""
+    data = json.loads(body)
+    try:
+        from openai.types.audio import TranscriptionVerbose
+    except ImportError:
+        return data
+    return TranscriptionVerbose.model_validate(data)
+
+
+def _verbose_result(transcript) -> Dict[str, Any]:
+    if isinstance(transcript, dict):
+        return {"text": transcript["text"], "segments": transcript["segments"], "full_result": json.loads(json.dumps(transcript))}
+    return {"text": transcript.text, "segments": transcript.segments, "full_result": transcript.model_dump()}
+
+
+def _compact_result(transcript) -> Dict[str, Any]:
+    if isinstance(transcript, dict):
+        text, segments = transcript["text"], transcript["segments"]
+        language, duration = transcript["language"], transcript["duration"]
+    else:
+        text, segments = transcript.text, transcript.segments
+        language, duration = transcript.language, transcript.duration
+    return {"text": text, "segments": CompactTranscript.from_segments(text, segments, language, duration)}
+
+
+def retained_bytes(body: str, build) -> int:
+    """Bytes still allocated once the response is parsed and turned into a result"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = build(_parse(body))
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=120, help="Meeting length")
+    parser.add_argument("--segment-seconds", type=float, default=4.0, help="Average Whisper segment length")
+    parser.add_argument("--out", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    response = make_response(args.minutes, args.segment_seconds)
+    body = json.dumps(response)
+    print(f"{args.minutes} min meeting: {len(response['segments'])} segments, "
+          f"{len(response['text'])} chars, response {len(body) // 1024} KiB")
+
+    # Import the SDK types and build their validators outside the measurement
+    _verbose_result(_parse(body))
+    verbose = retained_bytes(body, _verbose_result)
+    compact = retained_bytes(body, _compact_result)
+    segments = _compact_result(_parse(body))["segments"]
+    stored = json.dumps(segments.to_json())
+
+    started = time.perf_counter()
+    for _ in segments:
+        pass
+    iterate_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    segments.verbose()
+    verbose_ms = (time.perf_counter() - started) * 1000
+
+    results = {
+        "config": vars(args),
+        "segments": len(segments),
+        "retained_bytes": {"verbose": verbose, "compact": compact},
+        "reduction": round(verbose / compact, 1) if compact else None,
+        "json_bytes": {"verbose": len(json.dumps(segments.verbose())), "compact": len(stored)},
+        "iterate_ms": round(iterate_ms, 2),
+        "verbose_rebuild_ms": round(verbose_ms, 2),
+    }
+    print(f"  retained: verbose {verbose // 1024} KiB, compact {compact // 1024} KiB ({results['reduction']}x smaller)")
+    print(f"  stored JSON: verbose {results['json_bytes']['verbose'] // 1024} KiB, "
+          f"compact {results['json_bytes']['compact'] // 1024} KiB")
+    print(f"  iterate {results['iterate_ms']}ms, verbose() {results['verbose_rebuild_ms']}ms")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
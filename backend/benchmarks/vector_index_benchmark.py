@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Search latency benchmark for the similar action items index
+
+Builds an ActionItemIndex of synthetic action items through the normal
+add() path (which trains the IVF quantizer at TRAIN_SIZE rows and retrains
+it each time the row count doubles), then times top-k searches for
+paraphrased stored items and checks them against the latency target.
+Recall is the share of the exact (brute-force) top-k that the IVF search
+also returns, over a sample of the queries.
+
+Exits with status 1 when the p95 search latency misses --target-ms.
+
+Usage (from backend/):
+    python -m benchmarks.vector_index_benchmark
+    python -m benchmarks.vector_index_benchmark --rows 200000 --queries 500
+    python -m benchmarks.vector_index_benchmark --dir /tmp/action-index   # reuse a built index
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.vector_index import ActionItemIndex
+
+_VERBS = ("update", "fix", "review", "write", "send", "migrate", "deploy", "test", "document", "schedule",
+          "investigate", "clean up", "refactor", "benchmark", "escalate", "draft", "share", "plan")
+_OBJECTS = ("deployment script", "api changes", "release notes", "dashboard", "login bug", "on call rotation",
+            "database migration", "billing report", "load balancer config", "onboarding guide", "test suite",
+            "search index", "payment webhook", "mobile build", "sso integration", "quarterly roadmap",
+            "incident postmortem", "customer export", "cache layer", "audit log")
+_DETAILS = ("before friday", "for the eu region", "with the platform team", "after the freeze", "for v2",
+            "in staging", "for the board meeting", "by end of sprint", "for enterprise customers", "")
+_OWNERS = ("alice", "bob", "carol", "dan", "erin", "frank", "grace", "heidi")
+
+
+def make_item(rng: random.Random) -> dict:
+    description = " ".join(filter(None, (
+        rng.choice(_VERBS), "the", rng.choice(_OBJECTS), rng.choice(_DETAILS), f"(ticket {rng.randint(1, 50000)})"
+    )))
+    return {"description": description, "owner": rng.choice(_OWNERS)}
+
+
+def paraphrase(description: str, rng: random.Random) -> str:
+    words = description.split()
+    words[0] = words[0] + rng.choice(("", "s", "ing"))
+    return " ".join(w for w in words if w != "the")
+
+
+def build(index: ActionItemIndex, rows: int, batch: int, seed: int):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    while index.count < rows:
+        index.add([make_item(rng) for _ in range(min(batch, rows - index.count))])
+        if index.count % (batch * 20) == 0:
+            print(f"  {index.count} rows, {time.perf_counter() - started:.0f}s", flush=True)
+    return time.perf_counter() - started
+
+
+def exact_top(index: ActionItemIndex, text: str, k: int, block: int = 65536) -> set:
+    """Row ids of the brute-force top-k over every row"""
+    query = index.embed(text)
+    best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    for start in range(0, index.count, block):
+        stop = min(start + block, index.count)
+        scores = index._scores(index.vectors[start:stop], query)
+        best_rows = np.concatenate([best_rows, np.arange(start, stop)])
+        best_scores = np.concatenate([best_scores, scores])
+        keep = np.argsort(-best_scores)[:k]
+        best_rows, best_scores = best_rows[keep], best_scores[keep]
+    return set(best_rows.tolist())
+
+
+def ivf_top(index: ActionItemIndex, text: str, k: int) -> set:
+    query = index.embed(text)
+    rows = index._candidate_rows(query)
+    scores = index._scores(index.vectors[rows], query)
+    return set(rows[np.argsort(-scores)[:k]].tolist())
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Stored action items")
+    parser.add_argument("--queries", type=int, default=1000, help="Timed searches")
+    parser.add_argument("--recall-queries", type=int, default=50, help="Searches checked against brute force")
+    parser.add_argument("--k", type=int, default=3, help="Results per search (SIMILAR_ITEMS_TOP_K)")
+    parser.add_argument("--batch", type=int, default=5000, help="Items per add() call while building")
+    parser.add_argument("--target-ms", type=float, default=10.0, help="p95 search latency target")
+    parser.add_argument("--dir", help="Index directory to build or reuse (default: a temporary one)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="bench-action-index-")
+    try:
+        index = ActionItemIndex(directory)
+        build_s = 0.0
+        if index.count < args.rows:
+            print(f"Building {args.rows} rows in {directory} (starting at {index.count})")
+            build_s = build(index, args.rows, args.batch, args.seed)
+        print(f"{index.count} rows, {index.n_lists} lists (trained at {index.trained} rows), n_probe={index.n_probe}")
+
+        rng = random.Random(args.seed + 1)
+        queries = [paraphrase(make_item(rng)["description"], rng) for _ in range(args.queries)]
+        for text in queries[:20]:   # warm the page cache and list arrays
+            index.search(text, k=args.k)
+        latencies = []
+        for text in queries:
+            started = time.perf_counter()
+            index.search(text, k=args.k)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        recall_queries = queries[:args.recall_queries]
+        hits = sum(len(ivf_top(index, q, args.k) & exact_top(index, q, args.k)) for q in recall_queries)
+        recall = hits / (len(recall_queries) * args.k) if recall_queries else None
+
+        results = {
+            "config": vars(args),
+            "rows": index.count,
+            "lists": index.n_lists,
+            "trained_at": index.trained,
+            "build_s": round(build_s, 1),
+            "search_ms": {
+                "p50": round(percentile(latencies, 50), 3),
+                "p95": round(percentile(latencies, 95), 3),
+                "p99": round(percentile(latencies, 99), 3),
+            },
+            "recall_at_k": round(recall, 3) if recall is not None else None,
+        }
+        ms = results["search_ms"]
+        print(f"  search p50={ms['p50']}ms p95={ms['p95']}ms p99={ms['p99']}ms  recall@{args.k}={results['recall_at_k']}")
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.out}")
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    if ms["p95"] > args.target_ms:
+        print(f"p95 {ms['p95']}ms is over the {args.target_ms}ms target")
+        sys.exit(1)
+    print(f"p95 within the {args.target_ms}ms target")
+
+
+if __name__ == "__main__":
+    main()
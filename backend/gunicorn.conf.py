@@ -0,0 +1,42 @@
+"""
+Gunicorn configuration for production
+
+    cd backend
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Every value can be overridden through the environment variable named next
+to it.
+"""
+import multiprocessing
+import os
+
+# Networking
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+backlog = int(os.getenv("BACKLOG", "2048"))            # pending connections queued by the kernel
+keepalive = int(os.getenv("KEEPALIVE", "75"))          # > typical load balancer idle timeout (60s)
+
+# Workers: requests spend most of their time waiting on Whisper/LLM/Jira,
+# so run more workers than cores (2 x cores + 1). Each worker has its own
+# admission control, so WHISPER_CONCURRENCY etc. apply per worker.
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class = "app.workers.TunedUvicornWorker"
+
+# A single /upload can take minutes (Whisper + LLM), so allow long requests
+# and give in-flight transcriptions time to finish on SIGTERM.
+timeout = int(os.getenv("WORKER_TIMEOUT", "600"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+
+# Recycle workers periodically to bound memory growth; jitter avoids
+# restarting them all at once.
+max_requests = int(os.getenv("MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "100"))
+
+# Each worker imports the app itself and warms up its own service clients in
+# the startup hook (see WARMUP_SERVICES). Clients hold connection pools and
+# must not be shared across fork().
+preload_app = False
+
+accesslog = "-" if os.getenv("ACCESS_LOG", "false").lower() == "true" else None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Production server runner
+
+Uses gunicorn with uvicorn workers (see gunicorn.conf.py) when available,
+otherwise falls back to uvicorn's own multi-process mode (e.g. on Windows).
+Worker count defaults to 2 x CPU cores + 1; override with WEB_CONCURRENCY.
+"""
+import importlib.util
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+
+def main():
+    os.chdir(backend_dir)
+
+    if importlib.util.find_spec("gunicorn") and sys.platform != "win32":
+        os.execvp(
+            sys.executable,
+            [sys.executable, "-m", "gunicorn", "-c", str(backend_dir / "gunicorn.conf.py"), "app.main:app"]
+        )
+
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1))),
+        loop="auto",
+        http="auto",
+        backlog=int(os.getenv("BACKLOG", "2048")),
+        timeout_keep_alive=int(os.getenv("KEEPALIVE", "75")),
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", "120")),
+        access_log=os.getenv("ACCESS_LOG", "false").lower() == "true",
+        log_level=os.getenv("LOG_LEVEL", "info")
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""
+Shared test setup. Run from backend/:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Import `app` from the backend directory however pytest is invoked
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,84 @@
+"""Lexical pre-filter for action item extraction (app.services.action_prefilter) and its routes in the pipeline"""
+import asyncio
+
+import pytest
+
+from app import pipeline
+from app.services.action_prefilter import ActionPrefilter
+
+STANDUP_WITH_ITEMS = (
+    "Alice: I'll send the release notes by Friday. "
+    "Bob: Can you review the deployment script before the freeze? "
+    "Carol: Action item for me, update the dashboard."
+)
+STANDUP_WITHOUT_ITEMS = "Alice: Nothing new from me. Bob: No blockers, same as yesterday. Carol: All good here."
+
+
+class RecordingLLM:
+    provider = "test"
+
+    def __init__(self):
+        self.calls = []
+
+    def extract_action_items(self, transcript):
+        self.calls.append("extract")
+        return {"tasks": [{"description": "Send the release notes"}], "tier": "small"}
+
+    def extract_action_items_simple(self, transcript):
+        self.calls.append("regex")
+        return {"tasks": []}
+
+    def summarize_transcript(self, transcript):
+        self.calls.append("summarize")
+        return "Stand-up"
+
+
+def test_actionable_transcript_goes_to_the_llm():
+    decision = ActionPrefilter().evaluate(STANDUP_WITH_ITEMS)
+    assert decision["route"] == "llm"
+    assert decision["actionable"] == 3.0
+    assert decision["score"] == pytest.approx(0.777, abs=0.001)
+    assert {"marker", "commitment", "request", "deadline"} <= set(decision["cues"])
+
+
+def test_nothing_new_standup_takes_the_low_route():
+    assert ActionPrefilter().evaluate(STANDUP_WITHOUT_ITEMS)["route"] == "summary"
+    decision = ActionPrefilter(low_route="regex").evaluate(STANDUP_WITHOUT_ITEMS)
+    assert decision["route"] == "regex"
+    assert decision["score"] == 0.0
+    assert decision["negative"] == 4
+
+
+def test_negative_phrases_cancel_commitments():
+    text = "I'll send the notes tomorrow. Nothing new otherwise. No updates from me. All good."
+    decision = ActionPrefilter().evaluate(text)
+    assert decision["actionable"] == 1.0
+    assert decision["score"] == 0.0
+
+
+def test_near_silent_recordings_need_no_llm():
+    decision = ActionPrefilter(min_words=5).evaluate("Okay. Thanks all.")
+    assert decision == {"score": 0.0, "route": "regex", "words": 3, "actionable": 0.0, "negative": 0, "cues": {}}
+
+
+def test_invalid_low_route():
+    with pytest.raises(ValueError):
+        ActionPrefilter(low_route="skip")
+
+
+@pytest.mark.parametrize("transcript, low_route, calls", [
+    (STANDUP_WITH_ITEMS, "summary", ["extract", "summarize"]),
+    (STANDUP_WITHOUT_ITEMS, "summary", ["summarize"]),
+    (STANDUP_WITHOUT_ITEMS, "regex", ["regex"]),
+])
+def test_pipeline_follows_the_route(monkeypatch, transcript, low_route, calls):
+    llm = RecordingLLM()
+    monkeypatch.setattr(pipeline, "get_llm_service", lambda: llm)
+    monkeypatch.setattr(pipeline, "get_action_prefilter", lambda: ActionPrefilter(low_route=low_route))
+
+    result = asyncio.run(pipeline.process_transcript_and_create_issues(
+        transcript, "standup.vtt", "ENG", "Task", "Medium", create_issues=False
+    ))
+    assert llm.calls == calls
+    assert result["prefilter"]["route"] == ("llm" if transcript is STANDUP_WITH_ITEMS else low_route)
+    assert "prefilter_ms" in result["timings"]
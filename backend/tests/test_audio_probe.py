@@ -0,0 +1,120 @@
+"""Header probes (app.services.audio_probe) on small synthetic files"""
+import struct
+import wave
+
+import pytest
+
+from app.services.audio_probe import duration_seconds, probe_audio
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, stereo: 417-byte frames of 1152 samples
+MP3_HEADER = b"\xff\xfb\x90\x00"
+MP3_FRAME_BYTES = 417
+
+
+def _write(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _wav(tmp_path, name: str, seconds: float, rate: int = 16000, channels: int = 1) -> str:
+    path = str(tmp_path / name)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * channels * int(rate * seconds))
+    return path
+
+
+def _mp3_frames(count: int, first_payload: bytes = b"") -> bytes:
+    first = MP3_HEADER + first_payload
+    frames = [first + b"\x00" * (MP3_FRAME_BYTES - len(first))]
+    frames += [MP3_HEADER + b"\x00" * (MP3_FRAME_BYTES - 4)] * (count - 1)
+    return b"".join(frames)
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _ogg_page(granule: int, serial: int, packet: bytes, header_type: int = 0) -> bytes:
+    # CRC left at zero: the probe doesn't check it
+    return (b"OggS" + bytes([0, header_type]) + struct.pack("<qII", granule, serial, 0) + b"\x00\x00\x00\x00"
+            + bytes([1, len(packet)]) + packet)
+
+
+def test_wav(tmp_path):
+    info = probe_audio(_wav(tmp_path, "standup.wav", 1.5, rate=16000, channels=2))
+    assert info == {"format": "wav", "duration_us": 1_500_000, "sample_rate": 16000, "channels": 2, "exact": True}
+
+
+def test_wav_streamed_without_data_size(tmp_path):
+    path = _wav(tmp_path, "live.wav", 2.0, rate=8000)
+    data = bytearray(open(path, "rb").read())
+    data[40:44] = b"\xff\xff\xff\xff"   # data chunk size of a writer that never finalized it
+    info = probe_audio(_write(tmp_path, "live2.wav", bytes(data)))
+    assert duration_seconds(info) == 2.0
+
+
+def test_flac(tmp_path):
+    # 44.1 kHz, 2 channels, 16 bits, 441000 samples
+    packed = (44100 << 44) | (1 << 41) | (15 << 36) | 441000
+    streaminfo = struct.pack(">HH", 4096, 4096) + b"\x00" * 6 + packed.to_bytes(8, "big") + b"\x00" * 16
+    data = b"fLaC" + bytes([0x80]) + len(streaminfo).to_bytes(3, "big") + streaminfo
+    info = probe_audio(_write(tmp_path, "call.flac", data))
+    assert info == {"format": "flac", "duration_us": 10_000_000, "sample_rate": 44100, "channels": 2, "exact": True}
+
+
+def test_mp3_cbr_estimate(tmp_path):
+    info = probe_audio(_write(tmp_path, "cbr.mp3", _mp3_frames(100)))
+    assert info["format"] == "mp3"
+    assert (info["sample_rate"], info["channels"]) == (44100, 2)
+    assert not info["exact"]
+    assert duration_seconds(info) == pytest.approx(100 * MP3_FRAME_BYTES * 8 / 128000)
+
+
+def test_mp3_xing_frame_count_after_id3(tmp_path):
+    # Xing header after the 32 bytes of stereo MPEG-1 side information
+    xing = b"\x00" * 32 + b"Xing" + struct.pack(">II", 0x1, 1000)
+    id3 = b"ID3\x03\x00\x00" + bytes([0, 0, 0, 20]) + b"\x00" * 20
+    info = probe_audio(_write(tmp_path, "vbr.mp3", id3 + _mp3_frames(5, xing)))
+    assert info["exact"]
+    assert duration_seconds(info) == pytest.approx(1000 * 1152 / 44100, abs=1e-6)
+
+
+def test_m4a_with_moov_after_mdat(tmp_path):
+    mvhd = _box(b"mvhd", b"\x00" * 12 + struct.pack(">II", 44100, 44100 * 12) + b"\x00" * 80)
+    hdlr = _box(b"hdlr", b"\x00" * 8 + b"soun" + b"\x00" * 12)
+    entry = _box(b"mp4a", b"\x00" * 6 + struct.pack(">H", 1) + b"\x00" * 8
+                 + struct.pack(">HHI", 2, 16, 0) + struct.pack(">I", 44100 << 16))
+    stsd = _box(b"stsd", b"\x00" * 4 + struct.pack(">I", 1) + entry)
+    trak = _box(b"trak", _box(b"mdia", hdlr + _box(b"minf", _box(b"stbl", stsd))))
+    data = _box(b"ftyp", b"M4A \x00\x00\x00\x00") + _box(b"mdat", b"\x00" * 4096) + _box(b"moov", mvhd + trak)
+    info = probe_audio(_write(tmp_path, "meeting.m4a", data))
+    assert info == {"format": "m4a", "duration_us": 12_000_000, "sample_rate": 44100, "channels": 2, "exact": True}
+
+
+def test_ogg_vorbis(tmp_path):
+    ident = b"\x01vorbis" + struct.pack("<I", 0) + bytes([1]) + struct.pack("<I", 44100) + b"\x00" * 14
+    data = _ogg_page(0, 7, ident, header_type=2) + _ogg_page(44100 * 3, 7, b"\x00" * 50, header_type=4)
+    info = probe_audio(_write(tmp_path, "note.ogg", data))
+    assert info == {"format": "ogg", "duration_us": 3_000_000, "sample_rate": 44100, "channels": 1, "exact": True}
+
+
+def test_opus_subtracts_pre_skip(tmp_path):
+    head = b"OpusHead" + bytes([1, 2]) + struct.pack("<HIhB", 312, 16000, 0, 0)
+    data = _ogg_page(0, 9, head, header_type=2) + _ogg_page(48000 * 2 + 312, 9, b"\x00" * 50, header_type=4)
+    info = probe_audio(_write(tmp_path, "voice.opus", data))
+    assert info == {"format": "opus", "duration_us": 2_000_000, "sample_rate": 16000, "channels": 2, "exact": True}
+
+
+def test_format_comes_from_content_not_extension(tmp_path):
+    info = probe_audio(_wav(tmp_path, "misnamed.mp3", 0.5))
+    assert info["format"] == "wav"
+
+
+def test_unrecognized_and_missing_files(tmp_path):
+    assert probe_audio(_write(tmp_path, "notes.wav", b"just some text, not audio" * 10)) is None
+    assert probe_audio(str(tmp_path / "missing.wav")) is None
+    assert duration_seconds(None) is None
@@ -0,0 +1,140 @@
+"""Caption export parsers (app.services.captions)"""
+import io
+import json
+
+import pytest
+
+from app.services.captions import parse_captions, parse_timestamp
+
+
+def _parse(text: str, ext: str):
+    return parse_captions(io.BytesIO(text.encode("utf-8")), ext)
+
+
+TEAMS_VTT = """WEBVTT
+
+a1b2/12-0
+00:00:01.000 --> 00:00:04.500
+<v Alice Smith>I'll send the report by Friday.</v>
+
+a1b2/13-0
+00:00:04.500 --> 00:00:06.000
+<v Alice Smith>And the slides.</v>
+
+a1b2/14-0
+00:01:02.250 --> 00:01:05.000
+<v Bob Jones>Action item: I fix the login bug.</v>
+"""
+
+ZOOM_VTT = """WEBVTT
+
+1
+00:00:01.000 --> 00:00:03.000
+Alice Smith: Let's start with the release.
+
+2
+00:00:03.000 --> 00:00:05.000
+Bob: Action item: Bob sends the report.
+
+3
+00:00:05.000 --> 00:00:07.000
+Alice Smith: Note: it's due Friday.
+"""
+
+PLAIN_SRT = """1
+00:00:01,000 --> 00:00:03,000
+We reviewed the release.
+
+2
+00:00:03,000 --> 00:00:05,000
+Action item: Bob sends the report.
+
+3
+00:00:05,000 --> 00:00:07,500
+The meeting moves to 10:30 tomorrow.
+"""
+
+
+def test_vtt_voice_tags():
+    result = _parse(TEAMS_VTT, ".vtt")
+    assert result["speakers"] == ["Alice Smith", "Bob Jones"]
+    assert result["segments"][0] == {
+        "start": 1.0, "end": 4.5, "text": "I'll send the report by Friday.", "speaker": "Alice Smith"
+    }
+    assert result["segments"][2]["start"] == 62.25
+    # Consecutive cues of a speaker are merged into one line
+    assert result["text"] == (
+        "Alice Smith: I'll send the report by Friday. And the slides.\n"
+        "Bob Jones: Action item: I fix the login bug."
+    )
+
+
+def test_vtt_zoom_speaker_prefixes():
+    segments = _parse(ZOOM_VTT, ".vtt")["segments"]
+    assert [seg["speaker"] for seg in segments] == ["Alice Smith", "Bob", "Alice Smith"]
+    # Only the leading name is split off
+    assert segments[1]["text"] == "Action item: Bob sends the report."
+    assert segments[2]["text"] == "Note: it's due Friday."
+
+
+def test_labels_in_plain_captions_stay_text():
+    result = _parse(PLAIN_SRT, ".srt")
+    assert result["speakers"] == []
+    assert [seg["text"] for seg in result["segments"]] == [
+        "We reviewed the release.",
+        "Action item: Bob sends the report.",
+        "The meeting moves to 10:30 tomorrow.",
+    ]
+    assert result["segments"][2]["end"] == 7.5
+
+
+def test_srt_with_crlf_and_markup():
+    srt = "1\r\n00:00:01,000 --> 00:00:02,000\r\n<i>Hello</i> &amp; welcome\r\n\r\n"
+    assert _parse(srt, ".srt")["segments"] == [{"start": 1.0, "end": 2.0, "text": "Hello & welcome", "speaker": None}]
+
+
+def test_teams_json_entries():
+    data = {"entries": [
+        {"speakerDisplayName": "Alice", "text": "Ship it.", "startOffset": "00:00:05.4560000", "endOffset": "00:00:07.0000000"},
+        {"speakerDisplayName": "Bob", "text": "  ", "startOffset": "00:00:07.0000000"},
+        {"speakerDisplayName": "Bob", "text": "Agreed.", "startOffset": "00:00:07.0000000", "endOffset": "00:00:08.0000000"},
+    ]}
+    result = _parse(json.dumps(data), ".json")
+    assert result["segments"] == [
+        {"start": 5.456, "end": 7.0, "text": "Ship it.", "speaker": "Alice"},
+        {"start": 7.0, "end": 8.0, "text": "Agreed.", "speaker": "Bob"},
+    ]
+    assert result["text"] == "Alice: Ship it.\nBob: Agreed."
+
+
+def test_zoom_json_records():
+    data = [
+        {"username": "Alice", "text": "Let's begin.", "start": 0.5, "end": 2},
+        {"speaker": {"displayName": "Bob"}, "content": "I'll draft the plan.", "start_time": "00:00:02.000"},
+    ]
+    segments = _parse(json.dumps(data), ".json")["segments"]
+    assert segments[0] == {"start": 0.5, "end": 2.0, "text": "Let's begin.", "speaker": "Alice"}
+    assert segments[1] == {"start": 2.0, "end": 2.0, "text": "I'll draft the plan.", "speaker": "Bob"}
+
+
+@pytest.mark.parametrize("text, ext", [
+    ("{not json", ".json"),
+    ('{"meeting": "no records"}', ".json"),
+    ("WEBVTT\n\n", ".vtt"),
+    ("hello", ".txt"),
+])
+def test_invalid_files_raise_value_error(text, ext):
+    with pytest.raises(ValueError):
+        _parse(text, ext)
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("00:01:02.500", 62.5),
+    ("01:02,250", 62.25),
+    ("1:00:00", 3600.0),
+    ("00:00:05.4560000", 5.456),
+    (12, 12.0),
+    ("soon", None),
+])
+def test_parse_timestamp(value, seconds):
+    assert parse_timestamp(value) == seconds
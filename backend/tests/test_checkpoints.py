@@ -0,0 +1,107 @@
+"""Pipeline checkpoints (app.checkpoints) and resuming a run from them (app.pipeline)"""
+import asyncio
+
+from app import pipeline
+from app.checkpoints import Checkpoint, run_key
+from app.jobs import SQLiteJobStore
+from app.services.compact_transcript import CompactTranscript
+
+
+class RecordingLLM:
+    """LLM service stand-in that records which calls were made"""
+
+    provider = "test"
+
+    def __init__(self):
+        self.calls = []
+
+    def extract_action_items(self, transcript):
+        self.calls.append("extract")
+        return {"tasks": [{"description": "Fresh item"}], "tier": "small"}
+
+    def extract_action_items_simple(self, transcript):
+        self.calls.append("regex")
+        return {"tasks": []}
+
+    def summarize_transcript(self, transcript):
+        self.calls.append("summarize")
+        return "Fresh summary"
+
+
+SAVED_LLM = {
+    "action_items": [{"description": "Send the report", "owner": "Alice", "priority": "high"}],
+    "summary": "Weekly sync",
+    "prefilter": {"route": "llm", "score": 0.9},
+    "extraction": {"tier": "small", "model": "test", "escalation": None},
+}
+
+
+def _process(checkpoint=None):
+    return asyncio.run(pipeline.process_transcript_and_create_issues(
+        "Alice: I'll send the report by Friday.", "sync.vtt", "ENG", "Task", "Medium",
+        create_issues=False, checkpoint=checkpoint
+    ))
+
+
+def test_checkpoints_are_reloaded_from_the_store(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    key = run_key("upload", "tenant", "/upload", "key-1")
+    Checkpoint(SQLiteJobStore(path), key).save("llm", SAVED_LLM)
+
+    store = SQLiteJobStore(path)
+    checkpoint = Checkpoint(store, key, store.load_checkpoints(key))
+    assert checkpoint.get("transcript") is None
+    assert checkpoint.get("llm") == SAVED_LLM
+    assert checkpoint.resumed == ["llm"]
+
+    checkpoint.clear()
+    assert store.load_checkpoints(key) == {}
+
+
+def test_run_keys_are_stable_and_distinct():
+    assert run_key("upload", "tenant", "key-1") == run_key("upload", "tenant", "key-1")
+    assert run_key("upload", "tenant", "key-1") != run_key("upload", "tenant", "key-2")
+    assert run_key("job", "abc").startswith("job:")
+
+
+def test_resumed_transcript_skips_whisper(monkeypatch):
+    def no_whisper():
+        raise AssertionError("Whisper called for a checkpointed transcript")
+
+    monkeypatch.setattr(pipeline, "get_whisper_service", no_whisper)
+    segments = CompactTranscript.from_segments(
+        "Alice: Hello there.", [{"start": 0.0, "end": 1.5, "text": "Hello there.", "speaker": "Alice"}]
+    )
+    checkpoint = Checkpoint(None, "upload:test", {"transcript": segments.to_json()})
+
+    text, resumed = asyncio.run(pipeline.transcribe_audio("missing.wav", "ENG", {}, checkpoint))
+    assert text == "Alice: Hello there."
+    assert list(resumed) == list(segments)
+    assert checkpoint.resumed == ["transcript"]
+
+
+def test_resumed_llm_step_skips_llm_calls(monkeypatch):
+    llm = RecordingLLM()
+    monkeypatch.setattr(pipeline, "get_llm_service", lambda: llm)
+    monkeypatch.setattr(pipeline, "get_action_prefilter", lambda: None)
+
+    result = _process(Checkpoint(None, "upload:test", {"llm": SAVED_LLM}))
+    assert llm.calls == []
+    assert result["action_items"] == SAVED_LLM["action_items"]
+    assert result["summary"] == "Weekly sync"
+    assert result["prefilter"] == SAVED_LLM["prefilter"]
+    assert result["resumed"] == ["llm"]
+
+
+def test_fresh_run_saves_the_llm_step(monkeypatch):
+    llm = RecordingLLM()
+    monkeypatch.setattr(pipeline, "get_llm_service", lambda: llm)
+    monkeypatch.setattr(pipeline, "get_action_prefilter", lambda: None)
+    checkpoint = Checkpoint(None, "upload:test")
+
+    result = _process(checkpoint)
+    assert llm.calls == ["extract", "summarize"]
+    assert result["resumed"] == []
+    saved = checkpoint.get("llm")
+    assert saved["action_items"] == [{"description": "Fresh item"}]
+    assert saved["summary"] == "Fresh summary"
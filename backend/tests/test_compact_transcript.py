@@ -0,0 +1,77 @@
+"""Column-wise transcript segments (app.services.compact_transcript)"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.compact_transcript import CompactTranscript, load_segments
+
+TEXT = " Good morning everyone. Let's start with the release. Alice will send the notes."
+SEGMENTS = [
+    {"id": 0, "seek": 0, "start": 0.0, "end": 2.5, "text": " Good morning everyone.", "tokens": [50364, 2205, 2446],
+     "temperature": 0.0, "avg_logprob": -0.25, "compression_ratio": 1.2, "no_speech_prob": 0.01},
+    {"id": 1, "seek": 0, "start": 2.5, "end": 6.12, "text": " Let's start with the release.", "tokens": [961, 311],
+     "temperature": 0.0, "avg_logprob": -0.31, "compression_ratio": 1.1, "no_speech_prob": 0.02},
+    {"id": 2, "seek": 3000, "start": 6.12, "end": 9.75, "text": " Alice will send the notes.", "tokens": [],
+     "temperature": 0.2, "avg_logprob": -0.4, "compression_ratio": 1.3, "no_speech_prob": 0.05},
+]
+
+
+def test_segments_read_back_as_dicts():
+    compact = CompactTranscript.from_segments(TEXT, SEGMENTS, language="en", duration=9.75)
+    assert len(compact) == 3
+    assert compact[1] == {"start": 2.5, "end": 6.12, "text": "Let's start with the release.", "speaker": None}
+    assert compact[-1]["text"] == "Alice will send the notes."
+    assert [seg["start"] for seg in compact] == [0.0, 2.5, 6.12]
+    with pytest.raises(IndexError):
+        compact[3]
+    assert not CompactTranscript.from_segments("", None)
+
+
+def test_verbose_rebuilds_the_whisper_result():
+    verbose = CompactTranscript.from_segments(TEXT, SEGMENTS, language="en", duration=9.75).verbose()
+    assert (verbose["text"], verbose["language"], verbose["duration"]) == (TEXT, "en", 9.75)
+    for original, rebuilt in zip(SEGMENTS, verbose["segments"]):
+        assert rebuilt == {**original, "text": original["text"].strip()}
+
+
+def test_sdk_objects_and_diarized_text():
+    # Diarized text has speaker prefixes, so segments are found by search; text
+    # that isn't in the transcript at all goes to the string table
+    text = "Alice: Hello there.\nBob: Hi Alice."
+    segments = [
+        SimpleNamespace(start=0.0, end=1.0, text=" Hello there.", speaker="Alice"),
+        {"start": 1.0, "end": 2.0, "text": "Hi Alice.", "speaker": "Bob"},
+        {"start": 2.0, "end": 3.0, "text": "(inaudible)", "speaker": "Alice"},
+    ]
+    compact = CompactTranscript.from_segments(text, segments)
+    assert [seg["text"] for seg in compact] == ["Hello there.", "Hi Alice.", "(inaudible)"]
+    assert [seg["speaker"] for seg in compact] == ["Alice", "Bob", "Alice"]
+    assert compact.speakers() == ["Alice", "Bob"]
+    assert "temperature" not in compact.verbose()["segments"][0]
+
+
+@pytest.mark.parametrize("segments", [SEGMENTS, [{"start": 0.0, "end": 1.0, "text": " Good morning", "speaker": "Alice"}]])
+def test_json_round_trip(segments):
+    compact = CompactTranscript.from_segments(TEXT, segments, language="en", duration=9.75)
+    stored = json.loads(json.dumps(compact.to_json()))
+    restored = load_segments(stored)
+    assert isinstance(restored, CompactTranscript)
+    assert list(restored) == list(compact)
+    assert restored.verbose() == compact.verbose()
+
+    # Appending after a reload continues the text search where it left off
+    assert restored._cursor == compact._cursor
+
+
+def test_optional_columns_are_left_out():
+    data = CompactTranscript.from_segments("Hello.", [{"start": 0, "end": 1, "text": "Hello."}]).to_json()
+    assert set(data) == {"format", "text", "language", "duration", "text_offsets", "text_lengths", "strings", "start", "end"}
+
+
+def test_load_segments_passes_other_values_through():
+    captions = [{"start": 0.0, "end": 1.0, "text": "Hi", "speaker": "Alice"}]
+    assert load_segments(captions) is captions
+    assert load_segments(None) is None
+    with pytest.raises(ValueError):
+        CompactTranscript.from_json({"format": "something-else"})
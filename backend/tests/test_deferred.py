@@ -0,0 +1,152 @@
+"""Deferred processing through the provider Batch API (app.deferred) against the fake OpenAI server"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import main, pipeline
+from app.config import settings
+from app.deferred import NO_SUMMARY, DeferredJobStore, DeferredProcessor
+from app.services import action_prefilter, llm_service, vector_index
+from app.services.action_prefilter import ActionPrefilter
+from benchmarks.fake_servers import FakeOpenAIServer
+
+pytest.importorskip("openai")
+
+ACTIONABLE = "Alice: I'll send the quarterly report to finance by Friday. Bob: Can you schedule the review before the freeze?"
+NOTHING_NEW = "Alice: Nothing new from me. Bob: No blockers, same as yesterday. Carol: All good here."
+
+
+class RecordingLLM:
+    """Synchronous LLM calls made after the batch; there should be none"""
+
+    provider = "test"
+
+    def __init__(self):
+        self.calls = []
+
+    def extract_action_items(self, transcript):
+        self.calls.append("extract")
+        return {"tasks": []}
+
+    def extract_action_items_simple(self, transcript):
+        self.calls.append("regex")
+        return {"tasks": []}
+
+    def summarize_transcript(self, transcript):
+        self.calls.append("summarize")
+        return "Synchronous summary"
+
+
+@pytest.fixture
+def server():
+    server = FakeOpenAIServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def batch_llm(server, monkeypatch):
+    """An OpenAI-provider LLMService on the fake server, shared by the deferred steps"""
+    monkeypatch.setattr(settings, "GROQ_API_KEY", None)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", f"{server.url}/v1")
+    monkeypatch.setattr(settings, "LLM_MODEL", "batch-model")
+    monkeypatch.setattr(settings, "LLM_SMALL_MODEL", None)
+    monkeypatch.setattr(vector_index, "get_action_item_index", lambda: None)
+    service = llm_service.LLMService()
+    monkeypatch.setattr(llm_service, "get_llm_service", lambda: service)
+    return service
+
+
+def _wait_completed(service, batch_id: str) -> dict:
+    deadline = time.monotonic() + 5
+    while True:
+        status = service.batch_status(batch_id)
+        if status["status"] == "completed" or time.monotonic() > deadline:
+            return status
+        time.sleep(0.02)
+
+
+@pytest.mark.parametrize("provider, base_path", [("openai", "/v1/"), ("groq", "")])
+def test_batch_api_without_sdk_support(server, batch_llm, provider, base_path):
+    # The pinned SDKs have neither client.files.create(purpose="batch") nor client.batches
+    batch_llm.provider = provider
+    batch_llm.client = SimpleNamespace(base_url=f"{server.url}{base_path}", api_key="sk-test")
+
+    batch_id = batch_llm.submit_batch(batch_llm.batch_requests("job1", ACTIONABLE))
+    status = _wait_completed(batch_llm, batch_id)
+    assert status["status"] == "completed"
+
+    outputs = batch_llm.batch_output(status["output_file_id"])
+    assert set(outputs) == {"job1:extract", "job1:summary"}
+    extraction = batch_llm.batch_extraction_result(outputs["job1:extract"], ACTIONABLE)
+    assert extraction["tier"] == "batch"
+    assert extraction["tasks"][0]["owner"] == "Alice"
+    assert server.request_counts["batch_chat:batch-model"] == 2
+
+
+@pytest.fixture
+def processor(tmp_path, batch_llm, monkeypatch):
+    monkeypatch.setattr(action_prefilter, "get_action_prefilter", lambda: ActionPrefilter(low_route="regex"))
+    monkeypatch.setattr(settings, "CHECKPOINTS_ENABLED", False)
+
+    # The Jira step of app.main, without creating issues; synchronous LLM calls are recorded
+    sync_llm = RecordingLLM()
+    monkeypatch.setattr(pipeline, "get_llm_service", lambda: sync_llm)
+    process = pipeline.process_transcript_and_create_issues
+    monkeypatch.setattr(main, "process_transcript_and_create_issues",
+                        lambda **kwargs: process(**kwargs, create_issues=False))
+
+    store = DeferredJobStore(str(tmp_path / "deferred.sqlite3"))
+    deferred = DeferredProcessor(store, str(tmp_path / "audio"), min_jobs=1)
+    deferred._create_issues = main._deferred_create_issues
+    return deferred, sync_llm
+
+
+def _run_until_done(deferred, job_ids, ticks: int = 50):
+    for _ in range(ticks):
+        asyncio.run(deferred.tick())
+        jobs = [deferred.store.get(job_id) for job_id in job_ids]
+        if all(job["state"] in ("done", "failed") for job in jobs):
+            return jobs
+        time.sleep(0.02)
+    raise AssertionError(f"jobs not done: {[job['state'] for job in jobs]}")
+
+
+def test_jobs_finish_from_one_batch_without_sync_llm_calls(server, processor):
+    deferred, sync_llm = processor
+    batched = deferred.store.enqueue("ENG", "sync.txt", "ENG", "Task", "Medium", transcript=ACTIONABLE)
+    skipped = deferred.store.enqueue("ENG", "standup.txt", "ENG", "Task", "Medium", transcript=NOTHING_NEW)
+
+    batched_job, skipped_job = _run_until_done(deferred, [batched, skipped])
+    assert sync_llm.calls == []
+    assert server.request_counts.get("batch_create") == 1
+
+    assert batched_job["state"] == "done"
+    assert batched_job["result"]["summary"].startswith("- Decisions")
+    assert batched_job["result"]["extraction"]["tier"] == "batch"
+    assert len(batched_job["result"]["action_items"]) == 2
+
+    # Regex route: no batch requests, and no summary call in the Jira step either
+    assert skipped_job["state"] == "done"
+    assert skipped_job["prefilter"]["route"] == "regex"
+    assert skipped_job["summary"] == NO_SUMMARY
+    assert skipped_job["result"]["summary"] is None
+
+
+def test_missing_summary_in_the_batch_output(processor, batch_llm, monkeypatch):
+    deferred, sync_llm = processor
+    batch_output = batch_llm.batch_output
+    # The summary request failed inside the batch
+    monkeypatch.setattr(batch_llm, "batch_output", lambda file_id: {
+        custom_id: content for custom_id, content in batch_output(file_id).items() if not custom_id.endswith(":summary")
+    })
+    job_id = deferred.store.enqueue("ENG", "sync.txt", "ENG", "Task", "Medium", transcript=ACTIONABLE)
+
+    job, = _run_until_done(deferred, [job_id])
+    assert job["state"] == "done"
+    assert job["summary"] == NO_SUMMARY
+    assert job["result"]["summary"] is None
+    assert sync_llm.calls == []
@@ -0,0 +1,123 @@
+"""Speaker diarization and the speaker directory (app.services.diarization_service)"""
+import json
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services.diarization_service import (  # noqa: E402
+    SAMPLE_RATE,
+    DiarizationService,
+    SpeakerDirectory,
+    format_speaker_transcript,
+)
+
+
+def _voice(seconds: float, fundamental: float, harmonics, rate: int = SAMPLE_RATE, seed: int = 0) -> "np.ndarray":
+    """A buzzy harmonic tone with a little noise; the harmonic weights set its timbre"""
+    t = np.arange(int(seconds * rate)) / rate
+    signal = sum(weight * np.sin(2 * np.pi * fundamental * (n + 1) * t) for n, weight in enumerate(harmonics))
+    signal = signal + 0.01 * np.random.default_rng(seed).standard_normal(len(t))
+    return (0.3 * signal / np.max(np.abs(signal))).astype(np.float32)
+
+
+def _write_wav(path, samples: "np.ndarray", rate: int = SAMPLE_RATE, channels: int = 1) -> str:
+    pcm = (np.repeat(samples[:, None], channels, axis=1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    return str(path)
+
+
+LOW = (1.0, 0.8, 0.6, 0.4, 0.2)           # 120 Hz, energy spread over harmonics
+HIGH = (1.0, 0.05, 0.02)                  # 330 Hz, nearly a pure tone
+
+
+@pytest.fixture
+def meeting(tmp_path):
+    """Alternating 2-second turns of two voices: A B A B"""
+    turns = [_voice(2, 120, LOW, seed=1), _voice(2, 330, HIGH, seed=2), _voice(2, 120, LOW, seed=3), _voice(2, 330, HIGH, seed=4)]
+    path = _write_wav(tmp_path / "meeting.wav", np.concatenate(turns))
+    segments = [{"start": 2.0 * i, "end": 2.0 * (i + 1), "text": f"turn {i}"} for i in range(4)]
+    return path, segments
+
+
+def test_diarize_separates_two_voices(meeting):
+    path, segments = meeting
+    result = DiarizationService(threshold=0.9).diarize(path, segments)
+    assert [seg["speaker"] for seg in result["segments"]] == ["SPEAKER_1", "SPEAKER_2", "SPEAKER_1", "SPEAKER_2"]
+    assert sorted(result["speakers"]) == ["SPEAKER_1", "SPEAKER_2"]
+
+
+def test_short_segments_inherit_the_previous_speaker(meeting):
+    path, segments = meeting
+    segments = segments[:1] + [{"start": 2.0, "end": 2.01, "text": "uh"}]
+    result = DiarizationService().diarize(path, segments)
+    assert [seg["speaker"] for seg in result["segments"]] == ["SPEAKER_1", "SPEAKER_1"]
+
+
+def test_chunked_decoding_matches_whole_file(tmp_path):
+    # 44.1 kHz stereo is downmixed and resampled to 16 kHz mono
+    path = _write_wav(tmp_path / "call.wav", _voice(3, 200, LOW, rate=44100), rate=44100, channels=2)
+    service = DiarizationService()
+    whole = np.concatenate([chunk for _, chunk in service.iter_audio(path, chunk_seconds=60)])
+    chunks = list(service.iter_audio(path, chunk_seconds=0.7))
+    assert len(chunks) > 1
+    assert [position for position, _ in chunks] == list(np.cumsum([0] + [len(c) for _, c in chunks[:-1]]))
+    assert np.allclose(np.concatenate([chunk for _, chunk in chunks]), whole, atol=1e-6)
+    assert abs(len(whole) - 3 * SAMPLE_RATE) <= 1
+
+    assert len(service.load_audio(path, max_seconds=1.5)) == int(1.5 * SAMPLE_RATE)
+
+
+def test_diarize_without_segments_or_audio(tmp_path):
+    service = DiarizationService()
+    assert service.diarize(str(tmp_path / "missing.wav"), []) is None
+
+
+def test_format_speaker_transcript_merges_turns():
+    segments = [
+        {"speaker": "Alice", "text": "Hi."},
+        {"speaker": "Alice", "text": "Let's start."},
+        {"speaker": None, "text": "(noise)"},
+        {"speaker": "Bob", "text": "Sure."},
+    ]
+    assert format_speaker_transcript(segments) == "Alice: Hi. Let's start.\nUNKNOWN: (noise)\nBob: Sure."
+
+
+def test_directory_names_enrolled_voices(tmp_path):
+    directory = SpeakerDirectory(str(tmp_path))
+    service = DiarizationService()
+    alice = service.embed(_voice(3, 120, LOW, seed=5))
+    directory.enroll("eng", "Alice Smith", "acc-alice", alice)
+
+    centroids = {"SPEAKER_1": service.embed(_voice(3, 120, LOW, seed=6)), "SPEAKER_2": service.embed(_voice(3, 330, HIGH))}
+    assert directory.label_speakers("ENG", centroids) == {"SPEAKER_1": "Alice Smith"}
+    assert directory.label_speakers("OPS", centroids) == {}
+    assert directory.speakers("ENG") == [{"name": "Alice Smith", "account_id": "acc-alice"}]
+
+
+def test_directory_resolves_owners(tmp_path):
+    directory = SpeakerDirectory(str(tmp_path))
+    directory.enroll("ENG", "Alice Smith", "acc-alice", np.ones(4, dtype=np.float32))
+    assert directory.resolve_owner("eng", "alice smith!") == "acc-alice"
+    assert directory.resolve_owner("ENG", "Alice") == "acc-alice"
+    assert directory.resolve_owner("ENG", "Bob") is None
+
+    directory.remember_owner("ENG", "Bob  Jones", "acc-bob")
+    # Another worker process sees the same rows
+    assert SpeakerDirectory(str(tmp_path)).resolve_owner("ENG", "bob jones") == "acc-bob"
+
+
+def test_legacy_json_files_are_imported(tmp_path):
+    legacy = {"voices": [{"name": "Carol", "account_id": "acc-carol", "embedding": [0.5, 0.5]}], "owners": {"carol": "acc-carol"}}
+    (tmp_path / "ops.json").write_text(json.dumps(legacy))
+
+    directory = SpeakerDirectory(str(tmp_path))
+    assert directory.speakers("OPS") == [{"name": "Carol", "account_id": "acc-carol"}]
+    assert directory.resolve_owner("OPS", "Carol") == "acc-carol"
+    assert not (tmp_path / "ops.json").exists()
+    assert (tmp_path / "ops.json.imported").exists()
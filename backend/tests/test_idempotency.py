@@ -0,0 +1,92 @@
+"""Idempotency-Key runs (app.idempotency): replay, concurrent retries, reuse with other parameters"""
+import asyncio
+
+import pytest
+
+from app.idempotency import IdempotencyKeyReused, IdempotencyManager, IdempotencyStore, request_fingerprint
+
+
+def _manager(tmp_path) -> IdempotencyManager:
+    return IdempotencyManager(IdempotencyStore(str(tmp_path / "idempotency.sqlite3")), poll_interval=0.01)
+
+
+def _counting(response, delay: float = 0.0):
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return response
+
+    return run, calls
+
+
+def test_retry_replays_the_stored_response(tmp_path):
+    manager = _manager(tmp_path)
+    run, calls = _counting({"jira_issues": ["ENG-1"]})
+
+    async def main():
+        return await manager.run("k1", "fp", run), await manager.run("k1", "fp", run)
+
+    first, second = asyncio.run(main())
+    assert first == ({"jira_issues": ["ENG-1"]}, False)
+    assert second == ({"jira_issues": ["ENG-1"]}, True)
+    assert len(calls) == 1
+
+
+def test_replay_survives_a_new_manager(tmp_path):
+    run, calls = _counting({"jira_issues": ["ENG-2"]})
+    asyncio.run(_manager(tmp_path).run("k1", "fp", run))
+
+    # Another worker process reads the same store
+    response, replayed = asyncio.run(_manager(tmp_path).run("k1", "fp", run))
+    assert replayed
+    assert response == {"jira_issues": ["ENG-2"]}
+    assert len(calls) == 1
+
+
+def test_concurrent_retry_attaches_to_the_running_request(tmp_path):
+    manager = _manager(tmp_path)
+    run, calls = _counting({"jira_issues": ["ENG-3"]}, delay=0.1)
+
+    async def main():
+        return await asyncio.gather(manager.run("k1", "fp", run), manager.run("k1", "fp", run))
+
+    results = asyncio.run(main())
+    assert sorted(replayed for _, replayed in results) == [False, True]
+    assert all(response == {"jira_issues": ["ENG-3"]} for response, _ in results)
+    assert len(calls) == 1
+
+
+def test_key_reused_with_other_parameters(tmp_path):
+    manager = _manager(tmp_path)
+    run, calls = _counting({"ok": True})
+
+    async def main():
+        await manager.run("k1", request_fingerprint(["/upload", "ENG"]), run)
+        await manager.run("k1", request_fingerprint(["/upload", "OPS"]), run)
+
+    with pytest.raises(IdempotencyKeyReused):
+        asyncio.run(main())
+    assert len(calls) == 1
+
+
+def test_failed_run_is_not_stored(tmp_path):
+    manager = _manager(tmp_path)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("Jira unavailable")
+        return {"ok": True}
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(manager.run("k1", "fp", flaky))
+    assert asyncio.run(manager.run("k1", "fp", flaky)) == ({"ok": True}, False)
+    assert len(attempts) == 2
+
+
+def test_request_fingerprint_depends_on_every_part():
+    assert request_fingerprint(["/upload", "ENG", "Task"]) == request_fingerprint(["/upload", "ENG", "Task"])
+    assert request_fingerprint(["/upload", "ENG", "Task"]) != request_fingerprint(["/upload", "ENG", "Bug"])
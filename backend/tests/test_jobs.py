@@ -0,0 +1,95 @@
+"""Leases of the shared job queue (app.jobs) on the SQLite backend"""
+import asyncio
+import time
+
+from app.jobs import JobWorker, SQLiteJobStore
+
+
+def _store(tmp_path) -> SQLiteJobStore:
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.enqueue("tenant", {"filename": "standup.wav"})
+
+    first = store.lease("worker-a", 0.05, 3)
+    assert first["id"] == job_id
+    assert first["attempts"] == 1
+    # Hidden while the lease is live
+    assert store.lease("worker-b", 60, 3) is None
+
+    time.sleep(0.1)
+    second = store.lease("worker-b", 60, 3)
+    assert second["id"] == job_id
+    assert second["owner"] == "worker-b"
+    assert second["attempts"] == 2
+
+    # The previous owner can neither renew nor finish the job
+    assert not store.heartbeat(job_id, "worker-a", 60)
+    assert not store.complete(job_id, "worker-a", {"by": "worker-a"})
+    assert store.complete(job_id, "worker-b", {"by": "worker-b"})
+    job = store.get(job_id)
+    assert job["state"] == "done"
+    assert job["result"] == {"by": "worker-b"}
+
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.enqueue("tenant", {})
+    store.lease("worker-a", 0.5, 3)
+
+    time.sleep(0.3)
+    assert store.heartbeat(job_id, "worker-a", 0.5)
+    time.sleep(0.35)
+    # Past the original lease, but within the renewed one
+    assert store.lease("worker-b", 60, 3) is None
+
+
+def test_sweep_fails_a_job_out_of_attempts(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.enqueue("tenant", {})
+    store.lease("worker-a", 0.01, 1)
+    time.sleep(0.05)
+
+    assert store.lease("worker-b", 60, 1) is None
+    assert [job["id"] for job in store.sweep(1)] == [job_id]
+    job = store.get(job_id)
+    assert job["state"] == "failed"
+    assert "Lease expired" in job["error"]
+
+
+def test_release_hands_the_job_back_without_an_attempt(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.enqueue("tenant", {})
+    store.lease("worker-a", 60, 3)
+
+    assert store.release(job_id, "worker-a")
+    job = store.lease("worker-b", 60, 3)
+    assert job["id"] == job_id
+    assert job["attempts"] == 1
+
+
+def test_worker_releases_running_jobs_on_stop(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.enqueue("tenant", {})
+
+    async def main():
+        worker = JobWorker(store, str(tmp_path / "audio"), poll_seconds=0.01)
+        started = asyncio.Event()
+
+        async def handler(job):
+            started.set()
+            await asyncio.sleep(3600)
+
+        worker.start(handler)
+        await asyncio.wait_for(started.wait(), 5)
+        await worker.stop()
+        return worker.stats()
+
+    stats = asyncio.run(main())
+    job = store.get(job_id)
+    assert job["state"] == "queued"
+    assert job["owner"] is None
+    assert job["attempts"] == 0
+    assert stats["released"] == 1
@@ -0,0 +1,132 @@
+"""Live meeting sessions (app.services.live_session) with fake Whisper and LLM services"""
+import asyncio
+import threading
+import wave
+
+import pytest
+
+from app.config import settings
+from app.services import live_session
+from app.services.live_session import LiveMeetingSession
+
+RATE = 16000
+SECOND = RATE * 2   # bytes of mono 16-bit PCM
+
+
+class FakeWhisper:
+    """Transcribes window N as "window N"; can hold calls until released"""
+
+    def __init__(self, gate: threading.Event = None):
+        self.gate = gate
+        self.calls = []
+
+    def transcribe(self, path, prompt=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        with wave.open(path, "rb") as w:
+            seconds = w.getnframes() / w.getframerate()
+        self.calls.append({"seconds": seconds, "prompt": prompt})
+        text = f"window {len(self.calls) - 1}"
+        return {"text": text, "segments": [{"start": 0.0, "end": seconds, "text": f" {text}"}]}
+
+
+class FakeLLM:
+    def __init__(self):
+        self.chunks = []
+
+    def extract_action_items(self, transcript):
+        self.chunks.append(transcript)
+        # The same item every time: the session must keep one copy
+        return {"tasks": [{"description": "Send the Notes!"}, {"description": f"item {len(self.chunks)}"}]}
+
+
+@pytest.fixture
+def services(tmp_path, monkeypatch):
+    whisper, llm = FakeWhisper(), FakeLLM()
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(live_session, "get_local_whisper_service", lambda: whisper)
+    monkeypatch.setattr(live_session, "get_whisper_service", lambda: None)
+    monkeypatch.setattr(live_session, "get_llm_service", lambda: llm)
+    return whisper, llm
+
+
+def test_windows_are_transcribed_in_order(services, tmp_path):
+    whisper, llm = services
+    events = []
+
+    async def on_event(event):
+        events.append(event)
+
+    async def main():
+        session = LiveMeetingSession(sample_rate=RATE, window_seconds=1, on_event=on_event)
+        session.add_audio(b"\x00" * (SECOND + SECOND // 2))
+        session.add_audio(b"\x00" * (SECOND // 2 + SECOND // 4))
+        return await session.finish()
+
+    result = asyncio.run(main())
+    # Two full windows plus a 0.25s tail, which is too short to send
+    assert [call["seconds"] for call in whisper.calls] == [1.0, 1.0]
+    assert whisper.calls[1]["prompt"] == "window 0"
+    assert result["transcript"] == "window 0 window 1"
+    assert result["segments"] == [
+        {"start": 0.0, "end": 1.0, "text": "window 0"},
+        {"start": 1.0, "end": 2.0, "text": "window 1"},
+    ]
+    assert result["duration_seconds"] == 2.0
+    assert result["windows_dropped"] == 0
+    assert [task["description"] for task in result["action_items"]] == ["Send the Notes!", "item 1", "item 2"]
+    # The second extraction sees the new window with the earlier text as context
+    assert llm.chunks == ["window 0", "window 0 window 1"]
+    assert [e["window"] for e in events if e["type"] == "transcript"] == [0, 1]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_backlog_beyond_max_pending_is_dropped(services, monkeypatch):
+    gate = threading.Event()
+    whisper = FakeWhisper(gate)
+    monkeypatch.setattr(live_session, "get_local_whisper_service", lambda: whisper)
+    events = []
+
+    async def on_event(event):
+        events.append(event)
+
+    async def main():
+        session = LiveMeetingSession(sample_rate=RATE, window_seconds=1, max_pending=1, on_event=on_event)
+        session.add_audio(b"\x00" * SECOND)
+        await asyncio.sleep(0.1)    # window 0 is being transcribed
+        session.add_audio(b"\x00" * 3 * SECOND)
+        gate.set()
+        return await session.finish()
+
+    result = asyncio.run(main())
+    assert result["windows_dropped"] == 2
+    assert len(whisper.calls) == 2
+    assert result["duration_seconds"] == 4.0
+    dropped = [e for e in events if e["type"] == "dropped"]
+    assert [(e["window"], e["start"], e["end"]) for e in dropped] == [(2, 2.0, 3.0), (3, 3.0, 4.0)]
+
+
+def test_failed_window_is_reported_and_skipped(services):
+    whisper, _ = services
+    events = []
+    calls = []
+
+    def flaky(path, prompt=None):
+        calls.append(path)
+        if len(calls) == 1:
+            raise RuntimeError("whisper down")
+        return {"text": "recovered", "segments": []}
+
+    whisper.transcribe = flaky
+
+    async def on_event(event):
+        events.append(event)
+
+    async def main():
+        session = LiveMeetingSession(sample_rate=RATE, window_seconds=1, on_event=on_event)
+        session.add_audio(b"\x00" * 2 * SECOND)
+        return await session.finish()
+
+    result = asyncio.run(main())
+    assert result["transcript"] == "recovered"
+    assert [e["window"] for e in events if e["type"] == "error"] == [0]
@@ -0,0 +1,96 @@
+"""Small -> large model extraction cascade (app.services.llm_service)"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.services import vector_index
+from app.services.llm_service import LLMService
+
+pytest.importorskip("openai")
+
+TRANSCRIPT = "Alice: I'll send the quarterly report to finance by Friday.\nBob: Sounds good."
+
+
+def _tasks(confidence: float) -> str:
+    return json.dumps({"tasks": [{"description": "Send the quarterly report", "owner": "Alice", "confidence": confidence}]})
+
+
+class StubCompletions:
+    """chat.completions with one canned answer (or exception) per model"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.models = []
+
+    def create(self, **params):
+        self.models.append(params["model"])
+        answer = self.answers[params["model"]]
+        if isinstance(answer, Exception):
+            raise answer
+        message = SimpleNamespace(content=answer)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    monkeypatch.setattr(settings, "GROQ_API_KEY", None)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "LLM_MODEL", "large")
+    monkeypatch.setattr(settings, "LLM_SMALL_MODEL", "small")
+    monkeypatch.setattr(settings, "CASCADE_MIN_CONFIDENCE", 0.7)
+    monkeypatch.setattr(vector_index, "get_action_item_index", lambda: None)
+
+    def make(small_answer, large_answer=None):
+        service = LLMService()
+        completions = StubCompletions({"small": small_answer, "large": large_answer or _tasks(0.95)})
+        service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return service, completions.models
+
+    return make
+
+
+def test_confident_small_model_answers(make_service):
+    service, models = make_service(_tasks(0.9))
+    result = service.extract_action_items(TRANSCRIPT)
+    assert models == ["small"]
+    assert (result["tier"], result["model"], result["escalation"]) == ("small", "small", None)
+    assert result["tasks"][0]["description"] == "Send the quarterly report"
+
+
+@pytest.mark.parametrize("small_answer, reason", [
+    (_tasks(0.55), "low_confidence"),
+    (_tasks(0.2), "low_confidence"),       # every task dropped by TASK_CONFIDENCE_THRESHOLD
+    ("Sure! Here are the tasks you asked for", "invalid_json"),
+    (RuntimeError("rate limited"), "error"),
+])
+def test_small_model_escalates(make_service, small_answer, reason):
+    service, models = make_service(small_answer)
+    result = service.extract_action_items(TRANSCRIPT)
+    assert models == ["small", "large"]
+    assert (result["tier"], result["model"], result["escalation"]) == ("large", "large", reason)
+    assert result["tasks"][0]["confidence"] == 0.95
+
+
+def test_complex_transcripts_skip_the_small_model(make_service, monkeypatch):
+    monkeypatch.setattr(settings, "CASCADE_MAX_COMPLEXITY", 0.5)
+    service, models = make_service(_tasks(0.9))
+    result = service.extract_action_items(" ".join(["word"] * 1500))
+    assert models == ["large"]
+    assert result["escalation"] == "complexity"
+
+
+def test_cascade_off_without_a_small_model(make_service, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_SMALL_MODEL", None)
+    service, models = make_service(_tasks(0.9))
+    assert service.small_model is None
+    assert service.extract_action_items(TRANSCRIPT)["tier"] == "large"
+    assert models == ["large"]
+
+
+def test_large_model_failure_falls_back_to_regex(make_service):
+    service, models = make_service(_tasks(0.2), RuntimeError("down"))
+    result = service.extract_action_items(TRANSCRIPT)
+    assert models == ["small", "large"]
+    assert result["tier"] == "regex"
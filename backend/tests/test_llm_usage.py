@@ -0,0 +1,74 @@
+"""Prompt and cached token accounting of LLM calls (app.services.llm_service)"""
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel, ConfigDict
+
+from app.config import settings
+from app.services import vector_index
+from app.services.llm_service import LLMService
+
+pytest.importorskip("openai")
+
+TRANSCRIPT = "Alice: I'll send the quarterly report to finance by Friday.\nBob: Sounds good."
+
+
+class PinnedSdkUsage(BaseModel):
+    """CompletionUsage as declared by openai 1.3.0: no prompt_tokens_details"""
+
+    model_config = ConfigDict(extra="allow")
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "GROQ_API_KEY", None)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "LLM_SMALL_MODEL", None)
+    monkeypatch.setattr(vector_index, "get_action_item_index", lambda: None)
+    return LLMService()
+
+
+def _stub_client(usages):
+    usages = iter(usages)
+
+    def create(**params):
+        message = SimpleNamespace(content="Minutes")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=next(usages))
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_cached_tokens_from_fields_the_sdk_does_not_declare(service):
+    raw = {"prompt_tokens": 1000, "completion_tokens": 10, "total_tokens": 1010}
+    service.client = _stub_client([
+        PinnedSdkUsage.model_validate({**raw, "prompt_tokens_details": {"cached_tokens": 600}}),
+        SimpleNamespace(**raw, prompt_tokens_details={"cached_tokens": 300}),
+        PinnedSdkUsage.model_validate(raw),
+    ])
+    for _ in range(3):
+        service.summarize_transcript(TRANSCRIPT)
+
+    usage = service.usage_stats()
+    assert (usage["calls"], usage["prompt_tokens"], usage["cached_tokens"]) == (3, 3000, 900)
+    assert usage["cache_hit_ratio"] == 0.3
+
+
+def test_cached_tokens_reported_by_the_api(service):
+    from benchmarks.fake_servers import FakeOpenAIServer
+    from openai import OpenAI
+
+    server = FakeOpenAIServer().start()
+    try:
+        service.client = OpenAI(api_key="sk-test", base_url=f"{server.url}/v1")
+        service.summarize_transcript(TRANSCRIPT)
+        service.summarize_transcript(TRANSCRIPT + "\nCarol: One more thing.")
+    finally:
+        server.stop()
+
+    usage = service.usage_stats()
+    # The second call shares the static system prompt with the first
+    assert usage["cached_tokens"] == server.cached_tokens > 0
+    assert usage["prompt_tokens"] == server.prompt_tokens
@@ -0,0 +1,128 @@
+"""Admission control and fair queueing (app.scheduler)"""
+import asyncio
+import hashlib
+
+import pytest
+
+from app.scheduler import (
+    AdmissionRejected,
+    PipelineScheduler,
+    StageScheduler,
+    _parse_weights,
+    set_current_tenant,
+    tenant_key,
+)
+
+
+def _admission_order(stage: StageScheduler, requests):
+    """
+    Hold the only slot, queue `requests` ((queue, weight, cost) tuples),
+    then free the slot and record the order in which queues are admitted
+    """
+    order = []
+
+    async def run(queue, weight, cost):
+        ticket = await stage.acquire(queue, weight, cost)
+        order.append(queue)
+        await asyncio.sleep(0)
+        stage.release(ticket)
+
+    async def main():
+        blocker = await stage.acquire("blocker")
+        tasks = [asyncio.create_task(run(*request)) for request in requests]
+        await asyncio.sleep(0)
+        stage.release(blocker)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    return order
+
+
+def test_tenants_interleave_instead_of_running_in_arrival_order():
+    stage = StageScheduler("whisper", concurrency=1)
+    order = _admission_order(stage, [("BULK", 1.0, 1.0)] * 4 + [("SMALL", 1.0, 1.0)] * 2)
+    assert order[:4] == ["BULK", "SMALL", "BULK", "SMALL"]
+
+
+def test_weights_and_costs_set_the_share():
+    order = _admission_order(StageScheduler("llm", concurrency=1), [("A", 1.0, 1.0)] * 3 + [("B", 3.0, 1.0)] * 3)
+    assert order[:4] == ["A", "B", "B", "B"]
+
+    # One 3-minute recording counts like three 1-minute ones
+    order = _admission_order(StageScheduler("whisper", concurrency=1), [("LONG", 1.0, 3.0)] * 2 + [("SHORT", 1.0, 1.0)] * 3)
+    assert order == ["LONG", "SHORT", "SHORT", "SHORT", "LONG"]
+
+
+def test_queue_limits_reject_with_retry_after():
+    stage = StageScheduler("jira", concurrency=1, queue_limit=4, tenant_queue_limit=2)
+
+    async def main():
+        await stage.acquire("A")
+        waiting = [asyncio.create_task(stage.acquire(queue)) for queue in ("A", "A", "B")]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected, match="for this tenant") as tenant_full:
+            stage.check("A")
+        waiting.append(asyncio.create_task(stage.acquire("B")))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected, match="at capacity"):
+            stage.check("C")
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        return tenant_full.value
+
+    error = asyncio.run(main())
+    assert error.retry_after >= 1
+    assert stage.waiting == 0
+    assert stage.stats()["rejected"] == 2
+
+
+def test_concurrency_cap():
+    stage = StageScheduler("diarization", concurrency=2)
+    peak = running = 0
+
+    async def job():
+        nonlocal peak, running
+        ticket = await stage.acquire("T")
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        stage.release(ticket)
+
+    async def main():
+        await asyncio.gather(*(job() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert stage.stats()["admitted"] == 6
+
+
+def test_api_key_tenants_can_be_weighted():
+    digest = hashlib.sha256(b"s3cret-key").hexdigest()[:12]
+    assert tenant_key("s3cret-key", "eng") == f"key:{digest}"
+    assert tenant_key(None, "eng") == "ENG"
+    assert tenant_key() == "ANONYMOUS"
+
+    weights = _parse_weights(f"eng=4, KEY:{digest.upper()}=2,bad=x")
+    assert weights == {"ENG": 4.0, f"key:{digest}": 2.0}
+
+    scheduler = PipelineScheduler({"llm": 1}, weights=weights, batch_weight=0.5)
+    assert scheduler._queue(tenant_key("s3cret-key"), False) == (f"key:{digest}", 2.0)
+    assert scheduler._queue(tenant_key(None, "eng"), True) == ("ENG:batch", 2.0)
+    assert scheduler._queue(tenant_key("other-key"), False)[1] == 1.0
+
+
+def test_pipeline_acquire_uses_the_current_tenant():
+    scheduler = PipelineScheduler({"llm": 1}, weights={"ENG": 2.0})
+
+    async def main():
+        set_current_tenant("ENG", batch=True)
+        ticket = await scheduler.acquire("llm")
+        stats = scheduler.stats()["llm"]
+        scheduler.release(ticket)
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["active"] == 1
+    assert scheduler.stats()["llm"]["active"] == 0
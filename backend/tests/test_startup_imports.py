@@ -0,0 +1,29 @@
+"""
+Startup stays cheap: importing the app must not pull in the provider SDKs
+or NumPy, which are imported when a service is first used. Checked in a
+fresh interpreter, by module rather than by wall-clock time.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use of a service, never at import time
+LAZY_MODULES = ("groq", "openai", "numpy", "faster_whisper")
+
+
+def _imported_packages(module: str) -> set:
+    code = f"import json, sys, {module}; print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}})))"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return set(json.loads(proc.stdout.splitlines()[-1]))
+
+
+@pytest.mark.parametrize("module", ["app.main", "app.cli"])
+def test_import_does_not_load_heavy_modules(module):
+    eager = sorted(set(LAZY_MODULES) & _imported_packages(module))
+    assert eager == [], f"{module} imports {', '.join(eager)} at startup"
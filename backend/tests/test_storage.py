@@ -0,0 +1,175 @@
+"""Upload disk budget and janitors (app.storage)"""
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+import pytest
+
+from app import storage as storage_module
+from app.storage import QueuedAudio, UploadStorage, UploadStorageFull, copy_file_data
+
+
+class FakeUpload:
+    """The parts of Starlette's UploadFile that UploadStorage reads"""
+
+    def __init__(self, data: bytes, declare_size: bool = True):
+        self.file = io.BytesIO(data)
+        self.size = len(data) if declare_size else None
+
+    async def read(self, n: int) -> bytes:
+        return self.file.read(n)
+
+
+def _age(path, seconds: float):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_save_and_release_account_for_the_budget(tmp_path):
+    storage = UploadStorage(str(tmp_path), budget_bytes=1000)
+
+    async def main():
+        stored = await storage.save(FakeUpload(b"x" * 300), ".wav", max_bytes=500)
+        assert open(stored.path, "rb").read() == b"x" * 300
+        assert storage.used_bytes == 300
+        # Unknown size: reserves max_bytes while streaming, then shrinks to the real size
+        second = await storage.save(FakeUpload(b"y" * 100, declare_size=False), ".wav", max_bytes=500)
+        assert storage.used_bytes == 400
+        await storage.release(stored)
+        await storage.release(stored)
+        assert not os.path.exists(stored.path)
+        assert storage.used_bytes == 100
+        return storage.stats(), second
+
+    stats, second = asyncio.run(main())
+    assert stats["uploads_stored"] == 2
+    assert stats["in_flight_uploads"] == 1
+    assert os.path.exists(second.path)
+
+
+def test_oversized_uploads_are_refused(tmp_path):
+    storage = UploadStorage(str(tmp_path), budget_bytes=1000)
+
+    async def main():
+        with pytest.raises(ValueError):
+            await storage.save(FakeUpload(b"x" * 600), ".wav", max_bytes=500)
+        # Undeclared size: caught while streaming, and the partial file is removed
+        with pytest.raises(ValueError):
+            await storage.save(FakeUpload(b"x" * 600, declare_size=False), ".wav", max_bytes=500)
+
+    asyncio.run(main())
+    assert list(tmp_path.iterdir()) == []
+    assert storage.used_bytes == 0
+
+
+def test_full_storage_waits_then_rejects(tmp_path):
+    (tmp_path / "other-worker.wav").write_bytes(b"z" * 800)
+    storage = UploadStorage(str(tmp_path), budget_bytes=1000, queue_timeout=0.2, sweep_interval=30)
+
+    async def main():
+        with pytest.raises(UploadStorageFull) as exc:
+            await storage.save(FakeUpload(b"x" * 300), ".wav", max_bytes=500)
+        return exc.value
+
+    error = asyncio.run(main())
+    assert error.retry_after == 30
+    assert storage.stats()["uploads_rejected"] == 1
+
+
+def test_waiting_upload_proceeds_when_space_is_released(tmp_path):
+    storage = UploadStorage(str(tmp_path), budget_bytes=500, queue_timeout=5)
+
+    async def main():
+        first = await storage.save(FakeUpload(b"x" * 400), ".wav", max_bytes=500)
+        waiting = asyncio.create_task(storage.save(FakeUpload(b"y" * 400), ".wav", max_bytes=500))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        await storage.release(first)
+        return await asyncio.wait_for(waiting, 2)
+
+    stored = asyncio.run(main())
+    assert os.path.getsize(stored.path) == 400
+    assert storage.stats()["uploads_waited"] == 1
+
+
+def test_janitor_removes_only_old_orphans(tmp_path):
+    storage = UploadStorage(str(tmp_path), budget_bytes=10_000, orphan_age=60)
+    orphan = tmp_path / "crashed.wav"
+    orphan.write_bytes(b"o" * 50)
+    _age(orphan, 120)
+    recent = tmp_path / "recent.wav"
+    recent.write_bytes(b"r" * 20)
+
+    async def main():
+        stored = await storage.save(FakeUpload(b"x" * 30), ".wav", max_bytes=100)
+        _age(stored.path, 120)
+        return storage.sweep(), stored
+
+    result, stored = asyncio.run(main())
+    assert result == {"files": 1, "bytes": 50}
+    assert not orphan.exists()
+    # Files owned by an upload in progress are kept however old they are
+    assert os.path.exists(stored.path)
+    assert recent.exists()
+    assert storage.used_bytes == 50
+
+
+def test_queued_audio_budget_and_sweep(tmp_path):
+    queue = QueuedAudio(str(tmp_path / "queued"), budget_bytes=100, orphan_age=60, sweep_interval=10)
+    first, second = tmp_path / "a.wav", tmp_path / "b.wav"
+    first.write_bytes(b"a" * 60)
+    second.write_bytes(b"b" * 60)
+
+    kept = queue.add(str(first))
+    assert os.path.dirname(kept) == str(tmp_path / "queued")
+    assert not first.exists()
+    with pytest.raises(UploadStorageFull):
+        queue.add(str(second))
+    assert second.exists()
+
+    orphan = tmp_path / "queued" / "failed-job.wav"
+    orphan.write_bytes(b"f" * 10)
+    _age(orphan, 120)
+    _age(kept, 120)
+    assert queue.sweep([kept]) == {"files": 1, "bytes": 10}
+    assert os.path.exists(kept)
+    assert not queue.sweep_due()
+    assert queue.stats()["rejected"] == 1
+
+
+def test_spooled_upload_is_copied_in_the_kernel(tmp_path, monkeypatch):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+    spooled.write(data)
+    assert spooled._rolled
+    upload = FakeUpload(b"")
+    upload.file, upload.size = spooled, len(data)
+
+    copies = []
+    monkeypatch.setattr(storage_module, "copy_file_data", lambda *args: copies.append(args) or copy_file_data(*args))
+
+    async def read(n):
+        raise AssertionError("a spooled upload must not be read through user space")
+
+    upload.read = read
+    storage = UploadStorage(str(tmp_path / "uploads"), budget_bytes=10 * 1024 * 1024)
+    stored = asyncio.run(storage.save(upload, ".wav", max_bytes=5 * 1024 * 1024))
+    assert len(copies) == 1
+    assert stored.size == len(data)
+    assert open(stored.path, "rb").read() == data
+
+
+def test_copy_file_data_falls_back_to_reads(tmp_path, monkeypatch):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.write_bytes(b"0123456789" * 1000)
+
+    def unsupported(*args):
+        raise OSError("not supported")
+
+    monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+    monkeypatch.setattr(os, "sendfile", unsupported, raising=False)
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        assert copy_file_data(s.fileno(), d.fileno(), 5000) == 5000
+    assert dst.read_bytes() == src.read_bytes()[:5000]
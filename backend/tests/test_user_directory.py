@@ -0,0 +1,105 @@
+"""Local mirror of assignable Jira users (app.services.user_directory)"""
+import pytest
+
+from app.services import user_directory
+from app.services.jira_service import JiraService
+from app.services.user_directory import UserDirectory, UserIndex
+
+USERS = [
+    {"accountId": "acc-alex-k", "displayName": "Alex Kim", "emailAddress": "alex.kim@acme.io"},
+    {"accountId": "acc-alex-r", "displayName": "Alex Romero", "emailAddress": "aromero@acme.io"},
+    {"accountId": "acc-bob", "displayName": "Bob Stone", "emailAddress": "bob@acme.io"},
+    {"accountId": "acc-chloe", "displayName": "Chloé Dubois", "emailAddress": None},
+]
+
+
+class FakeJira:
+    """Serves USERS in short pages, the way Jira caps maxResults"""
+
+    base_url = "https://acme.atlassian.net/"
+
+    def __init__(self, users, page_cap: int = 2):
+        self.users = users
+        self.page_cap = page_cap
+        self.pages = []
+
+    def list_assignable_users(self, project_key, start_at=0, max_results=1000):
+        self.pages.append(start_at)
+        return self.users[start_at:start_at + min(max_results, self.page_cap)]
+
+
+def test_exact_keys_and_fuzzy_matches():
+    index = UserIndex(USERS)
+    assert index.match("bob@acme.io")[0]["accountId"] == "acc-bob"
+    assert index.match("Chloe Dubois")[0]["accountId"] == "acc-chloe"
+    assert index.match("Bob S.")[0]["accountId"] == "acc-bob"
+    assert index.match("Alex Romro")[0]["accountId"] == "acc-alex-r"
+    # Emails must match exactly
+    assert index.match("bob@acme.com") == (None, 0.0)
+
+
+def test_ambiguous_owners_are_not_assigned():
+    index = UserIndex(USERS)
+    # Two people share the first name: an exact but ambiguous key
+    assert index.match("Alex") == (None, 1.0)
+    user, score = index.match("Alexx")
+    assert user is None
+    assert score >= 0.6
+
+
+def test_sync_pages_until_an_empty_page(tmp_path):
+    jira = FakeJira(USERS + [{"accountId": "acc-bot", "displayName": "CI Bot", "accountType": "app"}])
+    directory = UserDirectory(str(tmp_path), page_size=1000)
+    key = directory._mirror_key(jira.base_url, "eng")
+    with directory._lock:
+        directory._mirror(key).jira_service = jira
+
+    # Short pages do not end the sync; apps are not assignable owners
+    assert directory.refresh(key) == 4
+    assert jira.pages == [0, 2, 4, 5]
+
+    # A restarted process answers from the snapshot without calling Jira
+    restarted = UserDirectory(str(tmp_path))
+    restarted._schedule_refresh = lambda mirror_key: None
+    assert restarted.lookup(jira, "ENG", "Bob Stone") == (True, "acc-bob", 1.0)
+
+
+def test_lookup_before_the_first_sync(tmp_path):
+    directory = UserDirectory(str(tmp_path))
+    scheduled = []
+    directory._schedule_refresh = scheduled.append
+    assert directory.lookup(FakeJira(USERS), "ENG", "Bob") == (False, None, 0.0)
+    assert scheduled == ["https://acme.atlassian.net|ENG"]
+
+
+@pytest.fixture
+def jira(tmp_path, monkeypatch):
+    directory = UserDirectory(str(tmp_path))
+    directory._schedule_refresh = lambda mirror_key: None
+    monkeypatch.setattr(user_directory, "get_user_directory", lambda: directory)
+    service = JiraService("https://acme.atlassian.net", "bot@acme.io", "token")
+    service.searches = []
+
+    def live_search(query, project_key):
+        service.searches.append(query)
+        return "acc-live"
+
+    monkeypatch.setattr(service, "_find_user", live_search)
+    return service, directory
+
+
+def test_find_user_searches_live_until_synced_and_for_misses(jira):
+    service, directory = jira
+    assert service.find_user("Bob Stone", "ENG") == "acc-live"
+
+    key = directory._mirror_key(service.base_url, "ENG")
+    with directory._lock:
+        directory._mirror(key).jira_service = FakeJira(USERS)
+    directory.refresh(key)
+
+    assert service.find_user("Bob Stone", "ENG") == "acc-bob"
+    # Ambiguous: not searched, the search would just take the first hit
+    assert service.find_user("Alex", "ENG") is None
+    # Unknown to the mirror, e.g. hired since the last sync
+    assert service.find_user("Zoe Quinn", "ENG") == "acc-live"
+    assert service.searches == ["Bob Stone", "Zoe Quinn"]
@@ -0,0 +1,118 @@
+"""Similar action items index (app.services.vector_index)"""
+import json
+
+import pytest
+
+from app.services.vector_index import ActionItemIndex
+
+np = pytest.importorskip("numpy")
+
+
+class SmallIndex(ActionItemIndex):
+    """Trains its quantizer at 200 rows instead of 20k"""
+
+    TRAIN_SIZE = 200
+    INITIAL_CAPACITY = 64
+
+
+def _items(count: int, start: int = 0):
+    topics = ("deployment script", "billing report", "login bug", "onboarding guide", "cache layer")
+    return [
+        {"description": f"update the {topics[i % len(topics)]} for customer {i}", "owner": f"owner{i % 7}"}
+        for i in range(start, start + count)
+    ]
+
+
+def test_search_ranks_the_closest_item_first(tmp_path):
+    index = ActionItemIndex(str(tmp_path))
+    index.add([
+        {"description": "Update the deployment script before Friday", "owner": "alice", "issue_key": "ENG-1"},
+        {"description": "Review the billing report", "owner": "bob"},
+        {"description": "Fix the login bug on mobile", "owner": "carol"},
+    ])
+    results = index.search("updating the deployment scripts", k=2)
+    assert results[0]["issue_key"] == "ENG-1"
+    assert results[0]["score"] > results[1]["score"]
+    assert index.search("   ") == []
+
+
+def test_scores_use_the_current_idf(tmp_path):
+    index = ActionItemIndex(str(tmp_path))
+    text = "Send the quarterly roadmap to the board"
+    index.add([{"description": text}])
+    # Many later items share "the"; an exact match must still score 1.0
+    index.add([{"description": f"the item number {i} for the team"} for i in range(50)])
+    assert index.search(text, k=1)[0]["score"] == pytest.approx(1.0, abs=0.01)
+
+
+def test_annotate_reports_a_previous_owner(tmp_path):
+    index = ActionItemIndex(str(tmp_path))
+    index.add([{"description": "Migrate the audit log to the new cluster", "owner": "dan"}])
+    tasks = index.annotate([{"description": "Migrate the audit log to the new cluster"}, {"description": "Plan the offsite"}])
+    assert tasks[0]["previously_assigned_to"] == "dan"
+    assert tasks[1]["similar_items"] == []
+
+
+def test_other_processes_see_new_rows(tmp_path):
+    writer = ActionItemIndex(str(tmp_path))
+    reader = ActionItemIndex(str(tmp_path))
+    writer.add([{"description": "Write the incident postmortem", "owner": "erin"}])
+    assert reader.search("incident postmortem", k=1)[0]["owner"] == "erin"
+
+
+def test_quantizer_retrains_when_rows_double(tmp_path):
+    index = SmallIndex(str(tmp_path))
+    index.add(_items(199))
+    assert index.centroids is None
+
+    index.add(_items(1, 199))
+    assert index.trained == 200
+    first_lists = index.n_lists
+
+    index.add(_items(150, 200))
+    assert index.trained == 200
+    index.add(_items(50, 350))
+    assert index.trained == 400
+    assert index.n_lists >= first_lists
+    # Every row is in exactly one list after the retrain
+    assert sorted(row for rows in index._lists for row in rows) == list(range(400))
+
+    # A process that opened the index earlier picks up the new quantizer
+    reopened = SmallIndex(str(tmp_path))
+    assert reopened.trained == 400
+    assert reopened.search("update the login bug for customer 2", k=1)[0]["description"] == "update the login bug for customer 2"
+
+
+def test_reader_reloads_a_retrained_quantizer(tmp_path):
+    writer = SmallIndex(str(tmp_path))
+    writer.add(_items(200))
+    reader = SmallIndex(str(tmp_path))
+    assert reader.trained == 200
+
+    writer.add(_items(200, 200))
+    reader.search("cache layer", k=1)
+    assert reader.trained == 400
+    assert reader.n_lists == writer.n_lists
+
+
+def test_rows_written_with_idf_weights_are_migrated(tmp_path):
+    index = ActionItemIndex(str(tmp_path))
+    index.add(_items(20))
+    # Rewrite the directory the way indexes were stored before query-time
+    # IDF: float16 TF-IDF rows in vectors.f16
+    legacy = np.zeros((index.capacity, index.dim), dtype=np.float16)
+    for row in range(index.count):
+        legacy[row] = index.embed(_items(20)[row]["description"])
+    legacy.tofile(tmp_path / "vectors.f16")
+    (tmp_path / "vectors.i8").unlink()
+    state_path = tmp_path / "state.json"
+    state = json.loads(state_path.read_text())
+    del state["rows"], state["trained"]
+    state_path.write_text(json.dumps(state))
+
+    migrated = ActionItemIndex(str(tmp_path))
+    assert json.loads(state_path.read_text())["rows"] == "tf"
+    assert not (tmp_path / "vectors.f16").exists()
+    result = migrated.search("update the cache layer for customer 4", k=1)[0]
+    assert result["description"] == "update the cache layer for customer 4"
+    assert result["score"] == pytest.approx(1.0, abs=0.01)